@@ -0,0 +1,330 @@
+"""参考发送端: 按中继的质量反馈 (VFBK) 调整帧率 / JPEG 质量 / mode，可模拟瓶颈链路
+
+    python3 bench/adaptive_sender.py --port 8766 --size 40000 --fps 72 --duration 30
+    python3 bench/adaptive_sender.py --relay video_streamer --link-mbps 25 --duration 20
+
+帧内容与 bench/vssp_sender.py 相同 (随机数据)，--size / --resolution 为 --quality 时的每眼帧大小，
+其他质量下按 JPEG_SIZE 估算。收到 seq 更新的反馈后，下一帧起改用推荐的 fps (不超过 --fps)、
+quality (不超过 --quality) 与 mode (--mode mono 时不升为 stereo)。
+--link-mbps 在发送端模拟一条瓶颈链路 (令牌桶，缓冲 --link-buffer-ms，溢出的包丢弃)。
+
+--relay 时自行启动中继和一个 ?timing=1 无头客户端，先后以 --ignore-feedback 与按反馈调整各跑一次，
+报告客户端收到的完整帧率 (每眼一帧) 与占发出帧的比例、平均帧大小，以及每秒的档位变化。
+"""
+
+import argparse
+import asyncio
+import bisect
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from load_test import HeadlessClient, RelayProcess  # noqa: E402
+from vssp.feedback import (  # noqa: E402
+    REASON_ASSEMBLY,
+    REASON_BACKLOG,
+    REASON_LOSS,
+    parse_feedback,
+)
+from vssp.header import (  # noqa: E402
+    EYE_LEFT,
+    EYE_MONO,
+    EYE_RIGHT,
+    MODE_MONO,
+    MODE_STEREO,
+)
+from vssp_sender import SyntheticSender, add_sender_arguments  # noqa: E402
+
+# 相对 quality 85 的 JPEG 大小 (典型自然图像的粗略估计)，其间线性插值
+JPEG_SIZE = (
+    (10, 0.25),
+    (20, 0.36),
+    (30, 0.45),
+    (40, 0.52),
+    (50, 0.58),
+    (60, 0.65),
+    (70, 0.75),
+    (80, 0.9),
+    (85, 1.0),
+    (90, 1.18),
+    (95, 1.55),
+    (100, 2.8),
+)
+SETTLE = 1.0
+
+
+def jpeg_scale(quality):
+    qualities = [q for q, _ in JPEG_SIZE]
+    i = bisect.bisect_left(qualities, quality)
+    if i == 0:
+        return JPEG_SIZE[0][1]
+    if i == len(JPEG_SIZE):
+        return JPEG_SIZE[-1][1]
+    (q0, s0), (q1, s1) = JPEG_SIZE[i - 1], JPEG_SIZE[i]
+    return s0 + (s1 - s0) * (quality - q0) / (q1 - q0)
+
+
+class Link:
+    """令牌桶瓶颈: 速率 mbps，缓冲 buffer_ms 内的突发，超出的包丢弃"""
+
+    def __init__(self, mbps, buffer_ms):
+        self.rate = mbps * 1e6 / 8
+        self.depth = self.rate * buffer_ms / 1000
+        self.tokens = self.depth
+        self.last = time.perf_counter()
+
+    def admit(self, size):
+        now = time.perf_counter()
+        self.tokens = min(self.tokens + (now - self.last) * self.rate, self.depth)
+        self.last = now
+        if self.tokens < size:
+            return False
+        self.tokens -= size
+        return True
+
+
+class AdaptiveSender(SyntheticSender):
+    """单进程发送端: 帧率 / 质量 / mode 随 VFBK 反馈变化"""
+
+    def __init__(self, args, port, first_id, stop=None):
+        super().__init__(0, args, port, time.perf_counter(), first_id)
+        self.base_size = self.size
+        self.fps = args.fps
+        self.quality = args.quality
+        self.set_mode(self.mode)
+        self.feedback_seq = None
+        self.link = (
+            Link(args.link_mbps, args.link_buffer_ms) if args.link_mbps else None
+        )
+        self.stop = stop
+        self.stats["link_drops"] = 0
+        self.stats["feedback"] = 0
+        self.stats["changes"] = 0
+        self.timeline = (
+            []
+        )  # 每秒 (t, fps, quality, mode, Mbit/s, 链路丢包率, reasons, 中继丢帧率)
+        self.last_feedback = None
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self.eyes = (EYE_LEFT, EYE_RIGHT) if mode == MODE_STEREO else (EYE_MONO,)
+
+    def handle_control(self, data, addr):
+        feedback = parse_feedback(data)
+        if feedback is None:
+            super().handle_control(data, addr)
+            return
+        self.stats["feedback"] += 1
+        # 16 位 seq 回绕比较: 丢弃乱序到达的旧反馈
+        if (
+            self.feedback_seq is not None
+            and (feedback.seq - self.feedback_seq) & 0xFFFF >= 0x8000
+        ):
+            return
+        self.feedback_seq = feedback.seq
+        self.last_feedback = feedback
+        if self.args.ignore_feedback:
+            return
+        fps = min(float(feedback.fps), self.args.fps)
+        quality = min(feedback.quality, self.args.quality)
+        mode = MODE_MONO if self.args.mode == "mono" else feedback.mode
+        if (fps, quality, mode) != (self.fps, self.quality, self.mode):
+            self.stats["changes"] += 1
+            self.fps, self.quality = fps, quality
+            self.set_mode(mode)
+
+    def send(self, packets):
+        if self.link is not None:
+            kept = []
+            for packet in packets:
+                if self.link.admit(len(packet[0]) + len(packet[1])):
+                    kept.append(packet)
+                else:
+                    self.stats["link_drops"] += 1
+            packets = kept
+        super().send(packets)
+
+    def send_frame(self, frame_id):
+        scale = jpeg_scale(self.quality) / jpeg_scale(self.args.quality)
+        self.size = max(int(self.base_size * min(scale, 1.0)), 1)
+        super().send_frame(frame_id)
+
+    def sample(self, t, last):
+        """记录一秒的档位与发送量"""
+        stats = self.stats
+        sent = stats["packets"] - last["packets"] + stats["link_drops"] - last["drops"]
+        drops = stats["link_drops"] - last["drops"]
+        feedback = self.last_feedback
+        self.timeline.append(
+            (
+                t,
+                self.fps,
+                self.quality,
+                "stereo" if self.mode == MODE_STEREO else "mono",
+                (stats["bytes"] - last["bytes"]) * 8 / 1e6,
+                drops / sent if sent else 0.0,
+                feedback.reasons if feedback else 0,
+                feedback.loss if feedback else 0.0,
+            )
+        )
+        last.update(
+            packets=stats["packets"], drops=stats["link_drops"], bytes=stats["bytes"]
+        )
+
+    def run(self):
+        args = self.args
+        start = time.perf_counter()
+        due = start
+        frame_id = self.first_id
+        next_sample = start + 1.0
+        last = {"packets": 0, "drops": 0, "bytes": 0}
+        while due - start < args.duration:
+            if self.stop is not None and self.stop.is_set():
+                break
+            if args.jitter:
+                wait = due + self.random.uniform(0, args.jitter / 1000)
+            else:
+                wait = due
+            wait -= time.perf_counter()
+            if wait > 0:
+                self.poll(wait)
+            elif wait < -1.0 / self.fps:
+                self.stats["late"] += 1
+                due = time.perf_counter()
+            self.send_frame(frame_id)
+            frame_id = (frame_id + 1) & 0xFFFFFFFF
+            due += 1.0 / self.fps
+            if time.perf_counter() >= next_sample:
+                self.sample(round(next_sample - start), last)
+                next_sample += 1.0
+        self.poll(0.2)
+        self.sock.close()
+        return self.stats
+
+
+def describe_reasons(reasons):
+    names = [
+        name
+        for bit, name in (
+            (REASON_LOSS, "loss"),
+            (REASON_ASSEMBLY, "assembly"),
+            (REASON_BACKLOG, "backlog"),
+        )
+        if reasons & bit
+    ]
+    return ",".join(names) or "-"
+
+
+def print_timeline(timeline):
+    print(
+        "     t |  fps | quality | mode   |  Mbit/s | link drops | relay loss | reasons"
+    )
+    for t, fps, quality, mode, mbps, drops, reasons, loss in timeline:
+        print(
+            f"{t:5.0f}s | {fps:4.0f} | {quality:7d} | {mode:6} | {mbps:7.1f} | "
+            f"{drops * 100:9.1f}% | {loss * 100:9.1f}% | {describe_reasons(reasons)}"
+        )
+
+
+async def compare_run(args, ignore):
+    """启动中继 + 一个无头客户端，跑一次发送端，返回 (客户端, 发送端)"""
+    run_args = argparse.Namespace(**vars(args))
+    run_args.ignore_feedback = ignore
+    relay_args = argparse.Namespace(
+        relay=args.relay,
+        metrics_port=None,
+        rx="auto",
+        workers=1,
+        nack=False,
+        relay_log=None,
+    )
+    relay = RelayProcess(relay_args)
+    try:
+        await relay.wait_ready()
+        client = HeadlessClient(0, f"ws://127.0.0.1:{relay.ws_port}/?timing=1")
+        await client.connect()
+        task = asyncio.create_task(client.run())
+        await asyncio.sleep(SETTLE)
+        stop = threading.Event()
+        sender = AdaptiveSender(
+            run_args, relay.udp_port, random.randrange(0x80000000), stop
+        )
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, sender.run)
+        finally:
+            stop.set()
+        await asyncio.sleep(0.5)
+        await client.ws.close()
+        await task
+    finally:
+        relay.stop()
+    return client, sender
+
+
+async def compare(args):
+    link = f"{args.link_mbps:g} Mbit/s link" if args.link_mbps else "no link limit"
+    print(
+        f"== {args.relay}: {args.size or 'resolution'} B/eye @ q{args.quality}, "
+        f"{args.fps:g} fps {args.mode}, {link}"
+    )
+    for ignore in (True, False):
+        client, sender = await compare_run(args, ignore)
+        frames = client.count()
+        received = client.bytes / max(frames, 1)
+        sent = max(sender.stats["frames"], 1)
+        print(
+            f"{'ignore feedback' if ignore else 'adaptive':>15}: "
+            f"{frames / args.duration:6.1f} frames/s received "
+            f"({frames / sent * 100:5.1f}% of sent), {received / 1000:5.1f} kB/frame, "
+            f"{sender.stats['changes']} changes, {sender.stats['feedback']} feedback datagrams"
+        )
+        if not ignore:
+            print_timeline(sender.timeline)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="VSSP sender that follows VFBK feedback"
+    )
+    parser.add_argument("--port", type=int, default=8766, help="中继 VSSP UDP 端口")
+    add_sender_arguments(parser)
+    parser.add_argument(
+        "--quality", type=int, default=85, help="最高 JPEG 质量 (--size 对应的质量)"
+    )
+    parser.add_argument(
+        "--link-mbps", type=float, default=0.0, help="模拟瓶颈链路速率，0 表示不限"
+    )
+    parser.add_argument(
+        "--link-buffer-ms", type=float, default=20.0, help="瓶颈链路的缓冲 (ms)"
+    )
+    parser.add_argument(
+        "--ignore-feedback", action="store_true", help="只记录反馈，不调整"
+    )
+    parser.add_argument(
+        "--relay",
+        choices=["video_streamer", "vssp_relay"],
+        help="自行启动中继，对比忽略反馈与按反馈调整两种情况",
+    )
+    parser.set_defaults(size=40000)
+    args = parser.parse_args()
+    if args.relay:
+        asyncio.run(compare(args))
+        return
+    sender = AdaptiveSender(args, args.port, random.randrange(0x80000000))
+    try:
+        stats = sender.run()
+    except KeyboardInterrupt:
+        return
+    print_timeline(sender.timeline)
+    print(
+        f"{stats['frames']} frames {stats['packets']} packets | link drops "
+        f"{stats['link_drops']} | feedback {stats['feedback']} changes {stats['changes']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
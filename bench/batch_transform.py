@@ -0,0 +1,275 @@
+"""pose_batch 对照检查与吞吐测量
+
+    python3 bench/batch_transform.py                     # 合成会话: 逐字节对照 + 吞吐
+    python3 bench/batch_transform.py session.vcap        # 对照一段 --record 抓包
+    python3 bench/batch_transform.py --samples 5000000   # 吞吐测试的样本数
+
+对照: 把同一组消息分别交给 fast_receiver 的实时路径 (handle_pose_records / handle_pose，
+time.time() 换成消息的到达时间，截获发往 Unity 的数据报) 和 pose_batch，
+比较 64 字节输出记录是否逐字节相同，以及 quat_to_euler 与 pose_batch.euler 是否逐位相同。
+合成会话包含 WebXR / Unity 坐标混合、JSON 消息、非法记录、休眠间隔与摇杆重置。
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import fast_receiver  # noqa: E402
+from pose_batch import POSE_KINDS, PoseBatch, decode_records, euler  # noqa: E402
+from pose_codec import (  # noqa: E402
+    BTN_THUMBSTICK,
+    FLAG_UNITY_SPACE,
+    POSE_MAGIC,
+    POSE_RECORD,
+    is_pose_records,
+    mask_to_buttons,
+)
+from pose_session import SessionTable  # noqa: E402
+from vssp.capture import CaptureReader  # noqa: E402
+
+
+class ReplayClock:
+    """替换 fast_receiver 中的 time 模块: time() 返回当前消息的到达时间"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.perf_counter = time.perf_counter
+
+    def time(self):
+        return self.now
+
+
+class Collector:
+    """替换 unity_sender: 收集发往 Unity 的数据报"""
+
+    def __init__(self):
+        self.packets = []
+
+    def sendto(self, data, addr):
+        self.packets.append(data)
+
+
+def random_quat(rnd):
+    x, y, z, w = (rnd.gauss(0, 1) for _ in range(4))
+    n = math.sqrt(x * x + y * y + z * z + w * w)
+    return x / n, y / n, z / n, w / n
+
+
+def synthetic_session(messages, seed=7):
+    """(t, payload) 列表"""
+    rnd = random.Random(seed)
+    session = []
+    t = 1.79e9
+    seq = [rnd.randrange(1 << 32) for _ in range(3)]
+    head_asleep_until = 0.0
+    for i in range(messages):
+        t += 1 / 72 + rnd.uniform(-0.002, 0.002)
+        if rnd.random() < 0.002:
+            t += rnd.choice((2.0, 3.5, 10.0))  # 整体中断 (休眠)
+        if rnd.random() < 0.003:
+            head_asleep_until = t + rnd.uniform(1.0, 6.0)  # 只有头盔中断
+        devices = [d for d in (0, 1, 2) if d or t >= head_asleep_until]
+        if rnd.random() < 0.15:
+            # JSON 兼容模式: WebXR 坐标的 dict 列表
+            batch = []
+            for d in devices:
+                x, y, z, w = random_quat(rnd)
+                data = {
+                    "type": "head" if d == 0 else "controller",
+                    "handedness": ("", "left", "right")[d],
+                    "position": {
+                        "x": rnd.uniform(-1, 1),
+                        "y": rnd.uniform(0, 2),
+                        "z": rnd.uniform(-1, 1),
+                    },
+                    "orientation": {"x": x, "y": y, "z": z, "w": w},
+                }
+                if d:
+                    mask = rnd.getrandbits(6)
+                    if rnd.random() > 0.02:
+                        mask &= ~(1 << BTN_THUMBSTICK)
+                    data["buttons"] = mask_to_buttons(mask, rnd.random(), rnd.random())
+                    data["axes"] = [rnd.uniform(-1, 1), rnd.uniform(-1, 1)]
+                batch.append(data)
+            session.append((t, json.dumps(batch).encode()))
+            continue
+        records = []
+        for d in devices:
+            seq[d] = (seq[d] + rnd.choice((1, 1, 1, 2))) & 0xFFFFFFFF
+            mask = rnd.getrandbits(6) if d else 0
+            if rnd.random() > 0.02:
+                mask &= ~(1 << BTN_THUMBSTICK)
+            records.append(
+                POSE_RECORD.pack(
+                    POSE_MAGIC if rnd.random() > 0.01 else b"XXXX",
+                    1,
+                    d,
+                    FLAG_UNITY_SPACE if rnd.random() < 0.5 else 0,
+                    seq[d],
+                    int(t * 1000) & 0xFFFFFFFF,
+                    rnd.uniform(-1, 1),
+                    rnd.uniform(0, 2),
+                    rnd.uniform(-1, 1),
+                    *random_quat(rnd),
+                    mask,
+                    rnd.random(),
+                    rnd.random(),
+                    rnd.uniform(-1, 1),
+                    rnd.uniform(-1, 1),
+                )
+            )
+        session.append((t, b"".join(records)))
+    return session
+
+
+def live_outputs(session):
+    """实时路径的输出数据报 (按顺序) 与用时"""
+    clock = ReplayClock()
+    collector = Collector()
+    fast_receiver.time = clock
+    fast_receiver.unity_sender = collector
+    # 每次对照从空状态开始
+    fast_receiver.sessions = SessionTable(fast_receiver.UNITY_PORT)
+    start = time.perf_counter()
+    for message in session:
+        t, payload = message[0], message[-1]
+        # 抓包记录 (t, kind, port, session, payload) 带连接的 ?session=N
+        connection = message[3] if len(message) == 5 else 0
+        clock.now = t
+        if is_pose_records(payload):
+            fast_receiver.handle_pose_records(payload, connection)
+            continue
+        try:
+            batch = json.loads(payload)
+        except ValueError:
+            continue
+        if isinstance(batch, dict):
+            batch = [batch]
+        for data in batch:
+            try:
+                fast_receiver.handle_pose(data, connection)
+            except Exception:
+                pass
+    return collector.packets, time.perf_counter() - start
+
+
+def batch_outputs(session):
+    start = time.perf_counter()
+    batch = PoseBatch.from_messages(session)
+    batch.to_unity()
+    records = batch.unity_records(batch.origins(fast_receiver.SLEEP_RESET_SECS))
+    return batch, records, time.perf_counter() - start
+
+
+def verify(session):
+    packets, live_time = live_outputs(session)
+    batch, records, batch_time = batch_outputs(session)
+    live = b"".join(packets)
+    same = live == records.tobytes()
+    print(
+        f"{len(session)} messages -> live {len(packets)} poses, batch {len(records)} poses: "
+        f"{'bit-identical' if same else 'MISMATCH'}"
+    )
+    if not same:
+        theirs = decode_records(live)
+        for i in range(min(len(theirs), len(records))):
+            if theirs[i].tobytes() != records[i].tobytes():
+                print(
+                    f"first difference at pose {i}:\n live  {theirs[i]}\n batch {records[i]}"
+                )
+                break
+
+    quats = np.concatenate(
+        (batch.quat, batch.quat * 1.3)
+    )  # 含 |sinp| > 1 的非单位四元数
+    expected = np.array([fast_receiver.quat_to_euler(q) for q in quats.tolist()])
+    euler_same = np.array_equal(expected, euler(quats)) and np.array_equal(
+        np.signbit(expected), np.signbit(euler(quats))
+    )
+    fast = euler(quats, exact=False)
+    ulps = np.abs(fast.view(np.int64) - expected.view(np.int64)).max()
+    print(
+        f"euler: {len(quats)} quaternions {'bit-identical' if euler_same else 'MISMATCH'}"
+        f" (exact=False: max {ulps} ULP)"
+    )
+    print(
+        f"end to end (decode + transform + records): live {len(records) / live_time:,.0f} "
+        f"poses/s, batch {len(records) / batch_time:,.0f} poses/s"
+    )
+    return same and euler_same
+
+
+def throughput(samples, seed=3):
+    """纯二进制记录的吞吐: 各阶段 samples/s"""
+    rng = np.random.default_rng(seed)
+    raw = np.zeros(samples, dtype=decode_records(b"").dtype)
+    raw["magic"] = POSE_MAGIC
+    raw["version"] = 1
+    raw["device"] = np.arange(samples) % 3
+    raw["flags"] = rng.integers(0, 2, samples)
+    raw["seq"] = np.arange(samples) // 3
+    raw["pos"] = rng.uniform(-1, 1, (samples, 3))
+    quat = rng.normal(size=(samples, 4))
+    raw["quat"] = quat / np.linalg.norm(quat, axis=1, keepdims=True)
+    raw["btns"] = np.where(rng.random(samples) < 0.001, 1 << BTN_THUMBSTICK, 0)
+    times = 1.79e9 + np.arange(samples) // 3 / 72
+    buf = raw.tobytes()
+
+    stages = []
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        stages.append((name, time.perf_counter() - start))
+        return result
+
+    records = timed("decode", lambda: decode_records(buf))
+    batch = timed("columns", lambda: PoseBatch.from_records(records, times))
+    timed("webxr->unity", batch.to_unity)
+    origins = timed("origins", batch.origins)
+    timed("records", lambda: batch.unity_records(origins).tobytes())
+    timed("euler", lambda: euler(batch.quat))
+    timed("euler (fast)", lambda: euler(batch.quat, exact=False))
+    total = sum(elapsed for name, elapsed in stages if name != "euler (fast)")
+    print(f"\n{samples:,} binary samples")
+    for name, elapsed in stages + [("total", total)]:
+        print(
+            f"{name:>13} {elapsed * 1000:>8.1f} ms {samples / elapsed / 1e6:>8.1f} M/s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pose_batch check and throughput")
+    parser.add_argument("files", nargs="*", help="抓包文件 (默认使用合成会话)")
+    parser.add_argument("--messages", type=int, default=20000, help="合成会话消息数")
+    parser.add_argument("--samples", type=int, default=3000000, help="吞吐测试样本数")
+    args = parser.parse_args()
+
+    if args.files:
+        session = []
+        for path in args.files:
+            reader = CaptureReader(path)
+            session.extend(
+                (t, kind, port, connection, bytes(payload))
+                for t, kind, port, connection, payload in reader
+                if kind in POSE_KINDS
+            )
+            reader.close()
+        session.sort(key=lambda m: m[0])
+    else:
+        session = synthetic_session(args.messages)
+    ok = verify(session)
+    throughput(args.samples)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
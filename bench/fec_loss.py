@@ -0,0 +1,158 @@
+"""本地丢包测试: 不同丢包率下 FEC / NACK 恢复后的有效帧率
+
+    python3 bench/fec_loss.py --loss 0 1 2 5 10 --frames 200
+
+在进程内启动 vssp.Relay (video_streamer 的配置)，通过回环 UDP 发送随机内容的帧并按概率丢弃数据报
+(包括校验包和重传包)，统计完整且内容正确的帧占比。
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import video_streamer  # noqa: E402
+from vssp import RELAY_HEADER_SIZE, Relay, pack_header  # noqa: E402
+from vssp import packetize as vssp_packetize  # noqa: E402
+from vssp.fec import (  # noqa: E402
+    FLAG_FEC_PARITY,
+    FLAG_RETRANSMIT,
+    make_parity,
+    parse_nack,
+)
+from vssp.header import HEADER_SIZE  # noqa: E402
+
+
+def packetize(frame_id, eye, data, fec_group=0, mode=1, codec=0):
+    """把一帧切成 VSSP 数据报，fec_group > 0 时每 fec_group 个数据包追加一个校验包"""
+    ts = int(time.time() * 1000) & 0xFFFFFFFF
+    packets = vssp_packetize(frame_id, mode, eye, codec, data, ts)
+    if fec_group:
+        count = len(packets)
+        chunks = [p[HEADER_SIZE:] for p in packets]
+        for g in range(0, count, fec_group):
+            parity = make_parity(chunks[g : g + fec_group], fec_group)
+            h = pack_header(
+                frame_id,
+                mode,
+                eye,
+                codec,
+                FLAG_FEC_PARITY,
+                g // fec_group,
+                count,
+                len(parity),
+                ts,
+            )
+            packets.append(h + parity)
+    return packets
+
+
+class LossySender:
+    def __init__(self, addr, loss):
+        self.addr = addr
+        self.loss = loss
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        self.sock.settimeout(0.1)
+        self.cache = {}  # Key: (frame_id, eye) -> packets
+        self.running = True
+        self.retransmitted = 0
+        threading.Thread(target=self.nack_listener, daemon=True).start()
+
+    def send(self, packet):
+        if random.random() >= self.loss:
+            self.sock.sendto(packet, self.addr)
+
+    def nack_listener(self):
+        while self.running:
+            try:
+                data, _ = self.sock.recvfrom(2048)
+            except (socket.timeout, OSError):
+                continue
+            nack = parse_nack(data)
+            if nack is None:
+                continue
+            frame_id, eye, ids = nack
+            packets = self.cache.get((frame_id, eye))
+            if packets is None:
+                continue
+            for p_id in ids:
+                if p_id < len(packets):
+                    pkt = bytearray(packets[p_id])
+                    pkt[11] |= FLAG_RETRANSMIT
+                    self.retransmitted += 1
+                    self.send(bytes(pkt))
+
+
+async def run_case(relay, sent, got, loss, fec_group, nack, args, base_id):
+    relay.assembler.nack = nack
+    sender = LossySender(("127.0.0.1", args.port), loss)
+    sent.clear()
+    got.clear()
+    interval = 1.0 / args.fps
+    for n in range(args.frames):
+        frame_id = base_id + n
+        data = os.urandom(args.size)
+        sent[frame_id] = data
+        packets = packetize(frame_id, 1, data, fec_group)
+        sender.cache[(frame_id, 1)] = packets
+        for p in packets:
+            sender.send(p)
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.3)
+    sender.running = False
+    sender.sock.close()
+    valid = sum(1 for fid, data in got.items() if sent.get(fid) == data)
+    return valid, sender.retransmitted
+
+
+async def main(args):
+    config = video_streamer.make_config()
+    config.udp_port = args.port
+    relay = Relay(config, lambda msg: None)
+    sent, got = {}, {}
+
+    def broadcast_frame(fb):
+        got[fb.frame_id] = bytes(fb.packet[RELAY_HEADER_SIZE:])
+        relay.release_frame(fb)
+
+    relay.broadcast_frame = broadcast_frame
+    receiver = asyncio.create_task(relay.udp_receiver())
+    await asyncio.sleep(0.2)
+
+    cases = [
+        ("none", 0, False),
+        (f"fec k={args.fec}", args.fec, False),
+        ("nack", 0, True),
+        (f"fec k={args.fec} + nack", args.fec, True),
+    ]
+    print(f"{args.frames} frames x {args.size} bytes @ {args.fps} fps")
+    print(f"{'loss %':>7} | " + " | ".join(f"{name:>16}" for name, _, _ in cases))
+    base_id = 1
+    for loss in args.loss:
+        cells = []
+        for _, fec_group, nack in cases:
+            valid, _ = await run_case(
+                relay, sent, got, loss / 100.0, fec_group, nack, args, base_id
+            )
+            base_id += args.frames + 1000
+            cells.append(f"{valid * args.fps / args.frames:>9.1f} fps")
+        print(f"{loss:>7.1f} | " + " | ".join(f"{c:>16}" for c in cells))
+    receiver.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VSSP FEC / NACK lossy-UDP harness")
+    parser.add_argument("--loss", type=float, nargs="+", default=[0, 0.5, 1, 2, 5, 10])
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--size", type=int, default=60000, help="每帧字节数")
+    parser.add_argument("--fec", type=int, default=10, help="FEC 组大小 K")
+    parser.add_argument("--port", type=int, default=18766)
+    asyncio.run(main(parser.parse_args()))
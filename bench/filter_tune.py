@@ -0,0 +1,208 @@
+"""pose 滤波离线调参: 对录制的会话 (--record) 或合成数据批量评估多组滤波参数
+
+    python3 bench/filter_tune.py session.vcap --device right --min-cutoff 0.5 1 2 --beta 0 0.5 2 8
+    python3 bench/filter_tune.py --synthetic 60 --type exp --cutoff 2 5 10 20
+
+样本按 fast_receiver 的方式解码 (坐标转换、发送端时间戳去抖) 后交给 pose_filter.batch_filter，
+所有参数组在一次遍历中向量化计算。每组参数输出:
+
+- rest jitter: 静止段 (原始速度 < REST_SPEED) 相邻输出位置变化的 RMS (mm) 与朝向变化 (deg)
+- motion lag: 运动段 (原始速度 > MOVE_SPEED) 输出与原始位置距离的 RMS (mm)
+
+需要 NumPy。
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pose_codec import (  # noqa: E402
+    DEVICE_NAMES,
+    FLAG_UNITY_SPACE,
+    POSE_MAGIC,
+    POSE_RECORD,
+    is_pose_records,
+)
+from pose_filter import DEFAULTS, batch_filter, load_numpy  # noqa: E402
+from pose_predict import SampleClock  # noqa: E402
+from vssp.capture import (  # noqa: E402
+    KIND_POSE_HTTP,
+    KIND_POSE_WS,
+    KIND_POSE_WS_TEXT,
+    CaptureReader,
+)
+
+np = load_numpy()
+
+REST_SPEED = 0.02  # m/s
+MOVE_SPEED = 0.3  # m/s
+SPEED_SPAN = 3  # 原始速度按前后各 N 个样本的中心差分估计
+
+
+def json_samples(payload):
+    """JSON pose 消息 -> [(device, px, py, pz, qx, qy, qz, qw)] (WebXR -> Unity，与 handle_pose 相同)"""
+    batch = json.loads(payload)
+    if isinstance(batch, dict):
+        batch = [batch]
+    result = []
+    for data in batch:
+        key = "head" if data.get("type") == "head" else data.get("handedness")
+        if key not in DEVICE_NAMES:
+            continue
+        pos = data.get("position", {})
+        ori = data.get("orientation", {})
+        result.append(
+            (
+                key,
+                float(pos.get("x", 0)),
+                float(pos.get("y", 0)),
+                -float(pos.get("z", 0)),
+                -float(ori.get("x", 0)),
+                -float(ori.get("y", 0)),
+                float(ori.get("z", 0)),
+                float(ori.get("w", 1)),
+            )
+        )
+    return result
+
+
+def load_capture(paths, device):
+    """抓包文件中一个设备的 (t, px, py, pz, qx, qy, qz, qw) 序列"""
+    clock = SampleClock()
+    samples = []
+    for path in paths:
+        reader = CaptureReader(path)
+        try:
+            for t, kind, _, _, payload in reader:
+                if kind not in (KIND_POSE_HTTP, KIND_POSE_WS, KIND_POSE_WS_TEXT):
+                    continue
+                if is_pose_records(payload):
+                    for record in POSE_RECORD.iter_unpack(payload):
+                        magic, _, dev, flags, _, ts_ms = record[:6]
+                        if magic != POSE_MAGIC or dev >= len(DEVICE_NAMES):
+                            continue
+                        if DEVICE_NAMES[dev] != device:
+                            continue
+                        px, py, pz, qx, qy, qz, qw = record[6:13]
+                        if not flags & FLAG_UNITY_SPACE:
+                            pz, qx, qy = -pz, -qx, -qy
+                        sample_time = clock.local_time(ts_ms, t)
+                        samples.append((sample_time, px, py, pz, qx, qy, qz, qw))
+                elif payload:
+                    try:
+                        decoded = json_samples(bytes(payload))
+                    except ValueError:
+                        continue
+                    for key, *pose in decoded:
+                        if key == device:
+                            samples.append((t, *pose))
+        finally:
+            reader.close()
+    samples.sort(key=lambda s: s[0])
+    return samples
+
+
+def synthetic(seconds, rate=72.0, noise=0.002, rot_noise=0.3, seed=1):
+    """静止与挥动交替的手柄轨迹，叠加高斯噪声 (m / deg)"""
+    rnd = random.Random(seed)
+    samples = []
+    for i in range(int(seconds * rate)):
+        t = i / rate + rnd.uniform(-0.001, 0.001)
+        phase = (i / rate) % 4.0
+        # 每 4 秒: 2 秒静止，2 秒以约 1 m/s 挥动
+        moving = phase >= 2.0
+        swing = math.sin((phase - 2.0) * math.pi) if moving else 0.0
+        yaw = 0.8 * swing + math.radians(rnd.gauss(0, rot_noise))
+        samples.append(
+            (
+                t,
+                0.3 * swing + rnd.gauss(0, noise),
+                1.2 + 0.1 * swing + rnd.gauss(0, noise),
+                0.4 + rnd.gauss(0, noise),
+                0.0,
+                math.sin(yaw / 2),
+                0.0,
+                math.cos(yaw / 2),
+            )
+        )
+    return samples
+
+
+def raw_speed(data):
+    n = len(data)
+    lo = np.clip(np.arange(n) - SPEED_SPAN, 0, n - 1)
+    hi = np.clip(np.arange(n) + SPEED_SPAN, 0, n - 1)
+    dt = np.maximum(data[hi, 0] - data[lo, 0], 1e-6)
+    return np.linalg.norm(data[hi, 1:4] - data[lo, 1:4], axis=1) / dt
+
+
+def score(data, out):
+    """out: (K, T, 7) -> 每组参数的 (静止抖动 mm, 静止朝向抖动 deg, 运动滞后 mm)"""
+    speed = raw_speed(data)
+    rest = (speed[1:] < REST_SPEED) & (speed[:-1] < REST_SPEED)
+    moving = speed > MOVE_SPEED
+    step = np.linalg.norm(np.diff(out[:, :, :3], axis=1), axis=2)[:, rest]
+    dots = np.abs((out[:, 1:, 3:] * out[:, :-1, 3:]).sum(axis=2))[:, rest]
+    turn = np.degrees(2 * np.arccos(np.minimum(dots, 1.0)))
+    lag = np.linalg.norm(out[:, :, :3] - data[None, :, 1:4], axis=2)[:, moving]
+
+    def rms(values):
+        if values.shape[1] == 0:
+            return np.full(values.shape[0], np.nan)
+        return np.sqrt((values * values).mean(axis=1))
+
+    return rms(step) * 1000, rms(turn), rms(lag) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pose filter tuning")
+    parser.add_argument("files", nargs="*", help="抓包文件 (fast_receiver --record)")
+    parser.add_argument("--synthetic", type=float, help="不读文件，生成 N 秒合成轨迹")
+    parser.add_argument("--device", choices=DEVICE_NAMES, default="right")
+    parser.add_argument("--type", choices=sorted(DEFAULTS), default="one_euro")
+    for name in sorted({n for params in DEFAULTS.values() for n in params}):
+        parser.add_argument(
+            "--" + name.replace("_", "-"), type=float, nargs="+", help="参数取值列表"
+        )
+    parser.add_argument("--top", type=int, default=20, help="按静止抖动排序输出前 N 组")
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("bench/filter_tune.py needs NumPy")
+    if args.synthetic:
+        samples = synthetic(args.synthetic)
+    elif args.files:
+        samples = load_capture(args.files, args.device)
+    else:
+        parser.error("give capture files or --synthetic SECONDS")
+    if len(samples) < 2:
+        sys.exit(f"not enough {args.device} samples")
+
+    names = sorted(DEFAULTS[args.type])
+    values = [getattr(args, name) or [DEFAULTS[args.type][name]] for name in names]
+    grid = [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    data = np.asarray(samples, dtype=float)
+    out = batch_filter(args.type, grid, samples)
+    raw_jitter, raw_turn, _ = score(data, data[None, :, 1:])
+    jitter, turn, lag = score(data, out)
+
+    span = data[-1, 0] - data[0, 0]
+    print(
+        f"{len(samples)} {args.device} samples over {span:.1f}s, "
+        f"{len(grid)} {args.type} parameter sets | raw rest jitter "
+        f"{raw_jitter[0]:.2f} mm {raw_turn[0]:.2f} deg"
+    )
+    header = " ".join(f"{name:>14}" for name in names)
+    print(f"{header} | {'jitter mm':>9} {'deg':>6} | {'lag mm':>7}")
+    for i in np.argsort(jitter)[: args.top]:
+        row = " ".join(f"{grid[i][name]:>14g}" for name in names)
+        print(f"{row} | {jitter[i]:>9.3f} {turn[i]:>6.3f} | {lag[i]:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
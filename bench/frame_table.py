@@ -0,0 +1,129 @@
+"""重组表微基准: 旧的 dict 整表重建 vs vssp.frames.FrameTable
+
+    python3 bench/frame_table.py --frames 20000 --loss 0 1 5 20
+
+模拟立体声 (eye 1/2) 帧流，按突发丢包生成数据包序列，只测量建帧 / 查表 / 过期 / 完成的
+簿记开销 (不拷贝 payload)，输出每包耗时与结束时表中残留的帧数。
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vssp.frames import FrameTable  # noqa: E402
+
+
+class Frame:
+    __slots__ = (
+        "packet_count",
+        "received_mask",
+        "received_count",
+        "first_time",
+        "last_update",
+    )
+
+    def __init__(self, packet_count, now):
+        self.packet_count = packet_count
+        self.received_mask = bytearray(packet_count)
+        self.received_count = 0
+        self.first_time = self.last_update = now
+
+
+def make_stream(frames, packets_per_frame, loss, burst, seed=1):
+    """(frame_id, eye, p_id, p_count) 序列，丢包以长度为 burst 的突发出现"""
+    rng = random.Random(seed)
+    stream = []
+    dropping = 0
+    frame_id = 0xFFFFFFFF - frames // 2  # 中途跨越 32 位回绕
+    for _ in range(frames):
+        for eye in (1, 2):
+            for p_id in range(packets_per_frame):
+                if dropping:
+                    dropping -= 1
+                    continue
+                if rng.random() < loss / burst:
+                    dropping = burst - 1
+                    continue
+                stream.append((frame_id, eye, p_id, packets_per_frame))
+        frame_id = (frame_id + 1) & 0xFFFFFFFF
+    return stream
+
+
+def run_legacy(stream):
+    """baseline video_streamer 的逻辑: 每包检查表大小并整表重建，完成帧只做标记"""
+    frames = {}
+    completed = 0
+    for frame_id, eye, p_id, p_count in stream:
+        now = time.time()
+        if len(frames) > 30:
+            frames = {k: v for k, v in frames.items() if now - v.last_update < 0.2}
+        key = (frame_id, eye)
+        if key not in frames:
+            frames[key] = Frame(p_count, now)
+        fb = frames[key]
+        if p_id < fb.packet_count and not fb.received_mask[p_id]:
+            fb.received_mask[p_id] = 1
+            fb.received_count += 1
+            fb.last_update = now
+        if fb.received_count == fb.packet_count:
+            completed += 1
+            fb.received_count = -99999
+    return completed, len(frames)
+
+
+def run_table(stream):
+    frames = FrameTable(max_frames=30, max_age=0.2, window=64)
+    completed = 0
+    for frame_id, eye, p_id, p_count in stream:
+        now = time.time()
+        fb = frames.get(frame_id, eye)
+        if fb is None:
+            if frames.is_stale(frame_id, eye):
+                continue
+            fb = Frame(p_count, now)
+            frames.add(frame_id, eye, fb, now)
+        if p_id < fb.packet_count and not fb.received_mask[p_id]:
+            fb.received_mask[p_id] = 1
+            fb.received_count += 1
+            fb.last_update = now
+        if fb.received_count == fb.packet_count:
+            completed += 1
+            frames.complete(frame_id, eye)
+    return completed, len(frames)
+
+
+def main(args):
+    print(f"{args.frames} stereo frames x {args.packets} packets, burst {args.burst}")
+    print(
+        f"{'loss %':>7} | {'legacy ns/pkt':>13} {'left':>5} | {'table ns/pkt':>12} "
+        f"{'left':>5} | {'speedup':>7} | completed"
+    )
+    for loss in args.loss:
+        stream = make_stream(args.frames, args.packets, loss / 100.0, args.burst)
+        results = []
+        for fn in (run_legacy, run_table):
+            start = time.perf_counter()
+            completed, left = fn(stream)
+            elapsed = time.perf_counter() - start
+            results.append((elapsed * 1e9 / max(len(stream), 1), left, completed))
+        (legacy_ns, legacy_left, legacy_done), (table_ns, table_left, table_done) = (
+            results
+        )
+        print(
+            f"{loss:>7.1f} | {legacy_ns:>13.0f} {legacy_left:>5} | {table_ns:>12.0f} "
+            f"{table_left:>5} | {legacy_ns / table_ns:>6.1f}x | "
+            f"{legacy_done} / {table_done}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VSSP frame table micro-benchmark")
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--packets", type=int, default=40, help="每帧数据包数")
+    parser.add_argument("--loss", type=float, nargs="+", default=[0, 1, 5, 20])
+    parser.add_argument("--burst", type=int, default=8, help="突发丢包长度")
+    main(parser.parse_args())
@@ -0,0 +1,258 @@
+"""fast_receiver HTTP 入口对比: Flask (每连接一线程) / asyncio / asyncio + uvloop
+
+    python3 bench/http_ingest.py                          # 270 poses/s 与满负荷两档
+    python3 bench/http_ingest.py --rates 270 540 0 --duration 10 --binary
+
+每种模式启动一个 fast_receiver 子进程，先检查 POST 接口的状态码 (空请求体 240，其余 204，
+GET /metrics 200)，再按 index.html 的 HTTP 回退方式发送: 每个 pose 一个 POST (默认 JSON，
+--binary 为 64 字节记录)，head / left / right 各一条连接。服务端不保持连接时 (Flask 开发服务器
+为 HTTP/1.0) 每个请求重新建连，与浏览器行为相同。
+
+报告: 实际完成的请求数 / s，请求往返时间 (发送 -> 收到完整响应) 的 p50 / p95 / p99，
+fast_receiver 每个请求消耗的 CPU 时间 (/proc，仅 Linux)。rate 0 表示不限速 (测吞吐)。
+压测客户端与 fast_receiver 在同一台机器上运行。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from load_test import cpu_seconds  # noqa: E402
+from pose_codec import FLAG_UNITY_SPACE, POSE_MAGIC, POSE_RECORD  # noqa: E402
+from vssp.timing import percentiles  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PORT = 8765
+DEVICES = (("head", ""), ("controller", "left"), ("controller", "right"))
+
+
+def pose_bodies(binary):
+    """head / left / right 各一个请求体"""
+    bodies = []
+    for device, (dtype, hand) in enumerate(DEVICES):
+        if binary:
+            bodies.append(
+                POSE_RECORD.pack(
+                    POSE_MAGIC,
+                    1,
+                    device,
+                    FLAG_UNITY_SPACE,
+                    0,
+                    0,
+                    0.1,
+                    1.6,
+                    0.2,
+                    0.0,
+                    0.0,
+                    0.0,
+                    1.0,
+                    0,
+                    0.0,
+                    0.0,
+                    0.0,
+                    0.0,
+                )
+            )
+            continue
+        data = {
+            "type": dtype,
+            "position": {"x": 0.1, "y": 1.6, "z": -0.2},
+            "orientation": {"x": 0.01, "y": 0.7, "z": 0.02, "w": 0.71},
+        }
+        if hand:
+            data["handedness"] = hand
+            data["buttons"] = [
+                {"pressed": False, "touched": False, "value": 0.0} for _ in range(6)
+            ]
+            data["axes"] = [0.0, 0.0, 0.0, 0.0]
+        bodies.append(json.dumps(data).encode())
+    return bodies
+
+
+class PoseClient:
+    """一条 HTTP 连接 (服务端关闭连接后下次请求重新建连)"""
+
+    def __init__(self, body):
+        self.request = (
+            f"POST / HTTP/1.1\r\nHost: 127.0.0.1:{PORT}\r\n"
+            f"Content-Type: text/plain;charset=UTF-8\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode() + body
+        self.reader = self.writer = None
+
+    async def post(self, request=None):
+        """发送一个请求，返回状态码"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", PORT)
+        self.writer.write(request or self.request)
+        status = int((await self.reader.readline()).split()[1])
+        length, close = 0, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"connection":
+                close = value.strip().lower() == b"close"
+        if length:
+            await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def check_contract():
+    """与 Flask 模式相同的状态码"""
+    client = PoseClient(b"")
+    results = {
+        "empty POST": (await client.post(), 240),
+        "JSON POST": (await PoseClient(pose_bodies(False)[0]).post(), 204),
+        "binary POST": (await PoseClient(pose_bodies(True)[0]).post(), 204),
+        "bad POST": (await PoseClient(b"{not json").post(), 204),
+        "GET /metrics": (
+            await client.post(b"GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n"),
+            200,
+        ),
+    }
+    client.close()
+    return [
+        f"{name} {got} (want {want})"
+        for name, (got, want) in results.items()
+        if got != want
+    ]
+
+
+async def load(rate, duration, bodies):
+    """各连接以 rate / 3 的频率 (rate 0 为不限速) 发送 duration 秒，返回 (往返时间列表, 错误数)"""
+    latencies = []
+    errors = 0
+
+    async def connection(body, offset):
+        nonlocal errors
+        client = PoseClient(body)
+        interval = len(bodies) / rate if rate else 0.0
+        start = time.perf_counter() + offset * interval / len(bodies)
+        i = 0
+        while True:
+            due = start + i * interval
+            now = time.perf_counter()
+            if now - start >= duration:
+                break
+            if due > now:
+                await asyncio.sleep(due - now)
+            sent = time.perf_counter()
+            try:
+                status = await client.post()
+            except (
+                ConnectionError,
+                asyncio.IncompleteReadError,
+                IndexError,
+                ValueError,
+            ):
+                client.close()
+                status = None
+            if status == 204:
+                latencies.append(time.perf_counter() - sent)
+            else:
+                errors += 1
+            i += 1
+        client.close()
+
+    await asyncio.gather(*(connection(body, k) for k, body in enumerate(bodies)))
+    return latencies, errors
+
+
+async def wait_ready(proc, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("fast_receiver exited")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", PORT)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("fast_receiver did not start")
+
+
+async def run_mode(name, options, args, bodies):
+    proc = subprocess.Popen(
+        [sys.executable, "fast_receiver.py", "--predict-port", "0"] + options,
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_ready(proc)
+        problems = await check_contract()
+        print(f"\n== {name}: contract {'OK' if not problems else ', '.join(problems)}")
+        for rate in args.rates:
+            cpu = cpu_seconds(proc.pid)
+            started = time.perf_counter()
+            latencies, errors = await load(rate, args.duration, bodies)
+            elapsed = time.perf_counter() - started
+            cpu_used = cpu_seconds(proc.pid) - cpu if cpu is not None else None
+            p50, p95, p99 = percentiles(latencies)
+            cpu_text = (
+                f"{cpu_used / max(len(latencies), 1) * 1e6:7.0f} us cpu/req"
+                if cpu_used is not None
+                else ""
+            )
+            print(
+                f"{('max' if not rate else f'{rate:g}/s'):>8} | {len(latencies) / elapsed:8.0f} req/s | "
+                f"rtt p50 {p50 * 1000:6.2f} p95 {p95 * 1000:6.2f} p99 {p99 * 1000:6.2f} ms | "
+                f"{cpu_text} | errors {errors}"
+            )
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def run(args):
+    bodies = pose_bodies(args.binary)
+    modes = [
+        ("flask", ["--server", "flask"]),
+        ("asyncio", ["--server", "asyncio"]),
+    ]
+    try:
+        import uvloop  # noqa: F401
+
+        modes.append(("asyncio+uvloop", ["--server", "asyncio", "--uvloop"]))
+    except ImportError:
+        print("uvloop not installed, skipping asyncio+uvloop")
+    for name, options in modes:
+        if args.modes and name not in args.modes:
+            continue
+        await run_mode(name, options, args, bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fast_receiver HTTP server modes")
+    parser.add_argument(
+        "--rates", type=float, nargs="+", default=[270, 0], help="poses/s，0 为不限速"
+    )
+    parser.add_argument("--duration", type=float, default=5.0, help="每档秒数")
+    parser.add_argument("--binary", action="store_true", help="发送 64 字节二进制记录")
+    parser.add_argument(
+        "--modes", nargs="+", help="只测这些模式 (flask / asyncio / asyncio+uvloop)"
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
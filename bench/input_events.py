@@ -0,0 +1,200 @@
+"""手柄输入解码对比: getevent -lt 文本逐行正则 (旧 monitor.py) / input_event 二进制批量解码
+
+    python3 bench/input_events.py                         # 合成 60 秒双手柄事件流
+    python3 bench/input_events.py --seconds 600 --write captures/
+    python3 bench/input_events.py --check captures/left.evdev
+
+合成流: 两个手柄，摇杆 / 扳机 / 握把按 500 Hz 上报，夹杂按键按下 / 松开，每次上报以 SYN_REPORT 结束。
+同一份事件分别生成 input_event 字节流与 getevent -lt 文本，报告两种解码的每秒事件数与每事件 CPU 时间，
+并检查二进制解码得到的每次上报与生成时的状态一致 (离线测试 monitor.InputDecoder)。
+--write 把字节流存为 <side>.evdev，可用 monitor.py --replay 回放；--check 解码已录制的文件并统计。
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from monitor import (  # noqa: E402
+    ABS_BRAKE,
+    ABS_GAS,
+    ABS_X,
+    ABS_Y,
+    DEFAULT_RANGES,
+    EV_ABS,
+    EV_KEY,
+    EV_SYN,
+    INPUT_EVENT,
+    KEY_BUTTONS,
+    SYN_REPORT,
+    InputDecoder,
+)
+
+RATE = 500.0  # 每个手柄每秒上报次数
+CHUNK = 4096  # 每次送入解码器的字节数 (模拟 adb 管道的读取粒度)
+ABS_LABELS = {
+    ABS_X: "ABS_X",
+    ABS_Y: "ABS_Y",
+    ABS_GAS: "ABS_GAS",
+    ABS_BRAKE: "ABS_BRAKE",
+}
+KEY_LABELS = {0x130: "BTN_A", 0x131: "BTN_B", 0x13D: "BTN_THUMBL"}
+
+
+def synthetic(seconds, seed):
+    """[(sec, usec, [(type, code, value)], 期望的 InputReport)]"""
+    rnd = random.Random(seed)
+    decoder = InputDecoder()  # 只用 scale() 计算期望值
+    values = {code: (lo + hi) // 2 for code, (lo, hi) in DEFAULT_RANGES.items()}
+    values[ABS_GAS] = values[ABS_BRAKE] = 0
+    keys = {code: 0 for code in KEY_LABELS}
+    reports = []
+    for i in range(int(seconds * RATE)):
+        sec, usec = divmod(1_000_000_000 + int(i * 1e6 / RATE), 1_000_000)
+        events = []
+        for code, (lo, hi) in DEFAULT_RANGES.items():
+            if i == 0 or rnd.random() < 0.7:
+                values[code] = min(hi, max(lo, values[code] + rnd.randint(-6, 6)))
+                events.append((EV_ABS, code, values[code]))
+        if rnd.random() < 0.01:
+            code = rnd.choice(list(KEY_LABELS))
+            keys[code] ^= 1
+            events.append((EV_KEY, code, keys[code]))
+        if not events:
+            continue
+        events.append((EV_SYN, SYN_REPORT, 0))
+        btns = 0
+        for code, down in keys.items():
+            if down:
+                btns |= 1 << KEY_BUTTONS[code]
+        trigger = decoder.scale(ABS_GAS, values[ABS_GAS])
+        grip = decoder.scale(ABS_BRAKE, values[ABS_BRAKE])
+        decoder.trigger, decoder.grip = trigger, grip
+        decoder.keys = btns
+        expected = decoder.report(sec + usec / 1e6)._replace(
+            ax=decoder.scale(ABS_X, values[ABS_X]),
+            ay=decoder.scale(ABS_Y, values[ABS_Y]),
+        )
+        reports.append((sec, usec, events, expected))
+    return reports
+
+
+def to_bytes(reports):
+    out = bytearray()
+    for sec, usec, events, _ in reports:
+        for etype, code, value in events:
+            out += INPUT_EVENT.pack(sec, usec, etype, code, value)
+    return bytes(out)
+
+
+def to_text(reports):
+    """getevent -lt 的输出格式"""
+    lines = []
+    for sec, usec, events, _ in reports:
+        t = f"{sec:6d}.{usec:06d}"
+        for etype, code, value in events:
+            if etype == EV_ABS:
+                lines.append(f"[{t}] EV_ABS       {ABS_LABELS[code]:<20} {value:08x}\n")
+            elif etype == EV_KEY:
+                state = "DOWN" if value else "UP"
+                lines.append(f"[{t}] EV_KEY       {KEY_LABELS[code]:<20} {state}\n")
+            else:
+                lines.append(f"[{t}] EV_SYN       SYN_REPORT           00000000\n")
+    return lines
+
+
+def text_decode(lines):
+    """旧 monitor_event 的逐行解析 (不含 print)"""
+    count = 0
+    for line in lines:
+        match = re.search(r"(\w+)\s+(\w+)\s+(\w+)", line)
+        if match:
+            ev_type, ev_code, ev_value = match.groups()
+            if ev_type == "EV_KEY":
+                state = "Pressed" if ev_value == "DOWN" else "Released"
+                count += state == "Pressed"
+            elif ev_type == "EV_ABS":
+                count += 1
+    return count
+
+
+def binary_decode(data):
+    decoder = InputDecoder()
+    reports = []
+    for i in range(0, len(data), CHUNK):
+        reports.extend(decoder.feed(data[i : i + CHUNK]))
+    return decoder, reports
+
+
+def timed(fn, *args):
+    cpu = time.process_time()
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start, time.process_time() - cpu
+
+
+def check_file(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    (decoder, reports), elapsed, _ = timed(binary_decode, data)
+    pressed = sum(1 for a, b in zip(reports, reports[1:]) if b.btns & ~a.btns)
+    print(
+        f"{path}: {decoder.events} events, {len(reports)} reports, {pressed} button presses, "
+        f"{len(decoder.pending)} trailing bytes, decoded in {elapsed * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="controller input decode benchmark")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument(
+        "--write", metavar="DIR", help="把合成字节流写为 DIR/<side>.evdev"
+    )
+    parser.add_argument(
+        "--check", nargs="+", metavar="FILE", help="解码录制的字节流文件"
+    )
+    args = parser.parse_args()
+    if args.check:
+        for path in args.check:
+            check_file(path)
+        return
+
+    ok = True
+    totals = {"text": [0.0, 0.0], "binary": [0.0, 0.0]}
+    events = 0
+    for seed, side in enumerate(("left", "right")):
+        reports = synthetic(args.seconds, seed)
+        data = to_bytes(reports)
+        lines = to_text(reports)
+        if args.write:
+            os.makedirs(args.write, exist_ok=True)
+            with open(os.path.join(args.write, f"{side}.evdev"), "wb") as f:
+                f.write(data)
+        _, elapsed, cpu = timed(text_decode, lines)
+        totals["text"][0] += elapsed
+        totals["text"][1] += cpu
+        (decoder, decoded), elapsed, cpu = timed(binary_decode, data)
+        totals["binary"][0] += elapsed
+        totals["binary"][1] += cpu
+        events += decoder.events
+        expected = [r[3] for r in reports]
+        same = decoded == expected
+        ok = ok and same
+        print(
+            f"{side}: {decoder.events} events, {len(decoded)} reports: "
+            f"{'match' if same else 'MISMATCH'}"
+        )
+    for name, (elapsed, cpu) in totals.items():
+        print(
+            f"{name:>7}: {events / elapsed / 1e6:6.2f} M events/s, "
+            f"{cpu / events * 1e9:6.0f} ns cpu/event"
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""中继负载测试: 启动 video_streamer.py / vssp_relay.py，用合成发送端 (bench/vssp_sender.py) 推流，
+挂 N 个无头 WebSocket 客户端接收
+
+    python3 bench/load_test.py --relay video_streamer --clients 4 --resolution 1920x1920 --fps 72
+    python3 bench/load_test.py --relay vssp_relay --workers 2 --procs 2 --loss 1 --json result.json
+
+报告:
+    每个客户端的帧率 / 丢帧率，组装延迟 (VTIM 扩展头: 首包 -> 末包 -> 交给 WebSocket)，
+    端到端延迟 (发送端 timestamp_ms -> 客户端收到，同机时钟)，
+    中继 CPU 时间 / 帧 (/proc，含 worker 子进程)，以及测试期间 /metrics 计数的增量。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import websockets  # noqa: E402
+
+from vssp.header import RELAY_HEADER, TIMING_HEADER, TIMING_HEADER_SIZE  # noqa: E402
+from vssp.timing import percentiles, wrap_ms  # noqa: E402
+from vssp_sender import (  # noqa: E402
+    SenderGroup,
+    add_sender_arguments,
+    describe,
+    eyes,
+    frame_count,
+)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RELAYS = ("video_streamer", "vssp_relay")
+# 测试前后抓取的中继指标 (同名的多个标签值相加)
+RELAY_METRICS = (
+    "vssp_packets_total",
+    "vssp_frames_assembled_total",
+    "vssp_frames_expired_total",
+    "vssp_stale_packets_total",
+    "vssp_kernel_drops_total",
+    "vssp_rx_queue_drops_total",
+    "vssp_pool_drops_total",
+    "vssp_fec_recovered_total",
+    "vssp_retransmits_total",
+    "vssp_ws_frames_dropped_total",
+)
+SETTLE = 1.0  # 客户端连上后等待 worker 进程完成启动再取 CPU 基线 (s)
+DRAIN = 1.5  # 发送结束后等待中继 / worker 指标刷新的时间 (s)
+
+
+def cpu_seconds(pid):
+    """pid 及其所有子孙进程已用的 CPU 时间 (s)，非 Linux 返回 None"""
+    tick = os.sysconf("SC_CLK_TCK")
+    parents = {}
+    times = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm 可能含空格，从最后一个 ')' 之后开始按空格切分
+        fields = stat[stat.rfind(")") + 2 :].split()
+        parents[int(entry)] = int(fields[1])
+        times[int(entry)] = (int(fields[11]) + int(fields[12])) / tick
+    if pid not in times:
+        return None
+    total = 0.0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += times.get(current, 0.0)
+        pending.extend(p for p, parent in parents.items() if parent == current)
+    return total
+
+
+def scrape(port):
+    """GET /metrics -> {指标名: 所有标签值之和}"""
+    values = dict.fromkeys(RELAY_METRICS, 0.0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=2) as r:
+            text = r.read().decode()
+    except OSError:
+        return None
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        name = name.split("{", 1)[0]
+        if name in values:
+            values[name] += float(value)
+    return values
+
+
+class RelayProcess:
+    """以子进程启动中继脚本，日志写入 --relay-log (默认丢弃)"""
+
+    def __init__(self, args):
+        module = __import__(args.relay)
+        self.udp_port = module.UDP_PORT
+        self.ws_port = module.WS_PORT
+        self.metrics_port = args.metrics_port or module.METRICS_PORT
+        command = [
+            sys.executable,
+            os.path.join(ROOT, f"{args.relay}.py"),
+            "--rx",
+            args.rx,
+            "--workers",
+            str(args.workers),
+            "--metrics-port",
+            str(self.metrics_port),
+        ]
+        if args.nack:
+            command.append("--nack")
+        self.log = open(args.relay_log, "w") if args.relay_log else subprocess.DEVNULL
+        # video_streamer.py 在当前目录写 vssp.log，放到临时目录
+        self.cwd = tempfile.TemporaryDirectory()
+        self.process = subprocess.Popen(
+            command, cwd=self.cwd.name, stdout=self.log, stderr=subprocess.STDOUT
+        )
+
+    async def wait_ready(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"relay exited with code {self.process.returncode}")
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.ws_port)
+                writer.close()
+                return
+            except OSError:
+                await asyncio.sleep(0.1)
+        raise RuntimeError("relay did not open its WebSocket port")
+
+    def stop(self):
+        # SIGTERM: 中继按 Ctrl+C 路径退出并回收 worker
+        self.process.terminate()
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self.log is not subprocess.DEVNULL:
+            self.log.close()
+        self.cwd.cleanup()
+
+
+class HeadlessClient:
+    """以 ?timing=1 连接中继，只解析扩展头并计数"""
+
+    def __init__(self, index, url):
+        self.index = index
+        self.url = url
+        self.frames = {}  # Key: eye -> 收到的帧数
+        self.bytes = 0
+        self.receive = []  # 首包 -> 末包 (ms)
+        self.handoff = []  # 末包 -> 交给 WebSocket (ms)
+        self.delivery = []  # 交给 WebSocket -> 客户端收到 (ms)
+        self.end_to_end = []  # 发送端 timestamp_ms -> 客户端收到 (ms)
+        self.first = None
+        self.last = None
+        self.ws = None
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, max_size=None)
+
+    async def run(self):
+        try:
+            async for message in self.ws:
+                self.on_frame(message, time.time())
+        except websockets.ConnectionClosed:
+            pass
+
+    def on_frame(self, message, now):
+        _, ts, _, _, _, first, last, assembled = TIMING_HEADER.unpack_from(message, 0)
+        _, _, eye, _ = RELAY_HEADER.unpack_from(message, TIMING_HEADER_SIZE)
+        now_ms = now * 1000
+        self.frames[eye] = self.frames.get(eye, 0) + 1
+        self.bytes += len(message)
+        self.receive.append(last - first)
+        self.handoff.append(assembled - last)
+        self.delivery.append(now_ms - assembled)
+        self.end_to_end.append(wrap_ms((int(now_ms) & 0xFFFFFFFF) - ts))
+        if self.first is None:
+            self.first = now
+        self.last = now
+
+    def count(self):
+        return sum(self.frames.values())
+
+    async def close(self):
+        await self.ws.close()
+
+
+def summary(samples):
+    if not samples:
+        return None
+    return dict(zip(("p50", "p95", "p99"), percentiles(samples)))
+
+
+def fmt(name, quantiles):
+    if quantiles is None:
+        return f"{name} -"
+    return (
+        f"{name} {quantiles['p50']:.1f}/{quantiles['p95']:.1f}/{quantiles['p99']:.1f}"
+    )
+
+
+async def run(args):
+    relay = RelayProcess(args)
+    try:
+        await relay.wait_ready()
+        url = f"ws://127.0.0.1:{relay.ws_port}/?timing=1&session={args.session}"
+        clients = [HeadlessClient(i, url) for i in range(args.clients)]
+        for client in clients:
+            await client.connect()
+        tasks = [asyncio.create_task(client.run()) for client in clients]
+        await asyncio.sleep(SETTLE)
+
+        metrics_before = scrape(relay.metrics_port)
+        cpu_before = cpu_seconds(relay.process.pid)
+        senders = SenderGroup(args, relay.udp_port)
+        senders.start()
+        sent = await asyncio.get_running_loop().run_in_executor(None, senders.join)
+        elapsed = time.perf_counter() - senders.start_time
+        await asyncio.sleep(DRAIN)
+        cpu_after = cpu_seconds(relay.process.pid)
+        metrics_after = scrape(relay.metrics_port)
+
+        for client in clients:
+            await client.close()
+        await asyncio.gather(*tasks)
+    finally:
+        relay.stop()
+
+    expected = frame_count(args) * len(eyes(args))
+    result = {
+        "relay": args.relay,
+        "workers": args.workers,
+        "rx": args.rx,
+        "config": describe(args),
+        "duration": elapsed,
+        "sent": sent,
+        "frames_expected": expected,
+        "clients": [],
+    }
+    if metrics_before and metrics_after:
+        result["relay_metrics"] = {
+            name: metrics_after[name] - metrics_before[name] for name in RELAY_METRICS
+        }
+    assembled = result.get("relay_metrics", {}).get("vssp_frames_assembled_total")
+    if cpu_before is not None and cpu_after is not None:
+        cpu = cpu_after - cpu_before
+        result["relay_cpu_seconds"] = cpu
+        result["relay_cpu_percent"] = cpu / elapsed * 100
+        if assembled:
+            result["relay_cpu_ms_per_frame"] = cpu / assembled * 1000
+    for client in clients:
+        received = client.count()
+        span = (client.last - client.first) if client.first is not None else 0
+        result["clients"].append(
+            {
+                "frames": received,
+                "fps": received / span if span > 0 else 0.0,
+                "drop_rate": 1 - received / expected if expected else 0.0,
+                "mbit_s": client.bytes * 8 / span / 1e6 if span > 0 else 0.0,
+                "receive_ms": summary(client.receive),
+                "handoff_ms": summary(client.handoff),
+                "delivery_ms": summary(client.delivery),
+                "end_to_end_ms": summary(client.end_to_end),
+            }
+        )
+    return result
+
+
+def report(result):
+    sent = result["sent"]
+    duration = max(result["duration"], 1e-9)
+    print(
+        f"relay {result['relay']}.py (workers {result['workers']}, rx {result['rx']}) | "
+        f"{result['config']} | {duration:.1f}s"
+    )
+    print(
+        f"sent     {result['frames_expected']} frames {sent['packets']} packets "
+        f"{sent['bytes'] * 8 / duration / 1e6:.1f} Mbit/s | lost {sent['lost']} "
+        f"dup {sent['duplicated']} reordered {sent['reordered']} "
+        f"retransmits {sent['retransmits']} late {sent['late']}"
+    )
+    metrics = result.get("relay_metrics")
+    line = "relay   "
+    if metrics:
+        assembled = metrics["vssp_frames_assembled_total"]
+        line += (
+            f" assembled {assembled:.0f} "
+            f"({assembled / max(result['frames_expected'], 1) * 100:.1f}%) "
+            f"expired {metrics['vssp_frames_expired_total']:.0f} "
+            f"kernel drops {metrics['vssp_kernel_drops_total']:.0f} "
+            f"queue drops {metrics['vssp_rx_queue_drops_total']:.0f} |"
+        )
+    if "relay_cpu_seconds" in result:
+        line += (
+            f" CPU {result['relay_cpu_seconds']:.2f}s "
+            f"({result['relay_cpu_percent']:.0f}% of a core)"
+        )
+        if "relay_cpu_ms_per_frame" in result:
+            line += f" {result['relay_cpu_ms_per_frame']:.2f} ms/frame"
+    print(line)
+    print("latency ms p50/p95/p99")
+    for i, client in enumerate(result["clients"]):
+        print(
+            f"client {i} {client['frames']} frames {client['fps']:.1f} fps "
+            f"drop {client['drop_rate'] * 100:.1f}% | "
+            + " | ".join(
+                (
+                    fmt("receive", client["receive_ms"]),
+                    fmt("handoff", client["handoff_ms"]),
+                    fmt("delivery", client["delivery_ms"]),
+                    fmt("end-to-end", client["end_to_end_ms"]),
+                )
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VSSP 中继负载测试")
+    parser.add_argument("--relay", choices=RELAYS, default="video_streamer")
+    parser.add_argument("--workers", type=int, default=1, help="中继 --workers")
+    parser.add_argument(
+        "--rx",
+        choices=["auto", "recvmmsg", "recv_into", "async"],
+        default="auto",
+        help="中继 --rx",
+    )
+    parser.add_argument("--nack", action="store_true", help="中继 --nack")
+    parser.add_argument("--metrics-port", type=int, help="覆盖中继指标端口")
+    parser.add_argument("--clients", type=int, default=1, help="WebSocket 客户端数")
+    parser.add_argument("--relay-log", help="中继输出写入该文件")
+    parser.add_argument("--json", help="结果另存为 JSON (用于比对回归)")
+    add_sender_arguments(parser)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""同机 Unity 输出对比: 回环 UDP + JSON vs 共享内存 pose 块 (pose_shm.py)
+
+    python3 bench/pose_output.py --samples 200000
+    python3 bench/pose_output.py --rate 1000 --duration 5 --poll 0.0002
+
+1. 单进程: 每个样本的发布开销 (JSON 编码 + sendto / 记录打包 + seqlock 写入) 与
+   读取开销 (recvfrom + json.loads / seqlock 快照 + 解包)。
+2. 双进程: 写入进程按 --rate 发布，读取进程阻塞 recv 或按 --poll 间隔轮询序号，
+   统计发布到读到的延迟 p50/p95/p99 (两个进程共用 perf_counter 时钟)。
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pose_codec import (  # noqa: E402
+    DEVICE_LEFT,
+    FLAG_UNITY_SPACE,
+    POSE_MAGIC,
+    POSE_RECORD,
+    POSE_VERSION,
+    mask_to_buttons,
+)
+from pose_shm import PoseBlockReader, PoseBlockWriter  # noqa: E402
+from vssp.timing import percentiles  # noqa: E402
+
+PORT = 9100
+BATCH = 64  # 单进程 UDP 测试每批发送的样本数，不超过接收缓冲
+
+
+def json_message(i):
+    """与 fast_receiver --unity-format json 的手柄消息相同的结构，absolutePosition.x 带样本序号"""
+    return json.dumps(
+        {
+            "type": "controller",
+            "handedness": "left",
+            "position": {"x": 0.1, "y": 0.2, "z": 0.3},
+            "absolutePosition": {"x": float(i), "y": 1.4, "z": 0.3},
+            "orientation": {"x": 0.0, "y": 0.38, "z": 0.0, "w": 0.92},
+            "buttons": mask_to_buttons(0b1001, 1.0, 0.0),
+            "axes": [0.25, -0.5],
+        }
+    ).encode()
+
+
+def pose_record(i):
+    return POSE_RECORD.pack(
+        POSE_MAGIC,
+        POSE_VERSION,
+        DEVICE_LEFT,
+        FLAG_UNITY_SPACE,
+        i & 0xFFFFFFFF,
+        0,
+        0.1,
+        0.2,
+        0.3,
+        0.0,
+        0.38,
+        0.0,
+        0.92,
+        0b1001,
+        1.0,
+        0.0,
+        0.25,
+        -0.5,
+    )
+
+
+def udp_pair():
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return tx, rx, rx.getsockname()
+
+
+def drain(sock):
+    sock.setblocking(False)
+    try:
+        while True:
+            sock.recv(2048)
+    except BlockingIOError:
+        pass
+    sock.setblocking(True)
+
+
+def ns_per(elapsed, n):
+    return elapsed * 1e9 / max(n, 1)
+
+
+def micro(samples, path):
+    """单进程: 返回 {name: (publish ns, read ns)}"""
+    tx, rx, addr = udp_pair()
+    start = time.perf_counter()
+    for i in range(samples):
+        tx.sendto(json_message(i), addr)
+        if i % BATCH == BATCH - 1:
+            # 不计入发布时间: 清空接收缓冲避免丢包
+            pause = time.perf_counter()
+            drain(rx)
+            start += time.perf_counter() - pause
+    json_publish = time.perf_counter() - start
+    drain(rx)
+
+    json_read = 0.0
+    for base in range(0, samples, BATCH):
+        count = min(BATCH, samples - base)
+        for i in range(base, base + count):
+            tx.sendto(json_message(i), addr)
+        start = time.perf_counter()
+        for _ in range(count):
+            json.loads(rx.recv(2048))
+        json_read += time.perf_counter() - start
+    tx.close()
+    rx.close()
+
+    writer = PoseBlockWriter(path)
+    reader = PoseBlockReader(path)
+    start = time.perf_counter()
+    for i in range(samples):
+        writer.write(DEVICE_LEFT, pose_record(i))
+    shm_publish = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(samples):
+        reader.read()
+    shm_read = time.perf_counter() - start
+    reader.close()
+    writer.close()
+    return {
+        "udp json": (ns_per(json_publish, samples), ns_per(json_read, samples)),
+        "shm block": (ns_per(shm_publish, samples), ns_per(shm_read, samples)),
+    }
+
+
+def read_udp(addr, count, ready, results):
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(addr)
+    rx.settimeout(1.0)
+    ready.set()
+    seen = {}
+    try:
+        while len(seen) < count:
+            data = rx.recv(2048)
+            now = time.perf_counter()
+            seen[int(json.loads(data)["absolutePosition"]["x"])] = now
+    except socket.timeout:
+        pass
+    rx.close()
+    results.put(seen)
+
+
+def read_shm(path, count, poll, ready, results):
+    reader = PoseBlockReader(path)
+    ready.set()
+    seen = {}
+    seq = reader.seq
+    while len(seen) < count:
+        polled = reader.wait(seq, timeout=1.0, interval=poll)
+        if polled is None:
+            break
+        now = time.perf_counter()
+        seq, poses = polled
+        pose = poses[DEVICE_LEFT]
+        if pose is not None:
+            seen.setdefault(pose[4], now)
+    results.put((seen, reader.retries))
+    reader.close()
+
+
+def cross_process(kind, args, path):
+    """双进程: 返回 (延迟 ms 的 p50/p95/p99, 读到的样本比例, seqlock 重读次数)"""
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    results = ctx.Queue()
+    count = int(args.rate * args.duration)
+    writer = None
+    if kind == "shm":
+        writer = PoseBlockWriter(path)
+        reader = ctx.Process(
+            target=read_shm, args=(path, count, args.poll, ready, results)
+        )
+    else:
+        addr = ("127.0.0.1", args.port)
+        reader = ctx.Process(target=read_udp, args=(addr, count, ready, results))
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    reader.start()
+    ready.wait()
+    time.sleep(0.2)
+
+    sent = [0.0] * count
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+    for i in range(count):
+        delay = start + i * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if writer is not None:
+            record = pose_record(i)
+            sent[i] = time.perf_counter()
+            writer.write(DEVICE_LEFT, record)
+        else:
+            message = json_message(i)
+            sent[i] = time.perf_counter()
+            tx.sendto(message, addr)
+
+    result = results.get()
+    reader.join()
+    if writer is not None:
+        writer.close()
+        seen, retries = result
+    else:
+        tx.close()
+        seen, retries = result, 0
+    latency = [(t - sent[i]) * 1000 for i, t in seen.items() if i < count]
+    return percentiles(latency) if latency else None, len(latency) / count, retries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP JSON vs shared-memory pose block")
+    parser.add_argument("--samples", type=int, default=100000, help="单进程测试样本数")
+    parser.add_argument(
+        "--rate", type=float, default=500.0, help="双进程测试发布频率 (Hz)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=4.0, help="双进程测试时长 (s)"
+    )
+    parser.add_argument(
+        "--poll", type=float, default=0.0005, help="共享内存读取方轮询间隔 (s)"
+    )
+    parser.add_argument("--port", type=int, default=PORT, help="双进程测试 UDP 端口")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"vssp_pose_bench_{os.getpid()}")
+    if os.path.isdir("/dev/shm"):
+        path = os.path.join("/dev/shm", os.path.basename(path))
+    try:
+        print(f"{args.samples} samples, single process")
+        print(f"{'':>10} | {'publish ns':>10} | {'read ns':>8}")
+        for name, (publish, read) in micro(args.samples, path).items():
+            print(f"{name:>10} | {publish:>10.0f} | {read:>8.0f}")
+
+        print(
+            f"\n{args.rate:g} Hz for {args.duration:g}s, reader in a second process "
+            f"(shm poll every {args.poll * 1e6:.0f} us)"
+        )
+        print(f"{'':>10} | {'p50/p95/p99 ms':>20} | {'seen':>6} | retries")
+        for kind, name in (("udp", "udp json"), ("shm", "shm block")):
+            quantiles, seen, retries = cross_process(kind, args, path)
+            text = "/".join(f"{q:.3f}" for q in quantiles) if quantiles else "-"
+            print(f"{name:>10} | {text:>20} | {seen:>6.1%} | {retries}")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""多头显会话负载测试: pose (fast_receiver) 与视频帧 (video_streamer.py) 吞吐随模拟头显数的变化
+
+    python3 bench/sessions.py                                    # 1 / 2 / 4 / 8 / 16 台头显
+    python3 bench/sessions.py --headsets 1 4 16 --duration 5 --pose-rate 90 --size 20000 --fps 72
+    python3 bench/sessions.py --skip-video --pose-rate 0         # 只测 pose，不限速
+
+头显 k (k = 1..N) 使用会话 k:
+
+- pose: 一个 fast_receiver (--server asyncio) 子进程，每台头显一条 WebSocket 连接，
+  每 1 / pose-rate 秒发送一条 head + left + right 三条二进制记录的消息 (0 为不限速)；
+  奇数头显在记录 flags 高 8 位写会话 id，偶数头显连接 ws://...:8786/?session=k。
+  每个会话的 Unity 端口 (--session-port-base + k) 各绑定一个 UDP socket；记录的 seq 高 8 位为会话 id，
+  任何端口收到其他会话的 pose 都计为串扰。
+- 视频: 一个 video_streamer.py 子进程，每台头显一个合成发送进程 (bench/vssp_sender.py --session k)
+  和一个 ?session=k&timing=1 的 WebSocket 客户端；延迟扩展头中的 session 不是 k 时计为串扰。
+
+报告每档的总吞吐 (pose/s、帧/s)、送达率、每会话吞吐的最小 / 最大值、子进程每 pose / 每帧的 CPU 时间。
+压测客户端、发送端与被测进程在同一台机器上运行，CPU 核数少时高档位会互相争用。
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import websockets  # noqa: E402
+
+from load_test import HeadlessClient, RelayProcess, cpu_seconds  # noqa: E402
+from pose_codec import (  # noqa: E402
+    FLAG_UNITY_SPACE,
+    POSE_MAGIC,
+    POSE_RECORD,
+    POSE_SIZE,
+    SESSION_SHIFT,
+)
+from vssp.header import TIMING_HEADER  # noqa: E402
+from vssp_sender import (  # noqa: E402
+    SenderGroup,
+    add_sender_arguments,
+    eyes,
+    frame_count,
+)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+POSE_WS_PORT = 8786
+SESSION_PORT_BASE = 19100
+SEQ_SHIFT = 24  # 记录 seq 的高 8 位: 会话 id
+SETTLE = 1.0
+
+
+def pose_message(session, seq, in_flags):
+    """一台头显一帧的 head + left + right 记录"""
+    flags = FLAG_UNITY_SPACE | (session << SESSION_SHIFT if in_flags else 0)
+    ts = int(time.time() * 1000) & 0xFFFFFFFF
+    seq = session << SEQ_SHIFT | seq & 0xFFFFFF
+    return b"".join(
+        POSE_RECORD.pack(
+            POSE_MAGIC,
+            1,
+            device,
+            flags,
+            seq,
+            ts,
+            0.1 * session,
+            1.6,
+            0.2 + 0.001 * (seq & 0xFF),
+            0.0,
+            0.0,
+            0.0,
+            1.0,
+            0,
+            0.0,
+            0.0,
+            0.0,
+            0.0,
+        )
+        for device in range(3)
+    )
+
+
+class UnityPort(asyncio.DatagramProtocol):
+    """一个会话的 Unity 端口: 统计收到的 pose 数与串扰"""
+
+    def __init__(self, session):
+        self.session = session
+        self.poses = 0
+        self.foreign = 0
+
+    def datagram_received(self, data, addr):
+        for i in range(0, len(data) - POSE_SIZE + 1, POSE_SIZE):
+            seq = POSE_RECORD.unpack_from(data, i)[4]
+            if seq >> SEQ_SHIFT == self.session:
+                self.poses += 1
+            else:
+                self.foreign += 1
+
+
+async def wait_port(proc, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"process exited with code {proc.returncode}")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"port {port} did not open")
+
+
+async def pose_headset(session, rate, duration, sent):
+    in_flags = session % 2 == 1
+    url = f"ws://127.0.0.1:{POSE_WS_PORT}/"
+    if not in_flags:
+        url += f"?session={session}"
+    async with websockets.connect(url) as ws:
+        interval = 1.0 / rate if rate else 0.0
+        start = time.perf_counter() + random.uniform(0, interval)
+        i = 0
+        while True:
+            due = start + i * interval
+            now = time.perf_counter()
+            if now - start >= duration:
+                break
+            if due > now:
+                await asyncio.sleep(due - now)
+            elif not rate:
+                await asyncio.sleep(0)
+            await ws.send(pose_message(session, i, in_flags))
+            sent[session] += 3
+            i += 1
+
+
+async def run_pose(headsets, args):
+    """返回 {"sent", "delivered", "per_session", "foreign", "cpu_us_per_pose"}"""
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "fast_receiver.py",
+            "--server",
+            "asyncio",
+            "--predict-port",
+            "0",
+            "--max-sessions",
+            str(headsets + 1),
+            "--session-port-base",
+            str(SESSION_PORT_BASE),
+        ],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    loop = asyncio.get_running_loop()
+    transports = []
+    try:
+        ports = {}
+        for k in range(1, headsets + 1):
+            transport, port = await loop.create_datagram_endpoint(
+                lambda k=k: UnityPort(k),
+                local_addr=("127.0.0.1", SESSION_PORT_BASE + k),
+            )
+            transports.append(transport)
+            transport.get_extra_info("socket").setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024
+            )
+            ports[k] = port
+        await wait_port(proc, POSE_WS_PORT)
+        await asyncio.sleep(SETTLE)
+        sent = dict.fromkeys(ports, 0)
+        cpu = cpu_seconds(proc.pid)
+        await asyncio.gather(
+            *(pose_headset(k, args.pose_rate, args.duration, sent) for k in ports)
+        )
+        await asyncio.sleep(0.5)
+        cpu_used = cpu_seconds(proc.pid) - cpu if cpu is not None else None
+    finally:
+        proc.terminate()
+        proc.wait()
+        for transport in transports:
+            transport.close()
+        # transport 在下一轮事件循环才真正关闭端口
+        await asyncio.sleep(0)
+    delivered = sum(p.poses for p in ports.values())
+    return {
+        "sent": sum(sent.values()),
+        "delivered": delivered,
+        "per_session": [p.poses / args.duration for p in ports.values()],
+        "foreign": sum(p.foreign for p in ports.values()),
+        "cpu_us_per_pose": (
+            cpu_used / max(delivered, 1) * 1e6 if cpu_used is not None else None
+        ),
+    }
+
+
+class SessionClient(HeadlessClient):
+    """只应收到 session 会话的帧"""
+
+    def __init__(self, index, url, session):
+        super().__init__(index, url)
+        self.session = session
+        self.foreign = 0
+
+    def on_frame(self, message, now):
+        if TIMING_HEADER.unpack_from(message, 0)[4] != self.session:
+            self.foreign += 1
+            return
+        super().on_frame(message, now)
+
+
+async def run_video(headsets, args):
+    relay_args = argparse.Namespace(
+        relay="video_streamer",
+        metrics_port=None,
+        rx="auto",
+        workers=1,
+        nack=False,
+        relay_log=None,
+    )
+    relay = RelayProcess(relay_args)
+    try:
+        await relay.wait_ready()
+        clients = []
+        for k in range(1, headsets + 1):
+            url = f"ws://127.0.0.1:{relay.ws_port}/?timing=1&session={k}"
+            clients.append(SessionClient(k, url, k))
+        for client in clients:
+            await client.connect()
+        tasks = [asyncio.create_task(client.run()) for client in clients]
+        await asyncio.sleep(SETTLE)
+
+        groups = []
+        for k in range(1, headsets + 1):
+            sender_args = copy.copy(args)
+            sender_args.session = k
+            sender_args.procs = 1
+            sender_args.first_id = None
+            # 所有发送进程启动完成后再开始计时
+            groups.append(
+                SenderGroup(sender_args, relay.udp_port, 1.0 + 0.2 * headsets)
+            )
+        cpu = cpu_seconds(relay.process.pid)
+        for group in groups:
+            group.start()
+        stats = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [group.join() for group in groups]
+        )
+        await asyncio.sleep(0.5)
+        cpu_used = cpu_seconds(relay.process.pid) - cpu if cpu is not None else None
+        for client in clients:
+            await client.close()
+        await asyncio.gather(*tasks)
+    finally:
+        relay.stop()
+    delivered = sum(client.count() for client in clients)
+    return {
+        "sent": sum(s["frames"] for s in stats),
+        "expected": frame_count(args) * len(eyes(args)) * headsets,
+        "delivered": delivered,
+        "per_session": [client.count() / args.duration for client in clients],
+        "foreign": sum(client.foreign for client in clients),
+        "late": sum(s["late"] for s in stats),
+        "cpu_ms_per_frame": (
+            cpu_used / max(delivered, 1) * 1000 if cpu_used is not None else None
+        ),
+    }
+
+
+def report_line(headsets, result, duration, unit, cpu_text):
+    sent, delivered = result["sent"], result["delivered"]
+    per_session = result["per_session"]
+    return (
+        f"{headsets:>8} | {sent / duration:9.0f} {unit}/s sent "
+        f"{delivered / duration:9.0f} delivered ({delivered / max(sent, 1) * 100:5.1f}%) | "
+        f"per session {min(per_session):7.1f} .. {max(per_session):7.1f} | "
+        f"{cpu_text} | cross-session {result['foreign']}"
+    )
+
+
+async def run(args):
+    if not args.skip_pose:
+        rate = f"{args.pose_rate:g} msgs/s" if args.pose_rate else "unthrottled"
+        print(f"== pose: fast_receiver --server asyncio, 3 poses per message, {rate}")
+        for n in args.headsets:
+            result = await run_pose(n, args)
+            cpu = result["cpu_us_per_pose"]
+            cpu_text = f"{cpu:6.1f} us cpu/pose" if cpu else "-"
+            print(report_line(n, result, args.duration, "pose", cpu_text))
+    if not args.skip_video:
+        size = f"{args.size} B" if args.size else "x".join(map(str, args.resolution))
+        print(
+            f"== video: video_streamer.py, {args.mode} {size} @ {args.fps:g} fps per headset"
+        )
+        for n in args.headsets:
+            result = await run_video(n, args)
+            cpu = result["cpu_ms_per_frame"]
+            cpu_text = f"{cpu:5.2f} ms cpu/frame" if cpu else "-"
+            if result["late"]:
+                cpu_text += f" (senders late {result['late']})"
+            print(report_line(n, result, args.duration, "frame", cpu_text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-headset session load test")
+    parser.add_argument(
+        "--headsets", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="模拟头显数"
+    )
+    parser.add_argument(
+        "--pose-rate",
+        type=float,
+        default=90.0,
+        help="每台头显每秒的 pose 消息数 (每条 3 个 pose)，0 为不限速",
+    )
+    parser.add_argument("--skip-pose", action="store_true")
+    parser.add_argument("--skip-video", action="store_true")
+    add_sender_arguments(parser)
+    parser.set_defaults(duration=5.0, size=20000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""启动方式对比: 三进程 (旧 start.sh) / 两进程 (start.sh，中继提供网页) / launcher.py 单进程
+
+    python3 bench/single_process.py
+    python3 bench/single_process.py --runs 5 --idle 5
+
+每种方式按默认配置启动 (pose 8765 / 8786，视频 8766 / 8787，网页 8000)，报告:
+
+- startup: 从启动子进程到所有 TCP 端口 (8765 8786 8787 8000) 都可连接的时间，--runs 次的中位数
+- RSS / PSS: 就绪 --settle 秒后所有进程 (含子进程) 的常驻内存之和；PSS 把共享页按进程数分摊 (Linux)
+- idle CPU: 之后 --idle 秒内的 CPU 占用 (无 pose / 视频输入，主要是终端 UI 与各后台循环)
+- stop: 发出 SIGTERM 到所有进程退出的时间
+"""
+
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from load_test import cpu_seconds  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PORTS = (8765, 8786, 8787, 8000)
+LAYOUTS = {
+    "3 processes (old start.sh)": [
+        ["fast_receiver.py"],
+        ["video_streamer.py"],
+        ["-m", "http.server", "8000"],
+    ],
+    "2 processes (start.sh)": [
+        ["fast_receiver.py"],
+        ["video_streamer.py", "--static-port", "8000"],
+    ],
+    "launcher.py": [["launcher.py"]],
+}
+
+
+def children(pid):
+    """pid 及其所有子孙进程"""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm 可能含空格: ppid 在最后一个 ")" 之后的第二个字段
+        parents[int(entry)] = int(stat.rsplit(")", 1)[1].split()[1])
+    tree = [pid]
+    for candidate in tree:
+        tree += [p for p, parent in parents.items() if parent == candidate]
+    return tree
+
+
+def read_kb(path, field):
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def memory_mb(pids):
+    """(RSS, PSS) MB 之和，读不到 PSS 时为 None"""
+    rss = [read_kb(f"/proc/{pid}/status", "VmRSS:") for pid in pids]
+    pss = [read_kb(f"/proc/{pid}/smaps_rollup", "Pss:") for pid in pids]
+    return (
+        sum(kb for kb in rss if kb) / 1024,
+        sum(pss) / 1024 if None not in pss else None,
+    )
+
+
+def port_open(port):
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+
+def start(layout, timeout=20.0):
+    """启动一种方式，返回 (进程列表, 就绪耗时 s)"""
+    started = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable] + command,
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        for command in layout
+    ]
+    waiting = set(PORTS)
+    while waiting:
+        if time.perf_counter() - started > timeout:
+            stop(procs)
+            raise RuntimeError(f"ports {sorted(waiting)} did not open")
+        for proc in procs:
+            if proc.poll() is not None:
+                stop(procs)
+                raise RuntimeError(f"{proc.args} exited with code {proc.returncode}")
+        waiting = {port for port in waiting if not port_open(port)}
+        if waiting:
+            time.sleep(0.005)
+    return procs, time.perf_counter() - started
+
+
+def stop(procs, timeout=10.0):
+    """SIGTERM 所有进程，返回全部退出的耗时 s"""
+    started = time.perf_counter()
+    for proc in procs:
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGTERM)
+    for proc in procs:
+        try:
+            proc.wait(max(timeout - (time.perf_counter() - started), 0.1))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    return time.perf_counter() - started
+
+
+def bench(name, layout, args):
+    startups = []
+    for run in range(args.runs):
+        procs, elapsed = start(layout)
+        startups.append(elapsed)
+        if run < args.runs - 1:
+            stop(procs)
+            time.sleep(0.5)
+    time.sleep(args.settle)
+    pids = [pid for proc in procs for pid in children(proc.pid)]
+    rss, pss = memory_mb(pids)
+    before = [cpu_seconds(proc.pid) for proc in procs]
+    time.sleep(args.idle)
+    after = [cpu_seconds(proc.pid) for proc in procs]
+    idle = None
+    if None not in before and None not in after:
+        idle = (sum(after) - sum(before)) / args.idle * 100
+    stopped = stop(procs)
+    pss_text = f"{pss:6.1f} MB" if pss is not None else "     -"
+    idle_text = f"{idle:5.1f}%" if idle is not None else "    -"
+    print(
+        f"{name:28} | {len(pids)} processes | startup {statistics.median(startups) * 1000:6.0f} ms "
+        f"(min {min(startups) * 1000:.0f}) | RSS {rss:6.1f} MB | PSS {pss_text} | "
+        f"idle CPU {idle_text} | stop {stopped * 1000:5.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="process layout benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="启动次数 (取中位数)")
+    parser.add_argument("--settle", type=float, default=2.0, help="就绪后等待 (s)")
+    parser.add_argument("--idle", type=float, default=3.0, help="空闲 CPU 统计时长 (s)")
+    args = parser.parse_args()
+    busy = [port for port in PORTS if port_open(port)]
+    if busy:
+        sys.exit(f"ports already in use: {busy}")
+    for name, layout in LAYOUTS.items():
+        bench(name, layout, args)
+
+
+if __name__ == "__main__":
+    main()
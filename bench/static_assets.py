@@ -0,0 +1,260 @@
+"""网页服务对比: 旧 https_server.py (单线程 HTTPServer) / python -m http.server / vssp.static
+
+    python3 bench/static_assets.py
+    python3 bench/static_assets.py --loads 200 --clients 16 --duration 3
+
+每个服务以子进程在本机端口启动，服务项目目录 (index.html)，均为纯 HTTP (TLS 握手开销与服务实现无关):
+
+- page load: 每次新建连接 GET / (Accept-Encoding: gzip, br，同浏览器)，报告耗时 p50 / p99 与传输字节
+- reload: 带上次响应的 ETag / Last-Modified 重新验证 (If-None-Match / If-Modified-Since)
+- stalled: 一个连接只发出半个请求行后停住，同时测一次 page load (超时 --stall-timeout 秒)
+- concurrent: --clients 个客户端并发请求 --duration 秒 (能 keep-alive 时复用连接)，报告请求/s 与服务进程每请求 CPU
+- 服务进程 RSS (与中继同进程时省下的正是这一个进程)
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from load_test import cpu_seconds  # noqa: E402
+from vssp.timing import percentiles  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PORT = 18080
+# 旧 https_server.py 去掉 TLS 后的等价服务
+OLD_SERVER = (
+    "import http.server as h; "
+    "h.HTTPServer(('127.0.0.1', {port}), h.SimpleHTTPRequestHandler).serve_forever()"
+)
+SERVERS = {
+    "https_server (old)": lambda port: [
+        sys.executable,
+        "-c",
+        OLD_SERVER.format(port=port),
+    ],
+    "http.server": lambda port: [
+        sys.executable,
+        "-m",
+        "http.server",
+        str(port),
+        "--bind",
+        "127.0.0.1",
+    ],
+    "vssp.static": lambda port: [
+        sys.executable,
+        "https_server.py",
+        "--no-tls",
+        "--port",
+        str(port),
+    ],
+}
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, deflate, br"}
+
+
+class Connection:
+    """最小 HTTP/1.1 客户端连接 (响应需带 Content-Length，或以关闭连接结束)"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.open = True
+
+    @classmethod
+    async def connect(cls, port):
+        return cls(*await asyncio.open_connection("127.0.0.1", port))
+
+    async def get(self, path, headers=None):
+        lines = [f"GET {path} HTTP/1.1", "Host: 127.0.0.1"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        version, status = (await self.reader.readline()).split()[:2]
+        status = int(status)
+        response = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response[name.strip().lower()] = value.strip()
+        if "content-length" in response:
+            body = await self.reader.readexactly(int(response["content-length"]))
+        elif status == 304:
+            body = b""
+        else:
+            body = await self.reader.read()
+        # SimpleHTTPRequestHandler 为 HTTP/1.0: 每个响应后关闭连接
+        if (
+            version == b"HTTP/1.0"
+            or response.get("connection", "").lower() == "close"
+            or "content-length" not in response
+            and status != 304
+            or self.reader.at_eof()
+        ):
+            self.open = False
+        return status, response, len(body)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def page_load(port, headers=BROWSER_HEADERS):
+    start = time.perf_counter()
+    conn = await Connection.connect(port)
+    status, response, size = await conn.get("/", headers)
+    await conn.close()
+    return (time.perf_counter() - start) * 1000, status, response, size
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def wait_port(proc, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"port {port} did not open")
+
+
+async def concurrent(port, clients, duration):
+    """返回完成的请求数"""
+    done = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal done
+        conn = None
+        while time.perf_counter() < deadline:
+            if conn is None or not conn.open:
+                if conn is not None:
+                    await conn.close()
+                conn = await Connection.connect(port)
+            await conn.get("/", BROWSER_HEADERS)
+            done += 1
+        if conn is not None:
+            await conn.close()
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return done
+
+
+async def stalled_load(port, timeout):
+    """一个只发了半个请求行的连接挂着时的 page load 耗时 (ms)，超时返回 None"""
+    _, staller = await asyncio.open_connection("127.0.0.1", port)
+    staller.write(b"GET /ind")
+    await staller.drain()
+    await asyncio.sleep(0.1)
+    try:
+        elapsed, _, _, _ = await asyncio.wait_for(page_load(port), timeout)
+        return elapsed
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        staller.close()
+
+
+async def bench(name, command, args):
+    proc = subprocess.Popen(
+        command(PORT), cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        await wait_port(proc, PORT)
+        times = []
+        size = 0
+        response = {}
+        for _ in range(args.loads):
+            elapsed, status, response, size = await page_load(PORT)
+            assert status == 200, status
+            times.append(elapsed)
+        validators = {}
+        if "etag" in response:
+            validators["If-None-Match"] = response["etag"]
+        if "last-modified" in response:
+            validators["If-Modified-Since"] = response["last-modified"]
+        reloads = []
+        for _ in range(args.loads):
+            elapsed, status, _, _ = await page_load(
+                PORT, {**BROWSER_HEADERS, **validators}
+            )
+            reloads.append((elapsed, status))
+        stalled = await stalled_load(PORT, args.stall_timeout)
+        # 旧服务在停住的连接断开前不会处理下一个请求
+        await asyncio.sleep(0.2)
+        cpu = cpu_seconds(proc.pid)
+        requests = await concurrent(PORT, args.clients, args.duration)
+        cpu_used = cpu_seconds(proc.pid) - cpu if cpu is not None else None
+        rss = rss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait()
+    p50, _, p99 = percentiles(times)
+    r50, _, r99 = percentiles([t for t, _ in reloads])
+    not_modified = sum(1 for _, status in reloads if status == 304)
+    encoding = response.get("content-encoding", "identity")
+    cache = response.get("cache-control", "-")
+    print(f"== {name}")
+    print(
+        f"   page load  p50 {p50:6.2f} ms p99 {p99:6.2f} ms | {size} B ({encoding}) | "
+        f"Cache-Control {cache}"
+    )
+    print(
+        f"   reload     p50 {r50:6.2f} ms p99 {r99:6.2f} ms | "
+        f"{not_modified}/{len(reloads)} answered 304"
+    )
+    stall = (
+        f"{stalled:6.2f} ms"
+        if stalled is not None
+        else f"timed out ({args.stall_timeout:g} s)"
+    )
+    print(f"   stalled    {stall}")
+    cpu_text = (
+        f"{cpu_used / max(requests, 1) * 1e6:6.0f} us cpu/request"
+        if cpu_used is not None
+        else "-"
+    )
+    rss_text = f"{rss:5.1f} MB RSS" if rss is not None else ""
+    print(
+        f"   concurrent {requests / args.duration:7.0f} req/s ({args.clients} clients) | "
+        f"{cpu_text} | {rss_text}"
+    )
+
+
+async def run(args):
+    for name, command in SERVERS.items():
+        await bench(name, command, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="static web server benchmark")
+    parser.add_argument("--loads", type=int, default=100, help="顺序 page load 次数")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--stall-timeout", type=float, default=3.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
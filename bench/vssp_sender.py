@@ -0,0 +1,364 @@
+"""合成 VSSP v1.0 发送端: 多进程按固定帧率发送随机内容的帧，可注入丢包 / 乱序 / 重复 / 抖动
+
+    python3 bench/vssp_sender.py --resolution 1920x1920 --fps 72 --mode stereo --duration 10
+    python3 bench/vssp_sender.py --size 80000 --fps 120 --procs 4 --loss 1 --reorder 2 --dup 0.5 --jitter 3
+
+--procs P 个进程按 frame_id % P 分担同一个帧流: 所有进程共用起始时间，第 k 帧在 start + k / fps 发出。
+每个进程回应中继的 VCLK 时钟探测 (延迟统计按 synced 计算) 和 VNAK 重传请求 (--nack)。
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import select
+import socket
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vssp.fec import FLAG_RETRANSMIT, parse_nack  # noqa: E402
+from vssp.header import (  # noqa: E402
+    EYE_LEFT,
+    EYE_MONO,
+    EYE_RIGHT,
+    MAX_PAYLOAD,
+    MODE_MONO,
+    MODE_STEREO,
+    pack_header,
+)
+from vssp.timing import answer_clock_probe  # noqa: E402
+
+NACK_CACHE = 64  # 每个进程为 NACK 保留最近的帧数
+REORDER_DEPTH = 8  # 乱序时与之后最多第 N 个包交换
+SNDBUF = 4 * 1024 * 1024
+STAT_KEYS = (
+    "frames",
+    "packets",
+    "bytes",
+    "lost",
+    "duplicated",
+    "reordered",
+    "retransmits",
+    "clock_replies",
+    "late",
+)
+
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def add_sender_arguments(parser):
+    """发送端参数，bench/load_test.py 共用"""
+    parser.add_argument("--host", default="127.0.0.1", help="中继地址")
+    parser.add_argument(
+        "--resolution",
+        type=parse_resolution,
+        default=(1920, 1920),
+        help="每眼分辨率 WxH，帧大小按 --bpp 估算 (MJPEG)",
+    )
+    parser.add_argument("--bpp", type=float, default=1.5, help="每像素比特数")
+    parser.add_argument("--size", type=int, help="每帧字节数 (覆盖 --resolution)")
+    parser.add_argument(
+        "--size-jitter", type=float, default=10.0, help="帧大小随机波动 (%%)"
+    )
+    parser.add_argument("--fps", type=float, default=72.0)
+    parser.add_argument("--mode", choices=["mono", "stereo"], default="stereo")
+    parser.add_argument("--codec", type=int, default=0, help="VSSP codec 字段")
+    parser.add_argument("--max-payload", type=int, default=MAX_PAYLOAD)
+    parser.add_argument("--duration", type=float, default=10.0, help="发送时长 (s)")
+    parser.add_argument("--procs", type=int, default=1, help="发送进程数")
+    parser.add_argument("--loss", type=float, default=0.0, help="丢包率 (%%)")
+    parser.add_argument("--reorder", type=float, default=0.0, help="乱序率 (%%)")
+    parser.add_argument("--dup", type=float, default=0.0, help="重复率 (%%)")
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="每帧发送时间随机延后 0..N ms"
+    )
+    parser.add_argument(
+        "--first-id",
+        type=int,
+        default=None,
+        help="起始 frame_id (默认随机，避免被中继当作旧帧)",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--session", type=int, default=0, help="VSSP 头中的会话 id (模拟第 N 台头显)"
+    )
+
+
+def frame_size(args):
+    if args.size:
+        return args.size
+    width, height = args.resolution
+    return max(int(width * height * args.bpp / 8), 1)
+
+
+def frame_count(args):
+    return int(args.duration * args.fps)
+
+
+def eyes(args):
+    return (EYE_LEFT, EYE_RIGHT) if args.mode == "stereo" else (EYE_MONO,)
+
+
+class SyntheticSender:
+    """一个发送进程: 发送 frame_id % procs == index 的帧"""
+
+    def __init__(self, index, args, port, start, first_id):
+        self.index = index
+        self.args = args
+        self.addr = (args.host, port)
+        self.start = start
+        self.first_id = first_id
+        self.mode = MODE_STEREO if args.mode == "stereo" else MODE_MONO
+        self.eyes = eyes(args)
+        self.size = frame_size(args)
+        self.random = random.Random(
+            None if args.seed is None else args.seed * 1000 + index
+        )
+        # 帧内容取自一块随机数据的不同位置，发送时只切片不拷贝
+        self.data = memoryview(os.urandom(self.size * 2 + 1))
+        self.cache = OrderedDict()  # Key: (frame_id, eye) -> (offset, size, ts)
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF)
+        self.sock.setblocking(False)
+
+    def packets(self, frame_id, eye, offset, size, ts, flags=0):
+        """按 p_id 顺序的 (header, payload view) 列表"""
+        step = self.args.max_payload
+        count = max(-(-size // step), 1)
+        result = []
+        for p_id in range(count):
+            start = offset + p_id * step
+            chunk = self.data[start : min(start + step, offset + size)]
+            header = pack_header(
+                frame_id,
+                self.mode,
+                eye,
+                self.args.codec,
+                flags,
+                p_id,
+                count,
+                len(chunk),
+                ts,
+                self.args.session,
+            )
+            result.append((header, chunk))
+        return result
+
+    def impair(self, packets):
+        """按 --loss / --dup / --reorder 处理一帧的数据包"""
+        args = self.args
+        rnd = self.random.random
+        stats = self.stats
+        if args.loss or args.dup:
+            out = []
+            for packet in packets:
+                if rnd() * 100 < args.loss:
+                    stats["lost"] += 1
+                    continue
+                out.append(packet)
+                if rnd() * 100 < args.dup:
+                    stats["duplicated"] += 1
+                    out.append(packet)
+            packets = out
+        if args.reorder:
+            last = len(packets) - 1
+            for i in range(last):
+                if rnd() * 100 < args.reorder:
+                    j = min(i + self.random.randint(1, REORDER_DEPTH), last)
+                    packets[i], packets[j] = packets[j], packets[i]
+                    stats["reordered"] += 1
+        return packets
+
+    def send(self, packets):
+        sendmsg = self.sock.sendmsg
+        addr = self.addr
+        sent = 0
+        for header, chunk in packets:
+            try:
+                sendmsg((header, chunk), (), 0, addr)
+            except BlockingIOError:
+                # 发送缓冲已满: 等待可写后重试一次
+                select.select((), (self.sock,), (), 0.01)
+                try:
+                    sendmsg((header, chunk), (), 0, addr)
+                except OSError:
+                    continue
+            except OSError:
+                continue
+            sent += 1
+            self.stats["bytes"] += len(header) + len(chunk)
+        self.stats["packets"] += sent
+
+    def send_frame(self, frame_id):
+        args = self.args
+        for eye in self.eyes:
+            size = self.size
+            if args.size_jitter:
+                spread = size * args.size_jitter / 100
+                size = max(int(size + self.random.uniform(-spread, spread)), 1)
+                size = min(size, self.size * 2)
+            offset = self.random.randrange(len(self.data) - size + 1)
+            ts = int(time.time() * 1000) & 0xFFFFFFFF
+            self.cache[(frame_id, eye)] = (offset, size, ts)
+            if len(self.cache) > NACK_CACHE:
+                self.cache.popitem(last=False)
+            self.send(self.impair(self.packets(frame_id, eye, offset, size, ts)))
+        self.stats["frames"] += len(self.eyes)
+
+    def poll(self, timeout):
+        """在 timeout 内处理中继发回的 VCLK 探测 / VNAK 请求"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            readable, _, _ = select.select((self.sock,), (), (), remaining)
+            if not readable:
+                return
+            while True:
+                try:
+                    data, addr = self.sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    return
+                self.handle_control(data, addr)
+
+    def handle_control(self, data, addr):
+        sender_ms = int(time.time() * 1000)
+        if answer_clock_probe(self.sock, data, addr, sender_ms):
+            self.stats["clock_replies"] += 1
+            return
+        nack = parse_nack(data)
+        if nack is None:
+            return
+        frame_id, eye, ids = nack
+        cached = self.cache.get((frame_id, eye))
+        if cached is None:
+            return
+        offset, size, ts = cached
+        packets = self.packets(frame_id, eye, offset, size, ts, FLAG_RETRANSMIT)
+        resend = [packets[p_id] for p_id in ids if p_id < len(packets)]
+        self.stats["retransmits"] += len(resend)
+        self.send(self.impair(resend))
+
+    def run(self):
+        args = self.args
+        procs = args.procs
+        interval = 1.0 / args.fps
+        jitter = args.jitter / 1000
+        for k in range(self.index, frame_count(args), procs):
+            due = self.start + k * interval
+            if jitter:
+                due += self.random.uniform(0, jitter)
+            wait = due - time.perf_counter()
+            if wait > 0:
+                self.poll(wait)
+            elif wait < -interval:
+                # 发送端跟不上设定帧率
+                self.stats["late"] += 1
+            self.send_frame((self.first_id + k) & 0xFFFFFFFF)
+        # 留一点时间回应最后几帧的 NACK
+        self.poll(0.2)
+        self.sock.close()
+        return self.stats
+
+
+def sender_main(index, args, port, start, first_id, results):
+    try:
+        stats = SyntheticSender(index, args, port, start, first_id).run()
+    except KeyboardInterrupt:
+        stats = None
+    results.put(stats)
+
+
+class SenderGroup:
+    """--procs 个发送进程，start() 后 join() 返回合计统计"""
+
+    def __init__(self, args, port, delay=0.5):
+        self.args = args
+        self.port = port
+        self.delay = delay
+        self.first_id = (
+            args.first_id if args.first_id is not None else random.randrange(0x80000000)
+        )
+        ctx = multiprocessing.get_context("spawn")
+        self.results = ctx.Queue()
+        self.processes = []
+        self.ctx = ctx
+        self.start_time = None
+
+    def start(self):
+        # perf_counter 在同一台机器的进程间一致 (CLOCK_MONOTONIC)，留出进程启动时间
+        self.start_time = time.perf_counter() + self.delay
+        for i in range(self.args.procs):
+            process = self.ctx.Process(
+                target=sender_main,
+                args=(
+                    i,
+                    self.args,
+                    self.port,
+                    self.start_time,
+                    self.first_id,
+                    self.results,
+                ),
+                name=f"vssp-sender-{i}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+
+    def join(self):
+        total = dict.fromkeys(STAT_KEYS, 0)
+        for _ in self.processes:
+            stats = self.results.get()
+            if stats:
+                for key, value in stats.items():
+                    total[key] += value
+        for process in self.processes:
+            process.join()
+        return total
+
+
+def describe(args):
+    mode = "stereo" if args.mode == "stereo" else "mono"
+    if args.size:
+        shape = f"{args.size} B/frame"
+    else:
+        width, height = args.resolution
+        shape = f"{width}x{height} ({frame_size(args)} B/frame)"
+    return f"{shape} {mode} @ {args.fps:g} fps, {args.procs} sender procs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成 VSSP v1.0 发送端")
+    parser.add_argument("--port", type=int, default=8766, help="中继 VSSP UDP 端口")
+    add_sender_arguments(parser)
+    args = parser.parse_args()
+
+    group = SenderGroup(args, args.port)
+    print(f"Sending {describe(args)} to {args.host}:{args.port} for {args.duration}s")
+    group.start()
+    try:
+        stats = group.join()
+    except KeyboardInterrupt:
+        return
+    elapsed = max(time.perf_counter() - group.start_time, 1e-9)
+    print(
+        f"{stats['frames']} frames {stats['packets']} packets "
+        f"{stats['bytes'] * 8 / elapsed / 1e6:.1f} Mbit/s | lost {stats['lost']} "
+        f"dup {stats['duplicated']} reordered {stats['reordered']} "
+        f"retransmits {stats['retransmits']} clock replies {stats['clock_replies']} "
+        f"late {stats['late']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
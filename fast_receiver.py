@@ -1,50 +1,174 @@
-from flask import Flask, request
+import argparse
+import asyncio
+import websockets
 import socket
 import json
 import sys
 import logging
 import math
+import signal
 import threading
 import time
+from urllib.parse import parse_qs, urlsplit
 
-app = Flask(__name__)
-log = logging.getLogger("werkzeug")
-log.setLevel(logging.ERROR)
+from pose_codec import (
+    POSE_MAGIC,
+    POSE_VERSION,
+    POSE_RECORD,
+    DEVICE_NAMES,
+    DEVICE_IDS,
+    FLAG_UNITY_SPACE,
+    FLAG_PREDICTED,
+    PREDICT_MAGIC,
+    PREDICT_REQUEST,
+    PREDICT_RELATIVE,
+    SESSION_SHIFT,
+    UNITY_HELLO,
+    UNITY_HELLO_MAGIC,
+    BTN_TRIGGER,
+    BTN_GRIP,
+    BTN_THUMBSTICK,
+    BTN_PRIMARY,
+    BTN_SECONDARY,
+    is_pose_records,
+    buttons_to_mask,
+    mask_to_buttons,
+)
+from pose_filter import FILTER_TYPES, ConfigWatcher
+from pose_http import serve_pose_http
+from monitor import get_pico_devices, monitor_devices
+from pose_predict import wrap_ms
+from pose_session import MAX_SESSIONS, SESSION_PORT_BASE, SessionTable, parse_session
+from pose_shm import DEFAULT_PATH as SHM_PATH
+from vssp.capture import (
+    KIND_POSE_HTTP,
+    KIND_POSE_WS,
+    KIND_POSE_WS_TEXT,
+    CaptureWriter,
+)
+from vssp.metrics import CONTENT_TYPE, Registry
 
+# 会话 0 的 Unity 端口；会话 N 发往 SESSION_PORT_BASE + N (见 pose_session.py)
 UNITY_PORT = 9000
+# Unity 请求预测 pose 的 UDP 端口 (PREDICT_REQUEST)，默认关闭 (--predict-port 9001 开启)；
+# 只监听 Unity 所在的本机地址 (sessions.host)
+PREDICT_PORT = 0
+POSE_PORT = 8765
+POSE_WS_PORT = 8786
 unity_sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
+# 发给 Unity 的格式: "binary" (64 字节 pose 记录)、"json" (旧版 Unity 接收端)，
+# 或 "auto": 每个会话先发 JSON，Unity 回发 hello (pose_codec.UNITY_HELLO) 后改发二进制记录
+UNITY_FORMAT = "auto"
+# 是否经 UDP 发送给 Unity (--unity-output shm 时关闭)
+UNITY_UDP = True
+
 # 头盔休眠超过此秒数再唤醒时，自动重置初始原点（避免方向反转）
 SLEEP_RESET_SECS = 3.0
 
-# 存储设备状态
-states = {
-    "head": {
-        "pos": None,
-        "initial_pos": None,
-        "euler": [0, 0, 0],
-        "quat": [0, 0, 0, 1],
-        "last_pkt_time": 0.0,
-    },
-    "left": {
-        "pos": None,
-        "initial_pos": None,
-        "euler": [0, 0, 0],
-        "quat": [0, 0, 0, 1],
-        "btns": {},
-        "axes": [0, 0],
-        "last_pkt_time": 0.0,
-    },
-    "right": {
-        "pos": None,
-        "initial_pos": None,
-        "euler": [0, 0, 0],
-        "quat": [0, 0, 0, 1],
-        "btns": {},
-        "axes": [0, 0],
-        "last_pkt_time": 0.0,
-    },
-}
+# pose 预测: 发给 Unity 的 pose 外推到 now + PREDICT_MS (0 表示不外推)
+PREDICT_MS = 0.0
+# 固定频率输出 (Hz): 由 output_thread 按节拍发送，0 表示每个样本到达即转发
+OUTPUT_RATE = 0.0
+
+# 每台头显一个会话 (pose_session.py): 设备状态 / 运动模型 / 滤波器 / Unity 端口 / 共享内存块
+# pose 平滑滤波 (pose_filter.py)，--filter-config 文件修改后由 filter_config_thread 重新加载到所有会话
+sessions = SessionTable(UNITY_PORT)
+filter_watcher = None
+FILTER_POLL_SECS = 1.0
+UI_PERIOD = 0.04  # 稍微降低 UI 刷新频率以减少 CPU 占用
+
+# --record: 原始 pose 消息抓包 (CaptureWriter)，用 replay.py 回放
+recorder = None
+
+# --adb-input: adb 读到的手柄输入覆盖会话 0 的 WebXR gamepad 值 (Session.adb_inputs)
+adb_devices = None
+
+# 指标 (GET /metrics): 热路径只做 dict / 列表元素 +=
+metrics = Registry()
+pose_errors = {"http": 0, "ws": 0}
+metrics.register(
+    "pose_samples_total",
+    "counter",
+    "Pose samples received, by session and device",
+    lambda: [
+        ({"session": session.id, "device": key}, session.states[key].version)
+        for session in sessions
+        for key in DEVICE_NAMES
+    ],
+)
+metrics.register(
+    "pose_sessions",
+    "gauge",
+    "Headset sessions, including the default session 0",
+    lambda: [(None, len(sessions))],
+)
+metrics.register(
+    "pose_session_drops_total",
+    "counter",
+    "Pose messages dropped because --max-sessions sessions already exist",
+    lambda: [(None, sessions.dropped)],
+)
+metrics.register(
+    "pose_errors_total",
+    "counter",
+    "Pose messages that could not be handled, by transport",
+    lambda: [({"transport": key}, n) for key, n in pose_errors.items()],
+)
+# --output-rate: 被新样本覆盖而未发送的样本数 (Session.stale_samples)
+metrics.register(
+    "unity_stale_samples_total",
+    "counter",
+    "Pose samples superseded before the next output tick, by session and device",
+    lambda: [
+        ({"session": session.id, "device": key}, n)
+        for session in sessions
+        for key, n in session.stale_samples.items()
+    ],
+)
+output_packets = metrics.counter(
+    "unity_output_packets_total",
+    "Combined head+left+right packets sent by the fixed-rate scheduler",
+)
+late_ticks = metrics.counter(
+    "unity_output_late_ticks_total",
+    "Scheduler ticks that started after their deadline",
+)
+metrics.register(
+    "unity_predicted_poses_total",
+    "counter",
+    "Predicted poses sent to Unity by the scheduler or on request, by session and device",
+    lambda: [
+        ({"session": session.id, "device": key}, n)
+        for session in sessions
+        for key, n in session.predicted_sent.items()
+    ],
+)
+input_reports = {key: 0 for key in DEVICE_NAMES[1:]}
+metrics.register(
+    "controller_input_reports_total",
+    "counter",
+    "Controller input reports read over adb (--adb-input), by device",
+    lambda: [({"device": key}, n) for key, n in input_reports.items()],
+)
+filter_reloads = metrics.counter(
+    "pose_filter_reloads_total",
+    "Filter configuration reloads from --filter-config",
+)
+metrics.register(
+    "unity_output_format",
+    "gauge",
+    "Pose format sent to each session's Unity receiver (1 for the current format)",
+    lambda: [
+        ({"session": session.id, "format": session.unity_format}, 1)
+        for session in sessions
+    ],
+)
+unity_send_latency = metrics.histogram(
+    "unity_send_latency_seconds",
+    "Time to process one pose sample and send it to Unity",
+    (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2),
+)
 
 
 def quat_to_euler(q):
@@ -64,155 +188,970 @@ def quat_to_euler(q):
     return [math.degrees(pitch), math.degrees(yaw), math.degrees(roll)]
 
 
-def ui_thread():
-    while True:
-        sys.stdout.write("\033[H\033[J")
-        sys.stdout.write(
-            "============================================================================================================\n"
-        )
-        sys.stdout.write("   Pico 4 Ultra Motion Link (Full 6DOF Sync)\n")
-        sys.stdout.write("   提示: 按下任一摇杆可重置 [全设备] 初始原点\n")
-        sys.stdout.write(
-            "============================================================================================================\n"
-        )
+def render_ui():
+    sys.stdout.write("\033[H\033[J")
+    sys.stdout.write(
+        "============================================================================================================\n"
+    )
+    sys.stdout.write("   Pico 4 Ultra Motion Link (Full 6DOF Sync)\n")
+    sys.stdout.write("   提示: 按下任一摇杆可重置 [全设备] 初始原点\n")
+    sys.stdout.write(
+        "============================================================================================================\n"
+    )
+    for session in sessions:
+        if len(sessions) > 1:
+            host, port = session.unity_addr
+            sys.stdout.write(f"-- 会话 {session.id} -> Unity {host}:{port}\n")
         for key in ["head", "left", "right"]:
-            s = states[key]
-            if s["pos"] and s["initial_pos"] is None:
+            s = session.states[key].snapshot()
+            if s.version and not s.has_origin:
                 sys.stdout.write(f"{key.upper():5} | 初始化中...\n")
-            elif s["pos"] and s["initial_pos"]:
-                dx, dy, dz = (
-                    s["pos"]["x"] - s["initial_pos"]["x"],
-                    s["pos"]["y"] - s["initial_pos"]["y"],
-                    s["pos"]["z"] - s["initial_pos"]["z"],
-                )
+            elif s.version:
+                dx, dy, dz = s.px - s.ox, s.py - s.oy, s.pz - s.oz
 
-                # 格式化四元数显示
-                q = s["quat"]
+                # 格式化四元数显示 (欧拉角只在 UI 线程计算，不占用接收热路径)
+                q = (s.qx, s.qy, s.qz, s.qw)
+                e = quat_to_euler(q)
                 quat_str = f"Q:({q[0]:>5.2f},{q[1]:>5.2f},{q[2]:>5.2f},{q[3]:>5.2f})"
-                ang_str = f"A:({s['euler'][0]:>4.0f},{s['euler'][1]:>4.0f},{s['euler'][2]:>4.0f})"
+                ang_str = f"A:({e[0]:>4.0f},{e[1]:>4.0f},{e[2]:>4.0f})"
 
                 if key == "head":
                     line = f"{key.upper():5} | Pos: {dx:>6.2f}, {dy:>6.2f}, {dz:>6.2f} | {ang_str} | {quat_str} | [HMD]"
                 else:
-                    btns = s["btns"]
-                    t, g = ("T" if btns.get(0) else "_"), ("G" if btns.get(1) else "_")
-                    b1 = ("X" if key == "left" else "A") if btns.get(4) else "_"
-                    b2 = ("Y" if key == "left" else "B") if btns.get(5) else "_"
-                    line = f"{key.upper():5} | Pos: {dx:>6.2f}, {dy:>6.2f}, {dz:>6.2f} | {ang_str} | {quat_str} | JS:({s['axes'][0]:>5.2f}, {s['axes'][1]:>5.2f})"
+                    btns = int(s.btns)
+                    t = "T" if btns >> BTN_TRIGGER & 1 else "_"
+                    g = "G" if btns >> BTN_GRIP & 1 else "_"
+                    b1 = (
+                        ("X" if key == "left" else "A")
+                        if btns >> BTN_PRIMARY & 1
+                        else "_"
+                    )
+                    b2 = (
+                        ("Y" if key == "left" else "B")
+                        if btns >> BTN_SECONDARY & 1
+                        else "_"
+                    )
+                    line = f"{key.upper():5} | Pos: {dx:>6.2f}, {dy:>6.2f}, {dz:>6.2f} | {ang_str} | {quat_str} | JS:({s.ax:>5.2f}, {s.ay:>5.2f})"
                 sys.stdout.write(line + "\n")
-            elif not s["pos"]:
+            else:
                 sys.stdout.write(f"{key.upper():5} | 等待数据中...\n")
-        sys.stdout.write(
-            "============================================================================================================\n"
+    sys.stdout.write(
+        "============================================================================================================\n"
+    )
+    sys.stdout.flush()
+
+
+def ui_thread():
+    while True:
+        render_ui()
+        time.sleep(UI_PERIOD)
+
+
+def process_pose(
+    session,
+    key,
+    px,
+    py,
+    pz,
+    qx,
+    qy,
+    qz,
+    qw,
+    btn_mask=0,
+    trigger=0.0,
+    grip=0.0,
+    ax=0.0,
+    ay=0.0,
+    seq=None,
+    ts_ms=None,
+    buttons=None,
+):
+    """更新会话中的设备状态并转发给该会话的 Unity，坐标已是 Unity 左手系 (热路径: 不分配 dict)"""
+    t0 = time.perf_counter()
+    states = session.states
+    s = states[key]
+    inputs = session.adb_inputs.get(key)
+    if inputs is not None:
+        btn_mask, trigger, grip, ax, ay = inputs
+        buttons = None
+
+    # 1. 更新服务器内部状态 (UI / 定频输出读取快照)
+    now = time.time()
+
+    if seq is None:
+        seq = (s.seq + 1) & 0xFFFFFFFF
+    # 运动模型的采样时间: 有发送端时间戳时去掉到达抖动，否则用到达时间
+    if ts_ms is None:
+        ts_ms = int(now * 1000) & 0xFFFFFFFF
+        sample_time = now
+    else:
+        sample_time = session.sample_clock.local_time(ts_ms, now)
+    # 平滑滤波: 之后的状态 / 原点 / 预测 / 输出都使用滤波后的 pose
+    px, py, pz, qx, qy, qz, qw = session.filters.filters[key].filter(
+        sample_time, px, py, pz, qx, qy, qz, qw
+    )
+    session.motion[key].add(sample_time, px, py, pz, qx, qy, qz, qw)
+
+    # 第一次收到数据时捕获初始原点（与 d61fd5f6 行为相同）
+    # 头盔休眠检测：超过 SLEEP_RESET_SECS 没收到包再恢复，自动重置初始原点
+    # 这样唤醒后 WebXR tracking origin 变化也能正确处理，不需要手动重启服务
+    # 相对位移按重置前的原点计算 (按下摇杆的这一帧仍相对旧原点)
+    ipos = s.update(
+        now,
+        SLEEP_RESET_SECS,
+        px,
+        py,
+        pz,
+        qx,
+        qy,
+        qz,
+        qw,
+        btn_mask,
+        trigger,
+        grip,
+        ax,
+        ay,
+        seq,
+        ts_ms,
+    )
+
+    # 按下摇杆 -> 重置本会话 [全设备] 初始原点
+    if key != "head" and btn_mask >> BTN_THUMBSTICK & 1:
+        states.recenter()
+
+    if OUTPUT_RATE:
+        # 由 output_thread 按固定频率发送最新状态
+        return
+
+    # 2. 发送给 Unity (可选: 外推 PREDICT_MS 毫秒)
+    flags = FLAG_UNITY_SPACE
+    if PREDICT_MS:
+        target = now + PREDICT_MS / 1000
+        predicted = session.motion[key].predict(target)
+        if predicted is not None:
+            px, py, pz, qx, qy, qz, qw = predicted
+            ts_ms = int(target * 1000) & 0xFFFFFFFF
+            flags |= FLAG_PREDICTED
+    if session.pose_block is not None:
+        session.pose_block.write(
+            DEVICE_IDS[key],
+            unity_record(
+                key,
+                ipos,
+                px,
+                py,
+                pz,
+                qx,
+                qy,
+                qz,
+                qw,
+                btn_mask,
+                trigger,
+                grip,
+                ax,
+                ay,
+                seq,
+                ts_ms,
+                flags,
+            ),
+        )
+    if UNITY_UDP:
+        message = unity_message(
+            key,
+            ipos,
+            px,
+            py,
+            pz,
+            qx,
+            qy,
+            qz,
+            qw,
+            btn_mask,
+            trigger,
+            grip,
+            ax,
+            ay,
+            seq,
+            ts_ms,
+            buttons,
+            flags,
+            fmt=session.unity_format,
         )
-        sys.stdout.flush()
-        time.sleep(0.04)  # 稍微降低 UI 刷新频率以减少 CPU 占用
+        unity_sender.sendto(message, session.unity_addr)
+    unity_send_latency.observe(time.perf_counter() - t0)
+
+
+def unity_message(
+    key,
+    ipos,
+    px,
+    py,
+    pz,
+    qx,
+    qy,
+    qz,
+    qw,
+    btn_mask=0,
+    trigger=0.0,
+    grip=0.0,
+    ax=0.0,
+    ay=0.0,
+    seq=0,
+    ts_ms=0,
+    buttons=None,
+    flags=FLAG_UNITY_SPACE,
+    encode=True,
+    fmt="binary",
+):
+    """发给 Unity 的一条 pose: 位置为相对 ipos 的位移，fmt 为 "binary" / "json" (会话的 unity_format)
+
+    encode=False 时 JSON 模式返回 dict (由调用方合并成数组)。
+    """
+    if fmt == "json":
+        rx, ry, rz = px - ipos[0], py - ipos[1], pz - ipos[2]
+        clean_data = {
+            "type": "head" if key == "head" else "controller",
+            "handedness": "" if key == "head" else key,
+            "position": {"x": rx, "y": ry, "z": rz},  # 发送相对坐标给 Unity，方便重置
+            "absolutePosition": {"x": px, "y": py, "z": pz},  # 保留绝对位置备用
+            "orientation": {"x": qx, "y": qy, "z": qz, "w": qw},
+        }
+        if flags & FLAG_PREDICTED:
+            clean_data["predictedTime"] = ts_ms
+        if key != "head":
+            if buttons is None:
+                buttons = mask_to_buttons(btn_mask, trigger, grip)
+            clean_data["buttons"] = buttons
+            clean_data["axes"] = [ax, ay]
+        return json.dumps(clean_data).encode() if encode else clean_data
+    return unity_record(
+        key,
+        ipos,
+        px,
+        py,
+        pz,
+        qx,
+        qy,
+        qz,
+        qw,
+        btn_mask,
+        trigger,
+        grip,
+        ax,
+        ay,
+        seq,
+        ts_ms,
+        flags,
+    )
+
+
+def unity_record(
+    key,
+    ipos,
+    px,
+    py,
+    pz,
+    qx,
+    qy,
+    qz,
+    qw,
+    btn_mask,
+    trigger,
+    grip,
+    ax,
+    ay,
+    seq,
+    ts_ms,
+    flags,
+):
+    """64 字节二进制 pose 记录 (共享内存输出总是使用该格式，与 --unity-format 无关)"""
+    return POSE_RECORD.pack(
+        POSE_MAGIC,
+        POSE_VERSION,
+        DEVICE_IDS[key],
+        flags,
+        seq,
+        ts_ms,
+        px - ipos[0],
+        py - ipos[1],
+        pz - ipos[2],
+        qx,
+        qy,
+        qz,
+        qw,
+        btn_mask,
+        trigger,
+        grip,
+        ax,
+        ay,
+    )
+
+
+def scheduled_fields(session, key, target):
+    """output_thread / 预测请求用的会话中单个设备的 pose: unity_record 的参数元组
+
+    target 为 None 时取最新状态；否则外推到 target (本机时间 s)，ts_ms 为 target 的 epoch ms 低 32 位。
+    设备尚无数据或超过 SLEEP_RESET_SECS 未更新时返回 None。
+    """
+    s = session.states[key].snapshot()
+    if not s.has_origin or time.time() - s.last_pkt_time > SLEEP_RESET_SECS:
+        return None
+    if target is None:
+        pose = (s.px, s.py, s.pz, s.qx, s.qy, s.qz, s.qw)
+        ts_ms = int(s.ts_ms)
+        flags = FLAG_UNITY_SPACE
+    else:
+        pose = session.motion[key].predict(target)
+        if pose is None:
+            return None
+        ts_ms = int(target * 1000) & 0xFFFFFFFF
+        flags = FLAG_UNITY_SPACE | FLAG_PREDICTED
+    return (
+        key,
+        (s.ox, s.oy, s.oz),
+        *pose,
+        int(s.btns),
+        s.trigger,
+        s.grip,
+        s.ax,
+        s.ay,
+        int(s.seq),
+        ts_ms,
+        flags,
+    )
+
+
+def scheduled_poses(session, target):
+    """会话中各设备的 scheduled_fields，跳过没有可发送 pose 的设备"""
+    poses = []
+    for key in DEVICE_NAMES:
+        fields = scheduled_fields(session, key, target)
+        if fields is not None:
+            poses.append(fields)
+            if target is not None:
+                session.predicted_sent[key] += 1
+    return poses
+
+
+def scheduled_message(poses, fmt="binary"):
+    """head + left + right 合成一个数据报: 二进制为连续的 pose 记录，JSON 为数组
+
+    没有可发送的设备时返回 None。
+    """
+    if not poses:
+        return None
+    if fmt == "json":
+        return json.dumps(
+            [unity_message(*f[:-1], None, f[-1], encode=False, fmt=fmt) for f in poses]
+        ).encode()
+    return b"".join(unity_record(*f) for f in poses)
+
+
+def output_tick():
+    """一个输出节拍: 每个会话统计上个节拍以来被覆盖的样本，把各设备最新 (预测) pose 合成一个数据报
+    发给该会话的 Unity"""
+    target = time.time() + PREDICT_MS / 1000 if PREDICT_MS else None
+    for session in sessions:
+        versions = session.versions
+        for key in DEVICE_NAMES:
+            version = session.states[key].version
+            if version > versions[key] + 1:
+                session.stale_samples[key] += version - versions[key] - 1
+            versions[key] = version
+        poses = scheduled_poses(session, target)
+        if session.pose_block is not None:
+            for fields in poses:
+                session.pose_block.write(DEVICE_IDS[fields[0]], unity_record(*fields))
+        if UNITY_UDP and poses:
+            unity_sender.sendto(
+                scheduled_message(poses, session.unity_format), session.unity_addr
+            )
+            output_packets.value += 1
+
+
+def output_thread():
+    """固定频率 (OUTPUT_RATE) 输出，与样本到达时间无关
+
+    每个节拍把每个会话各设备的最新状态 (--predict-ms 时外推到 now + PREDICT_MS) 合成一个数据报发给 Unity，
+    两个节拍之间被新样本覆盖的旧样本不再发送，计入 unity_stale_samples_total。
+    """
+    period = 1.0 / OUTPUT_RATE
+    next_tick = time.perf_counter()
+    while True:
+        next_tick += period
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # 落后超过一个周期: 不补发，从当前时间重新计时
+            late_ticks.value += 1
+            next_tick = time.perf_counter()
+        output_tick()
+
+
+def filter_config_thread():
+    """--filter-config 文件修改后重新加载滤波参数 (类型不变时保留滤波状态)"""
+    while True:
+        time.sleep(FILTER_POLL_SECS)
+        if filter_watcher.poll():
+            filter_reloads.value += 1
+
+
+def predict_reply(data):
+    """Unity 主动请求指定时刻的预测 pose (PREDICT_REQUEST，见 pose_codec.py)，返回合成数据报或 None"""
+    if len(data) != PREDICT_REQUEST.size:
+        return None
+    magic, flags, session_id, value = PREDICT_REQUEST.unpack(data)
+    session = sessions.find(session_id)
+    if magic != PREDICT_MAGIC or session is None:
+        return None
+    now = time.time()
+    if flags & PREDICT_RELATIVE:
+        target = now + value / 1000
+    else:
+        target = now + wrap_ms(value - (int(now * 1000) & 0xFFFFFFFF)) / 1000
+    return scheduled_message(scheduled_poses(session, target), session.unity_format)
+
+
+def predict_request_thread():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((sessions.host, PREDICT_PORT))
+    while True:
+        data, addr = sock.recvfrom(64)
+        message = predict_reply(data)
+        if message is not None:
+            sock.sendto(message, addr)
+
+
+def handle_unity_hello(data, addr):
+    """--unity-format auto: Unity 从其接收端口回发 UNITY_HELLO (pose_codec.py) 后，该会话改发二进制记录
+
+    hello 的来源地址即会话的 Unity 地址；版本为 0 时改回 JSON。返回是否为有效的 hello。
+    """
+    if len(data) != UNITY_HELLO.size:
+        return False
+    magic, version = UNITY_HELLO.unpack(data)
+    if magic != UNITY_HELLO_MAGIC:
+        return False
+    for session in sessions:
+        if session.unity_addr == addr:
+            session.unity_format = "binary" if version >= POSE_VERSION else "json"
+            return True
+    return False
+
+
+def unity_hello_thread():
+    while True:
+        try:
+            data, addr = unity_sender.recvfrom(64)
+        except OSError:
+            # Windows: Unity 端口未监听时 ICMP 不可达表现为 recvfrom 出错，忽略
+            continue
+        handle_unity_hello(data, addr)
+
 
+def handle_input_report(key, report):
+    """adb 手柄输入 (monitor.py): 覆盖会话 0 之后样本的按键 / 扳机 / 摇杆，并立即以最新 pose 发给 Unity
 
-@app.route("/", methods=["POST"])
-def receive():
+    adb 连接的是本机 USB 上的那台头显，即会话 0。
+    按键变化不必等下一个 WebXR 帧；--output-rate 时由下一个节拍发送。
+    """
+    session = sessions.find(0)
+    values = (report.btns, report.trigger, report.grip, report.ax, report.ay)
+    session.adb_inputs[key] = values
+    session.states[key].set_inputs(*values)
+    input_reports[key] += 1
+    if report.btns >> BTN_THUMBSTICK & 1:
+        session.states.recenter()
+    if OUTPUT_RATE:
+        return
+    fields = scheduled_fields(
+        session, key, time.time() + PREDICT_MS / 1000 if PREDICT_MS else None
+    )
+    if fields is None:
+        return
+    if session.pose_block is not None:
+        session.pose_block.write(DEVICE_IDS[key], unity_record(*fields))
+    if UNITY_UDP:
+        unity_sender.sendto(
+            unity_message(*fields[:-1], None, fields[-1], fmt=session.unity_format),
+            session.unity_addr,
+        )
+
+
+def input_thread():
+    asyncio.run(monitor_devices(adb_devices, handle_input_report))
+
+
+def handle_pose(data, session_id=0):
+    """处理一条 JSON pose 样本（dict，兼容模式）
+
+    会话取 "session" 字段，没有时为 session_id (连接的 ?session=N)；字段不合法时抛出 ValueError。
+    """
+    dtype = data.get("type")
+    key = "head" if dtype == "head" else data.get("handedness")
+
+    if key not in DEVICE_IDS:
+        return
+    if "session" in data:
+        session_id = parse_session(data["session"])
+        if session_id is None:
+            raise ValueError(f"invalid session {data['session']!r}")
+    session = sessions.get(session_id)
+    if session is None:
+        return
+
+    # 提取并转换坐标系 (WebXR RH -> Unity LH)
+    # WebXR: X+, Y+, Z- (forward is Z-)
+    # Unity: X+, Y+, Z+ (forward is Z+)
+    pos = data.get("position", {"x": 0, "y": 0, "z": 0})
+    ori = data.get("orientation", {"x": 0, "y": 0, "z": 0, "w": 1})
+
+    # 位置转换: Z 轴取反
+    # 四元数转换: Mirror across XY plane (Z inversion)
+    # WebXR Quaternion (x,y,z,w) -> Unity (-x,-y,z,w)
+    px, py, pz = float(pos.get("x", 0)), float(pos.get("y", 0)), -float(pos.get("z", 0))
+    qx, qy = -float(ori.get("x", 0)), -float(ori.get("y", 0))
+    qz, qw = float(ori.get("z", 0)), float(ori.get("w", 1))
+
+    if dtype != "controller":
+        process_pose(session, key, px, py, pz, qx, qy, qz, qw)
+        return
+
+    buttons = data.get("buttons", [])
+    axes = data.get("axes", [0, 0])
+    trigger = (
+        float(buttons[BTN_TRIGGER].get("value", 0))
+        if len(buttons) > BTN_TRIGGER
+        else 0.0
+    )
+    grip = float(buttons[BTN_GRIP].get("value", 0)) if len(buttons) > BTN_GRIP else 0.0
+    ax, ay = (
+        (float(axes[0] or 0), float(axes[1] or 0)) if len(axes) >= 2 else (0.0, 0.0)
+    )
+    process_pose(
+        session,
+        key,
+        px,
+        py,
+        pz,
+        qx,
+        qy,
+        qz,
+        qw,
+        buttons_to_mask(buttons),
+        trigger,
+        grip,
+        ax,
+        ay,
+        buttons=buttons,
+    )
+
+
+def handle_pose_records(buf, session_id=0):
+    """处理一条或多条 64 字节二进制 pose 记录 (见 pose_codec.py)
+
+    会话取 flags 的高 8 位，为 0 时取 session_id (连接的 ?session=N)。
+    """
+    session = None
+    for (
+        magic,
+        version,
+        device,
+        flags,
+        seq,
+        ts_ms,
+        px,
+        py,
+        pz,
+        qx,
+        qy,
+        qz,
+        qw,
+        btn_mask,
+        trigger,
+        grip,
+        ax,
+        ay,
+    ) in POSE_RECORD.iter_unpack(buf):
+        if (
+            magic != POSE_MAGIC
+            or version != POSE_VERSION
+            or device >= len(DEVICE_NAMES)
+        ):
+            continue
+        record_session = flags >> SESSION_SHIFT or session_id
+        if session is None or session.id != record_session:
+            session = sessions.get(record_session)
+            if session is None:
+                continue
+        if not flags & FLAG_UNITY_SPACE:
+            # WebXR RH -> Unity LH (与 handle_pose 相同)
+            pz, qx, qy = -pz, -qx, -qy
+        process_pose(
+            session,
+            DEVICE_NAMES[device],
+            px,
+            py,
+            pz,
+            qx,
+            qy,
+            qz,
+            qw,
+            btn_mask,
+            trigger,
+            grip,
+            ax,
+            ay,
+            seq,
+            ts_ms,
+        )
+
+
+def handle_http_pose(raw_data, query=None):
+    """HTTP 单样本入口 (Flask 与 asyncio 模式共用)，返回状态码
+
+    query 为 URL 查询参数 (dict 风格)，?session=N 指定默认会话。
+    """
     try:
         # 1. 解析原始数据
-        raw_data = request.get_data()
+        session_id = parse_session(query.get("session", 0)) if query else 0
+        if session_id is None:
+            raise ValueError("invalid session")
+        if recorder is not None:
+            recorder.write(KIND_POSE_HTTP, raw_data, POSE_PORT, session_id)
         if not raw_data:
-            return "", 240
-
-        data = json.loads(raw_data.decode())
-        dtype = data.get("type")
-        key = "head" if dtype == "head" else data.get("handedness")
-
-        if key not in states:
-            return "", 204
-
-        # 2. 提取并转换坐标系 (WebXR RH -> Unity LH)
-        # WebXR: X+, Y+, Z- (forward is Z-)
-        # Unity: X+, Y+, Z+ (forward is Z+)
-        pos = data.get("position", {"x": 0, "y": 0, "z": 0})
-        ori = data.get("orientation", {"x": 0, "y": 0, "z": 0, "w": 1})
-
-        # 位置转换: Z 轴取反
-        unity_pos = {
-            "x": float(pos.get("x", 0)),
-            "y": float(pos.get("y", 0)),
-            "z": -float(pos.get("z", 0)),
-        }
+            return 240
 
-        # 四元数转换: Mirror across XY plane (Z inversion)
-        # WebXR Quaternion (x,y,z,w) -> Unity (-x,-y,z,w)
-        unity_ori = {
-            "x": -float(ori.get("x", 0)),
-            "y": -float(ori.get("y", 0)),
-            "z": float(ori.get("z", 0)),
-            "w": float(ori.get("w", 1)),
-        }
+        if is_pose_records(raw_data):
+            handle_pose_records(raw_data, session_id)
+        else:
+            handle_pose(json.loads(raw_data.decode()), session_id)
+    except Exception:
+        # 解析错误不影响后续样本，只计数
+        pose_errors["http"] += 1
+    return 204
 
-        # 3. 更新服务器内部状态 (用于 console 显示)
-        now = time.time()
-
-        # 头盔休眠检测：超过 SLEEP_RESET_SECS 没收到包再恢复，自动重置初始原点
-        # 这样唤醒后 WebXR tracking origin 变化也能正确处理，不需要手动重启服务
-        if states[key]["initial_pos"] is not None and states[key]["last_pkt_time"] > 0:
-            gap = now - states[key]["last_pkt_time"]
-            if gap > SLEEP_RESET_SECS:
-                states[key]["initial_pos"] = None
-
-        states[key]["last_pkt_time"] = now
-        states[key]["pos"] = unity_pos
-        states[key]["quat"] = [
-            unity_ori["x"],
-            unity_ori["y"],
-            unity_ori["z"],
-            unity_ori["w"],
-        ]
-        states[key]["euler"] = quat_to_euler(unity_ori)
-
-        # 第一次收到数据时捕获初始原点（与 d61fd5f6 行为相同）
-        if states[key]["initial_pos"] is None:
-            states[key]["initial_pos"] = unity_pos
-
-        # 计算相对位移
-        ipos = states[key]["initial_pos"]
-        rel_pos = {
-            "x": unity_pos["x"] - ipos["x"],
-            "y": unity_pos["y"] - ipos["y"],
-            "z": unity_pos["z"] - ipos["z"],
-        }
 
-        # 4. 构造发送给 Unity 的最终数据包
-        clean_data = {
-            "type": dtype,
-            "handedness": data.get("handedness", ""),
-            "position": rel_pos,  # 发送相对坐标给 Unity，方便重置
-            "absolutePosition": unity_pos,  # 保留绝对位置备用
-            "orientation": unity_ori,
-        }
+def flask_app():
+    """--server flask 的 WSGI 应用 (Flask 只在此时导入，asyncio 模式与 launcher.py 不加载)"""
+    from flask import Flask, request
 
-        if dtype == "controller":
-            clean_data["buttons"] = data.get("buttons", [])
-            clean_data["axes"] = data.get("axes", [0, 0])
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app = Flask(__name__)
 
-            # 更新 CLI 需要显示的状态
-            for i, b in enumerate(clean_data["buttons"]):
-                states[key]["btns"][i] = b["pressed"]
-            states[key]["axes"] = clean_data["axes"]
+    @app.route("/", methods=["POST"])
+    def receive():
+        # HTTP 单样本入口：保留作为 WebSocket 不可用时的回退
+        return "", handle_http_pose(request.get_data(), request.args)
 
-            if any(
-                b.get("pressed") for i, b in enumerate(clean_data["buttons"]) if i == 3
-            ):
-                for k in states:
-                    if states[k]["pos"]:
-                        states[k]["initial_pos"] = states[k]["pos"]
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        return metrics.render(), 200, {"Content-Type": CONTENT_TYPE}
 
-        # 5. 发送处理后的 JSON 给 Unity
-        message = json.dumps(clean_data).encode()
-        unity_sender.sendto(message, ("127.0.0.1", UNITY_PORT))
+    return app
+
+
+async def pose_ws_handler(websocket, path=None):
+    # 长连接入口：每个 XR 帧一条消息，内容为 [head, left, right]
+    # 二进制消息为连续的 64 字节 pose 记录，文本消息为 JSON pose 数组 (兼容模式)
+    # 同一连接内按发送顺序处理，保证 pose 时序
+    # ws://host:8786/?session=N: 该连接上未指定会话的 pose 属于会话 N
+    if path is None:
+        request = getattr(websocket, "request", None)
+        path = request.path if request is not None else ""
+    session_id = parse_session(parse_qs(urlsplit(path).query).get("session", [0])[0])
+    if session_id is None:
+        pose_errors["ws"] += 1
+        await websocket.close(1008, "invalid session")
+        return
+    async for message in websocket:
+        if recorder is not None:
+            if isinstance(message, bytes):
+                recorder.write(KIND_POSE_WS, message, POSE_WS_PORT, session_id)
+            else:
+                recorder.write(
+                    KIND_POSE_WS_TEXT, message.encode(), POSE_WS_PORT, session_id
+                )
+        if isinstance(message, bytes):
+            if is_pose_records(message):
+                try:
+                    handle_pose_records(message, session_id)
+                except Exception:
+                    pose_errors["ws"] += 1
+            else:
+                pose_errors["ws"] += 1
+            continue
+        try:
+            batch = json.loads(message)
+        except ValueError:
+            pose_errors["ws"] += 1
+            continue
+        if isinstance(batch, dict):
+            batch = [batch]
+        for data in batch:
+            try:
+                handle_pose(data, session_id)
+            except Exception:
+                pose_errors["ws"] += 1
+
+
+def ws_thread():
+    async def serve():
+        async with websockets.serve(pose_ws_handler, "0.0.0.0", POSE_WS_PORT):
+            await asyncio.Future()
+
+    asyncio.run(serve())
 
-    except Exception:
-        # 忽略解析错误
-        pass
-    return "", 204
+
+class PredictProtocol(asyncio.DatagramProtocol):
+    """--server asyncio 时的预测请求端口"""
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        message = predict_reply(data)
+        if message is not None:
+            self.transport.sendto(message, addr)
+
+
+class UnityHelloProtocol(asyncio.DatagramProtocol):
+    """--server asyncio 时在 Unity 输出 socket 上接收 hello (unity_hello_thread 的事件循环版本)"""
+
+    def datagram_received(self, data, addr):
+        handle_unity_hello(data, addr)
+
+    def error_received(self, exc):
+        pass  # Unity 端口未监听时的 ICMP 不可达
+
+
+async def output_loop():
+    """output_thread 的事件循环版本"""
+    period = 1.0 / OUTPUT_RATE
+    next_tick = time.perf_counter()
+    while True:
+        next_tick += period
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            late_ticks.value += 1
+            next_tick = time.perf_counter()
+        output_tick()
+
+
+async def filter_config_loop():
+    while True:
+        await asyncio.sleep(FILTER_POLL_SECS)
+        if filter_watcher.poll():
+            filter_reloads.value += 1
+
+
+async def ui_loop():
+    while True:
+        render_ui()
+        await asyncio.sleep(UI_PERIOD)
+
+
+async def serve_async(ui=True):
+    """--server asyncio: HTTP / WebSocket 入口、固定频率输出、预测请求与 UI 共用一个事件循环
+
+    launcher.py 把它作为一个组件与 VSSP 中继放在同一个事件循环中运行；任务被取消时关闭各端口。
+    """
+    loop = asyncio.get_running_loop()
+    http_server = await serve_pose_http(handle_http_pose, metrics.render, POSE_PORT)
+    ws_server = await websockets.serve(pose_ws_handler, "0.0.0.0", POSE_WS_PORT)
+    predict = None
+    if PREDICT_PORT:
+        predict, _ = await loop.create_datagram_endpoint(
+            PredictProtocol, local_addr=(sessions.host, PREDICT_PORT)
+        )
+    hello = None
+    if UNITY_FORMAT == "auto" and UNITY_UDP:
+        # 事件循环接管 unity_sender 的接收 (socket 变为非阻塞)，输出仍直接 sendto；退出时随 transport 关闭
+        hello, _ = await loop.create_datagram_endpoint(
+            UnityHelloProtocol, sock=unity_sender
+        )
+    tasks = [ui_loop()] if ui else []
+    if adb_devices:
+        tasks.append(monitor_devices(adb_devices, handle_input_report))
+    if OUTPUT_RATE:
+        tasks.append(output_loop())
+    if filter_watcher is not None:
+        tasks.append(filter_config_loop())
+    try:
+        await asyncio.gather(*tasks, loop.create_future())
+    finally:
+        http_server.close()
+        ws_server.close()
+        if predict is not None:
+            predict.close()
+        if hello is not None:
+            hello.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="VSSP pose receiver")
+    parser.add_argument(
+        "--unity-format",
+        choices=["auto", "binary", "json"],
+        default=UNITY_FORMAT,
+        help="发给 Unity 的 pose 格式: auto (默认，先发 JSON，Unity 回发 VHEL hello 后改发二进制)、"
+        "binary 或 json (旧版 Unity 接收端)",
+    )
+    parser.add_argument(
+        "--unity-output",
+        choices=["udp", "shm", "both"],
+        default="udp",
+        help="Unity 输出方式: UDP (127.0.0.1:9000) 和/或同机共享内存 pose 块 (见 pose_shm.py)",
+    )
+    parser.add_argument(
+        "--shm-path",
+        default=SHM_PATH,
+        help="共享内存 pose 块的文件路径 (会话 N 为 <path>.N)",
+    )
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=MAX_SESSIONS,
+        help="同时服务的头显会话数上限 (见 pose_session.py)",
+    )
+    parser.add_argument(
+        "--session-port-base",
+        type=int,
+        default=SESSION_PORT_BASE,
+        help="会话 N (N >= 1) 的 Unity UDP 端口为 base + N (会话 0 仍为 9000)",
+    )
+    parser.add_argument(
+        "--filter",
+        choices=FILTER_TYPES,
+        default="none",
+        help="pose 平滑滤波 (默认参数，详见 pose_filter.py)",
+    )
+    parser.add_argument(
+        "--filter-config",
+        metavar="FILE",
+        help="JSON 滤波配置 (类型、参数、按设备覆盖)，文件修改后自动重新加载，覆盖 --filter",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="FILE",
+        help="把收到的原始 pose 消息 (HTTP / WebSocket) 追加写入抓包文件 (用 replay.py 回放)",
+    )
+    parser.add_argument(
+        "--predict-ms",
+        type=float,
+        default=PREDICT_MS,
+        help="把发给 Unity 的 pose 外推到 N 毫秒之后 (补偿渲染延迟，0 表示不外推)",
+    )
+    parser.add_argument(
+        "--output-rate",
+        type=float,
+        default=OUTPUT_RATE,
+        help="以固定频率 (Hz，如 90 / 120) 向 Unity 发送预测 pose，0 表示样本到达即转发",
+    )
+    parser.add_argument(
+        "--predict-port",
+        type=int,
+        default=PREDICT_PORT,
+        help="Unity 请求预测 pose 的 UDP 端口 (VPRQ，见 pose_codec.py，如 9001)，"
+        "只监听 127.0.0.1；默认 0 表示关闭",
+    )
+    parser.add_argument(
+        "--server",
+        choices=["flask", "asyncio"],
+        default="flask",
+        help="HTTP 入口: Flask 开发服务器 (每连接一线程) 或 asyncio (与 WebSocket / 输出 / UI 共用一个事件循环)",
+    )
+    parser.add_argument(
+        "--uvloop",
+        action="store_true",
+        help="--server asyncio 时使用 uvloop 事件循环 (需 pip install uvloop)",
+    )
+    parser.add_argument(
+        "--adb-input",
+        action="store_true",
+        help="通过 adb 直接读取手柄 input_event (按键 / 扳机 / 摇杆，见 monitor.py)，覆盖 WebXR gamepad 的值",
+    )
+    return parser
+
+
+def configure(args):
+    """按命令行参数 (或 launcher.py 配置文件的 pose 段) 设置输出格式、会话表、滤波与 adb 输入"""
+    global UNITY_FORMAT, PREDICT_MS, OUTPUT_RATE, PREDICT_PORT, UNITY_UDP
+    global sessions, filter_watcher, adb_devices, recorder
+    UNITY_FORMAT = args.unity_format
+    PREDICT_MS = args.predict_ms
+    OUTPUT_RATE = args.output_rate
+    PREDICT_PORT = args.predict_port
+    UNITY_UDP = args.unity_output != "shm"
+    sessions = SessionTable(
+        UNITY_PORT,
+        args.session_port_base,
+        args.max_sessions,
+        args.shm_path if args.unity_output != "udp" else None,
+        unity_format="json" if UNITY_FORMAT == "auto" else UNITY_FORMAT,
+    )
+    if UNITY_FORMAT == "auto" and UNITY_UDP and not unity_sender.getsockname()[1]:
+        # Unity 向 pose 数据报的来源地址回发 hello: 固定来源端口，只在本机接收 (Unity 在本机)
+        unity_sender.bind((sessions.host, 0))
+    sessions.configure({"type": args.filter})
+    if args.filter_config:
+        filter_watcher = ConfigWatcher(args.filter_config, sessions)
+        if not filter_watcher.poll():
+            sys.exit(f"Cannot load filter config {args.filter_config}")
+    if args.adb_input:
+        adb_devices = get_pico_devices()
+        if not adb_devices:
+            print("--adb-input: 未发现 Pico 手柄，只使用 WebXR gamepad 数据")
+    if args.record:
+        recorder = CaptureWriter(args.record)
+
+
+def shutdown():
+    """抓包缓冲落盘、关闭共享内存 pose 块"""
+    if recorder is not None:
+        recorder.close()
+    sessions.close()
 
 
 if __name__ == "__main__":
-    threading.Thread(target=ui_thread, daemon=True).start()
-    app.run(host="0.0.0.0", port=8765, threaded=True)
+    parser = build_parser()
+    args = parser.parse_args()
+    run = asyncio.run
+    if args.uvloop:
+        if args.server != "asyncio":
+            parser.error("--uvloop needs --server asyncio")
+        try:
+            import uvloop
+        except ImportError:
+            sys.exit("--uvloop needs the uvloop package (pip install uvloop)")
+        run = uvloop.run
+    configure(args)
+    if args.record:
+        # kill (start.sh 的停止方式) 按 Ctrl+C 处理，保证抓包缓冲落盘
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    try:
+        if args.server == "asyncio":
+            try:
+                run(serve_async())
+            except KeyboardInterrupt:
+                pass
+        else:
+            threading.Thread(target=ui_thread, daemon=True).start()
+            threading.Thread(target=ws_thread, daemon=True).start()
+            if OUTPUT_RATE:
+                threading.Thread(target=output_thread, daemon=True).start()
+            if PREDICT_PORT:
+                threading.Thread(target=predict_request_thread, daemon=True).start()
+            if UNITY_FORMAT == "auto" and UNITY_UDP:
+                threading.Thread(target=unity_hello_thread, daemon=True).start()
+            if filter_watcher is not None:
+                threading.Thread(target=filter_config_thread, daemon=True).start()
+            if adb_devices:
+                threading.Thread(target=input_thread, daemon=True).start()
+            flask_app().run(host="0.0.0.0", port=POSE_PORT, threaded=True)
+    finally:
+        shutdown()
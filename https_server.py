@@ -1,20 +1,56 @@
-import http.server
-import ssl
+"""独立的网页服务 (不启动中继时使用)，默认 HTTPS
+
+    python3 https_server.py                          # https://<ip>:8000，证书 ./cert.pem ./key.pem
+    python3 https_server.py --no-tls --port 8000     # 纯 HTTP (经 adb reverse 访问 127.0.0.1 时足够)
+
+与 video_streamer.py --static-port 相同的 vssp.static 服务: 资源缓存在内存中，预压缩 (gzip / brotli)，
+带 ETag 与 Cache-Control，keep-alive，单个事件循环处理所有连接。
+"""
+
+import argparse
+import asyncio
+import os
 import socket
 
+from vssp.static import AssetCache, make_ssl_context, serve_static
+
+PORT = 8000
+
+
 def get_real_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.connect(('8.8.8.8', 80))
-    ip = s.getsockname()[0]
-    s.close()
-    return ip
+    try:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+    finally:
+        s.close()
+
 
-ip = get_real_ip()
-port = 8000
-httpd = http.server.HTTPServer(('0.0.0.0', port), http.server.SimpleHTTPRequestHandler)
+async def main(args):
+    cache = AssetCache(args.root)
+    context = None if args.no_tls else make_ssl_context(args.cert, args.key)
+    server = await serve_static(cache, args.port, ssl_context=context)
+    scheme = "http" if args.no_tls else "https"
+    print(f"{scheme.upper()} 服务器已启动: {scheme}://{get_real_ip()}:{args.port}")
+    async with server:
+        await server.serve_forever()
 
-# 使用临时生成的证书 (由 start.sh 生成)
-httpd.socket = ssl.wrap_socket(httpd.socket, certfile='./cert.pem', keyfile='./key.pem', server_side=True)
 
-print(f"HTTPS 服务器已启动: https://{ip}:{port}")
-httpd.serve_forever()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VSSP static web server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--root",
+        default=os.path.dirname(os.path.abspath(__file__)),
+        help="网页目录 (默认项目目录)",
+    )
+    # 使用临时生成的证书 (由 start.sh 生成)
+    parser.add_argument("--cert", default="./cert.pem")
+    parser.add_argument("--key", default="./key.pem")
+    parser.add_argument("--no-tls", action="store_true", help="不使用 TLS")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,314 @@
+"""单进程启动器: pose 接收与 Unity 输出 (fast_receiver)、VSSP 中继 (video_streamer) 与网页服务共用一个事件循环
+
+    python3 launcher.py                          # 全部组件，网页在 http://<host>:8000
+    python3 launcher.py --config vssp.json
+    python3 launcher.py --print-config > vssp.json   # 带全部默认值的配置模板
+
+配置文件 (JSON) 的 pose / video 段的键即 fast_receiver.py / video_streamer.py 的命令行选项
+(连字符换成下划线，开关选项为 true / false)，由各自的 argparse 解析与校验；某段为 false 时不启动该组件:
+
+    {"pose": {"output_rate": 90, "filter": "one_euro"},
+     "video": {"workers": 2},
+     "static": {"port": 8000, "tls_cert": "cert.pem", "tls_key": "key.pem"},
+     "ui": true, "uvloop": false}
+
+- pose: HTTP 8765 / WebSocket 8786 入口、Unity 输出 (--server 固定为 asyncio)
+- video: UDP 8766 -> WebSocket 8787；"workers": N 时重组在 N 个子进程中进行，完整帧经共享内存交回
+- static: port / root / tls_cert / tls_key；有 video 时由中继提供 (计入其 /metrics)，否则单独启动
+- 组件只在启用时导入，Flask 与 NumPy 都不加载
+- SIGINT / SIGTERM 或任一组件出错: 取消所有组件，关闭端口、抓包落盘、回收 worker 后退出
+
+pose 与视频在同一进程、同一时钟下: 每个视频帧记录其采集时刻与同会话最新头部 pose 到达时刻之差，
+见中继 /metrics 的 vssp_frame_pose_skew_ms。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+
+from vssp.header import TIMING_HEADER
+from vssp.timing import percentiles, wrap_ms
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 未指定 --config 时，存在则使用
+CONFIG_FILE = os.path.join(PROJECT_DIR, "vssp.json")
+DEFAULT_CONFIG = {
+    "pose": {},
+    "video": {},
+    "static": {"port": 8000, "root": PROJECT_DIR, "tls_cert": None, "tls_key": None},
+    "ui": True,
+    "uvloop": False,
+}
+# 由启动器决定、不能在 pose 段设置的 fast_receiver 选项
+POSE_FIXED = ("server", "uvloop")
+# static 段 -> video_streamer 选项
+STATIC_OPTIONS = {
+    "port": "static_port",
+    "root": "static_root",
+    "tls_cert": "tls_cert",
+    "tls_key": "tls_key",
+}
+SKEW_WINDOW = 1024  # 每个会话保留的最近帧数
+
+
+def log(msg):
+    t = time.strftime("%H:%M:%S", time.localtime())
+    print(f"[{t}] {msg}")
+
+
+class ConfigError(Exception):
+    pass
+
+
+def load_config(path):
+    """读取配置文件并补全默认值；path 为 None 时只用默认值"""
+    config = dict(DEFAULT_CONFIG)
+    if path is None:
+        return config
+    try:
+        with open(path) as f:
+            loaded = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"cannot read {path}: {e}")
+    if not isinstance(loaded, dict):
+        raise ConfigError(f"{path}: expected a JSON object")
+    for key, value in loaded.items():
+        if key not in DEFAULT_CONFIG:
+            raise ConfigError(f"{path}: unknown key {key!r}")
+        if isinstance(DEFAULT_CONFIG[key], dict):
+            if value is False or value is None:
+                config[key] = None
+                continue
+            if not isinstance(value, dict):
+                raise ConfigError(f"{path}: {key!r} must be an object or false")
+            value = {**DEFAULT_CONFIG[key], **value}
+        config[key] = value
+    static = config["static"]
+    if static is not None:
+        unknown = set(static) - set(STATIC_OPTIONS)
+        if unknown:
+            raise ConfigError(f"unknown static option(s): {', '.join(sorted(unknown))}")
+    pose = config["pose"]
+    if pose is not None:
+        fixed = [key for key in POSE_FIXED if key in pose]
+        if fixed:
+            raise ConfigError(f"pose option(s) set by the launcher: {', '.join(fixed)}")
+    return config
+
+
+def section_argv(section):
+    """配置段 -> 命令行参数列表 (交给对应程序的 argparse)"""
+    argv = []
+    for key, value in section.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif value is not False and value is not None:
+            argv += [flag, str(value)]
+    return argv
+
+
+def parse_section(name, parser, section):
+    parser.prog = f"launcher.py [{name}]"
+    return parser.parse_args(section_argv(section))
+
+
+def video_section(config):
+    section = dict(config["video"])
+    if config["static"] is not None:
+        for key, option in STATIC_OPTIONS.items():
+            section[option] = config["static"][key]
+    return section
+
+
+class PoseFrameSkew:
+    """每会话最近 SKEW_WINDOW 帧: 视频帧采集时刻 - 同会话最新头部 pose 到达时刻 (ms)
+
+    采集时刻由延迟扩展头换算到本机时钟 (首包到达 - 发送端到中继的延迟)；
+    pose 会话与 VSSP 会话按 id 对应 (同一台头显)。正值表示帧比所用的最新 pose 晚。
+    """
+
+    def __init__(self, receiver, window=SKEW_WINDOW):
+        self.receiver = receiver
+        self.window = window
+        self.samples = {}  # Key: session -> deque of ms
+
+    def add_frame(self, session, timed, now):
+        pose = self.receiver.sessions.find(session)
+        if pose is None:
+            return
+        head = pose.states["head"]
+        if not head.version:
+            return
+        _, ts, offset, _, _, first, _, _ = TIMING_HEADER.unpack_from(timed, 0)
+        captured = first - wrap_ms(int(first) - ts + offset)
+        samples = self.samples.get(session)
+        if samples is None:
+            samples = self.samples[session] = deque(maxlen=self.window)
+        samples.append(captured - head.last_pkt_time * 1000)
+
+    def quantiles(self):
+        return [
+            ({"session": session, "quantile": q}, float(value))
+            for session, samples in sorted(self.samples.items())
+            if samples
+            for q, value in zip(("0.5", "0.95", "0.99"), percentiles(samples))
+        ]
+
+
+async def serve_assets(static, registry=None):
+    """没有 video 组件时单独提供网页"""
+    from vssp.static import AssetCache, make_ssl_context, serve_static
+
+    cache = AssetCache(static["root"])
+    if registry is not None:
+        cache.register_metrics(registry, "vssp")
+    tls = static["tls_cert"], static["tls_key"]
+    server = await serve_static(
+        cache, static["port"], ssl_context=make_ssl_context(*tls) if tls[0] else None
+    )
+    log(f"Serving {len(cache.assets)} static assets on port {static['port']}")
+    async with server:
+        await server.serve_forever()
+
+
+def build_components(config):
+    """按配置导入并创建组件，返回 ([(名称, 协程)], 退出时调用的清理函数列表)
+
+    先解析校验所有段，出错时还没有打开任何端口或文件。
+    """
+    receiver = video = None
+    if config["pose"] is not None:
+        import fast_receiver as receiver
+
+        pose_args = parse_section("pose", receiver.build_parser(), config["pose"])
+    if config["video"] is not None:
+        import video_streamer as video
+
+        parser = video.build_parser()
+        relay_config = video.config_from_args(
+            parser, parse_section("video", parser, video_section(config))
+        )
+    components = []
+    cleanup = []
+    if receiver is not None:
+        receiver.configure(pose_args)
+        cleanup.append(receiver.shutdown)
+        components.append(("pose", receiver.serve_async(ui=config["ui"])))
+    if video is not None:
+        relay = video.create(relay_config)
+        if receiver is not None:
+            skew = PoseFrameSkew(receiver)
+            relay.frame_observers.append(skew.add_frame)
+            relay.metrics.register(
+                "vssp_frame_pose_skew_ms",
+                "gauge",
+                "Video frame capture time minus the latest head pose arrival, by session",
+                skew.quantiles,
+            )
+        components.append(("video", relay.run()))
+    elif config["static"] is not None:
+        registry = receiver.metrics if receiver is not None else None
+        components.append(("static", serve_assets(config["static"], registry)))
+    return components, cleanup
+
+
+async def run(config):
+    """运行各组件直到收到 SIGINT / SIGTERM；返回退出码 (组件无法打开端口时为 1)"""
+    components, cleanup = build_components(config)
+    if not components:
+        raise ConfigError("no components enabled")
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C 以 KeyboardInterrupt 结束 asyncio.run
+    log(f"Launcher running {', '.join(name for name, _ in components)} in one process")
+    tasks = [asyncio.create_task(coro, name=name) for name, coro in components]
+    failed = []
+    try:
+        # 任一组件抛出异常时取消其余组件
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for t in done:
+            error = None if t.cancelled() else t.exception()
+            if isinstance(error, OSError):
+                failed.append(error)
+            elif error is not None:
+                raise error
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for close in cleanup:
+            close()
+        for error in failed:
+            log(f"Launcher error: {error}")
+        log("Launcher stopped")
+    return 1 if failed else 0
+
+
+def print_config(config):
+    """输出带全部默认值的配置 (pose / video 段为各程序的选项默认值)"""
+    import fast_receiver
+    import video_streamer
+
+    result = dict(config)
+    if config["pose"] is not None:
+        args = parse_section("pose", fast_receiver.build_parser(), config["pose"])
+        result["pose"] = {k: v for k, v in vars(args).items() if k not in POSE_FIXED}
+    if config["video"] is not None:
+        args = parse_section("video", video_streamer.build_parser(), config["video"])
+        result["video"] = {
+            k: v for k, v in vars(args).items() if k not in STATIC_OPTIONS.values()
+        }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run pose ingest, the VSSP relay and the web server in one process"
+    )
+    parser.add_argument(
+        "--config",
+        metavar="FILE",
+        help=f"JSON 配置文件 (默认: 存在时使用 {os.path.basename(CONFIG_FILE)})",
+    )
+    parser.add_argument(
+        "--print-config", action="store_true", help="输出带默认值的完整配置后退出"
+    )
+    args = parser.parse_args()
+    path = args.config
+    if path is None and os.path.exists(CONFIG_FILE):
+        path = CONFIG_FILE
+    try:
+        config = load_config(path)
+    except ConfigError as e:
+        parser.error(str(e))
+    if args.print_config:
+        print_config(config)
+        return
+    run_loop = asyncio.run
+    if config["uvloop"]:
+        try:
+            import uvloop
+        except ImportError:
+            sys.exit("uvloop needs the uvloop package (pip install uvloop)")
+        run_loop = uvloop.run
+    try:
+        code = run_loop(run(config))
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        code = 0
+    except ConfigError as e:
+        sys.exit(str(e))
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
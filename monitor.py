@@ -1,76 +1,287 @@
-import subprocess
+"""Pico 手柄 input_event 读取: 通过 adb 同时读取所有手柄的原始事件设备
+
+    python3 monitor.py                                   # 监控所有发现的手柄，打印每次上报
+    python3 monitor.py --dump captures/                  # 同时把原始字节流存为 <side>.evdev
+    python3 monitor.py --replay left=captures/left.evdev right=captures/right.evdev   # 离线解码
+
+每个设备一个 `adb exec-out cat /dev/input/eventN` 子进程，输出为内核 struct input_event 的
+原始字节 (不经过 getevent 的文本格式化)，在一个事件循环中并发读取。每次读到的数据块用预编译的
+struct 按定长记录批量解码 (iter_unpack)，EV_KEY / EV_ABS 累积到设备状态，EV_SYN/SYN_REPORT
+时产生一次上报 InputReport: 按键位掩码 (pose_codec 的 BTN_* 位)、扳机 / 握把 (0~1)、摇杆 (-1~1)，
+与发给 Unity 的 pose 记录中的字段含义相同。fast_receiver --adb-input 用它覆盖 WebXR gamepad 的值。
+"""
+
+import argparse
+import asyncio
+import os
 import re
+import struct
+import subprocess
 import sys
+from collections import namedtuple
 
+from pose_codec import BTN_GRIP, BTN_PRIMARY, BTN_SECONDARY, BTN_THUMBSTICK, BTN_TRIGGER
 
-def get_pico_event_paths():
-    """通过 adb 获取 Pico 手柄的事件设备路径"""
+# struct input_event: struct timeval (2 x long) + u16 type + u16 code + s32 value
+INPUT_EVENT = struct.Struct("<qqHHi")  # 64 位 Android (Pico 4 Ultra)
+INPUT_EVENT_32 = struct.Struct("<llHHi")  # 32 位用户空间
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_REPORT = 0
+
+ABS_X = 0x00  # 摇杆
+ABS_Y = 0x01
+ABS_GAS = 0x09  # 扳机
+ABS_BRAKE = 0x0A  # 握把
+ABS_CODES = {"ABS_X": ABS_X, "ABS_Y": ABS_Y, "ABS_GAS": ABS_GAS, "ABS_BRAKE": ABS_BRAKE}
+
+# EV_KEY 键码 -> pose_codec 按键位
+KEY_BUTTONS = {
+    0x130: BTN_PRIMARY,  # BTN_A
+    0x131: BTN_SECONDARY,  # BTN_B
+    0x133: BTN_PRIMARY,  # BTN_X
+    0x134: BTN_SECONDARY,  # BTN_Y
+    0x136: BTN_GRIP,  # BTN_TL
+    0x137: BTN_GRIP,  # BTN_TR
+    0x138: BTN_TRIGGER,  # BTN_TL2
+    0x139: BTN_TRIGGER,  # BTN_TR2
+    0x13D: BTN_THUMBSTICK,  # BTN_THUMBL
+    0x13E: BTN_THUMBSTICK,  # BTN_THUMBR
+}
+
+# getevent -lp 没有给出范围时使用的默认 (min, max)
+DEFAULT_RANGES = {
+    ABS_X: (-128, 127),
+    ABS_Y: (-128, 127),
+    ABS_GAS: (0, 255),
+    ABS_BRAKE: (0, 255),
+}
+# 扳机 / 握把模拟量超过该值时同时置位对应按键 (与 WebXR 的 pressed 一致)
+PRESS_THRESHOLD = 0.5
+
+READ_SIZE = 64 * 1024
+RETRY_SECS = 2.0  # adb 子进程退出 (手柄断开 / 设备拔出) 后重新连接的间隔
+
+# time: 事件时间戳 (设备时钟 s)；其余字段见模块说明
+InputReport = namedtuple("InputReport", "time btns trigger grip ax ay")
+
+
+class InputDecoder:
+    """一个手柄的 input_event 字节流 -> InputReport 列表 (可分块送入，记录可跨块)"""
+
+    def __init__(self, ranges=None, event=INPUT_EVENT):
+        self.event = event
+        self.ranges = dict(DEFAULT_RANGES)
+        self.ranges.update(ranges or {})
+        self.events = 0
+        self.reset()
+
+    def reset(self):
+        """断开后: 丢弃不完整的记录，松开全部按键，模拟量归零"""
+        self.pending = b""
+        self.keys = 0  # EV_KEY 按下的按键位
+        self.trigger = self.grip = 0.0
+        self.ax = self.ay = 0.0
+
+    def scale(self, code, value):
+        lo, hi = self.ranges[code]
+        unit = (value - lo) / (hi - lo) if hi != lo else 0.0
+        unit = min(max(unit, 0.0), 1.0)
+        return unit * 2 - 1 if code in (ABS_X, ABS_Y) else unit
+
+    def feed(self, data):
+        buf = self.pending + data if self.pending else bytes(data)
+        end = len(buf) - len(buf) % self.event.size
+        self.pending = buf[end:]
+        reports = []
+        for sec, usec, etype, code, value in self.event.iter_unpack(
+            memoryview(buf)[:end]
+        ):
+            if etype == EV_KEY:
+                bit = KEY_BUTTONS.get(code)
+                if bit is not None:
+                    if value:
+                        self.keys |= 1 << bit
+                    else:
+                        self.keys &= ~(1 << bit)
+            elif etype == EV_ABS:
+                if code == ABS_X:
+                    self.ax = self.scale(code, value)
+                elif code == ABS_Y:
+                    self.ay = self.scale(code, value)
+                elif code == ABS_GAS:
+                    self.trigger = self.scale(code, value)
+                elif code == ABS_BRAKE:
+                    self.grip = self.scale(code, value)
+            elif etype == EV_SYN and code == SYN_REPORT:
+                reports.append(self.report(sec + usec / 1e6))
+        self.events += end // self.event.size
+        return reports
+
+    def report(self, t):
+        btns = self.keys
+        if self.trigger >= PRESS_THRESHOLD:
+            btns |= 1 << BTN_TRIGGER
+        if self.grip >= PRESS_THRESHOLD:
+            btns |= 1 << BTN_GRIP
+        return InputReport(t, btns, self.trigger, self.grip, self.ax, self.ay)
+
+
+def parse_devices(output):
+    """getevent -lp 输出 -> {"left" / "right": (设备路径, {ABS 码: (min, max)})}"""
+    devices = {}
+    current_device = None
+    ranges = None
+    for line in output.splitlines():
+        # 匹配设备路径
+        dev_match = re.match(r"add device \d+: (.*)", line)
+        if dev_match:
+            current_device = dev_match.group(1).strip()
+            ranges = {}
+
+        # 匹配名称 (Pico 4 Ultra 通常包含 Pico Controller, 也可能叫 pvr-virtual-input)
+        if current_device and "name:" in line:
+            name_val = line.split('"')[1].lower()
+            if "pico" in name_val or "pvr" in name_val or "virtual" in name_val:
+                # 简单区分左右 (0通常是左，或者名字里带 left)
+                side = (
+                    "left"
+                    if "left" in name_val or " l" in name_val or "0" in name_val
+                    else "right"
+                )
+                devices[side] = (current_device, ranges)
+
+        # ABS 范围: "ABS_X   : value 0, min -128, max 127, fuzz 0, ..."
+        abs_match = re.search(
+            r"(ABS_\w+)\s*:\s*value -?\d+, min (-?\d+), max (-?\d+)", line
+        )
+        if abs_match and ranges is not None and abs_match.group(1) in ABS_CODES:
+            code = ABS_CODES[abs_match.group(1)]
+            ranges[code] = (int(abs_match.group(2)), int(abs_match.group(3)))
+    return devices
+
+
+def get_pico_devices(adb="adb"):
+    """通过 adb 获取 Pico 手柄的事件设备路径与 ABS 范围"""
     try:
-        output = subprocess.check_output(["adb", "shell", "getevent", "-lp"], text=True)
-        devices = {}
-        current_device = None
-
-        for line in output.splitlines():
-            # 匹配设备路径
-            dev_match = re.match(r"add device \d+: (.*)", line)
-            if dev_match:
-                current_device = dev_match.group(1)
-
-            # 匹配名称 (Pico 4 Ultra 通常包含 Pico Controller, 也可能叫 pvr-virtual-input)
-            if current_device and "name:" in line:
-                name_val = line.split('"')[1].lower()
-                if "pico" in name_val or "pvr" in name_val or "virtual" in name_val:
-                    name = line.split('"')[1]
-                    # 简单区分左右 (0通常是左，或者名字里带 left)
-                    side = (
-                        "Left"
-                        if "left" in name_val or " l" in name_val or "0" in name_val
-                        else "Right"
-                    )
-                    devices[side] = current_device
-
-        return devices
-    except Exception as e:
+        output = subprocess.check_output(
+            [adb, "shell", "getevent", "-lp"], text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError) as e:
         print(f"获取设备失败: {e}")
         return {}
+    return parse_devices(output)
 
 
-def monitor_event(device_path, side):
-    """实时监控并解析 getevent 输出"""
-    print(f"开始监控 {side} 手柄: {device_path}")
+def get_pico_event_paths():
+    """通过 adb 获取 Pico 手柄的事件设备路径 {"left" / "right": path}"""
+    return {side: path for side, (path, _) in get_pico_devices().items()}
 
-    # -lt: l 是显示标签名称, t 是增加时间戳
-    cmd = ["adb", "shell", "getevent", "-lt", device_path]
-    process = subprocess.Popen(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
-    )
 
+async def read_stream(stream, decoder, on_report, side, dump=None):
+    """读取到 EOF，每个数据块批量解码后逐条回调 on_report(side, report)"""
+    while True:
+        data = await stream.read(READ_SIZE)
+        if not data:
+            return
+        if dump is not None:
+            dump.write(data)
+        for report in decoder.feed(data):
+            on_report(side, report)
+
+
+async def watch_device(side, path, decoder, on_report, adb="adb", dump=None):
+    """持续读取一个手柄 (adb 断开后每 RETRY_SECS 重连)"""
+    while True:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                adb,
+                "exec-out",
+                "cat",
+                path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError as e:
+            print(f"[{side}] 无法启动 adb: {e}")
+            return
+        try:
+            await read_stream(proc.stdout, decoder, on_report, side, dump)
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+        # 断开期间按键状态未知: 上报一次全部松开
+        decoder.reset()
+        on_report(side, decoder.report(0.0))
+        await asyncio.sleep(RETRY_SECS)
+
+
+async def replay_file(side, path, decoder, on_report):
+    """离线: 从录制的原始字节流文件解码"""
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(READ_SIZE)
+            if not data:
+                return
+            for report in decoder.feed(data):
+                on_report(side, report)
+
+
+async def monitor_devices(
+    devices, on_report, event=INPUT_EVENT, adb="adb", dump_dir=None
+):
+    """在当前事件循环中并发读取所有手柄
+
+    devices: {side: (路径, ABS 范围)}；on_report(side, InputReport) 在事件循环中同步调用。
+    """
+    dumps = {}
+    tasks = []
     try:
-        for line in process.stdout:
-            # 格式解析: [时间戳] 类型 代码 值
-            # 例子: [ 12345.678] EV_KEY       BTN_A                DOWN
-            match = re.search(r"(\w+)\s+(\w+)\s+(\w+)", line)
-            if match:
-                ev_type, ev_code, ev_value = match.groups()
-
-                # 处理按键事件
-                if ev_type == "EV_KEY":
-                    state = "Pressed" if ev_value == "DOWN" else "Released"
-                    print(f"[{side}] Button: {ev_code} -> {state}")
-
-                # 处理摇杆和模拟量 (ABS)
-                elif ev_type == "EV_ABS":
-                    # ABS_X/Y 为摇杆, ABS_GAS 为扳机, ABS_BRAKE 为抓握
-                    print(f"[{side}] Axis: {ev_code} -> Value: {ev_value}")
+        for side, (path, ranges) in devices.items():
+            if dump_dir is not None:
+                dumps[side] = open(os.path.join(dump_dir, f"{side}.evdev"), "ab")
+            decoder = InputDecoder(ranges, event)
+            tasks.append(
+                watch_device(side, path, decoder, on_report, adb, dumps.get(side))
+            )
+        await asyncio.gather(*tasks)
+    finally:
+        for f in dumps.values():
+            f.close()
 
-    except KeyboardInterrupt:
-        process.terminate()
-        print("监控停止")
 
+def print_report(side, report):
+    buttons = "".join(
+        name if report.btns >> bit & 1 else "_"
+        for name, bit in (
+            ("T", BTN_TRIGGER),
+            ("G", BTN_GRIP),
+            ("S", BTN_THUMBSTICK),
+            ("A", BTN_PRIMARY),
+            ("B", BTN_SECONDARY),
+        )
+    )
+    print(
+        f"[{report.time:14.6f}] {side:5} | {buttons} | trigger {report.trigger:4.2f} "
+        f"grip {report.grip:4.2f} | stick ({report.ax:>5.2f}, {report.ay:>5.2f})"
+    )
 
-if __name__ == "__main__":
-    pico_devices = get_pico_event_paths()
 
+async def main(args):
+    event = INPUT_EVENT_32 if args.event_size == INPUT_EVENT_32.size else INPUT_EVENT
+    if args.replay:
+        tasks = []
+        for item in args.replay:
+            side, _, path = item.partition("=")
+            decoder = InputDecoder(event=event)
+            tasks.append(replay_file(side, path, decoder, print_report))
+        await asyncio.gather(*tasks)
+        return
+
+    pico_devices = get_pico_devices(args.adb)
     if not pico_devices:
         print("未发现 Pico 手柄。请确保：")
         print("1. Pico 已连接且开启了 ADB 调试")
@@ -78,9 +289,33 @@ if __name__ == "__main__":
         sys.exit(1)
 
     print("发现手柄设备:")
-    for side, path in pico_devices.items():
-        print(f" - {side}: {path}")
+    for side, (path, ranges) in pico_devices.items():
+        print(f" - {side}: {path} {ranges}")
+    if args.dump:
+        os.makedirs(args.dump, exist_ok=True)
+    await monitor_devices(pico_devices, print_report, event, args.adb, args.dump)
+
 
-    # 默认监控发现的第一个设备，或者可以修改为多线程监控两个
-    first_side = list(pico_devices.keys())[0]
-    monitor_event(pico_devices[first_side], first_side)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pico controller input_event monitor")
+    parser.add_argument("--adb", default="adb", help="adb 可执行文件")
+    parser.add_argument(
+        "--event-size",
+        type=int,
+        choices=[INPUT_EVENT.size, INPUT_EVENT_32.size],
+        default=INPUT_EVENT.size,
+        help="input_event 记录长度 (64 位设备 24，32 位 16)",
+    )
+    parser.add_argument(
+        "--dump", metavar="DIR", help="把原始字节流追加写入 DIR/<side>.evdev"
+    )
+    parser.add_argument(
+        "--replay",
+        nargs="+",
+        metavar="SIDE=FILE",
+        help="离线解码录制的字节流 (不连接 adb)",
+    )
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("监控停止")
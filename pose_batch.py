@@ -0,0 +1,389 @@
+"""NumPy 批量 pose 变换: 对整段录制的样本做与 fast_receiver 实时路径相同的计算
+
+    batch = PoseBatch.from_messages(reader)          # 抓包中的 (t, kind, port, session, payload) 或 (t, payload)
+    batch.to_unity()                                  # WebXR -> Unity (未带 FLAG_UNITY_SPACE 的记录)
+    origins = batch.origins()                         # 首样本 / 休眠唤醒 / 摇杆重置后的原点 (按会话)
+    records = batch.unity_records(origins)            # 与发往 Unity 的 64 字节记录逐字节相同
+    records[batch.session == 2]                       # 会话 2 (第 3 台头显) 的 Unity 端口收到的记录
+    angles = euler(batch.quat)                        # 与 fast_receiver.quat_to_euler 逐位相同
+
+对应 fast_receiver 默认输出 (--filter none，无 --predict-ms / --output-rate)。
+运算顺序与实时路径的标量代码一致 (float64，逐元素的 IEEE 运算)，结果逐位相同，
+会话的确定与 pose_session 相同 (记录 flags 高 8 位 / JSON "session" / 连接的 ?session=N，
+最多 max_sessions 个)，原点、seq 补齐与休眠重置都按会话分别计算。
+tests/test_pose_batch.py 用实时路径的函数做逐字节对照，bench/batch_transform.py 另测吞吐。
+"""
+
+import json
+import math
+
+import numpy as np
+
+from pose_codec import (
+    BTN_GRIP,
+    BTN_THUMBSTICK,
+    BTN_TRIGGER,
+    DEVICE_HEAD,
+    DEVICE_IDS,
+    DEVICE_NAMES,
+    FLAG_UNITY_SPACE,
+    POSE_MAGIC,
+    POSE_SIZE,
+    POSE_VERSION,
+    SESSION_SHIFT,
+    buttons_to_mask,
+    is_pose_records,
+)
+from pose_session import MAX_SESSIONS, parse_session
+from vssp.capture import KIND_POSE_HTTP, KIND_POSE_WS, KIND_POSE_WS_TEXT
+
+POSE_KINDS = (KIND_POSE_HTTP, KIND_POSE_WS, KIND_POSE_WS_TEXT)
+
+# 与 fast_receiver.SLEEP_RESET_SECS 相同
+SLEEP_RESET_SECS = 3.0
+
+# pose_codec.POSE_RECORD 的 NumPy 结构化类型
+RECORD_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("version", "u1"),
+        ("device", "u1"),
+        ("flags", "<u2"),
+        ("seq", "<u4"),
+        ("ts_ms", "<u4"),
+        ("pos", "<f4", (3,)),
+        ("quat", "<f4", (4,)),
+        ("btns", "<u4"),
+        ("trigger", "<f4"),
+        ("grip", "<f4"),
+        ("axes", "<f4", (2,)),
+    ]
+)
+assert RECORD_DTYPE.itemsize == POSE_SIZE
+
+
+def decode_records(buf):
+    """连续的 64 字节 pose 记录 -> 结构化数组 (不拷贝)，不检查 magic"""
+    return np.frombuffer(buf, dtype=RECORD_DTYPE)
+
+
+# 超越函数逐元素调用 libm (与 math 模块相同)；NumPy 的 SIMD 实现可能差 1 ULP
+_atan2 = np.frompyfunc(math.atan2, 2, 1)
+_asin = np.frompyfunc(math.asin, 1, 1)
+
+
+def euler(quat, exact=True):
+    """(N, 4) 四元数 -> (N, 3) 欧拉角 (度)，公式与 fast_receiver.quat_to_euler 相同
+
+    exact=True 时 atan2 / asin 用 libm，结果与 quat_to_euler 逐位相同；
+    exact=False 用 NumPy 的向量化实现，快一个数量级以上，误差在几个 ULP 以内。
+    """
+    atan2, asin = (_atan2, _asin) if exact else (np.arctan2, np.arcsin)
+    x, y, z, w = quat[:, 0], quat[:, 1], quat[:, 2], quat[:, 3]
+    sinr_cosp = 2 * (w * x + y * z)
+    cosr_cosp = 1 - 2 * (x * x + y * y)
+    pitch = atan2(sinr_cosp, cosr_cosp)
+    sinp = 2 * (w * y - z * x)
+    clipped = np.abs(sinp) <= 1
+    yaw = np.copysign(np.pi / 2, sinp)
+    yaw[clipped] = asin(sinp[clipped])
+    siny_cosp = 2 * (w * z + x * y)
+    cosy_cosp = 1 - 2 * (y * y + z * z)
+    roll = atan2(siny_cosp, cosy_cosp)
+    return np.degrees(np.stack((pitch, yaw, roll), axis=1).astype(np.float64))
+
+
+class PoseBatch:
+    """按到达顺序排列的样本列 (与 process_pose 的参数一一对应)
+
+    t: 到达时间 (s)；session: 会话 id；device: 0/1/2；flags: 输入记录的 flags (JSON 样本已转换，为 FLAG_UNITY_SPACE)；
+    pos (N, 3) / quat (N, 4) / axes (N, 2) 为 float64；btns / seq / ts_ms 为 int64。
+    """
+
+    def __init__(
+        self,
+        t,
+        session,
+        device,
+        flags,
+        seq,
+        ts_ms,
+        pos,
+        quat,
+        btns,
+        trigger,
+        grip,
+        axes,
+    ):
+        self.t = t
+        self.session = session
+        self.device = device
+        self.flags = flags
+        self.seq = seq
+        self.ts_ms = ts_ms
+        self.pos = pos
+        self.quat = quat
+        self.btns = btns
+        self.trigger = trigger
+        self.grip = grip
+        self.axes = axes
+
+    def __len__(self):
+        return len(self.t)
+
+    @staticmethod
+    def accepted(records, session, max_sessions=MAX_SESSIONS):
+        """(实时路径会处理的记录, 每条记录的会话 id)
+
+        跳过 magic / version / device 不合法的记录；会话取 flags 高 8 位，为 0 时取 session
+        (连接的 ?session=N，标量或每条记录一个)。与 SessionTable 相同，会话 0 总是存在，
+        其他会话按首次出现的顺序接纳，超出 max_sessions 的会话的记录丢弃。
+        """
+        valid = (
+            (records["magic"] == POSE_MAGIC)
+            & (records["version"] == POSE_VERSION)
+            & (records["device"] < len(DEVICE_NAMES))
+        )
+        ids = (records["flags"] >> SESSION_SHIFT).astype(np.int64)
+        ids = np.where(ids != 0, ids, session)
+        seen, first = np.unique(ids[valid], return_index=True)
+        admitted = [0] + [int(i) for _, i in sorted(zip(first, seen)) if i != 0][
+            : max_sessions - 1
+        ]
+        return valid & np.isin(ids, admitted), ids
+
+    @classmethod
+    def from_records(cls, records, t, session=0, max_sessions=MAX_SESSIONS):
+        """结构化记录数组 + 每条记录的到达时间 (与连接的会话 id)，只保留 accepted() 的记录"""
+        keep, ids = cls.accepted(records, session, max_sessions)
+        records = records[keep]
+        return cls(
+            np.asarray(t, dtype=np.float64)[keep],
+            ids[keep],
+            records["device"].astype(np.int64),
+            records["flags"].astype(np.int64),
+            records["seq"].astype(np.int64),
+            records["ts_ms"].astype(np.int64),
+            records["pos"].astype(np.float64),
+            records["quat"].astype(np.float64),
+            records["btns"].astype(np.int64),
+            records["trigger"].astype(np.float64),
+            records["grip"].astype(np.float64),
+            records["axes"].astype(np.float64),
+        )
+
+    @classmethod
+    def from_messages(cls, messages, max_sessions=MAX_SESSIONS):
+        """pose 消息序列 -> PoseBatch
+
+        messages 中每项为 (t, payload)，或抓包记录 (t, kind, port, session, payload，只取 pose 类型，
+        session 为连接的 ?session=N)：二进制记录按 64 字节批量解码，JSON 消息按 handle_pose 的规则解析
+        (已转换为 Unity 坐标)。没有 seq / ts_ms 的 JSON 样本按实时路径补齐: seq 为该会话该设备上一个样本 +1，
+        ts_ms 为到达时间。
+        """
+        # 所有记录拼成一块缓冲区一次解码，每条消息记录 (到达时间, 连接会话, 记录数)
+        buf = bytearray()
+        times, sessions, counts = [], [], []
+        # JSON 样本: (全局序号, t) + json_row()
+        rows = []
+        count = 0
+        for message in messages:
+            if len(message) == 5:
+                t, kind, _, session, payload = message
+                if kind not in POSE_KINDS:
+                    continue
+            else:
+                (t, payload), session = message, 0
+            if not payload:
+                continue
+            if is_pose_records(payload):
+                buf += payload
+                times.append(t)
+                sessions.append(session)
+                counts.append(len(payload) // POSE_SIZE)
+                count += counts[-1]
+                continue
+            try:
+                batch = json.loads(bytes(payload))
+            except ValueError:
+                continue
+            if isinstance(batch, dict):
+                batch = [batch]
+            for data in batch:
+                try:
+                    row = json_row(data)
+                    row_session = json_session(data, session)
+                except (AttributeError, TypeError, ValueError, IndexError):
+                    # 实时路径计为 pose_errors，样本不生效
+                    continue
+                if row is not None:
+                    # 占位记录 (flags 为 0: 会话取连接会话一列) 保持到达顺序，之后用 JSON 样本替换
+                    rows.append((count, t) + row)
+                    buf += bytes(POSE_SIZE)
+                    times.append(t)
+                    sessions.append(row_session)
+                    counts.append(1)
+                    count += 1
+
+        records = decode_records(buf)
+        times = np.repeat(np.asarray(times, dtype=np.float64), counts)
+        sessions = np.repeat(np.asarray(sessions, dtype=np.int64), counts)
+        is_json = np.zeros(len(records), dtype=bool)
+        if rows:
+            index = np.array([r[0] for r in rows], dtype=np.int64)
+            is_json[index] = True
+            records["magic"][index] = POSE_MAGIC
+            records["version"][index] = POSE_VERSION
+            records["device"][index] = [r[2] for r in rows]
+        keep, _ = cls.accepted(records, sessions, max_sessions)
+        batch = cls.from_records(records, times, sessions, max_sessions)
+        if rows:
+            # JSON 样本的 float64 值不能经过 f4 记录，直接写入列
+            values = np.array([r[3:] for r in rows], dtype=np.float64)[keep[index]]
+            is_json = is_json[keep]
+            batch.pos[is_json] = values[:, 0:3]
+            batch.quat[is_json] = values[:, 3:7]
+            batch.btns[is_json] = values[:, 7].astype(np.int64)
+            batch.trigger[is_json] = values[:, 8]
+            batch.grip[is_json] = values[:, 9]
+            batch.axes[is_json] = values[:, 10:12]
+            batch.flags[is_json] = FLAG_UNITY_SPACE
+            batch.fill_json_seq(is_json)
+        return batch
+
+    def streams(self):
+        """每个 (会话, 设备) 的样本下标 (按到达顺序)，对应实时路径中各会话的 DeviceState"""
+        for session in np.unique(self.session):
+            in_session = self.session == session
+            for device in range(len(DEVICE_NAMES)):
+                idx = np.flatnonzero(in_session & (self.device == device))
+                if len(idx):
+                    yield session, idx
+
+    def fill_json_seq(self, missing):
+        """按实时路径为没有 seq / ts_ms 的样本补齐: seq = 该会话该设备上一个样本的 seq + 1"""
+        self.ts_ms[missing] = (self.t[missing] * 1000).astype(np.int64) & 0xFFFFFFFF
+        for _, idx in self.streams():
+            known = ~missing[idx]
+            pos = np.arange(len(idx))
+            last_known = np.maximum.accumulate(np.where(known, pos, -1))
+            base = np.where(
+                last_known >= 0, self.seq[idx[np.maximum(last_known, 0)]], 0
+            )
+            seq = (base + pos - last_known) & 0xFFFFFFFF
+            self.seq[idx] = np.where(known, self.seq[idx], seq)
+
+    def to_unity(self):
+        """未带 FLAG_UNITY_SPACE 的样本做 WebXR (右手系) -> Unity (左手系) 转换"""
+        webxr = (self.flags & FLAG_UNITY_SPACE) == 0
+        self.pos[webxr, 2] = -self.pos[webxr, 2]
+        self.quat[webxr, 0] = -self.quat[webxr, 0]
+        self.quat[webxr, 1] = -self.quat[webxr, 1]
+        self.flags[webxr] |= FLAG_UNITY_SPACE
+
+    def origins(self, sleep_reset=SLEEP_RESET_SECS):
+        """每个样本计算相对位移所用的原点 (N, 3)，与 process_pose 相同 (各会话分别计算):
+
+        - 设备的第一个样本，或距该设备上个样本超过 sleep_reset 秒: 以本样本位置为原点 (作用于本样本)
+        - 手柄样本按下摇杆 (BTN_THUMBSTICK): 本会话所有已有数据的设备以各自最新位置为原点 (从下一个样本起)
+        取两类事件中较晚的一个。
+        """
+        n = len(self.t)
+        result = np.empty((n, 3))
+        pressed = (self.device != DEVICE_HEAD) & (
+            (self.btns >> BTN_THUMBSTICK) & 1 == 1
+        )
+        for session, idx in self.streams():
+            recenter = np.flatnonzero(pressed & (self.session == session))
+            local = np.arange(len(idx))
+            times = self.t[idx]
+            reset = np.ones(len(idx), dtype=bool)
+            reset[1:] = (times[:-1] > 0) & (times[1:] - times[:-1] > sleep_reset)
+            reset_at = idx[np.maximum.accumulate(np.where(reset, local, 0))]
+            origin_at = reset_at
+            if len(recenter):
+                # 本样本之前最近的一次重置 (严格早于本样本)，以及当时该设备的最新样本
+                k = np.searchsorted(recenter, idx, side="left") - 1
+                event = np.where(k >= 0, recenter[np.maximum(k, 0)], -1)
+                latest = np.searchsorted(idx, event, side="right") - 1
+                use = (k >= 0) & (latest >= 0) & (event > reset_at)
+                origin_at = np.where(use, idx[np.maximum(latest, 0)], reset_at)
+            result[idx] = self.pos[origin_at]
+        return result
+
+    def relative(self, origins):
+        return self.pos - origins
+
+    def unity_records(self, origins):
+        """发往 Unity 的二进制记录 (与 --unity-format binary 逐字节相同)
+
+        tobytes() 即 UDP 负载序列；多会话时 records[self.session == N] 为会话 N 的 Unity 端口收到的部分。
+        """
+        out = np.zeros(len(self.t), dtype=RECORD_DTYPE)
+        out["magic"] = POSE_MAGIC
+        out["version"] = POSE_VERSION
+        out["device"] = self.device
+        out["flags"] = FLAG_UNITY_SPACE
+        out["seq"] = self.seq
+        out["ts_ms"] = self.ts_ms
+        out["pos"] = self.pos - origins
+        out["quat"] = self.quat
+        out["btns"] = self.btns
+        out["trigger"] = self.trigger
+        out["grip"] = self.grip
+        out["axes"] = self.axes
+        return out
+
+
+def json_session(data, session):
+    """JSON pose 的 "session" 字段 (没有时为连接会话 session)；不合法时抛出 ValueError，同 handle_pose"""
+    if "session" not in data:
+        return session
+    value = parse_session(data["session"])
+    if value is None:
+        raise ValueError(f"invalid session {data['session']!r}")
+    return value
+
+
+def json_row(data):
+    """一个 JSON pose dict -> (device, px, py, pz, qx, qy, qz, qw, btns, trigger, grip, ax, ay)
+
+    规则与 fast_receiver.handle_pose 相同 (含坐标转换)，无法识别的设备返回 None。
+    """
+    dtype = data.get("type")
+    key = "head" if dtype == "head" else data.get("handedness")
+    if key not in DEVICE_IDS:
+        return None
+    pos = data.get("position", {"x": 0, "y": 0, "z": 0})
+    ori = data.get("orientation", {"x": 0, "y": 0, "z": 0, "w": 1})
+    px, py, pz = float(pos.get("x", 0)), float(pos.get("y", 0)), -float(pos.get("z", 0))
+    qx, qy = -float(ori.get("x", 0)), -float(ori.get("y", 0))
+    qz, qw = float(ori.get("z", 0)), float(ori.get("w", 1))
+    if dtype != "controller":
+        return (DEVICE_IDS[key], px, py, pz, qx, qy, qz, qw, 0, 0.0, 0.0, 0.0, 0.0)
+    buttons = data.get("buttons", [])
+    axes = data.get("axes", [0, 0])
+    trigger = (
+        float(buttons[BTN_TRIGGER].get("value", 0))
+        if len(buttons) > BTN_TRIGGER
+        else 0.0
+    )
+    grip = float(buttons[BTN_GRIP].get("value", 0)) if len(buttons) > BTN_GRIP else 0.0
+    ax, ay = (
+        (float(axes[0] or 0), float(axes[1] or 0)) if len(axes) >= 2 else (0.0, 0.0)
+    )
+    return (
+        DEVICE_IDS[key],
+        px,
+        py,
+        pz,
+        qx,
+        qy,
+        qz,
+        qw,
+        buttons_to_mask(buttons),
+        trigger,
+        grip,
+        ax,
+        ay,
+    )
@@ -0,0 +1,78 @@
+import struct
+
+# VSSP Pose Record v1 Constants
+POSE_MAGIC = b"VPOS"
+POSE_VERSION = 1
+
+# Pose Record: 4(magic), 1(version), 1(device), 2(flags), 4(seq), 4(timestamp_ms),
+# 12(position xyz f32), 16(orientation xyzw f32), 4(button bitmask), 4(trigger), 4(grip),
+# 8(axes xy f32) = 64 bytes, little-endian
+POSE_RECORD = struct.Struct("<4sBBHII3f4fIff2f")
+POSE_SIZE = POSE_RECORD.size
+
+# device 字段
+DEVICE_HEAD = 0
+DEVICE_LEFT = 1
+DEVICE_RIGHT = 2
+DEVICE_NAMES = ("head", "left", "right")
+DEVICE_IDS = {name: i for i, name in enumerate(DEVICE_NAMES)}
+
+# flags 字段
+FLAG_UNITY_SPACE = 0x01  # 坐标已是 Unity 左手系 (发给 Unity 的包为相对原点位移)
+FLAG_PREDICTED = 0x02  # fast_receiver 外推的 pose，ts_ms 为预测目标时间 (fast_receiver 本机 epoch ms)
+# flags 高 8 位: 会话 id (多台头显共用一个 fast_receiver，见 pose_session.py)，0 表示未指定
+SESSION_SHIFT = 8
+SESSION_MAX = 0xFF
+
+# Unity -> fast_receiver 预测请求 (UDP): 4(magic "VPRQ"), 1(flags), 1(session), 2(pad), 4(int32 ms)
+# flags & PREDICT_RELATIVE: ms 为相对收到请求时刻的预测时长；否则为目标时间 (fast_receiver 本机 epoch ms 低 32 位)
+# session: 请求哪台头显的 pose (旧版请求此处为 0，即会话 0)
+# 回复: 该会话每个设备一条 FLAG_PREDICTED 的 pose (格式同 --unity-format)，发回请求来源地址
+PREDICT_MAGIC = b"VPRQ"
+PREDICT_REQUEST = struct.Struct("<4sBB2xi")
+PREDICT_RELATIVE = 0x01
+
+# Unity -> fast_receiver 格式协商 (UDP，由 Unity 的接收 socket 发往它收到的 pose 数据报的来源地址):
+# 4(magic "VHEL"), 1(Unity 支持的最高 pose 记录版本，0 表示只收 JSON), 3(pad)
+# --unity-format auto 时每个会话先发 JSON (旧版 Unity 接收端不发 hello)，收到 hello 后改发二进制记录；
+# fast_receiver 重启后来源端口改变，Unity 看到新的来源地址时应再发一次
+UNITY_HELLO_MAGIC = b"VHEL"
+UNITY_HELLO = struct.Struct("<4sB3x")
+
+# 手柄按键索引 (WebXR xr-standard gamepad)
+BTN_TRIGGER = 0
+BTN_GRIP = 1
+BTN_THUMBSTICK = 3
+BTN_PRIMARY = 4  # A / X
+BTN_SECONDARY = 5  # B / Y
+
+
+def is_pose_records(buf):
+    """判断消息是否为一条或多条二进制 pose 记录"""
+    return (
+        len(buf) >= POSE_SIZE and len(buf) % POSE_SIZE == 0 and buf[0:4] == POSE_MAGIC
+    )
+
+
+def buttons_to_mask(buttons):
+    """WebXR buttons 列表 [{"pressed": bool, "value": float}, ...] -> 按键位掩码"""
+    mask = 0
+    for i, b in enumerate(buttons):
+        if b.get("pressed"):
+            mask |= 1 << i
+    return mask
+
+
+def mask_to_buttons(mask, trigger, grip, count=6):
+    """按键位掩码 -> JSON 兼容的 buttons 列表"""
+    buttons = []
+    for i in range(count):
+        pressed = bool(mask >> i & 1)
+        if i == BTN_TRIGGER:
+            value = trigger
+        elif i == BTN_GRIP:
+            value = grip
+        else:
+            value = 1.0 if pressed else 0.0
+        buttons.append({"pressed": pressed, "value": value})
+    return buttons
@@ -0,0 +1,353 @@
+"""pose 平滑滤波: 每设备一个滤波器，位于 WebXR -> Unity 坐标转换之后、状态更新 / 输出之前
+
+- "none": 原样输出
+- "exp": 固定截止频率的一阶低通 (按样本间隔换算平滑系数，与采样率无关)
+- "one_euro": One Euro 滤波 (Casiez et al. 2012)，截止频率随速度升高: 静止时抑制抖动，快速运动时减小延迟
+
+位置按轴低通；朝向在四元数上做 nlerp (先取同一半球，避免 q / -q 跳变)，
+One Euro 的朝向速度为相邻朝向的夹角 / dt。参数 (截止频率 Hz，beta 单位分别为 s/m 与 s/rad):
+
+    {"type": "one_euro", "min_cutoff": 1.0, "beta": 0.5, "d_cutoff": 1.0,
+     "rot_min_cutoff": 1.0, "rot_beta": 0.3,
+     "devices": {"head": {"type": "none"}}}
+
+FilterBank.configure() 可在运行中调用: 类型不变时只替换参数，保留滤波状态。
+batch_filter() 对一段录制的样本同时评估多组参数 (有 NumPy 时按参数组向量化)，用于离线调参。
+"""
+
+import json
+import math
+import os
+
+FILTER_TYPES = ("none", "exp", "one_euro")
+DEFAULTS = {
+    "exp": {"cutoff": 5.0, "rot_cutoff": 5.0},
+    "one_euro": {
+        "min_cutoff": 1.0,
+        "beta": 0.5,
+        "d_cutoff": 1.0,
+        "rot_min_cutoff": 1.0,
+        "rot_beta": 0.3,
+    },
+}
+TWO_PI = 2 * math.pi
+RESET_GAP = 0.25  # 相邻样本间隔超过该值 (s) 时从新样本重新开始，不从旧位置平滑过去
+
+
+def filter_params(kind, params):
+    """合并默认参数并检查取值，返回只含该类型参数的 dict"""
+    if kind not in FILTER_TYPES:
+        raise ValueError(f"unknown filter type {kind!r}")
+    merged = dict(DEFAULTS.get(kind, {}))
+    for name, value in params.items():
+        if name in ("type", "devices"):
+            continue
+        if name not in merged:
+            raise ValueError(f"unknown {kind} filter parameter {name!r}")
+        value = float(value)
+        if value < 0 or (value == 0 and "cutoff" in name):
+            raise ValueError(f"{kind} filter parameter {name} must be positive")
+        merged[name] = value
+    return merged
+
+
+class PassThrough:
+    __slots__ = ()
+
+    def configure(self, params):
+        pass
+
+    def reset(self):
+        pass
+
+    def filter(self, t, px, py, pz, qx, qy, qz, qw):
+        return px, py, pz, qx, qy, qz, qw
+
+
+class ExponentialFilter:
+    """固定截止频率的位置 / 朝向低通"""
+
+    __slots__ = ("cutoff", "rot_cutoff", "t", "px", "py", "pz", "qx", "qy", "qz", "qw")
+
+    def __init__(self, params):
+        self.configure(params)
+        self.reset()
+
+    def configure(self, params):
+        self.cutoff = params["cutoff"]
+        self.rot_cutoff = params["rot_cutoff"]
+
+    def reset(self):
+        self.t = None
+
+    def start(self, t, px, py, pz, qx, qy, qz, qw):
+        self.t = t
+        self.px, self.py, self.pz = px, py, pz
+        self.qx, self.qy, self.qz, self.qw = qx, qy, qz, qw
+        return px, py, pz, qx, qy, qz, qw
+
+    def filter(self, t, px, py, pz, qx, qy, qz, qw):
+        last = self.t
+        if last is None or t - last > RESET_GAP:
+            return self.start(t, px, py, pz, qx, qy, qz, qw)
+        dt = t - last
+        if dt > 0:
+            self.t = t
+            a = 1.0 / (1.0 + 1.0 / (TWO_PI * self.cutoff * dt))
+            self.px += a * (px - self.px)
+            self.py += a * (py - self.py)
+            self.pz += a * (pz - self.pz)
+            a = 1.0 / (1.0 + 1.0 / (TWO_PI * self.rot_cutoff * dt))
+            self.nlerp(qx, qy, qz, qw, a)
+        return self.px, self.py, self.pz, self.qx, self.qy, self.qz, self.qw
+
+    def nlerp(self, qx, qy, qz, qw, a):
+        """朝向向 (qx, qy, qz, qw) 移动 a，结果归一化"""
+        fx, fy, fz, fw = self.qx, self.qy, self.qz, self.qw
+        if fx * qx + fy * qy + fz * qz + fw * qw < 0:
+            qx, qy, qz, qw = -qx, -qy, -qz, -qw
+        fx += a * (qx - fx)
+        fy += a * (qy - fy)
+        fz += a * (qz - fz)
+        fw += a * (qw - fw)
+        n = math.sqrt(fx * fx + fy * fy + fz * fz + fw * fw)
+        if n > 0:
+            self.qx, self.qy, self.qz, self.qw = fx / n, fy / n, fz / n, fw / n
+
+
+class OneEuroFilter(ExponentialFilter):
+    """One Euro: 截止频率 = min_cutoff + beta * 平滑后的速度"""
+
+    __slots__ = (
+        "min_cutoff",
+        "beta",
+        "d_cutoff",
+        "rot_min_cutoff",
+        "rot_beta",
+        "dx",
+        "dy",
+        "dz",
+        "rot_speed",
+    )
+
+    def configure(self, params):
+        self.min_cutoff = params["min_cutoff"]
+        self.beta = params["beta"]
+        self.d_cutoff = params["d_cutoff"]
+        self.rot_min_cutoff = params["rot_min_cutoff"]
+        self.rot_beta = params["rot_beta"]
+
+    def reset(self):
+        self.t = None
+        self.dx = self.dy = self.dz = self.rot_speed = 0.0
+
+    def start(self, t, px, py, pz, qx, qy, qz, qw):
+        self.dx = self.dy = self.dz = self.rot_speed = 0.0
+        return ExponentialFilter.start(self, t, px, py, pz, qx, qy, qz, qw)
+
+    def filter(self, t, px, py, pz, qx, qy, qz, qw):
+        last = self.t
+        if last is None or t - last > RESET_GAP:
+            return self.start(t, px, py, pz, qx, qy, qz, qw)
+        dt = t - last
+        if dt > 0:
+            self.t = t
+            ad = 1.0 / (1.0 + 1.0 / (TWO_PI * self.d_cutoff * dt))
+
+            # 位置: 速度低通后决定截止频率
+            self.dx += ad * ((px - self.px) / dt - self.dx)
+            self.dy += ad * ((py - self.py) / dt - self.dy)
+            self.dz += ad * ((pz - self.pz) / dt - self.dz)
+            speed = math.sqrt(self.dx * self.dx + self.dy * self.dy + self.dz * self.dz)
+            cutoff = self.min_cutoff + self.beta * speed
+            a = 1.0 / (1.0 + 1.0 / (TWO_PI * cutoff * dt))
+            self.px += a * (px - self.px)
+            self.py += a * (py - self.py)
+            self.pz += a * (pz - self.pz)
+
+            # 朝向: 与上次输出的夹角 / dt 作为角速度
+            dot = abs(self.qx * qx + self.qy * qy + self.qz * qz + self.qw * qw)
+            angle = 2.0 * math.acos(dot if dot < 1.0 else 1.0)
+            self.rot_speed += ad * (angle / dt - self.rot_speed)
+            cutoff = self.rot_min_cutoff + self.rot_beta * self.rot_speed
+            a = 1.0 / (1.0 + 1.0 / (TWO_PI * cutoff * dt))
+            self.nlerp(qx, qy, qz, qw, a)
+        return self.px, self.py, self.pz, self.qx, self.qy, self.qz, self.qw
+
+
+FILTER_CLASSES = {
+    "exp": ExponentialFilter,
+    "one_euro": OneEuroFilter,
+}
+
+
+def make_filter(kind, params):
+    if kind == "none":
+        return PassThrough()
+    return FILTER_CLASSES[kind](params)
+
+
+class FilterBank:
+    """每设备一个滤波器，filters[name].filter(...) 由接收线程调用
+
+    configure() 先整体检查新配置，出错时保持原配置不变；替换滤波器对象是一次属性赋值，
+    接收线程看到的要么是旧对象要么是新对象。
+    """
+
+    def __init__(self, names, config=None):
+        self.names = tuple(names)
+        self.config = {}
+        self.filters = {name: PassThrough() for name in self.names}
+        if config:
+            self.configure(config)
+
+    def configure(self, config):
+        kind = config.get("type", "none")
+        resolved = {}
+        devices = config.get("devices", {})
+        for name in devices:
+            if name not in self.names:
+                raise ValueError(f"unknown device {name!r}")
+        for name in self.names:
+            override = devices.get(name, {})
+            device_kind = override.get("type", kind)
+            params = {k: v for k, v in config.items() if k not in ("type", "devices")}
+            if device_kind != kind:
+                # 设备单独指定了类型: 不继承全局参数
+                params = {}
+            params.update(override)
+            resolved[name] = (device_kind, filter_params(device_kind, params))
+
+        filters = dict(self.filters)
+        for name, (device_kind, params) in resolved.items():
+            current = filters[name]
+            if type(current) is FILTER_CLASSES.get(device_kind, PassThrough):
+                current.configure(params)
+            else:
+                filters[name] = make_filter(device_kind, params)
+        self.filters = filters
+        self.config = config
+
+    def reset(self):
+        for f in self.filters.values():
+            f.reset()
+
+
+class ConfigWatcher:
+    """轮询 JSON 配置文件的修改时间，变化时重新加载到 FilterBank"""
+
+    def __init__(self, path, bank, log=print):
+        self.path = path
+        self.bank = bank
+        self.log = log
+        self.mtime = None
+
+    def poll(self):
+        """检查一次，重新加载返回 True"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        try:
+            with open(self.path) as f:
+                self.bank.configure(json.load(f))
+        except (OSError, ValueError) as e:
+            self.log(f"Filter config {self.path} not applied: {e}")
+            return False
+        return True
+
+
+def load_numpy():
+    """NumPy 模块，未安装时为 None
+
+    只有 batch_filter 的向量化路径需要: 首次调用时才导入，fast_receiver 启动时不加载。
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def batch_filter(kind, param_sets, samples):
+    """对同一段样本评估多组参数
+
+    samples 为 (t, px, py, pz, qx, qy, qz, qw) 序列；返回每组参数的输出列表 (与 samples 等长)。
+    有 NumPy 时按参数组向量化 (返回 shape (K, T, 7) 的数组)，结果与逐样本调用 filter() 在浮点舍入误差内一致。
+    """
+    param_sets = [filter_params(kind, p) for p in param_sets]
+    np = load_numpy()
+    if np is None or kind == "none":
+        results = []
+        for params in param_sets:
+            f = make_filter(kind, params)
+            results.append([f.filter(*s) for s in samples])
+        return results if np is None else np.asarray(results, dtype=float)
+    return _batch_numpy(kind, param_sets, np.asarray(samples, dtype=float))
+
+
+def _batch_numpy(kind, param_sets, data):
+    np = load_numpy()
+    k, n = len(param_sets), len(data)
+    out = np.empty((k, n, 7))
+    if n == 0:
+        return out
+
+    def column(name):
+        return np.array([p[name] for p in param_sets])[:, None]
+
+    one_euro = kind == "one_euro"
+    if one_euro:
+        min_cutoff, beta, d_cutoff = (
+            column("min_cutoff"),
+            column("beta"),
+            column("d_cutoff"),
+        )
+        rot_min_cutoff, rot_beta = column("rot_min_cutoff"), column("rot_beta")
+        deriv = np.zeros((k, 3))
+        rot_speed = np.zeros((k, 1))
+    else:
+        cutoff, rot_cutoff = column("cutoff"), column("rot_cutoff")
+
+    pos = np.repeat(data[0:1, 1:4], k, axis=0)
+    quat = np.repeat(data[0:1, 4:8], k, axis=0)
+    out[:, 0, :3], out[:, 0, 3:] = pos, quat
+    last = data[0, 0]
+    for i in range(1, n):
+        t = data[i, 0]
+        dt = t - last
+        if dt > RESET_GAP:
+            last = t
+            pos[:] = data[i, 1:4]
+            quat[:] = data[i, 4:8]
+            if one_euro:
+                deriv[:] = 0.0
+                rot_speed[:] = 0.0
+        elif dt > 0:
+            last = t
+            p = data[i, 1:4]
+            q = data[i, 4:8]
+            if one_euro:
+                ad = 1.0 / (1.0 + 1.0 / (TWO_PI * d_cutoff * dt))
+                deriv += ad * ((p - pos) / dt - deriv)
+                speed = np.sqrt((deriv * deriv).sum(axis=1, keepdims=True))
+                a = 1.0 / (1.0 + 1.0 / (TWO_PI * (min_cutoff + beta * speed) * dt))
+                pos += a * (p - pos)
+                dot = np.abs(quat @ q)[:, None]
+                angle = 2.0 * np.arccos(np.minimum(dot, 1.0))
+                rot_speed += ad * (angle / dt - rot_speed)
+                cut = rot_min_cutoff + rot_beta * rot_speed
+                a = 1.0 / (1.0 + 1.0 / (TWO_PI * cut * dt))
+            else:
+                a = 1.0 / (1.0 + 1.0 / (TWO_PI * cutoff * dt))
+                pos += a * (p - pos)
+                a = 1.0 / (1.0 + 1.0 / (TWO_PI * rot_cutoff * dt))
+            target = np.where((quat @ q)[:, None] < 0, -q, q)
+            blended = quat + a * (target - quat)
+            norm = np.sqrt((blended * blended).sum(axis=1, keepdims=True))
+            quat = np.where(norm > 0, blended / np.where(norm > 0, norm, 1.0), quat)
+        out[:, i, :3], out[:, i, 3:] = pos, quat
+    return out
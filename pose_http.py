@@ -0,0 +1,136 @@
+"""fast_receiver 的 asyncio HTTP 入口 (--server asyncio)，替代 Flask 开发服务器的每连接一线程
+
+接口与 Flask 模式相同:
+
+- POST /          pose 消息 (二进制记录或 JSON)，状态码由 on_pose(body, query) 决定 (空请求体 240，其余 204)，
+                  query 为 URL 查询参数 dict (如 ?session=N)
+- GET /metrics    on_metrics() 返回的 Prometheus 文本
+
+HTTP/1.1 keep-alive (HTTP/1.0 或 Connection: close 时每请求一连接)，请求体按 Content-Length
+或 chunked 读取。请求在事件循环中直接处理，不创建线程，也不经过 WSGI 环境与 Request 对象。
+"""
+
+import asyncio
+from urllib.parse import parse_qsl
+
+from vssp.metrics import CONTENT_TYPE
+
+# 请求体上限 (单条 pose 消息远小于此)
+MAX_BODY = 1 << 20
+# 请求头行数上限
+MAX_HEADER_LINES = 100
+
+# werkzeug 对未登记的状态码 (240) 使用 UNKNOWN
+REASONS = {
+    200: "OK",
+    204: "No Content",
+    240: "UNKNOWN",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Request Entity Too Large",
+}
+
+
+class BadRequest(Exception):
+    def __init__(self, status):
+        self.status = status
+
+
+def response(status, body=b"", ctype="text/html; charset=utf-8", close=False):
+    head = f"HTTP/1.1 {status} {REASONS.get(status, 'UNKNOWN')}\r\n"
+    if status != 204:
+        head += f"Content-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+    if close:
+        head += "Connection: close\r\n"
+    return head.encode() + b"\r\n" + body
+
+
+async def read_headers(reader):
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n"):
+            return headers
+        if not line:
+            raise asyncio.IncompleteReadError(line, None)
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    raise BadRequest(400)
+
+
+async def read_body(reader, headers):
+    if headers.get(b"transfer-encoding", b"").lower() == b"chunked":
+        body = bytearray()
+        while True:
+            size = int(((await reader.readline()).split(b";")[0]), 16)
+            if size == 0:
+                await read_headers(reader)  # trailer
+                return bytes(body)
+            if len(body) + size > MAX_BODY:
+                raise BadRequest(413)
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)  # \r\n
+    length = int(headers.get(b"content-length", b"0"))
+    if length < 0:
+        raise BadRequest(400)
+    if length > MAX_BODY:
+        raise BadRequest(413)
+    return await reader.readexactly(length) if length else b""
+
+
+async def serve_pose_http(on_pose, on_metrics, port, host="0.0.0.0"):
+    """启动 HTTP 服务并返回 asyncio.Server
+
+    on_pose(body, query) -> 状态码，on_metrics() -> Prometheus 文本；两者都在事件循环中同步调用。
+    """
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                parts = request.split()
+                if len(parts) != 3:
+                    writer.write(response(400, close=True))
+                    break
+                method, target, version = parts
+                try:
+                    headers = await read_headers(reader)
+                    body = await read_body(reader, headers)
+                except (BadRequest, ValueError) as exc:
+                    status = exc.status if isinstance(exc, BadRequest) else 400
+                    writer.write(response(status, close=True))
+                    break
+                connection = headers.get(b"connection", b"").lower()
+                if version == b"HTTP/1.1":
+                    close = connection == b"close"
+                else:
+                    close = connection != b"keep-alive"
+
+                path, _, query = target.partition(b"?")
+                if path == b"/":
+                    if method == b"POST":
+                        params = dict(parse_qsl(query.decode("latin-1")))
+                        writer.write(response(on_pose(body, params), close=close))
+                    else:
+                        writer.write(response(405, close=close))
+                elif path == b"/metrics":
+                    if method == b"GET":
+                        text = on_metrics().encode()
+                        writer.write(response(200, text, CONTENT_TYPE, close))
+                    else:
+                        writer.write(response(405, close=close))
+                else:
+                    writer.write(response(404, close=close))
+                await writer.drain()
+                if close:
+                    break
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,162 @@
+"""服务端 pose 预测: 每设备一个最近样本环形缓冲，估计线速度 / 角速度并外推到目标时间
+
+位置按窗口内样本最小二乘求线速度后线性外推；朝向取参考样本与最新样本做 slerp，
+插值参数 > 1 即沿同一旋转轴继续转动 (等价于恒定角速度外推)。
+"""
+
+import math
+
+HISTORY = 16  # 环形缓冲样本数
+VELOCITY_WINDOW = 0.06  # 估计速度使用最近多少秒内的样本
+MIN_SPAN = 0.008  # 角速度参考样本与最新样本的最小时间间隔 (s)
+MAX_HORIZON = 0.1  # 最多外推到最新样本之后多少秒，超过后保持不动
+MAX_GAP = 0.25  # 相邻样本间隔超过该值视为中断，清空历史
+CLOCK_WINDOW = 10.0  # SampleClock 最小延迟的滑动窗口 (s)
+CLOCK_RESET_MS = 1000  # 延迟超出最小值这么多 ms 视为发送端时钟跳变
+
+
+def wrap_ms(value):
+    """32 位毫秒差值 -> 有符号整数"""
+    return ((value + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+
+class SampleClock:
+    """发送端 timestamp_ms -> 本机时间 (s)
+
+    到达时间 = 采样时间 + 网络延迟，取窗口内最小的 (到达 - ts) 作为无排队时的延迟，
+    采样时间 = 到达时间 - 超出最小延迟的部分，从而去掉 HTTP / WebSocket 线程调度的抖动。
+    """
+
+    def __init__(self):
+        self.minimum = None
+        self.prev_minimum = None
+        self.window_start = 0.0
+
+    def local_time(self, ts_ms, now):
+        delta = wrap_ms(int(now * 1000) - ts_ms)
+        if now - self.window_start > CLOCK_WINDOW:
+            self.prev_minimum, self.minimum = self.minimum, None
+            self.window_start = now
+        if self.minimum is None or delta < self.minimum:
+            self.minimum = delta
+        floor = self.minimum
+        if self.prev_minimum is not None and self.prev_minimum < floor:
+            floor = self.prev_minimum
+        excess = delta - floor
+        if excess > CLOCK_RESET_MS:
+            # 发送端时钟跳变: 重新估计
+            self.minimum = self.prev_minimum = delta
+            excess = 0
+        return now - excess / 1000
+
+
+def quat_normalize(x, y, z, w):
+    n = math.sqrt(x * x + y * y + z * z + w * w)
+    if n == 0:
+        return 0.0, 0.0, 0.0, 1.0
+    return x / n, y / n, z / n, w / n
+
+
+def slerp(q0, q1, u):
+    """球面线性插值，u 可以大于 1 (外推)"""
+    x0, y0, z0, w0 = q0
+    x1, y1, z1, w1 = q1
+    dot = x0 * x1 + y0 * y1 + z0 * z1 + w0 * w1
+    if dot < 0:
+        # q 与 -q 表示同一旋转，取短弧
+        x1, y1, z1, w1, dot = -x1, -y1, -z1, -w1, -dot
+    if dot > 0.9995:
+        # 夹角很小时退化为线性插值
+        a, b = 1 - u, u
+    else:
+        theta = math.acos(min(dot, 1.0))
+        # 外推不超过半圈，避免越过对跖点后方向反转
+        u = min(u, math.pi / theta)
+        s = math.sin(theta)
+        a = math.sin((1 - u) * theta) / s
+        b = math.sin(u * theta) / s
+    return quat_normalize(
+        a * x0 + b * x1, a * y0 + b * y1, a * z0 + b * z1, a * w0 + b * w1
+    )
+
+
+class MotionModel:
+    """一个设备的运动模型
+
+    add() 由接收线程调用，predict() 由输出线程调用: 样本以元组整体写入列表槽位，
+    读取方复制列表后计算，不需要加锁。
+    """
+
+    def __init__(self, history=HISTORY):
+        self.samples = [None] * history  # (t, px, py, pz, qx, qy, qz, qw)
+        self.head = 0
+        self.count = 0
+
+    def reset(self):
+        self.samples = [None] * len(self.samples)
+        self.head = 0
+        self.count = 0
+
+    def add(self, t, px, py, pz, qx, qy, qz, qw):
+        last = self.latest()
+        if last is not None:
+            if t <= last[0]:
+                # 乱序或重复的样本不参与估计
+                return
+            if t - last[0] > MAX_GAP:
+                self.reset()
+        self.samples[self.head] = (t, px, py, pz, qx, qy, qz, qw)
+        self.head = (self.head + 1) % len(self.samples)
+        self.count = min(self.count + 1, len(self.samples))
+
+    def latest(self):
+        if not self.count:
+            return None
+        return self.samples[self.head - 1]
+
+    def history(self):
+        """按时间先后排列的样本"""
+        size = len(self.samples)
+        head, count, samples = self.head, self.count, list(self.samples)
+        return [samples[(head - count + i) % size] for i in range(count)]
+
+    def velocity(self, window):
+        """窗口内样本的最小二乘线速度 (单位/s)"""
+        t_last = window[-1][0]
+        n = len(window)
+        mean_t = sum(s[0] for s in window) / n - t_last
+        var = sum((s[0] - t_last - mean_t) ** 2 for s in window)
+        if var <= 0:
+            return 0.0, 0.0, 0.0
+        result = []
+        for axis in (1, 2, 3):
+            mean_p = sum(s[axis] for s in window) / n
+            cov = sum((s[0] - t_last - mean_t) * (s[axis] - mean_p) for s in window)
+            result.append(cov / var)
+        return tuple(result)
+
+    def predict(self, target, horizon=MAX_HORIZON):
+        """外推到 target 时刻 (与 add 的 t 同一时钟)，返回 (px, py, pz, qx, qy, qz, qw) 或 None"""
+        samples = self.history()
+        if not samples:
+            return None
+        last = samples[-1]
+        t_last = last[0]
+        dt = min(target - t_last, horizon)
+        if dt <= 0 or len(samples) < 2:
+            return last[1:]
+
+        window = [s for s in samples if t_last - s[0] <= VELOCITY_WINDOW]
+        if len(window) < 2:
+            window = samples[-2:]
+        vx, vy, vz = self.velocity(window)
+
+        # 角速度参考样本: 距最新样本至少 MIN_SPAN 的最近一个
+        ref = window[0]
+        for s in reversed(window[:-1]):
+            if t_last - s[0] >= MIN_SPAN:
+                ref = s
+                break
+        span = t_last - ref[0]
+        quat = slerp(ref[4:], last[4:], 1 + dt / span) if span > 0 else last[4:]
+        return (last[1] + vx * dt, last[2] + vy * dt, last[3] + vz * dt) + quat
@@ -0,0 +1,154 @@
+"""fast_receiver 的多头显会话: 一个进程同时服务多台头显，每台一个会话，互不影响
+
+会话 id 的来源 (优先级从高到低):
+
+- 二进制 pose 记录 flags 的高 8 位 (pose_codec.SESSION_SHIFT)，非 0 时生效
+- JSON pose 的 "session" 字段
+- 连接 URL 的 ?session=N (ws://host:8786/?session=N、POST http://host:8765/?session=N)
+- 以上都没有时为会话 0 (单头显部署与旧版网页)
+
+每个会话有独立的设备状态 (StateStore)、运动模型、平滑滤波器与 Unity 输出:
+会话 0 发往 127.0.0.1:UNITY_PORT (9000，与单会话时相同)，会话 N 发往 127.0.0.1:(port_base + N)；
+共享内存输出时会话 0 使用 --shm-path，会话 N 使用 <shm-path>.N。
+摇杆重置原点、休眠检测、--adb-input (只作用于会话 0，即 USB 连接的那台头显) 都只影响本会话。
+会话 0 总是存在，其他会话在收到第一条消息时创建，最多 max_sessions 个 (含会话 0)，超出的消息丢弃并计数。
+"""
+
+import threading
+
+from pose_codec import DEVICE_NAMES, SESSION_MAX
+from pose_filter import FilterBank
+from pose_predict import MotionModel, SampleClock
+from pose_shm import PoseBlockWriter
+from pose_state import StateStore
+
+MAX_SESSIONS = 16
+SESSION_PORT_BASE = 9100
+
+
+def parse_session(value):
+    """URL 参数 / JSON 字段 -> 会话 id，不合法时返回 None"""
+    if isinstance(value, bool):
+        return None
+    try:
+        session = int(value)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, float) and session != value:
+        return None
+    return session if 0 <= session <= SESSION_MAX else None
+
+
+class Session:
+    """一台头显的接收 / 输出状态"""
+
+    def __init__(
+        self,
+        session_id,
+        unity_addr,
+        filter_config=None,
+        shm_path=None,
+        unity_format="binary",
+    ):
+        self.id = session_id
+        self.unity_addr = unity_addr
+        # 发给 Unity 的格式: "binary" / "json"；--unity-format auto 时由 Unity 的 hello 切换
+        self.unity_format = unity_format
+        self.states = StateStore(DEVICE_NAMES)
+        # 每设备运动模型，采样时间由发送端时间戳去抖 (每台头显的时钟不同)
+        self.sample_clock = SampleClock()
+        self.motion = {key: MotionModel() for key in DEVICE_NAMES}
+        self.filters = FilterBank(DEVICE_NAMES, filter_config)
+        self.pose_block = PoseBlockWriter(shm_path) if shm_path else None
+        # --adb-input: 设备 -> 最新 (btns, trigger, grip, ax, ay)
+        self.adb_inputs = {}
+        # 上个输出节拍时各设备的样本数 (--output-rate)
+        self.versions = {key: 0 for key in DEVICE_NAMES}
+        self.predicted_sent = {key: 0 for key in DEVICE_NAMES}
+        self.stale_samples = {key: 0 for key in DEVICE_NAMES}
+
+    def close(self):
+        if self.pose_block is not None:
+            self.pose_block.close()
+
+
+class SessionTable:
+    """会话 id -> Session，按需创建
+
+    get() 可能同时在多个接收线程中调用，只有创建会话时加锁。
+    configure() 接口同 FilterBank，可直接交给 pose_filter.ConfigWatcher。
+    """
+
+    def __init__(
+        self,
+        unity_port,
+        port_base=SESSION_PORT_BASE,
+        max_sessions=MAX_SESSIONS,
+        shm_path=None,
+        host="127.0.0.1",
+        unity_format="binary",
+    ):
+        self.unity_port = unity_port
+        self.port_base = port_base
+        self.max_sessions = max_sessions
+        self.shm_path = shm_path
+        self.host = host
+        self.unity_format = unity_format  # 新会话的初始 Unity 格式
+        self.filter_config = None
+        self.sessions = {}
+        self.dropped = 0  # 超出 max_sessions 而丢弃的消息数
+        self.lock = threading.Lock()
+        # 会话 0 总是存在 (旧版发送端 / --adb-input / 默认 Unity 端口)
+        self.get(0)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __iter__(self):
+        # 复制一份: 接收线程可能同时创建新会话
+        return iter(tuple(self.sessions.values()))
+
+    def unity_port_of(self, session_id):
+        return self.unity_port if session_id == 0 else self.port_base + session_id
+
+    def shm_path_of(self, session_id):
+        if not self.shm_path:
+            return None
+        return self.shm_path if session_id == 0 else f"{self.shm_path}.{session_id}"
+
+    def find(self, session_id):
+        """已存在的会话或 None (不创建)"""
+        return self.sessions.get(session_id)
+
+    def get(self, session_id):
+        """会话 (首次出现时创建)，超出 max_sessions 时返回 None"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                if len(self.sessions) >= self.max_sessions:
+                    self.dropped += 1
+                    return None
+                session = Session(
+                    session_id,
+                    (self.host, self.unity_port_of(session_id)),
+                    self.filter_config,
+                    self.shm_path_of(session_id),
+                    self.unity_format,
+                )
+                self.sessions[session_id] = session
+        return session
+
+    def configure(self, config):
+        """所有会话 (含之后创建的) 的滤波配置；配置有误时抛出 ValueError 且不做任何修改"""
+        FilterBank(DEVICE_NAMES, config)
+        with self.lock:
+            self.filter_config = config
+            for session in self.sessions.values():
+                session.filters.configure(config)
+
+    def close(self):
+        for session in self:
+            session.close()
@@ -0,0 +1,148 @@
+"""同机 Unity 的共享内存 pose 输出: /dev/shm 下固定布局的 pose 块，seqlock 保护
+
+布局 (小端，BLOCK_SIZE = 256 字节):
+
+    0   4s   magic "VPSH"
+    4   u16  version
+    6   u16  设备数 (3: head / left / right)
+    8   u64  seqlock 序号: 写入中为奇数，写完为偶数，每次写入 +2
+    16  u32  写入进程 pid
+    20  ...  保留 (0)
+    64  3 x 64 字节 pose 记录 (pose_codec.POSE_RECORD，按 device 索引)，内容与发往 Unity 的 UDP 二进制包相同；
+        magic 为 0 的槽位表示该设备尚无数据
+
+读取方 (Unity 可直接 MemoryMappedFile + 指针读取，不需要系统调用和解析):
+
+    do {
+        s1 = Volatile.Read(seq); if (s1 & 1) continue;
+        复制需要的记录;
+        s2 = Volatile.Read(seq);
+    } while (s1 != s2);
+
+写入方持锁串行化 (单写者)。序号以对齐的 8 字节整体写入；Python 无法插入内存屏障，依赖 x86-64 的存储顺序 (TSO)，
+写入顺序为 序号(奇) -> 记录 -> 序号(偶)。
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from pose_codec import POSE_MAGIC, POSE_RECORD, POSE_SIZE
+
+SHM_MAGIC = b"VPSH"
+SHM_VERSION = 1
+BLOCK_HEADER = struct.Struct("<4sHHQI")
+SEQ_OFFSET = 8
+RECORDS_OFFSET = 64
+DEVICE_COUNT = 3
+BLOCK_SIZE = RECORDS_OFFSET + DEVICE_COUNT * POSE_SIZE
+
+# 没有 /dev/shm 的系统 (Windows) 退回临时目录下的普通文件，同样经 mmap 共享
+DEFAULT_PATH = os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "vssp_pose"
+)
+
+
+class PoseBlockWriter:
+    """fast_receiver 一侧: 每个 pose 样本写入对应设备的槽位
+
+    write() 可从多个线程调用 (HTTP 请求线程、WebSocket 线程、固定频率输出、adb 输入)，
+    由 self.lock 串行化: seqlock 只允许一个写者，交错的写入会让读取方看到偶数序号下未写完的记录。
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, BLOCK_SIZE)
+            self.mm = mmap.mmap(fd, BLOCK_SIZE)
+        finally:
+            os.close(fd)
+        self.buf = memoryview(self.mm)
+        self.lock = threading.Lock()
+        # 序号槽位: 8 字节对齐的原生 u64，赋值为一次整体存储
+        self.seq_view = self.buf[SEQ_OFFSET : SEQ_OFFSET + 8].cast("Q")
+        # 沿用旧块的序号继续递增，正在轮询的读取方能看到重新初始化
+        self.seq = (self.seq_view[0] | 1) + 1
+        self.seq_view[0] = self.seq - 1
+        self.buf[RECORDS_OFFSET:] = bytes(BLOCK_SIZE - RECORDS_OFFSET)
+        self.buf[BLOCK_HEADER.size : RECORDS_OFFSET] = bytes(
+            RECORDS_OFFSET - BLOCK_HEADER.size
+        )
+        BLOCK_HEADER.pack_into(
+            self.buf, 0, SHM_MAGIC, SHM_VERSION, DEVICE_COUNT, self.seq - 1, os.getpid()
+        )
+        self.seq_view[0] = self.seq
+
+    def write(self, device, record):
+        """record 为一条 64 字节 pose 记录"""
+        offset = RECORDS_OFFSET + device * POSE_SIZE
+        with self.lock:
+            seq = self.seq
+            self.seq_view[0] = seq + 1
+            self.buf[offset : offset + POSE_SIZE] = record
+            self.seq = seq + 2
+            self.seq_view[0] = seq + 2
+
+    def close(self):
+        self.seq_view.release()
+        self.buf.release()
+        self.mm.close()
+
+
+class PoseBlockReader:
+    """读取最新 pose: read() 返回 (seq, [每设备的 POSE_RECORD 元组或 None])"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), BLOCK_SIZE, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self.mm)
+        magic, version, count, _, self.pid = BLOCK_HEADER.unpack_from(self.buf)
+        if magic != SHM_MAGIC or version != SHM_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a pose block")
+        self.count = count
+        self.seq_view = self.buf[SEQ_OFFSET : SEQ_OFFSET + 8].cast("Q")
+        self.retries = 0  # 与写入冲突而重读的次数
+
+    @property
+    def seq(self):
+        return self.seq_view[0]
+
+    def snapshot(self):
+        """一致的 (seq, 记录区 bytes)"""
+        seq_view = self.seq_view
+        buf = self.buf
+        while True:
+            s1 = seq_view[0]
+            if not s1 & 1:
+                data = bytes(buf[RECORDS_OFFSET:BLOCK_SIZE])
+                if seq_view[0] == s1:
+                    return s1, data
+            self.retries += 1
+
+    def read(self):
+        seq, data = self.snapshot()
+        poses = []
+        for record in POSE_RECORD.iter_unpack(data):
+            poses.append(record if record[0] == POSE_MAGIC else None)
+        return seq, poses
+
+    def wait(self, last_seq, timeout=1.0, interval=0.0005):
+        """轮询直到序号不同于 last_seq，超时返回 None"""
+        deadline = time.perf_counter() + timeout
+        while self.seq_view[0] == last_seq:
+            if time.perf_counter() > deadline:
+                return None
+            time.sleep(interval)
+        return self.read()
+
+    def close(self):
+        if hasattr(self, "seq_view"):
+            self.seq_view.release()
+        self.buf.release()
+        self.mm.close()
@@ -0,0 +1,210 @@
+"""fast_receiver 的设备状态存储: 每设备一块预分配的 array('d')，写入 / 读取各为一次 struct 调用
+
+多个线程写入 (werkzeug 请求线程、WebSocket 线程、adb 输入、其他设备的摇杆重置)，
+UI / 输出线程 / 预测请求读取。每个设备一个 seqlock:
+
+- 写入: 持 lock，writes 先 +1 (奇数) 再改数组、写完再 +1 (偶数)；
+  update() 在同一次加锁中读取 / 重置原点并用一次 pack_into 写入整条样本 (含 version)，不分配容器对象；
+  原点由 set_origin() / recenter() 写入，手柄输入由 set_inputs() 写入 (fast_receiver --adb-input)
+- 读取: snapshot() 不加锁，writes 为偶数且复制前后不变时返回 (样本与原点来自同一次写入之后)，否则重读
+
+version 与样本在同一次写入中更新，读取方用它判断是否有新样本 (以及两次读取之间的样本数)。
+不依赖 GIL 使 pack_into / unpack_from 成为原子操作。
+"""
+
+import struct
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+# 样本字段 (update 写入)，整数字段以 double 存储 (u32 可精确表示)
+SAMPLE_FIELDS = (
+    "version",  # 已写入的样本数，0 表示尚无数据
+    "last_pkt_time",  # 本机 time.time()
+    "px",
+    "py",
+    "pz",
+    "qx",
+    "qy",
+    "qz",
+    "qw",
+    "btns",  # 按键位掩码
+    "trigger",
+    "grip",
+    "ax",
+    "ay",
+    "seq",
+    "ts_ms",
+)
+# 原点字段 (set_origin 写入)
+ORIGIN_FIELDS = ("has_origin", "ox", "oy", "oz")
+
+SAMPLE = struct.Struct(f"={len(SAMPLE_FIELDS)}d")
+ORIGIN = struct.Struct(f"={len(ORIGIN_FIELDS)}d")
+ORIGIN_OFFSET = SAMPLE.size
+# 手柄输入字段 (set_inputs 写入)
+INPUTS = struct.Struct("=5d")
+INPUTS_OFFSET = SAMPLE_FIELDS.index("btns") * 8
+STATE = struct.Struct(f"={len(SAMPLE_FIELDS) + len(ORIGIN_FIELDS)}d")
+
+VERSION = 0
+LAST_PKT_TIME = 1
+PX = 2
+SEQ = 14
+HAS_ORIGIN = len(SAMPLE_FIELDS)
+
+Snapshot = namedtuple("Snapshot", SAMPLE_FIELDS + ORIGIN_FIELDS)
+
+
+class DeviceState:
+    """一个设备的最新状态 (seqlock: lock 串行化写入方，writes 为奇数时正在写入)"""
+
+    __slots__ = ("name", "data", "lock", "writes")
+
+    def __init__(self, name):
+        self.name = name
+        self.data = array("d", bytes(STATE.size))
+        self.data[SAMPLE_FIELDS.index("qw")] = 1.0
+        self.lock = threading.Lock()
+        self.writes = 0
+
+    @property
+    def version(self):
+        return int(self.data[VERSION])
+
+    @property
+    def seq(self):
+        return int(self.data[SEQ])
+
+    @property
+    def last_pkt_time(self):
+        return self.data[LAST_PKT_TIME]
+
+    @property
+    def has_origin(self):
+        return self.data[HAS_ORIGIN] != 0.0
+
+    def update(
+        self,
+        now,
+        max_gap,
+        px,
+        py,
+        pz,
+        qx,
+        qy,
+        qz,
+        qw,
+        btns,
+        trigger,
+        grip,
+        ax,
+        ay,
+        seq,
+        ts_ms,
+    ):
+        """写入一个样本，返回写入前的原点 (ox, oy, oz)
+
+        尚未设置原点或距上个样本超过 max_gap 秒 (休眠唤醒) 时以本样本位置为新原点。
+        """
+        data = self.data
+        with self.lock:
+            self.writes += 1
+            has_origin, ox, oy, oz = ORIGIN.unpack_from(data, ORIGIN_OFFSET)
+            last = data[LAST_PKT_TIME]
+            if not has_origin or (last > 0 and now - last > max_gap):
+                ox, oy, oz = px, py, pz
+                ORIGIN.pack_into(data, ORIGIN_OFFSET, 1.0, px, py, pz)
+            SAMPLE.pack_into(
+                data,
+                0,
+                data[VERSION] + 1,
+                now,
+                px,
+                py,
+                pz,
+                qx,
+                qy,
+                qz,
+                qw,
+                btns,
+                trigger,
+                grip,
+                ax,
+                ay,
+                seq,
+                ts_ms,
+            )
+            self.writes += 1
+        return ox, oy, oz
+
+    def set_inputs(self, btns, trigger, grip, ax, ay):
+        """只更新按键 / 扳机 / 握把 / 摇杆 (adb 手柄输入)，不计入 version"""
+        with self.lock:
+            self.writes += 1
+            INPUTS.pack_into(self.data, INPUTS_OFFSET, btns, trigger, grip, ax, ay)
+            self.writes += 1
+
+    def set_origin(self, ox, oy, oz):
+        with self.lock:
+            self.writes += 1
+            ORIGIN.pack_into(self.data, ORIGIN_OFFSET, 1.0, ox, oy, oz)
+            self.writes += 1
+
+    def origin(self):
+        """(ox, oy, oz)，需先确认 has_origin"""
+        return self.read()[HAS_ORIGIN + 1 :]
+
+    def clear_origin(self):
+        with self.lock:
+            self.writes += 1
+            ORIGIN.pack_into(self.data, ORIGIN_OFFSET, 0.0, 0.0, 0.0, 0.0)
+            self.writes += 1
+
+    def recenter(self):
+        """以当前位置为原点 (尚无数据时不变)；读取位置与写入原点在同一次加锁中"""
+        data = self.data
+        with self.lock:
+            if data[VERSION]:
+                self.writes += 1
+                ORIGIN.pack_into(
+                    data, ORIGIN_OFFSET, 1.0, data[PX], data[PX + 1], data[PX + 2]
+                )
+                self.writes += 1
+
+    def read(self):
+        """一致的样本 + 原点元组 (seqlock 读取)"""
+        data = self.data
+        while True:
+            writes = self.writes
+            if not writes & 1:
+                values = STATE.unpack_from(data)
+                if self.writes == writes:
+                    return values
+            # 写入方持锁时被切换出去: 让出 CPU 而不是空转到下一个调度周期
+            time.sleep(0)
+
+    def snapshot(self):
+        return Snapshot._make(self.read())
+
+
+class StateStore:
+    """head / left / right 的 DeviceState，按名称索引"""
+
+    def __init__(self, names):
+        self.devices = {name: DeviceState(name) for name in names}
+
+    def __getitem__(self, name):
+        return self.devices[name]
+
+    def __contains__(self, name):
+        return name in self.devices
+
+    def __iter__(self):
+        return iter(self.devices.values())
+
+    def recenter(self):
+        """摇杆重置: 全部设备以当前位置为原点"""
+        for device in self.devices.values():
+            device.recenter()
@@ -0,0 +1,180 @@
+"""回放 --record 抓包文件: 把原始 pose 消息 / VSSP 数据报按原时间间隔重新注入
+
+    python3 replay.py session.vcap                     # 实时
+    python3 replay.py session.vcap --speed 4           # 4 倍速
+    python3 replay.py session.vcap --speed 0 --kinds vssp   # 不限速，只回放视频
+    python3 replay.py session.vcap.w0 session.vcap.w1  # --workers 模式的分片文件按时间归并
+
+文件经 mmap 映射，UDP / HTTP / WebSocket 发送的都是映射上的 memoryview，不拷贝 payload。
+目标端口默认为记录中的原端口 (video_streamer / fast_receiver 的监听端口)。
+pose 消息带回录制时连接的会话: HTTP POST /?session=N，WebSocket 每个会话一条 ws://host:port/?session=N 连接。
+"""
+
+import argparse
+import contextlib
+import heapq
+import http.client
+import socket
+import time
+from operator import itemgetter
+
+from websockets.exceptions import WebSocketException
+from websockets.sync.client import connect
+
+from vssp.capture import (
+    KIND_NAMES,
+    KIND_POSE_HTTP,
+    KIND_POSE_WS,
+    KIND_POSE_WS_TEXT,
+    KIND_VSSP,
+    CaptureReader,
+)
+
+# 落后目标时间不足该值时直接发送，避免每个数据报都 sleep
+SLEEP_THRESHOLD = 0.001
+
+
+def session_path(session):
+    """会话 0 (默认会话) 不带查询参数，与旧版接收端兼容"""
+    return f"/?session={session}" if session else "/"
+
+
+class Injector:
+    """按 kind 把记录发往对应端口，连接按需建立"""
+
+    def __init__(self, host, ports):
+        self.host = host
+        self.ports = ports  # Key: kind -> 覆盖端口 (None 表示使用记录中的端口)
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.http = {}  # Key: port -> HTTPConnection
+        self.ws = {}  # Key: (port, session) -> websockets 同步连接
+        self.stack = contextlib.ExitStack()
+        self.sent = {kind: [0, 0] for kind in KIND_NAMES}  # kind -> [记录数, 字节数]
+        self.errors = 0
+
+    def send(self, kind, port, session, payload):
+        port = self.ports.get(kind) or port
+        try:
+            if kind == KIND_VSSP:
+                self.udp.sendto(payload, (self.host, port))
+            elif kind == KIND_POSE_HTTP:
+                self.post(port, session, payload)
+            else:
+                self.ws_send(port, session, payload, kind == KIND_POSE_WS_TEXT)
+        except (OSError, http.client.HTTPException, WebSocketException):
+            # 连接出错后下次重连
+            self.errors += 1
+            self.http.pop(port, None)
+            self.ws.pop((port, session), None)
+            return
+        counts = self.sent[kind]
+        counts[0] += 1
+        counts[1] += len(payload)
+
+    def post(self, port, session, payload):
+        conn = self.http.get(port)
+        if conn is None:
+            conn = self.http[port] = http.client.HTTPConnection(self.host, port)
+        conn.request(
+            "POST",
+            session_path(session),
+            body=payload,
+            headers={"Content-Type": "application/json"},
+        )
+        conn.getresponse().read()
+
+    def ws_send(self, port, session, payload, text):
+        conn = self.ws.get((port, session))
+        if conn is None:
+            conn = connect(f"ws://{self.host}:{port}{session_path(session)}")
+            conn = self.ws[port, session] = self.stack.enter_context(conn)
+        if text:
+            conn.send(str(payload, "utf-8"))
+        else:
+            conn.send(payload)
+
+    def close(self):
+        self.udp.close()
+        for conn in self.http.values():
+            conn.close()
+        self.stack.close()
+
+
+def replay(readers, injector, speed, kinds):
+    """回放一遍，返回实际耗时 (s)"""
+    records = heapq.merge(*readers, key=itemgetter(0))
+    send = injector.send
+    start = time.perf_counter()
+    t0 = None
+    for t, kind, port, session, payload in records:
+        if kind not in kinds:
+            continue
+        if t0 is None:
+            t0 = t
+        if speed > 0:
+            delay = start + (t - t0) / speed - time.perf_counter()
+            if delay > SLEEP_THRESHOLD:
+                time.sleep(delay)
+        send(kind, port, session, payload)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放 VSSP / pose 抓包文件")
+    parser.add_argument("files", nargs="+", help="抓包文件 (多个文件按时间归并)")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="回放速度: 1 为实时，N 为 N 倍速，0 为不限速",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="目标地址")
+    parser.add_argument("--vssp-port", type=int, help="覆盖 VSSP UDP 目标端口")
+    parser.add_argument("--pose-port", type=int, help="覆盖 pose HTTP 目标端口")
+    parser.add_argument("--pose-ws-port", type=int, help="覆盖 pose WebSocket 目标端口")
+    parser.add_argument(
+        "--kinds",
+        nargs="+",
+        choices=sorted(KIND_NAMES.values()),
+        default=sorted(KIND_NAMES.values()),
+        help="只回放这些类型的记录",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="循环回放次数")
+    args = parser.parse_args()
+
+    readers = [CaptureReader(path) for path in args.files]
+    for path, reader in zip(args.files, readers):
+        print(f"{path}: {len(reader)} records, {reader.duration():.1f}s")
+    kinds = {kind for kind, name in KIND_NAMES.items() if name in args.kinds}
+    injector = Injector(
+        args.host,
+        {
+            KIND_VSSP: args.vssp_port,
+            KIND_POSE_HTTP: args.pose_port,
+            KIND_POSE_WS: args.pose_ws_port,
+            KIND_POSE_WS_TEXT: args.pose_ws_port,
+        },
+    )
+    elapsed = 0.0
+    try:
+        for _ in range(args.repeat):
+            elapsed += replay(readers, injector, args.speed, kinds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        injector.close()
+        for reader in readers:
+            reader.close()
+
+    elapsed = max(elapsed, 1e-9)
+    for kind, (count, size) in injector.sent.items():
+        if count:
+            print(
+                f"{KIND_NAMES[kind]}: {count} records, {size} bytes | "
+                f"{count / elapsed:.0f} rec/s {size * 8 / elapsed / 1e6:.1f} Mbit/s"
+            )
+    print(f"Elapsed {elapsed:.2f}s, send errors {injector.errors}")
+
+
+if __name__ == "__main__":
+    main()
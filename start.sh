@@ -42,42 +42,42 @@ cd "$PROJECT_DIR"
 echo "=== 清理旧进程..."
 pkill -f "fast_receiver.py" || true
 pkill -f "video_streamer.py" || true
+pkill -f "launcher.py" || true
 pkill -f "http.server 8000" || true
 sleep 1
 
 # --- pose 数据隧道（两种模式都需要）---
-echo ">>> 建立 ADB 数据隧道 (8765 pose)..."
+echo ">>> 建立 ADB 数据隧道 (8765 pose / 8786 pose-ws)..."
 adb reverse tcp:8765 tcp:8765 > /dev/null
-
-# --- pose 接收器（两种模式都需要）---
-echo ">>> 启动 fast_receiver..."
-python3 "$PROJECT_DIR/fast_receiver.py" &
-RECEIVER_PID=$!
+adb reverse tcp:8786 tcp:8786 > /dev/null
 
 if [ "$MODE" = "web" ]; then
     # ========== WEB 模式 ==========
     adb reverse tcp:8787 tcp:8787 > /dev/null
-    adb reverse tcp:8786 tcp:8786 > /dev/null
     adb reverse tcp:8000 tcp:8000 > /dev/null
 
-    echo ">>> 启动 video_streamer + HTTP..."
-    python3 "$PROJECT_DIR/video_streamer.py" &
-    VIDEO_PID=$!
-    python3 -m http.server 8000 > /dev/null 2>&1 &
-    HTTP_PID=$!
+    # pose 接收、视频中继与网页服务在同一个进程 / 事件循环中 (launcher.py，配置见 vssp.json)
+    echo ">>> 启动 launcher (pose + 视频 + 网页)..."
+    python3 "$PROJECT_DIR/launcher.py" &
+    RECEIVER_PID=$!
 
     sleep 1
 
     echo ">>> 打开 Pico 浏览器..."
     adb shell am start -a android.intent.action.VIEW -d "http://127.0.0.1:8000" > /dev/null 2>&1
 
-    trap "echo -e '\n停止服务...'; kill $RECEIVER_PID $VIDEO_PID $HTTP_PID 2>/dev/null; exit" SIGINT
+    trap "echo -e '\n停止服务...'; kill $RECEIVER_PID 2>/dev/null; wait $RECEIVER_PID; exit" SIGINT
 
     echo "-----------------------------------------------"
     echo "操作提示: 头盔里点击屏幕任意位置进入 VR；Ctrl+C 退出。"
     echo "-----------------------------------------------"
 else
     # ========== APK 模式 ==========
+    # 只需要 pose 接收器
+    echo ">>> 启动 fast_receiver..."
+    python3 "$PROJECT_DIR/fast_receiver.py" &
+    RECEIVER_PID=$!
+
     sleep 1
 
     # 检查 APK 是否已安装
@@ -43,12 +43,8 @@ adb reverse tcp:8765 tcp:8765
 adb reverse tcp:8786 tcp:8786
 
 echo [4/4] 启动 VSSP 服务端...
-:: 1. 启动坐标接收中心
-start "vssp_receiver" /b cmd /c "python fast_receiver.py"
-:: 2. 启动视频中转
-start "vssp_video" /b cmd /c "python video_streamer.py"
-:: 3. 启动网页服务器
-start "vssp_http" /b cmd /c "python -m http.server 8000"
+:: pose 接收、视频中转与网页服务 (8000 端口) 在同一个进程中 (launcher.py，配置见 vssp.json)
+start "vssp" /b cmd /c "python launcher.py"
 
 timeout /t 5 >nul
 
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 与 bench/ 相同: 从项目目录导入 vssp 与入口程序
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,262 @@
+"""重组引擎: 乱序 / 越界 p_id / FEC 恢复 / NACK 重传"""
+
+from vssp import (
+    HEADER_SIZE,
+    RELAY_HEADER,
+    Reassembler,
+    pack_header,
+    packetize,
+    parse_header,
+)
+from vssp.fec import FLAG_FEC_PARITY, FLAG_RETRANSMIT, make_parity, parse_nack
+from vssp.transport import FRAME_QUEUE_PER_SESSION, FrameQueue
+
+SENDER = ("127.0.0.1", 50000)
+FRAME = bytes(i * 7 % 251 for i in range(5000))  # 5 个数据包
+
+
+def with_parity(packets, group):
+    """每 group 个数据包追加一个校验包 (同 bench/fec_loss.py 的发送端)"""
+    frame_id, mode, eye, codec, _, _, count, _, ts, session = parse_header(packets[0])
+    chunks = [p[HEADER_SIZE:] for p in packets]
+    parity = []
+    for g in range(0, count, group):
+        payload = make_parity(chunks[g : g + group], group)
+        header = pack_header(
+            frame_id,
+            mode,
+            eye,
+            codec,
+            FLAG_FEC_PARITY,
+            g // group,
+            count,
+            len(payload),
+            ts,
+            session,
+        )
+        parity.append(header + payload)
+    return parity
+
+
+def feed(assembler, packets):
+    """依次交给重组引擎，返回完成的帧"""
+    done = []
+    for packet in packets:
+        fb = assembler.handle_packet(packet, SENDER)
+        if fb is not None:
+            done.append(fb)
+    return done
+
+
+def browser_packet(data, mode=1, eye=1, codec=0):
+    return RELAY_HEADER.pack(len(data), mode, eye, codec) + data
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append((bytes(data), addr))
+
+
+def test_out_of_order_frame_matches_browser_format():
+    assembler = Reassembler()
+    packets = packetize(10, 1, 1, 0, FRAME, 1000)
+    done = feed(assembler, packets[::-1])
+    assert len(done) == 1
+    assert bytes(done[0].packet) == browser_packet(FRAME)
+    assert assembler.counters()["assembled"] == {1: 1}
+    assembler.release_frame(done[0])
+
+
+def test_out_of_range_p_id_is_rejected():
+    assembler = Reassembler()
+    packets = packetize(11, 1, 1, 0, FRAME, 1000)
+    bogus = pack_header(11, 1, 1, 0, 0, len(packets), len(packets), 4, 1000) + b"evil"
+    beyond = pack_header(11, 1, 1, 0, 0, 0xFFFF, len(packets), 4, 1000) + b"evil"
+    done = feed(assembler, [packets[0], bogus, beyond])
+    assert done == []
+    assert assembler.bad_p_id == 2
+    done = feed(assembler, packets[1:])
+    assert len(done) == 1
+    assert bytes(done[0].packet) == browser_packet(FRAME)
+
+
+def test_p_count_mismatch_is_malformed():
+    assembler = Reassembler()
+    packets = packetize(12, 1, 1, 0, FRAME, 1000)
+    other = packetize(12, 1, 1, 0, FRAME[:1000], 1000)
+    assert feed(assembler, [packets[0], other[0]]) == []
+    assert assembler.malformed == 1
+
+
+def test_invalid_datagrams_are_counted():
+    assembler = Reassembler()
+    assert feed(assembler, [b"not vssp at all", b"VSSP short"]) == []
+    assert assembler.bad_magic == 1
+    assert assembler.malformed == 1
+
+
+def test_fec_recovers_one_loss_per_group():
+    assembler = Reassembler()
+    packets = packetize(20, 1, 1, 0, FRAME, 1000)
+    parity = with_parity(packets, 3)  # 组 [0, 1, 2] 与 [3, 4]
+    # 每组各丢一个数据包，校验包在数据包之前或之后到达
+    done = feed(assembler, [packets[0], parity[0], packets[2], packets[3], parity[1]])
+    assert len(done) == 1
+    assert bytes(done[0].packet) == browser_packet(FRAME)
+    assert assembler.fec_recovered == 2
+
+
+def test_fec_cannot_recover_two_losses_in_a_group():
+    assembler = Reassembler()
+    packets = packetize(21, 1, 1, 0, FRAME, 1000)
+    parity = with_parity(packets, 3)
+    assert feed(assembler, [packets[0], parity[0], packets[3], packets[4]]) == []
+    assert assembler.fec_recovered == 0
+
+
+def test_nack_requests_missing_packets_and_counts_retransmits():
+    assembler = Reassembler()
+    assembler.nack = True
+    assembler.sock = FakeSocket()
+    packets = packetize(30, 1, 1, 0, FRAME, 1000)
+    # 丢失 1 与 3: 最后一包到达时请求重传
+    assert feed(assembler, [packets[0], packets[2], packets[4]]) == []
+    nacks = [parse_nack(data) for data, _ in assembler.sock.sent]
+    nacks = [
+        (nack, addr) for nack, (_, addr) in zip(nacks, assembler.sock.sent) if nack
+    ]
+    assert nacks == [((30, 1, [1, 3]), SENDER)]
+    assert assembler.nack_requested == 2
+
+    retransmits = []
+    for p_id in (1, 3):
+        packet = bytearray(packets[p_id])
+        packet[11] |= FLAG_RETRANSMIT
+        retransmits.append(bytes(packet))
+    done = feed(assembler, retransmits)
+    assert len(done) == 1
+    assert bytes(done[0].packet) == browser_packet(FRAME)
+    assert assembler.retransmits == 2
+
+
+def test_nack_disabled_sends_nothing():
+    assembler = Reassembler()
+    assembler.sock = FakeSocket()
+    packets = packetize(31, 1, 1, 0, FRAME, 1000)
+    feed(assembler, [packets[0], packets[4]])
+    assert not any(parse_nack(data) for data, _ in assembler.sock.sent)
+    assert assembler.nack_requested == 0
+
+
+def test_frames_larger_than_a_shared_memory_slot_are_counted_once():
+    from vssp.workers import SlotPool
+
+    slot_size = 4096
+    pool = SlotPool(memoryview(bytearray(2 * slot_size)), 2, slot_size)
+    assembler = Reassembler(pool=pool)
+    big = packetize(40, 1, 1, 0, FRAME, 1000)  # 5 个数据包 > 4096 字节
+    small = packetize(41, 1, 1, 0, FRAME[:2000], 1000)
+    assert feed(assembler, big) == []
+    done = feed(assembler, small)
+    assert len(done) == 1
+    counters = assembler.counters()
+    assert counters["oversize_drops"] == 1
+    assert counters["pool_drops"] == 0
+
+
+def test_single_old_packet_is_dropped_as_stale():
+    assembler = Reassembler()
+    feed(assembler, packetize(300, 1, 1, 0, FRAME, 1000))
+    current = packetize(301, 1, 1, 0, FRAME, 1000)
+    feed(assembler, current[:2])
+    # 落后 200 帧的重复包: 不是发送端重启
+    stray = packetize(101, 1, 1, 0, FRAME, 1000)[0]
+    assert feed(assembler, [stray]) == []
+    counters = assembler.counters()
+    assert counters["stale"] == 1
+    assert counters["sender_restarts"] == 0
+    # 重组中的帧不受影响，已显示的帧仍拒绝迟到的包
+    done = feed(assembler, current[2:])
+    assert [fb.frame_id for fb in done] == [301]
+    assembler.release_frame(done[0])
+    assert feed(assembler, packetize(300, 1, 1, 0, FRAME, 1000)[:1]) == []
+    assert assembler.counters()["stale"] == 2
+
+
+def test_sender_restart_after_consecutive_packets():
+    assembler = Reassembler()
+    done = feed(assembler, packetize(300, 1, 1, 0, FRAME, 1000))
+    assembler.release_frame(done[0])
+    restarted = packetize(0, 1, 1, 0, FRAME, 1000)
+    # 前两个包仍按迟到的包丢弃，第三个确认重启
+    done = feed(assembler, restarted)
+    counters = assembler.counters()
+    assert counters["stale"] == 2
+    assert counters["sender_restarts"] == 1
+    assert done == []  # 帧 0 缺了前两个包
+    done = feed(assembler, packetize(1, 1, 1, 0, FRAME, 1000))
+    assert [fb.frame_id for fb in done] == [1]
+    assembler.release_frame(done[0])
+
+
+def test_far_jump_restarts_at_once():
+    assembler = Reassembler()
+    done = feed(assembler, packetize(5000, 1, 1, 0, FRAME, 1000))
+    assembler.release_frame(done[0])
+    # 落后超过 RESTART_WINDOWS 个窗口: 第一个包即视为重启
+    done = feed(assembler, packetize(0, 1, 1, 0, FRAME, 1000))
+    assert [fb.frame_id for fb in done] == [0]
+    assert assembler.counters()["sender_restarts"] == 1
+    assembler.release_frame(done[0])
+
+
+def test_fec_short_last_group_parity_first():
+    assembler = Reassembler()
+    packets = packetize(22, 1, 1, 0, FRAME, 1000)
+    parity = with_parity(packets, 3)  # 组 [0, 1, 2] 与短组 [3, 4]
+    # 短组的校验包先到: 组长仍为 3，组 0 不会混入组 1 的数据
+    done = feed(assembler, [parity[1], packets[0], packets[1], parity[0], packets[4]])
+    assert len(done) == 1
+    assert bytes(done[0].packet) == browser_packet(FRAME)
+    assert assembler.fec_recovered == 2
+
+
+def test_fec_parity_with_other_group_size_is_rejected():
+    assembler = Reassembler()
+    packets = packetize(23, 1, 1, 0, FRAME, 1000)
+    parity = with_parity(packets, 3)
+    # 组长 2 的组 1 校验包 (覆盖 [2, 3]) 与已知组长 3 不一致
+    wrong = with_parity(packets, 2)[1]
+    # 组 2 在 5 个包的帧中不存在
+    beyond = pack_header(23, 1, 1, 0, FLAG_FEC_PARITY, 2, 5, 5, 1000) + make_parity(
+        [b"x"], 3
+    )
+    assert feed(assembler, [parity[0], wrong, beyond, packets[0], packets[1]]) == []
+    assert assembler.fec_recovered == 1  # 组 0 缺的 packets[2]
+    done = feed(assembler, [packets[4]])
+    assert done == []  # 组 1 仍缺 packets[3]，错误的校验包未被采用
+    assert assembler.fec_recovered == 1
+
+
+def test_frame_queue_grows_with_active_sessions():
+    assembler = Reassembler()
+    released = []
+    queue = FrameQueue(released.append, sessions=assembler.session_count)
+    # 单个头显: 无论 max_sessions 多大，只排队 FRAME_QUEUE_PER_SESSION 帧
+    frames = [
+        fb
+        for frame_id in range(FRAME_QUEUE_PER_SESSION + 1)
+        for fb in feed(assembler, packetize(frame_id, 1, 1, 0, FRAME, 1000))
+    ]
+    assert [queue._push(fb) for fb in frames] == [True] * FRAME_QUEUE_PER_SESSION + [
+        False
+    ]
+    assert queue.stats.queue_drops == 1 and released == frames[-1:]
+    # 第二个会话出现后上限翻倍
+    assert feed(assembler, packetize(0, 1, 1, 0, FRAME, 1000, session=1))
+    assert queue.limit() == 2 * FRAME_QUEUE_PER_SESSION
+    # --frame-queue 指定的固定上限不随会话数变化
+    assert FrameQueue(max_frames=3, sessions=assembler.session_count).limit() == 3
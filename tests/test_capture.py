@@ -0,0 +1,52 @@
+"""抓包文件: 记录的端口 / pose 会话往返，早期文件的会话字节为 0"""
+
+import struct
+import time
+
+from vssp.capture import (
+    CAPTURE_MAGIC,
+    CAPTURE_VERSION,
+    FILE_HEADER,
+    KIND_POSE_HTTP,
+    KIND_POSE_WS,
+    KIND_VSSP,
+    CaptureReader,
+    CaptureWriter,
+)
+
+
+def test_records_keep_port_and_session(tmp_path):
+    path = str(tmp_path / "session.vcap")
+    writer = CaptureWriter(path)
+    writer.write(KIND_VSSP, b"VSSP...", 8766)
+    writer.write(KIND_POSE_WS, b"\x01" * 64, 8786, 2)
+    writer.write(KIND_POSE_HTTP, b"{}", 8765, 255)
+    writer.close()
+
+    reader = CaptureReader(path)
+    records = [
+        (kind, port, session, bytes(data)) for _, kind, port, session, data in reader
+    ]
+    assert records == [
+        (KIND_VSSP, 8766, 0, b"VSSP..."),
+        (KIND_POSE_WS, 8786, 2, b"\x01" * 64),
+        (KIND_POSE_HTTP, 8765, 255, b"{}"),
+    ]
+    assert reader.record(1)[3] == 2
+    reader.close()
+
+
+def test_files_without_session_read_as_session_zero(tmp_path):
+    # 早期格式: 记录头的第 14 字节为保留的 0，且没有索引文件
+    path = tmp_path / "old.vcap"
+    old_record = struct.Struct("<dIBxH")
+    now = time.time()
+    path.write_bytes(
+        FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, 0, now)
+        + old_record.pack(now, 2, KIND_POSE_HTTP, 8765)
+        + b"{}"
+    )
+    reader = CaptureReader(str(path))
+    (record,) = list(reader)
+    assert record[1:4] == (KIND_POSE_HTTP, 8765, 0)
+    reader.close()
@@ -0,0 +1,94 @@
+"""video_streamer.py 与 vssp_relay.py: 共用的命令行，以及同一组数据报经 UDP -> WebSocket 得到相同的浏览器包"""
+
+import asyncio
+import socket
+
+import pytest
+import websockets
+
+import video_streamer
+import vssp_relay
+from vssp import EYE_LEFT, EYE_RIGHT, RELAY_HEADER, create_relay, packetize
+
+ENTRY_POINTS = (video_streamer, vssp_relay)
+
+
+def free_port(kind):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def frames():
+    """(期望的浏览器包, 按发送顺序的数据报) 列表；含乱序、重复与非 VSSP 数据报"""
+    result = []
+    for frame_id in range(1, 5):
+        for eye in (EYE_LEFT, EYE_RIGHT):
+            data = bytes(
+                (frame_id * 31 + eye + i) % 256 for i in range(3000 + frame_id)
+            )
+            packets = packetize(frame_id, 1, eye, 0, data, frame_id * 11)
+            if frame_id % 2:
+                packets = packets[::-1]
+            datagrams = [b"noise"] + packets[:1] + packets
+            result.append((RELAY_HEADER.pack(len(data), 1, eye, 0) + data, datagrams))
+    return result
+
+
+async def relay_output(module):
+    """按模块的默认配置启动中继 (端口换成空闲端口)，返回浏览器收到的包"""
+    config = module.make_config(feedback_interval=0)
+    config.udp_port = free_port(socket.SOCK_DGRAM)
+    config.ws_port = free_port(socket.SOCK_STREAM)
+    relay = create_relay(config, lambda msg: None)
+    task = asyncio.create_task(relay.run())
+    received = []
+    try:
+        while relay.rx is None:
+            await asyncio.sleep(0.01)
+        async with websockets.connect(f"ws://127.0.0.1:{config.ws_port}/") as ws:
+            while not relay.broadcaster.clients:
+                await asyncio.sleep(0.01)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+                for _, datagrams in frames():
+                    for datagram in datagrams:
+                        sender.sendto(datagram, ("127.0.0.1", config.udp_port))
+                    received.append(await asyncio.wait_for(ws.recv(), 5))
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    return received, relay.assembler.counters()
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS, ids=lambda m: m.__name__)
+def test_defaults_come_from_the_entry_point(module):
+    parser = module.CLI.build_parser()
+    config = module.CLI.config_from_args(parser, parser.parse_args([]))
+    assert (config.udp_port, config.ws_port) == (module.UDP_PORT, module.WS_PORT)
+    assert config.metrics_port == module.METRICS_PORT
+    assert (config.max_pending, config.max_age, config.window) == (
+        module.MAX_PENDING_FRAMES,
+        module.FRAME_MAX_AGE,
+        module.FRAME_ID_WINDOW,
+    )
+    assert config.static_root == module.STATIC_ROOT
+    # 各会话共用的帧队列默认按活跃会话数放大，而不是按 --max-sessions
+    assert config.frame_queue is None
+    assert config.tls is None
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS, ids=lambda m: m.__name__)
+def test_tls_options_must_be_paired(module):
+    parser = module.CLI.build_parser()
+    with pytest.raises(SystemExit):
+        module.CLI.config_from_args(parser, parser.parse_args(["--tls-cert", "a"]))
+
+
+def test_both_entry_points_send_identical_browser_packets():
+    expected = [packet for packet, _ in frames()]
+    outputs = [asyncio.run(relay_output(module)) for module in ENTRY_POINTS]
+    for received, counters in outputs:
+        assert received == expected
+        assert counters["bad_magic"] == len(expected)
+        assert counters["stale"] == 0
+    assert outputs[0][0] == outputs[1][0]
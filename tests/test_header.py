@@ -0,0 +1,57 @@
+"""VSSP 头编解码与分包"""
+
+from vssp import (
+    HEADER_SIZE,
+    MAX_PAYLOAD,
+    VSSP_MAGIC,
+    pack_header,
+    packetize,
+    parse_header,
+)
+
+
+def test_pack_parse_round_trip():
+    fields = (0xDEADBEEF, 1, 2, 0, 0x03, 7, 9, 5, 123456789, 0xFFFF)
+    packet = pack_header(*fields) + b"hello"
+    assert len(packet) == HEADER_SIZE + 5
+    assert packet[:4] == VSSP_MAGIC
+    assert parse_header(packet) == fields
+
+
+def test_session_defaults_to_zero():
+    header = parse_header(pack_header(1, 0, 0, 0, 0, 0, 1, 0, 0))
+    assert header[-1] == 0
+
+
+def test_parse_rejects_invalid_headers():
+    valid = pack_header(1, 0, 0, 0, 0, 0, 1, 4, 0) + b"data"
+    assert parse_header(valid) is not None
+    assert parse_header(valid[: HEADER_SIZE - 1]) is None
+    assert parse_header(b"XXXX" + valid[4:]) is None
+    # p_count 为 0
+    assert parse_header(pack_header(1, 0, 0, 0, 0, 0, 0, 4, 0) + b"data") is None
+    # p_size 超出数据报
+    assert parse_header(pack_header(1, 0, 0, 0, 0, 0, 1, 5, 0) + b"data") is None
+
+
+def test_packetize_splits_at_max_payload():
+    data = bytes(range(256)) * 10  # 2560 字节 -> 1200 + 1200 + 160
+    packets = packetize(42, 1, 2, 0, data, 1000, session=3)
+    assert len(packets) == 3
+    payloads = []
+    for p_id, packet in enumerate(packets):
+        frame_id, mode, eye, codec, flags, pid, p_count, p_size, ts, session = (
+            parse_header(packet)
+        )
+        assert (frame_id, mode, eye, codec, flags) == (42, 1, 2, 0, 0)
+        assert (pid, p_count, ts, session) == (p_id, 3, 1000, 3)
+        assert p_size == len(packet) - HEADER_SIZE
+        payloads.append(packet[HEADER_SIZE:])
+    assert [len(p) for p in payloads] == [MAX_PAYLOAD, MAX_PAYLOAD, 160]
+    assert b"".join(payloads) == data
+
+
+def test_packetize_empty_frame():
+    packets = packetize(1, 0, 0, 0, b"", 0)
+    assert len(packets) == 1
+    assert parse_header(packets[0])[5:8] == (0, 1, 0)
@@ -0,0 +1,130 @@
+"""adb 手柄输入: 录制的 input_event 字节流经 InputDecoder 离线解码，记录可跨读取块，末尾可不完整"""
+
+import asyncio
+
+import pytest
+
+import monitor
+from monitor import (
+    ABS_BRAKE,
+    ABS_GAS,
+    ABS_X,
+    ABS_Y,
+    EV_ABS,
+    EV_KEY,
+    EV_SYN,
+    INPUT_EVENT,
+    INPUT_EVENT_32,
+    SYN_REPORT,
+    InputDecoder,
+    InputReport,
+)
+from pose_codec import BTN_GRIP, BTN_PRIMARY, BTN_THUMBSTICK, BTN_TRIGGER
+
+EV_MSC = 0x04
+BTN_A = 0x130
+BTN_THUMBL = 0x13D
+
+# 左手柄的一段录制: (sec, usec, type, code, value)
+EVENTS = [
+    (100, 0, EV_ABS, ABS_X, 127),
+    (100, 0, EV_ABS, ABS_Y, -128),
+    (100, 0, EV_SYN, SYN_REPORT, 0),
+    (100, 11000, EV_KEY, BTN_A, 1),
+    (100, 11000, EV_ABS, ABS_GAS, 255),
+    (100, 11000, EV_SYN, SYN_REPORT, 0),
+    (100, 22000, EV_KEY, BTN_THUMBL, 1),
+    (100, 22000, EV_ABS, ABS_BRAKE, 51),
+    (100, 22000, EV_SYN, SYN_REPORT, 0),
+    (100, 33000, EV_KEY, BTN_A, 0),
+    (100, 33000, EV_ABS, ABS_GAS, 0),
+    (100, 33000, EV_ABS, ABS_BRAKE, 204),
+    (100, 33000, EV_SYN, SYN_REPORT, 0),
+    # 未映射的键码与其他事件类型不改变状态
+    (100, 44000, EV_KEY, 0x200, 1),
+    (100, 44000, EV_MSC, 4, 0x90001),
+    (100, 44000, EV_SYN, SYN_REPORT, 0),
+]
+EXPECTED = [
+    InputReport(100.0, 0, 0.0, 0.0, 1.0, -1.0),
+    InputReport(100.011, 1 << BTN_PRIMARY | 1 << BTN_TRIGGER, 1.0, 0.0, 1.0, -1.0),
+    InputReport(
+        100.022,
+        1 << BTN_PRIMARY | 1 << BTN_TRIGGER | 1 << BTN_THUMBSTICK,
+        1.0,
+        0.2,
+        1.0,
+        -1.0,
+    ),
+    InputReport(100.033, 1 << BTN_THUMBSTICK | 1 << BTN_GRIP, 0.0, 0.8, 1.0, -1.0),
+    InputReport(100.044, 1 << BTN_THUMBSTICK | 1 << BTN_GRIP, 0.0, 0.8, 1.0, -1.0),
+]
+# 断开时正在传输的下一条记录
+PARTIAL = INPUT_EVENT.pack(100, 55000, EV_SYN, SYN_REPORT, 0)[:13]
+
+
+def recording(event=INPUT_EVENT, events=EVENTS):
+    return b"".join(event.pack(*e) for e in events)
+
+
+def test_whole_recording():
+    decoder = InputDecoder()
+    assert decoder.feed(recording()) == EXPECTED
+    assert decoder.events == len(EVENTS)
+    assert decoder.pending == b""
+
+
+@pytest.mark.parametrize("chunk", [1, 5, 13, 24, 25, 47, 4096])
+def test_records_split_across_chunks(chunk):
+    stream = recording() + PARTIAL
+    decoder = InputDecoder()
+    reports = []
+    for i in range(0, len(stream), chunk):
+        reports += decoder.feed(stream[i : i + chunk])
+    assert reports == EXPECTED
+    assert decoder.events == len(EVENTS)
+    # 末尾不完整的记录留待下一块，不产生报告
+    assert decoder.pending == PARTIAL
+
+
+def test_partial_record_completes_in_next_read():
+    decoder = InputDecoder()
+    decoder.feed(recording() + PARTIAL)
+    rest = INPUT_EVENT.pack(100, 55000, EV_SYN, SYN_REPORT, 0)[len(PARTIAL) :]
+    assert decoder.feed(rest) == [EXPECTED[-1]._replace(time=100.055)]
+    assert decoder.pending == b""
+
+
+def test_reset_drops_partial_record_and_releases_buttons():
+    decoder = InputDecoder()
+    decoder.feed(recording() + PARTIAL)
+    decoder.reset()
+    assert decoder.pending == b""
+    assert decoder.report(0.0) == InputReport(0.0, 0, 0.0, 0.0, 0.0, 0.0)
+    assert decoder.feed(recording(events=EVENTS[:3])) == EXPECTED[:1]
+
+
+def test_replay_file_reads_in_small_chunks(tmp_path, monkeypatch):
+    path = tmp_path / "left.evdev"
+    path.write_bytes(recording() + PARTIAL)
+    monkeypatch.setattr(monitor, "READ_SIZE", 7)
+    reports = []
+    asyncio.run(
+        monitor.replay_file(
+            "left", str(path), InputDecoder(), lambda side, r: reports.append((side, r))
+        )
+    )
+    assert reports == [("left", report) for report in EXPECTED]
+
+
+def test_32_bit_events_and_device_ranges():
+    # 32 位用户空间的 input_event，getevent -lp 给出的摇杆范围 0..1023
+    decoder = InputDecoder({ABS_X: (0, 1023), ABS_Y: (0, 1023)}, INPUT_EVENT_32)
+    events = [
+        (5, 500000, EV_ABS, ABS_X, 0),
+        (5, 500000, EV_ABS, ABS_Y, 1023),
+        (5, 500000, EV_SYN, SYN_REPORT, 0),
+    ]
+    stream = recording(INPUT_EVENT_32, events)
+    reports = decoder.feed(stream[:10]) + decoder.feed(stream[10:])
+    assert reports == [InputReport(5.5, 0, 0.0, 0.0, -1.0, 1.0)]
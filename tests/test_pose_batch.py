@@ -0,0 +1,190 @@
+"""pose_batch: 同一段多头显抓包经实时路径 (fast_receiver) 与 PoseBatch，发往 Unity 的记录逐字节相同"""
+
+import json
+import math
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import fast_receiver  # noqa: E402
+from pose_batch import PoseBatch  # noqa: E402
+from pose_codec import (  # noqa: E402
+    BTN_THUMBSTICK,
+    FLAG_UNITY_SPACE,
+    POSE_MAGIC,
+    POSE_RECORD,
+    SESSION_SHIFT,
+    is_pose_records,
+    mask_to_buttons,
+)
+from pose_session import SessionTable  # noqa: E402
+from vssp.capture import KIND_POSE_HTTP, KIND_POSE_WS, KIND_VSSP  # noqa: E402
+
+
+class Clock:
+    """替换 fast_receiver 中的 time 模块: time() 为当前消息的到达时间"""
+
+    def __init__(self, perf_counter):
+        self.now = 0.0
+        self.perf_counter = perf_counter
+
+    def time(self):
+        return self.now
+
+
+class Collector:
+    """替换 unity_sender: 按顺序收集 (目标端口, 数据报)"""
+
+    def __init__(self):
+        self.packets = []
+
+    def sendto(self, data, addr):
+        self.packets.append((addr[1], data))
+
+
+def quat(rnd):
+    x, y, z, w = (rnd.gauss(0, 1) for _ in range(4))
+    n = math.sqrt(x * x + y * y + z * z + w * w)
+    return x / n, y / n, z / n, w / n
+
+
+def record(rnd, device, seq, t, flags, mask=0):
+    return POSE_RECORD.pack(
+        POSE_MAGIC,
+        1,
+        device,
+        flags,
+        seq,
+        int(t * 1000) & 0xFFFFFFFF,
+        rnd.uniform(-1, 1),
+        rnd.uniform(0, 2),
+        rnd.uniform(-1, 1),
+        *quat(rnd),
+        mask,
+        rnd.random(),
+        rnd.random(),
+        rnd.uniform(-1, 1),
+        rnd.uniform(-1, 1),
+    )
+
+
+def json_pose(rnd, device, mask=0, session=None):
+    x, y, z, w = quat(rnd)
+    data = {
+        "type": "head" if device == 0 else "controller",
+        "handedness": ("", "left", "right")[device],
+        "position": {"x": rnd.uniform(-1, 1), "y": rnd.uniform(0, 2), "z": 0.5},
+        "orientation": {"x": x, "y": y, "z": z, "w": w},
+    }
+    if device:
+        data["buttons"] = mask_to_buttons(mask, rnd.random(), rnd.random())
+        data["axes"] = [rnd.uniform(-1, 1), rnd.uniform(-1, 1)]
+    if session is not None:
+        data["session"] = session
+    return data
+
+
+def capture(headsets=(0, 2, 5), steps=400, seed=11):
+    """多头显抓包 (t, kind, port, session, payload): 各头显的会话分别来自连接 ?session=N、
+    记录 flags 高 8 位或 JSON "session" 字段；只在部分会话中出现摇杆重置与休眠间隔"""
+    rnd = random.Random(seed)
+    messages = []
+    seq = {(h, d): rnd.randrange(1 << 32) for h in headsets for d in range(3)}
+    t = 1.79e9
+    for step in range(steps):
+        for h in headsets:
+            t += 1 / 72 / len(headsets)
+            if h == 2 and step == steps // 2:
+                t += 4.0  # 所有会话都超过 SLEEP_RESET_SECS
+            if h == 5 and 100 <= step < 110:
+                continue  # 只有会话 5 中断，不超过 SLEEP_RESET_SECS
+            masks = [0] + [
+                (1 << BTN_THUMBSTICK) if h == 2 and step % 97 == 50 else 1
+                for _ in range(2)
+            ]
+            if step % 7 == 3:
+                # JSON: 会话 5 用 "session" 字段，其余用连接会话
+                batch = [
+                    json_pose(rnd, d, masks[d], h if h == 5 else None) for d in range(3)
+                ]
+                connection = 0 if h == 5 else h
+                payload = json.dumps(batch).encode()
+                messages.append((t, KIND_POSE_HTTP, 8765, connection, payload))
+                continue
+            records = []
+            for d in range(3):
+                seq[h, d] = (seq[h, d] + 1) & 0xFFFFFFFF
+                # 会话 2 在记录 flags 中带会话 id，其余取连接会话
+                flags = rnd.choice((0, FLAG_UNITY_SPACE))
+                if h == 2:
+                    flags |= h << SESSION_SHIFT
+                records.append(record(rnd, d, seq[h, d], t, flags, masks[d]))
+            connection = 0 if h == 2 else h
+            messages.append((t, KIND_POSE_WS, 8786, connection, b"".join(records)))
+        # 同一抓包中的 VSSP 数据报 (内容恰好像 pose 记录) 必须被跳过
+        if step % 50 == 0:
+            stray = record(rnd, 0, 0, t, FLAG_UNITY_SPACE)
+            messages.append((t, KIND_VSSP, 8766, 0, stray))
+    return messages
+
+
+def live_packets(messages, monkeypatch, max_sessions=16):
+    """实时路径发往 Unity 的 (端口, 数据报)，fast_receiver 按默认配置 (binary 输出，无滤波 / 预测)"""
+    clock = Clock(fast_receiver.time.perf_counter)
+    collector = Collector()
+    monkeypatch.setattr(fast_receiver, "time", clock)
+    monkeypatch.setattr(fast_receiver, "unity_sender", collector)
+    monkeypatch.setattr(
+        fast_receiver,
+        "sessions",
+        SessionTable(fast_receiver.UNITY_PORT, max_sessions=max_sessions),
+    )
+    for t, kind, _, connection, payload in messages:
+        if kind == KIND_VSSP:
+            continue
+        clock.now = t
+        if is_pose_records(payload):
+            fast_receiver.handle_pose_records(payload, connection)
+            continue
+        for data in json.loads(payload):
+            fast_receiver.handle_pose(data, connection)
+    return collector.packets
+
+
+def batch_records(messages, max_sessions=16):
+    batch = PoseBatch.from_messages(messages, max_sessions)
+    batch.to_unity()
+    return batch, batch.unity_records(batch.origins(fast_receiver.SLEEP_RESET_SECS))
+
+
+def test_multi_session_capture_is_bit_identical(monkeypatch):
+    messages = capture()
+    packets = live_packets(messages, monkeypatch)
+    batch, records = batch_records(messages)
+
+    assert len(records) == len(packets)
+    assert records.tobytes() == b"".join(data for _, data in packets)
+    # 每个会话的记录发往该会话的 Unity 端口
+    table = SessionTable(fast_receiver.UNITY_PORT)
+    ports = [table.unity_port_of(int(s)) for s in batch.session]
+    assert ports == [port for port, _ in packets]
+    assert sorted(set(batch.session.tolist())) == [0, 2, 5]
+
+
+def test_sessions_over_the_limit_are_dropped(monkeypatch):
+    messages = capture()
+    packets = live_packets(messages, monkeypatch, max_sessions=2)
+    batch, records = batch_records(messages, max_sessions=2)
+
+    assert records.tobytes() == b"".join(data for _, data in packets)
+    assert sorted(set(batch.session.tolist())) == [0, 2]
+
+
+def test_plain_messages_use_session_zero():
+    messages = [(t, payload) for t, kind, _, _, payload in capture(headsets=(0,))]
+    batch = PoseBatch.from_messages(messages)
+    # (t, payload) 不带类型: 像 pose 记录的 VSSP 数据报也会被解码，只有抓包记录能按类型过滤
+    assert len(batch) == len(PoseBatch.from_messages(capture(headsets=(0,)))) + 8
+    assert set(batch.session.tolist()) == {0}
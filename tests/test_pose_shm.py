@@ -0,0 +1,100 @@
+"""共享内存 pose 块: 多个写入线程时，另一进程的读取方只看到完整的记录"""
+
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from pose_codec import POSE_MAGIC, POSE_RECORD, POSE_VERSION
+from pose_shm import DEVICE_COUNT, PoseBlockReader, PoseBlockWriter
+
+WRITERS = 4
+WRITES = 2000
+
+
+def record(device, n):
+    """所有数值字段都取 n 的记录，读到混合的值即为撕裂"""
+    v = float(n)
+    return POSE_RECORD.pack(
+        POSE_MAGIC, POSE_VERSION, device, 0, n, n, v, v, v, v, v, v, v, n, v, v, v, v
+    )
+
+
+class YieldingBuffer:
+    """包装写入方的 buf: 记录分两半复制，中间让出 GIL
+
+    模拟复制记录的途中切换到另一个写入线程 (CPython 在一次切片赋值内部不会切换线程)。
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+
+    def __setitem__(self, key, value):
+        middle = (key.start + key.stop) // 2
+        half = middle - key.start
+        self.buf[key.start : middle] = value[:half]
+        time.sleep(0)
+        self.buf[middle : key.stop] = value[half:]
+
+
+def torn(fields):
+    _, _, _, _, seq, ts, *values = fields
+    return ts != seq or any(value != seq for value in values)
+
+
+def read_until_stopped(path, stop, result):
+    reader = PoseBlockReader(path)
+    reads = bad = 0
+    last = 0
+    while not stop.is_set():
+        seq, poses = reader.read()
+        reads += 1
+        if seq & 1 or seq < last:
+            bad += 1
+        last = seq
+        bad += sum(1 for fields in poses if fields is not None and torn(fields))
+    reader.close()
+    result.put((reads, bad))
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_concurrent_writers_publish_whole_records(tmp_path):
+    path = str(tmp_path / "pose")
+    writer = PoseBlockWriter(path)
+    start_seq = writer.seq
+    writer.buf = YieldingBuffer(writer.buf)
+    ctx = multiprocessing.get_context("fork")
+    stop, result = ctx.Event(), ctx.Queue()
+    reader = ctx.Process(target=read_until_stopped, args=(path, stop, result))
+    reader.start()
+
+    def write(first):
+        for i in range(WRITES):
+            n = first + i
+            writer.write(n % DEVICE_COUNT, record(n % DEVICE_COUNT, n))
+
+    threads = [
+        threading.Thread(target=write, args=(w * WRITES,)) for w in range(WRITERS)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    reads, bad = result.get(timeout=10)
+    reader.join(10)
+
+    assert reads > 0
+    assert bad == 0
+    # 每次写入恰好 +2: 没有两个写者发布同一个序号
+    assert writer.seq == start_seq + 2 * WRITERS * WRITES
+    check = PoseBlockReader(path)
+    assert check.seq == writer.seq
+    _, poses = check.read()
+    assert all(fields is not None and not torn(fields) for fields in poses)
+    check.close()
+    writer.buf = writer.buf.buf
+    writer.close()
@@ -0,0 +1,116 @@
+"""设备状态 seqlock: 多个写入线程 (样本 / 摇杆重置 / 手柄输入) 时，读取方得到一致的样本 + 原点"""
+
+import sys
+import threading
+
+import pose_state
+from pose_state import DeviceState, StateStore
+
+WRITERS = 3
+UPDATES = 20000
+
+
+def sample(v):
+    """位置、seq、ts_ms 都取 v 的样本，读到混合的值即为不一致"""
+    return (1.0, 60.0, v, v, v, 0.0, 0.0, 0.0, 1.0, 0, 0.0, 0.0, 0.0, 0.0, v, v)
+
+
+def consistent(snap):
+    return (
+        snap.px == snap.py == snap.pz == snap.seq == snap.ts_ms
+        and snap.ox == snap.oy == snap.oz
+        and (not snap.version or snap.has_origin)
+    )
+
+
+def test_concurrent_writers_and_recenter():
+    state = DeviceState("left")
+    stop = threading.Event()
+    bad = []
+    reads = 0
+
+    def write(first):
+        for i in range(UPDATES):
+            state.update(*sample(float(first + i)))
+
+    def recenter():
+        while not stop.is_set():
+            state.recenter()
+            state.set_inputs(1, 0.5, 0.5, 0.0, 0.0)
+
+    def read():
+        nonlocal reads
+        while not stop.is_set():
+            snap = state.snapshot()
+            reads += 1
+            if not consistent(snap):
+                bad.append(snap)
+
+    # 频繁切换线程，让写入尽量交错
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        others = [threading.Thread(target=recenter), threading.Thread(target=read)]
+        writers = [
+            threading.Thread(target=write, args=(w * UPDATES,)) for w in range(WRITERS)
+        ]
+        for t in others + writers:
+            t.start()
+        for t in writers:
+            t.join()
+        stop.set()
+        for t in others:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert reads > 0
+    assert bad == []
+    # version 的自增不丢失
+    assert state.version == WRITERS * UPDATES
+    assert state.writes % 2 == 0
+
+
+def test_recenter_uses_latest_position():
+    store = StateStore(("head", "left", "right"))
+    store["head"].update(*sample(1.0))
+    store["left"].update(*sample(2.0))
+    store["head"].update(*sample(5.0))
+    store.recenter()
+    assert store["head"].origin() == (5.0, 5.0, 5.0)
+    assert store["left"].origin() == (2.0, 2.0, 2.0)
+    # 尚无数据的设备不设置原点
+    assert not store["right"].has_origin
+    # 休眠唤醒 (超过 max_gap): 本样本成为新原点，返回值即新原点
+    assert store["head"].update(100.0, 60.0, *sample(7.0)[2:]) == (7.0, 7.0, 7.0)
+
+
+class RecenterDuringWrite:
+    """替换 pose_state.ORIGIN: update() 写入新原点后，另一线程立即尝试摇杆重置"""
+
+    def __init__(self, origin, state):
+        self.origin = origin
+        self.state = state
+        self.thread = None
+
+    def __getattr__(self, name):
+        return getattr(self.origin, name)
+
+    def pack_into(self, *args):
+        self.origin.pack_into(*args)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.state.recenter)
+            self.thread.start()
+            # 没有锁时重置在此完成；有锁时要等 update() 写完样本
+            self.thread.join(0.2)
+
+
+def test_recenter_cannot_land_inside_update(monkeypatch):
+    state = DeviceState("head")
+    state.update(*sample(1.0))
+    racer = RecenterDuringWrite(pose_state.ORIGIN, state)
+    monkeypatch.setattr(pose_state, "ORIGIN", racer)
+    # 休眠唤醒: update() 以本样本为新原点；摇杆重置必须看到本样本，而不是休眠前的位置
+    state.update(100.0, 60.0, *sample(7.0)[2:])
+    racer.thread.join()
+    assert state.origin() == (7.0, 7.0, 7.0)
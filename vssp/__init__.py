@@ -0,0 +1,51 @@
+"""VSSP v1.0 核心库: 头编解码 / 帧重组 / FEC 与 NACK / 质量反馈 / 扇出广播 / UDP 接收 / 抓包回放，
+以及网页静态资源服务
+
+video_streamer.py 与 vssp_relay.py 都只是 Relay 的不同配置 (端口与重组表上限，命令行见 vssp/cli.py)。
+"""
+
+from .assembler import FrameBuffer, FramePool, Reassembler, SessionStream
+from .capture import CaptureReader, CaptureWriter
+from .cli import RelayCli, serve
+from .fanout import Broadcaster, ClientQueue, SharedFrame
+from .feedback import (
+    FEEDBACK_INTERVAL,
+    Feedback,
+    QualityMonitor,
+    parse_feedback,
+    quality_ladder,
+)
+from .frames import FrameTable, frame_before
+from .header import (
+    CODEC_MJPEG,
+    EYE_LEFT,
+    EYE_MONO,
+    EYE_RIGHT,
+    HEADER_SIZE,
+    MAX_PAYLOAD,
+    MAX_SESSIONS,
+    MODE_MONO,
+    MODE_STEREO,
+    RELAY_HEADER,
+    RELAY_HEADER_SIZE,
+    TIMING_HEADER,
+    TIMING_HEADER_SIZE,
+    VSSP_HEADER,
+    VSSP_MAGIC,
+    pack_header,
+    packetize,
+    parse_header,
+)
+from .relay import Relay, RelayConfig, query_session
+from .static import AssetCache, make_ssl_context, serve_static
+from .timing import SenderClock, StageLatency, answer_clock_probe
+from .transport import (
+    AsyncReceiver,
+    BatchReceiver,
+    RxReporter,
+    RxStats,
+    attach_shard_filter,
+    make_receiver,
+    open_udp_socket,
+)
+from .workers import ShardedRelay, create_relay
@@ -0,0 +1,356 @@
+import threading
+import time
+
+from .fec import (
+    FLAG_FEC_PARITY,
+    FLAG_RETRANSMIT,
+    handle_fec_packet,
+    nack_due,
+    send_nack,
+)
+from .frames import FrameTable
+from .header import (
+    FRAME_PREFIX_SIZE,
+    HEADER_SIZE,
+    MAX_PAYLOAD,
+    MAX_SESSIONS,
+    RELAY_HEADER,
+    TIMING_HEADER,
+    TIMING_HEADER_SIZE,
+    TIMING_MAGIC,
+    VSSP_MAGIC,
+    parse_header,
+)
+from .timing import SenderClock
+
+# 帧缓冲按此粒度向上取整，便于不同大小的帧复用同一块内存
+POOL_GRANULARITY = 64 * 1024
+POOL_MAX_SLOTS = 16
+
+
+class FramePool:
+    """可复用的帧缓冲池，避免每帧分配/拼接大块内存"""
+
+    # 单帧缓冲的上限 (None 表示不限，见 workers.SlotPool)
+    max_size = None
+
+    def __init__(self, max_slots=POOL_MAX_SLOTS):
+        self.max_slots = max_slots
+        self.free = []
+        # 接收线程 acquire，asyncio 广播完成后 release
+        self.lock = threading.Lock()
+
+    def acquire(self, size):
+        # 取容量足够的最小空闲缓冲
+        with self.lock:
+            best = -1
+            for i, buf in enumerate(self.free):
+                if len(buf) >= size and (best < 0 or len(buf) < len(self.free[best])):
+                    best = i
+            if best >= 0:
+                return self.free.pop(best)
+        size = -(-size // POOL_GRANULARITY) * POOL_GRANULARITY
+        return bytearray(size)
+
+    def release(self, buf):
+        with self.lock:
+            if len(self.free) < self.max_slots:
+                self.free.append(buf)
+
+
+class FrameBuffer:
+    """单帧重组缓冲: 前 47 字节预留给延迟扩展头 + Web Relay 头，payload 按 p_id * MAX_PAYLOAD 就地写入"""
+
+    def __init__(self, frame_id, eye, packet_count, mode, codec, buf, session=0):
+        self.frame_id = frame_id
+        self.eye = eye
+        self.session = session
+        self.packet_count = packet_count
+        self.mode = mode
+        self.codec = codec
+        self.buf = buf
+        self.view = memoryview(buf)
+        self.size = packet_count * MAX_PAYLOAD  # 收到最后一包后修正为实际大小
+        self.received_mask = bytearray(packet_count)
+        self.received_count = 0
+        self.packet = None
+        self.timed = None
+        self.ts = 0  # 发送端 timestamp_ms
+        self.fec = None
+        self.addr = None
+        self.nacks = 0
+        self.last_nack = 0.0
+        self.first_time = self.last_update = time.time()
+        self.done_time = 0.0
+
+    def write(self, p_id, payload):
+        """写入一个分包，返回是否为新包"""
+        if p_id >= self.packet_count or self.received_mask[p_id]:
+            return False
+        p_size = len(payload)
+        if p_size > MAX_PAYLOAD or (
+            p_id < self.packet_count - 1 and p_size != MAX_PAYLOAD
+        ):
+            return False
+        offset = FRAME_PREFIX_SIZE + p_id * MAX_PAYLOAD
+        self.view[offset : offset + p_size] = payload
+        if p_id == self.packet_count - 1:
+            self.size = p_id * MAX_PAYLOAD + p_size
+        self.received_mask[p_id] = 1
+        self.received_count += 1
+        return True
+
+    def payload(self, p_id):
+        """已收到分包的 payload 视图"""
+        offset = FRAME_PREFIX_SIZE + p_id * MAX_PAYLOAD
+        if p_id < self.packet_count - 1:
+            return self.view[offset : offset + MAX_PAYLOAD]
+        return self.view[offset : FRAME_PREFIX_SIZE + self.size]
+
+    def seal(self, clock_offset=0, clock_flags=0):
+        """写入 Web Relay 头与延迟扩展头，返回可直接发送的整帧视图 (无拷贝)
+
+        self.timed 为带延迟扩展头的视图，交给 WebSocket 前由中继填入发送时间。
+        """
+        RELAY_HEADER.pack_into(
+            self.buf, TIMING_HEADER_SIZE, self.size, self.mode, self.eye, self.codec
+        )
+        TIMING_HEADER.pack_into(
+            self.buf,
+            0,
+            TIMING_MAGIC,
+            self.ts,
+            clock_offset,
+            clock_flags,
+            self.session,
+            self.first_time * 1000,
+            self.done_time * 1000,
+            0.0,
+        )
+        self.timed = self.view[: FRAME_PREFIX_SIZE + self.size]
+        return self.timed[TIMING_HEADER_SIZE:]
+
+    def detach(self):
+        """释放视图并交还底层缓冲"""
+        buf = self.buf
+        self.view.release()
+        self.view = None
+        self.buf = None
+        return buf
+
+
+class SessionStream:
+    """一个会话 (一台头显的发送端) 的重组状态: frame_id 序列、重组表与发送端时钟各自独立"""
+
+    def __init__(self, session, frames, route):
+        self.session = session
+        self.frames = frames
+        self.latest = {}  # Key: eye -> 最新 frame_id
+        self.clock = SenderClock(route)
+        self.addr = None  # 最近的发送端地址 (VCLK 回包按地址找回会话)
+        self.assembled = 0
+        self.oversize = {}  # Key: eye -> 最近因超出缓冲上限而丢弃的 frame_id
+
+
+class Reassembler:
+    """VSSP 重组引擎: 数据报 -> 完整帧 (含 FEC 恢复与 NACK 请求)
+
+    handle_packet 在接收线程 (或 asyncio 逐包接收) 中调用；返回的帧归调用方所有，
+    发送完成后须调用 release_frame 归还缓冲。
+    按头中的 session 分别重组 (SessionStream)，最多 max_sessions 个会话。
+    """
+
+    def __init__(
+        self,
+        max_pending=30,
+        max_age=0.2,
+        window=64,
+        pool=None,
+        route=0,
+        max_sessions=MAX_SESSIONS,
+    ):
+        # 未指定缓冲池时自建，空闲缓冲数随会话数增长
+        self.own_pool = pool is None
+        self.pool = pool or FramePool()
+        self.table_args = (max_pending, max_age, window)
+        self.route = route
+        self.max_sessions = max_sessions
+        self.streams = {}  # Key: session -> SessionStream
+        self.sock = None  # 用于回发 NACK
+        self.nack = False
+        self.session_drops = 0
+        self.fec_recovered = 0
+        self.nack_requested = 0
+        self.retransmits = 0
+        self.pool_drops = 0
+        self.oversize_drops = 0
+        # 指标计数 (只由接收线程写入)
+        self.bad_magic = 0
+        self.malformed = 0
+        self.bad_p_id = 0
+        self.assembled = [0] * 256  # 按 eye 统计完成的帧
+
+    def stream(self, session):
+        """会话的重组状态 (首个数据报到达时创建)，超出 max_sessions 时返回 None"""
+        stream = self.streams.get(session)
+        if stream is None:
+            if len(self.streams) >= self.max_sessions:
+                return None
+            frames = FrameTable(*self.table_args, self.evict)
+            stream = self.streams[session] = SessionStream(session, frames, self.route)
+            if self.own_pool:
+                self.pool.max_slots = POOL_MAX_SLOTS * len(self.streams)
+        return stream
+
+    def session_count(self):
+        """活跃会话数 (接收线程交给事件循环的帧队列按此放大)"""
+        return len(self.streams)
+
+    def evict(self, fb):
+        # 未完成即被淘汰的帧；已完成的帧归广播方所有，由 release_frame 归还
+        self.pool.release(fb.detach())
+
+    def release_frame(self, fb):
+        fb.packet = None
+        fb.timed = None
+        self.pool.release(fb.detach())
+
+    def handle_packet(self, data, addr):
+        """重组一个 VSSP 数据报，帧完整时返回该帧"""
+        header = parse_header(data)
+        if header is None:
+            if data[:4] == VSSP_MAGIC:
+                self.malformed += 1
+            # 非 VSSP 数据报: 可能是发送端的 VCLK 时钟回包
+            elif not self.handle_clock(data, addr):
+                self.bad_magic += 1
+            return None
+        frame_id, mode, eye, codec, flags, p_id, p_count, p_size, ts, session = header
+        stream = self.streams.get(session) or self.stream(session)
+        if stream is None:
+            self.session_drops += 1
+            return None
+        frames = stream.frames
+
+        now = time.time()
+        fb = frames.get(frame_id, eye)
+        if fb is None:
+            # 已显示过更新的帧，或远远落后的单个包: 迟到 / 重复的包直接丢弃 (在占用缓冲之前)
+            if not frames.admit(frame_id, eye):
+                return None
+            size = FRAME_PREFIX_SIZE + p_count * MAX_PAYLOAD
+            max_size = self.pool.max_size
+            if max_size is not None and size > max_size:
+                # 帧大于共享内存槽位 (--shm-slot-size)，按帧计数
+                if stream.oversize.get(eye) != frame_id:
+                    stream.oversize[eye] = frame_id
+                    self.oversize_drops += 1
+                return None
+            buf = self.pool.acquire(size)
+            if buf is None:
+                # 有界缓冲池 (共享内存槽位) 已用尽
+                self.pool_drops += 1
+                return None
+            fb = FrameBuffer(frame_id, eye, p_count, mode, codec, buf, session)
+            fb.ts = ts
+            stream.addr = addr
+            stream.clock.observe(ts, now)
+            stream.clock.probe(self.sock, addr, now)
+            if self.nack and stream.latest.get(eye, frame_id) != frame_id:
+                # 新帧开始: 同一 eye 的旧帧不会再有新包，立即请求重传
+                self.request_retransmits(frames, eye, frame_id, now)
+            stream.latest[eye] = frame_id
+            # 登记新帧，同时淘汰过期 / 超出窗口的旧帧
+            frames.add(frame_id, eye, fb, now)
+        elif fb.packet_count != p_count:
+            self.malformed += 1
+            return None
+        fb.addr = addr
+
+        payload = data[HEADER_SIZE : HEADER_SIZE + p_size]
+        if flags & FLAG_FEC_PARITY:
+            # 校验包: 组内只缺一包时直接恢复，无需等待重传
+            self.fec_recovered += handle_fec_packet(fb, p_id, flags, payload)
+        elif p_id >= p_count:
+            self.bad_p_id += 1
+        elif fb.write(p_id, payload):
+            # 直接拷贝到帧缓冲中的最终位置 (唯一一次拷贝)
+            fb.last_update = now
+            if flags & FLAG_RETRANSMIT:
+                self.retransmits += 1
+            if fb.fec is not None:
+                self.fec_recovered += handle_fec_packet(fb, p_id, flags, payload)
+
+        if (
+            self.nack
+            and p_id == p_count - 1
+            and fb.received_count < fb.packet_count
+            and nack_due(fb, now)
+        ):
+            # 最后一包已到但帧不完整: 发送端已发完该帧，请求重传
+            self.nack_requested += send_nack(self.sock, addr, fb, now)
+
+        # Check completion logic
+        if fb.received_count == fb.packet_count:
+            # Push to web clients straight from the reassembly buffer
+            frames.complete(frame_id, eye)
+            fb.done_time = now
+            self.assembled[eye] += 1
+            stream.assembled += 1
+            fb.packet = fb.seal(stream.clock.offset, stream.clock.flags(now))
+            return fb
+        return None
+
+    def handle_clock(self, data, addr):
+        """VCLK 回包交给向该地址发出探测的会话"""
+        now = time.time()
+        for stream in self.streams.values():
+            if stream.addr == addr and stream.clock.handle(data, now):
+                return True
+        return False
+
+    def request_retransmits(self, frames, eye, frame_id, now):
+        for fb in frames.values():
+            if (
+                fb.eye == eye
+                and fb.frame_id != frame_id
+                and fb.addr is not None
+                and nack_due(fb, now)
+            ):
+                self.nack_requested += send_nack(self.sock, fb.addr, fb, now)
+
+    def counters(self):
+        """指标快照 (采集线程读取)
+
+        接收线程可能同时创建新会话: 先复制 streams 再遍历，避免 "dictionary changed size during iteration"。
+        """
+        streams = list(self.streams.items())
+        return {
+            "bad_magic": self.bad_magic,
+            "malformed": self.malformed,
+            "bad_p_id": self.bad_p_id,
+            "expired": sum(stream.frames.expired for _, stream in streams),
+            "stale": sum(stream.frames.stale for _, stream in streams),
+            "sender_restarts": sum(stream.frames.restarts for _, stream in streams),
+            "fec_recovered": self.fec_recovered,
+            "nack_requested": self.nack_requested,
+            "retransmits": self.retransmits,
+            "pool_drops": self.pool_drops,
+            "oversize_drops": self.oversize_drops,
+            "session_drops": self.session_drops,
+            "assembled": {eye: n for eye, n in enumerate(self.assembled) if n},
+            "sessions": {s: stream.assembled for s, stream in streams},
+            "session_expired": {s: stream.frames.expired for s, stream in streams},
+            "senders": {s: stream.addr for s, stream in streams},
+        }
+
+    def report(self):
+        counters = self.counters()
+        line = (
+            f"FEC recovered {self.fec_recovered} | NACK requested {self.nack_requested} "
+            f"retransmits {self.retransmits} | frames expired {counters['expired']} "
+            f"stale packets {counters['stale']}"
+        )
+        if len(self.streams) > 1 or self.session_drops:
+            line += f" | sessions {len(self.streams)} dropped over limit {self.session_drops}"
+        return line
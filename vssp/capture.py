@@ -0,0 +1,161 @@
+"""会话抓包: 追加写入带时间戳的原始 pose 消息 / VSSP 数据报，回放时 mmap 零拷贝读取
+
+文件格式 (little-endian):
+    文件头 16 字节: 4(magic "VCAP"), 2(version), 2(reserved), 8(double 创建时间 epoch s)
+    记录: 8(double 到达时间 epoch s), 4(length), 1(kind), 1(session), 2(原目标端口), length 字节原始数据
+          session: pose 消息所属连接的 ?session=N (回放时带回)；VSSP 数据报的会话在其头中，此处为 0。
+          早期文件此字节为保留的 0，即默认会话。
+索引文件 <path>.idx: 每条记录一个 u64 记录偏移，与记录同步追加；缺失或不完整时扫描重建。
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+CAPTURE_MAGIC = b"VCAP"
+CAPTURE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHd")
+RECORD = struct.Struct("<dIBBH")
+INDEX_ENTRY = struct.Struct("<Q")
+
+KIND_VSSP = 0  # VSSP 数据报 (UDP)
+KIND_POSE_HTTP = 1  # pose HTTP POST 请求体
+KIND_POSE_WS = 2  # pose WebSocket 二进制消息
+KIND_POSE_WS_TEXT = 3  # pose WebSocket 文本消息 (UTF-8)
+KIND_NAMES = {
+    KIND_VSSP: "vssp",
+    KIND_POSE_HTTP: "pose-http",
+    KIND_POSE_WS: "pose-ws",
+    KIND_POSE_WS_TEXT: "pose-ws-text",
+}
+
+WRITE_BUFFER = 1024 * 1024
+FLUSH_INTERVAL = 1.0
+
+
+class CaptureWriter:
+    """追加写入抓包文件，可被多个线程同时调用"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = os.path.getsize(path) if os.path.exists(path) else 0
+        self.file = open(path, "ab", buffering=WRITE_BUFFER)
+        self.index = open(path + ".idx", "ab", buffering=WRITE_BUFFER)
+        if self.offset == 0:
+            self.file.write(
+                FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, 0, time.time())
+            )
+            self.offset = FILE_HEADER.size
+        self.lock = threading.Lock()
+        self.records = 0
+        self.last_flush = time.time()
+
+    def write(self, kind, data, port=0, session=0):
+        now = time.time()
+        with self.lock:
+            self.file.write(RECORD.pack(now, len(data), kind, session, port))
+            self.file.write(data)
+            self.index.write(INDEX_ENTRY.pack(self.offset))
+            self.offset += RECORD.size + len(data)
+            self.records += 1
+            if now - self.last_flush > FLUSH_INTERVAL:
+                self._flush()
+                self.last_flush = now
+
+    def _flush(self):
+        # 先落数据再落索引，索引项总是指向完整记录
+        self.file.flush()
+        self.index.flush()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.file.close()
+            self.index.close()
+
+
+class CaptureReader:
+    """mmap 读取抓包文件，迭代得到 (time, kind, port, session, payload)，payload 为映射上的 memoryview"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+        magic, version, _, self.created = FILE_HEADER.unpack_from(self.view, 0)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"{path}: not a VSSP capture file")
+        self.offsets = self._load_index()
+
+    def _load_index(self):
+        size = len(self.view)
+        try:
+            with open(self.path + ".idx", "rb") as f:
+                raw = f.read()
+        except OSError:
+            raw = b""
+        offsets = []
+        for (offset,) in INDEX_ENTRY.iter_unpack(raw[: len(raw) // 8 * 8]):
+            if offset + RECORD.size > size:
+                break
+            _, length, _, _, _ = RECORD.unpack_from(self.view, offset)
+            if offset + RECORD.size + length > size:
+                break
+            offsets.append(offset)
+        # 索引缺失 / 落后于数据文件时从最后一个已知记录继续扫描
+        offset = (
+            offsets[-1] + RECORD.size + RECORD.unpack_from(self.view, offsets[-1])[1]
+            if offsets
+            else FILE_HEADER.size
+        )
+        while offset + RECORD.size <= size:
+            _, length, _, _, _ = RECORD.unpack_from(self.view, offset)
+            if offset + RECORD.size + length > size:
+                break
+            offsets.append(offset)
+            offset += RECORD.size + length
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def record(self, i):
+        offset = self.offsets[i]
+        t, length, kind, session, port = RECORD.unpack_from(self.view, offset)
+        start = offset + RECORD.size
+        return t, kind, port, session, self.view[start : start + length]
+
+    def __iter__(self):
+        view = self.view
+        unpack_from = RECORD.unpack_from
+        header_size = RECORD.size
+        for offset in self.offsets:
+            t, length, kind, session, port = unpack_from(view, offset)
+            start = offset + header_size
+            yield t, kind, port, session, view[start : start + length]
+
+    def duration(self):
+        if not self.offsets:
+            return 0.0
+        return self.record(len(self) - 1)[0] - self.record(0)[0]
+
+    def close(self):
+        self.view.release()
+        try:
+            self.mm.close()
+        except BufferError:
+            pass  # 仍有 payload 视图未释放，随进程退出
+        self.file.close()
+
+
+def recording_handler(writer, handler, port):
+    """包装 VSSP 数据报 handler: 先落盘原始数据报再交给重组"""
+    write = writer.write
+
+    def handle(data, addr):
+        write(KIND_VSSP, data, port)
+        return handler(data, addr)
+
+    return handle
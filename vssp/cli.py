@@ -0,0 +1,191 @@
+"""中继入口程序的命令行: video_streamer.py / vssp_relay.py 只提供各自的端口与重组表上限
+
+CLI = RelayCli(udp_port, ws_port, metrics_port, max_pending, max_age, window, static_root)
+CLI.main(main)        # 解析命令行 -> RelayConfig -> asyncio.run(main(config))
+"""
+
+import argparse
+import asyncio
+import signal
+
+from .feedback import FEEDBACK_INTERVAL
+from .header import FRAME_PREFIX_SIZE, MAX_PAYLOAD, MAX_SESSIONS
+from .relay import SHM_SLOT_SIZE, SHM_SLOTS, RelayConfig
+from .transport import FRAME_QUEUE_PER_SESSION
+
+DESCRIPTION = "VSSP v1.0 relay (UDP -> WS)"
+
+
+class RelayCli:
+    """一个入口程序的固定参数 (端口 / 重组表上限 / 网页目录) 与共用的命令行选项"""
+
+    def __init__(
+        self,
+        udp_port,
+        ws_port,
+        metrics_port,
+        max_pending,
+        max_age,
+        window,
+        static_root,
+        description=DESCRIPTION,
+    ):
+        self.udp_port = udp_port
+        self.ws_port = ws_port
+        self.metrics_port = metrics_port
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.window = window
+        self.static_root = static_root
+        self.description = description
+
+    def make_config(self, **options):
+        """本入口的端口与重组表上限 + options (RelayConfig 的其余关键字参数)"""
+        options.setdefault("static_root", self.static_root)
+        return RelayConfig(
+            self.udp_port,
+            self.ws_port,
+            self.max_pending,
+            self.max_age,
+            self.window,
+            **options,
+        )
+
+    def build_parser(self):
+        parser = argparse.ArgumentParser(description=self.description)
+        parser.add_argument(
+            "--rx",
+            choices=["auto", "recvmmsg", "recv_into", "async"],
+            default="auto",
+            help="UDP 接收路径: 独立线程批量读取 (auto/recvmmsg/recv_into) 或旧的逐包 asyncio",
+        )
+        parser.add_argument(
+            "--nack",
+            action="store_true",
+            help="丢包时向发送端回发 NACK 请求重传 (需发送端支持)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="重组进程数 (>1 时以 SO_REUSEPORT 按 frame_id / eye 分片，经共享内存交回前端)",
+        )
+        parser.add_argument(
+            "--shm-slots",
+            type=int,
+            default=SHM_SLOTS,
+            help="--workers 模式每个 worker 的共享内存帧槽位数 (同时在途的帧数)",
+        )
+        parser.add_argument(
+            "--shm-slot-size",
+            type=int,
+            default=SHM_SLOT_SIZE,
+            help="--workers 模式每个槽位的字节数，大于它的帧被丢弃 (vssp_oversize_frame_drops_total)",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=self.metrics_port,
+            help="Prometheus 指标端口 (http://127.0.0.1:<port>/metrics)，0 表示关闭",
+        )
+        parser.add_argument(
+            "--record",
+            metavar="FILE",
+            help="把收到的原始 VSSP 数据报追加写入抓包文件 (用 replay.py 回放)",
+        )
+        parser.add_argument(
+            "--max-sessions",
+            type=int,
+            default=MAX_SESSIONS,
+            help="同时服务的会话 (头显) 数上限，浏览器以 ?session=N 选择会话",
+        )
+        parser.add_argument(
+            "--frame-queue",
+            type=int,
+            default=0,
+            help="接收线程交给事件循环的完整帧队列上限 (各会话共用)，"
+            f"0 表示每个活跃会话 {FRAME_QUEUE_PER_SESSION} 帧",
+        )
+        parser.add_argument(
+            "--feedback-interval",
+            type=float,
+            default=FEEDBACK_INTERVAL,
+            help="向发送端回发质量反馈 (VFBK: 推荐 fps / JPEG 质量 / mode) 的间隔 (s)，0 表示关闭",
+        )
+        parser.add_argument(
+            "--feedback-fps",
+            type=int,
+            default=72,
+            help="推荐帧率的上限 (发送端的目标帧率)",
+        )
+        parser.add_argument(
+            "--feedback-quality", type=int, default=85, help="推荐 JPEG 质量的上限"
+        )
+        parser.add_argument(
+            "--static-port",
+            type=int,
+            default=0,
+            help="在同一进程中提供网页 (index.html) 的端口 (如 8000，代替 python -m http.server)，0 表示关闭",
+        )
+        parser.add_argument(
+            "--static-root",
+            default=self.static_root,
+            help="网页静态资源目录 (默认项目目录)",
+        )
+        parser.add_argument(
+            "--tls-cert",
+            metavar="PEM",
+            help="证书文件，与 --tls-key 一起指定时网页走 HTTPS",
+        )
+        parser.add_argument("--tls-key", metavar="PEM", help="私钥文件")
+        return parser
+
+    def config_from_args(self, parser, args):
+        """命令行参数 (或 launcher.py 配置文件的 video 段) -> RelayConfig，参数冲突时 parser.error"""
+        if bool(args.tls_cert) != bool(args.tls_key):
+            parser.error("--tls-cert and --tls-key must be given together")
+        if args.frame_queue < 0:
+            parser.error("--frame-queue must be >= 0")
+        if not 1 <= args.shm_slots <= 0xFFFF:
+            parser.error("--shm-slots must be between 1 and 65535")
+        if args.shm_slot_size < FRAME_PREFIX_SIZE + MAX_PAYLOAD:
+            parser.error(
+                f"--shm-slot-size must be at least {FRAME_PREFIX_SIZE + MAX_PAYLOAD}"
+            )
+        return self.make_config(
+            rx_mode=args.rx,
+            nack=args.nack,
+            workers=args.workers,
+            shm_slots=args.shm_slots,
+            shm_slot_size=args.shm_slot_size,
+            metrics_port=args.metrics_port,
+            record=args.record,
+            max_sessions=args.max_sessions,
+            frame_queue=args.frame_queue or None,
+            feedback_interval=args.feedback_interval,
+            feedback_fps=args.feedback_fps,
+            feedback_quality=args.feedback_quality,
+            static_port=args.static_port,
+            static_root=args.static_root,
+            tls=(args.tls_cert, args.tls_key) if args.tls_cert else None,
+        )
+
+    def main(self, main):
+        """解析命令行并运行 main(config) 直到 Ctrl+C / SIGTERM"""
+        parser = self.build_parser()
+        config = self.config_from_args(parser, parser.parse_args())
+        try:
+            asyncio.run(main(config))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+
+
+async def serve(relay):
+    """运行中继；kill (start.sh 的停止方式) 与 Ctrl+C 一样正常退出: 抓包缓冲落盘、worker 回收"""
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, asyncio.current_task().cancel
+        )
+    except NotImplementedError:
+        pass  # Windows: 无 SIGTERM 处理，Ctrl+C 以 KeyboardInterrupt 退出
+    await relay.run()
@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+
+class SharedFrame:
+    """多个客户端共享的一帧数据，所有客户端发送或丢弃后调用 on_done 归还缓冲
+
+    timed 为同一缓冲上带延迟扩展头的视图 (可为 None)，assembled 为交给广播的时间。
+    """
+
+    __slots__ = ("packet", "timed", "assembled", "refs", "on_done")
+
+    def __init__(self, packet, refs, on_done=None, timed=None, assembled=0.0):
+        self.packet = packet
+        self.timed = timed
+        self.assembled = assembled
+        self.refs = refs
+        self.on_done = on_done
+
+    def unref(self):
+        self.refs -= 1
+        if self.refs == 0 and self.on_done is not None:
+            self.on_done()
+
+
+class ClientQueue:
+    """单个 WebSocket 客户端的发送队列: 每个 eye 一个槽位，新帧覆盖未发送的旧帧"""
+
+    def __init__(self, websocket, timing=False, latency=None, session=0):
+        self.websocket = websocket
+        self.timing = timing  # 客户端请求了延迟扩展头
+        self.session = session  # 订阅的会话
+        self.latency = latency
+        self.slots = {}  # Key: eye
+        self.ready = asyncio.Event()
+        self.delivered = 0
+        self.dropped = 0
+        self.last = (0, 0)
+        self.last_time = time.time()
+
+    @property
+    def name(self):
+        addr = getattr(self.websocket, "remote_address", None)
+        return f"{addr[0]}:{addr[1]}" if addr else "?"
+
+    def offer(self, eye, frame):
+        old = self.slots.pop(eye, None)
+        if old is not None:
+            # 客户端还没发完上一帧: 丢弃旧帧，只保留最新
+            self.dropped += 1
+            old.unref()
+        self.slots[eye] = frame
+        self.ready.set()
+
+    async def run(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.slots:
+                eye = next(iter(self.slots))
+                frame = self.slots.pop(eye)
+                packet = frame.packet
+                if self.timing and frame.timed is not None:
+                    packet = frame.timed
+                try:
+                    await self.websocket.send(packet)
+                finally:
+                    frame.unref()
+                self.delivered += 1
+                if self.latency is not None and frame.assembled:
+                    self.latency.add_send(frame.assembled, time.time())
+
+    def close(self):
+        for frame in self.slots.values():
+            frame.unref()
+        self.slots.clear()
+
+    def rates(self):
+        """自上次调用以来的 (delivered fps, dropped fps)"""
+        now = time.time()
+        dt = max(now - self.last_time, 1e-6)
+        delivered, dropped = self.delivered - self.last[0], self.dropped - self.last[1]
+        self.last, self.last_time = (self.delivered, self.dropped), now
+        return delivered / dt, dropped / dt
+
+
+class Broadcaster:
+    """把完整帧分发给订阅该会话的客户端队列，自身从不 await 发送"""
+
+    def __init__(self, latency=None):
+        self.clients = set()
+        self.groups = {}  # Key: session -> 订阅该会话的客户端集合
+        self.latency = latency
+
+    def publish(self, eye, packet, on_done=None, timed=None, assembled=0.0, session=0):
+        group = self.groups.get(session)
+        if not group:
+            if on_done is not None:
+                on_done()
+            return
+        frame = SharedFrame(packet, len(group), on_done, timed, assembled)
+        for client in group:
+            client.offer(eye, frame)
+
+    async def serve(self, websocket, timing=False, on_message=None, session=0):
+        """在 ws_handler 中调用: 运行该客户端的发送任务直到连接关闭
+
+        client 只收到 session 会话的帧；on_message(client, message) 处理客户端发来的消息
+        (时钟握手 / 延迟汇报)。
+        """
+        client = ClientQueue(websocket, timing, self.latency, session)
+        self.clients.add(client)
+        self.groups.setdefault(session, set()).add(client)
+        sender = asyncio.create_task(client.run())
+        reader = asyncio.create_task(self._read(client, on_message))
+        try:
+            await asyncio.wait({sender, reader}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.clients.discard(client)
+            group = self.groups[session]
+            group.discard(client)
+            if not group:
+                del self.groups[session]
+            for task in (sender, reader):
+                task.cancel()
+                if task.done() and not task.cancelled():
+                    task.exception()  # 连接断开导致的收发失败，无需上报
+            client.close()
+
+    async def _read(self, client, on_message):
+        async for message in client.websocket:
+            if on_message is not None:
+                await on_message(client, message)
+
+    def report(self):
+        lines = []
+        for client in list(self.clients):
+            delivered, dropped = client.rates()
+            lines.append(
+                f"WS {client.name} session {client.session} delivered {delivered:.1f} fps "
+                f"dropped {dropped:.1f} fps (total {client.delivered}/{client.dropped})"
+            )
+        return lines
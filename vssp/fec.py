@@ -0,0 +1,156 @@
+import struct
+
+# VSSP v1.0 FEC / NACK 扩展
+#
+# flags 字节:
+#   bit0 FLAG_FEC_PARITY  该包是 XOR 校验包: p_id = 组号 g，覆盖数据包 [g*K, min((g+1)*K, p_count))
+#   bit1 FLAG_RETRANSMIT  该包是响应 NACK 的重传包 (仅用于统计)
+#
+# 校验包 payload: 2(group_size K), 2(组内各包长度的 XOR), N(组内各 payload 的 XOR，短包视为尾部补零)
+#   一帧内所有校验包 (含帧末不足 K 包的短组) 写入同一个 K；接收端以先到的校验包为准，
+#   K 不一致或组号超出 p_count 的校验包丢弃
+#
+# NACK (relay -> sender，发往收包时的源地址):
+#   4(magic "VNAK"), 4(frame_id), 1(eye), 1(reserved), 2(count), count * 2(p_id)
+FLAG_FEC_PARITY = 0x01
+FLAG_RETRANSMIT = 0x02
+
+FEC_HEADER = struct.Struct("<HH")
+NACK_MAGIC = b"VNAK"
+NACK_HEADER = struct.Struct("<4sIBBH")
+NACK_MAX_IDS = 256  # 单个 NACK 数据报携带的最大 p_id 数
+
+# 只在帧首包到达后的 NACK_DEADLINE 秒内请求重传，超过即放弃 (来不及显示)
+NACK_DEADLINE = 0.05
+NACK_INTERVAL = 0.01
+NACK_RETRIES = 2
+
+
+def make_parity(payloads, group_size):
+    """发送端: 由一组数据包 payload 生成校验包 payload
+
+    group_size 为本帧的组长 K；帧末不足 K 包的短组也写入 K，接收端据此定位各组。
+    """
+    acc = 0
+    len_xor = 0
+    width = 0
+    for p in payloads:
+        # 小端整数的高位补零等价于尾部补零
+        acc ^= int.from_bytes(p, "little")
+        len_xor ^= len(p)
+        width = max(width, len(p))
+    return FEC_HEADER.pack(group_size, len_xor) + acc.to_bytes(width, "little")
+
+
+def recover_missing(parity, others):
+    """由校验包和组内其余数据包恢复唯一丢失的 payload"""
+    _, len_xor = FEC_HEADER.unpack_from(parity, 0)
+    body = parity[FEC_HEADER.size :]
+    acc = int.from_bytes(body, "little")
+    for p in others:
+        acc ^= int.from_bytes(p, "little")
+        len_xor ^= len(p)
+    if len_xor > len(body):
+        return None
+    return acc.to_bytes(len(body), "little")[:len_xor]
+
+
+class FrameFec:
+    """单帧的校验包状态，按需挂在 FrameBuffer.fec 上"""
+
+    __slots__ = ("group_size", "parity")
+
+    def __init__(self):
+        self.group_size = 0
+        self.parity = {}  # Key: group index
+
+    def add_parity(self, g, payload, packet_count):
+        """登记组 g 的校验包；K 与本帧已知组长不一致或组 g 超出 packet_count 时拒绝"""
+        if len(payload) < FEC_HEADER.size:
+            return False
+        k, _ = FEC_HEADER.unpack_from(payload, 0)
+        if k == 0 or g in self.parity or g * k >= packet_count:
+            return False
+        if self.group_size and k != self.group_size:
+            return False
+        self.group_size = k
+        self.parity[g] = bytes(payload)
+        return True
+
+
+def try_recover(fb, g):
+    """组 g 只缺一个数据包且校验包已到时恢复它，返回是否恢复成功
+
+    fb 需提供 fec / packet_count / received_mask / payload(i) / write(i, data)。
+    """
+    parity = fb.fec.parity.get(g)
+    if parity is None:
+        return False
+    k = fb.fec.group_size
+    start, end = g * k, min(g * k + k, fb.packet_count)
+    missing = -1
+    for i in range(start, end):
+        if not fb.received_mask[i]:
+            if missing >= 0:
+                return False
+            missing = i
+    if missing < 0:
+        return False
+    others = [fb.payload(i) for i in range(start, end) if i != missing]
+    data = recover_missing(parity, others)
+    if data is None:
+        return False
+    return fb.write(missing, data)
+
+
+def handle_fec_packet(fb, p_id, flags, payload):
+    """处理校验包或数据包到达后的 FEC 恢复，返回恢复的包数"""
+    if flags & FLAG_FEC_PARITY:
+        if fb.fec is None:
+            fb.fec = FrameFec()
+        if not fb.fec.add_parity(p_id, payload, fb.packet_count):
+            return 0
+        return 1 if try_recover(fb, p_id) else 0
+    if fb.fec is None or not fb.fec.group_size:
+        return 0
+    return 1 if try_recover(fb, p_id // fb.fec.group_size) else 0
+
+
+def build_nack(frame_id, eye, missing):
+    ids = missing[:NACK_MAX_IDS]
+    return NACK_HEADER.pack(NACK_MAGIC, frame_id, eye, 0, len(ids)) + struct.pack(
+        f"<{len(ids)}H", *ids
+    )
+
+
+def parse_nack(data):
+    """发送端: 解析 NACK，返回 (frame_id, eye, [p_id, ...]) 或 None"""
+    if len(data) < NACK_HEADER.size or data[0:4] != NACK_MAGIC:
+        return None
+    _, frame_id, eye, _, count = NACK_HEADER.unpack_from(data, 0)
+    if len(data) < NACK_HEADER.size + count * 2:
+        return None
+    return frame_id, eye, list(struct.unpack_from(f"<{count}H", data, NACK_HEADER.size))
+
+
+def nack_due(fb, now):
+    """帧仍在 NACK 期限内且距上次请求已过 NACK_INTERVAL"""
+    return (
+        fb.nacks < NACK_RETRIES
+        and now - fb.first_time < NACK_DEADLINE
+        and now - fb.last_nack >= NACK_INTERVAL
+    )
+
+
+def send_nack(sock, addr, fb, now):
+    """向发送端请求重传 fb 中缺失的数据包，返回请求的包数"""
+    missing = [i for i in range(fb.packet_count) if not fb.received_mask[i]]
+    if not missing:
+        return 0
+    fb.nacks += 1
+    fb.last_nack = now
+    try:
+        sock.sendto(build_nack(fb.frame_id, fb.eye, missing), addr)
+    except OSError:
+        return 0
+    return len(missing)
@@ -0,0 +1,262 @@
+import struct
+import time
+from collections import deque, namedtuple
+
+from .header import MODE_MONO, MODE_STEREO, TIMING_HEADER
+from .timing import percentiles
+
+# 质量反馈 (relay -> sender，发往该会话最近一个数据报的源地址，每 FEEDBACK_INTERVAL 秒一次):
+#   4(magic "VFBK"), 2(session), 2(seq), 1(推荐 fps), 1(推荐 JPEG quality 1..100),
+#   1(推荐 mode: MODE_MONO / MODE_STEREO), 1(reasons), 2(窗口内丢帧率 1/10000),
+#   2(窗口内重组耗时 p95，0.1 ms), 2(最慢客户端的积压丢帧率 1/10000)
+# 推荐值只在窗口内的指标越过阈值时改变，发送端按 seq (16 位回绕) 丢弃乱序的旧反馈。
+FEEDBACK_MAGIC = b"VFBK"
+FEEDBACK_MSG = struct.Struct("<4sHHBBBBHHH")
+REASON_LOSS = 0x01  # 未完成即过期的帧过多 (链路丢包 / 拥塞)
+REASON_ASSEMBLY = 0x02  # 首包 -> 末包耗时接近帧间隔 (带宽不足)
+REASON_BACKLOG = 0x04  # WebSocket 客户端来不及发送，帧被新帧覆盖
+
+FEEDBACK_INTERVAL = 0.5  # 反馈间隔 (s)
+FEEDBACK_WINDOW = 2.0  # 指标滑动窗口 (s)
+MIN_FRAMES = 8  # 窗口内帧数少于此值时不调整
+# 降级阈值 / 升级阈值 (需持续 hold 秒都低于升级阈值)
+LOSS_HIGH = 0.02
+LOSS_LOW = 0.005
+BACKLOG_HIGH = 0.1
+BACKLOG_LOW = 0.02
+ASSEMBLY_HIGH = 0.5  # 重组耗时 p95 占帧间隔的比例
+ASSEMBLY_LOW = 0.25
+UPGRADE_HOLD = 4.0  # 升级前需稳定的时间 (s)，升级后立即又降级则加倍
+UPGRADE_HOLD_MAX = 32.0
+
+Feedback = namedtuple(
+    "Feedback", "session seq fps quality mode reasons loss assembly_ms backlog"
+)
+
+
+def parse_feedback(data):
+    """发送端: VFBK 数据报 -> Feedback，不是反馈时返回 None"""
+    if len(data) != FEEDBACK_MSG.size or data[:4] != FEEDBACK_MAGIC:
+        return None
+    _, session, seq, fps, quality, mode, reasons, loss, assembly, backlog = (
+        FEEDBACK_MSG.unpack(data)
+    )
+    return Feedback(
+        session,
+        seq,
+        fps,
+        quality,
+        mode,
+        reasons,
+        loss / 10000,
+        assembly / 10,
+        backlog / 10000,
+    )
+
+
+def quality_ladder(max_fps=72, max_quality=85, min_quality=30):
+    """由好到差的 (fps, quality, mode) 档位: 先降 JPEG 质量，再降帧率，最后改单目"""
+    steps = (
+        (1.0, 0, MODE_STEREO),
+        (1.0, 15, MODE_STEREO),
+        (1.0, 30, MODE_STEREO),
+        (5 / 6, 30, MODE_STEREO),
+        (2 / 3, 45, MODE_STEREO),
+        (2 / 3, 45, MODE_MONO),
+        (1 / 2, 55, MODE_MONO),
+    )
+    ladder = []
+    for scale, drop, mode in steps:
+        level = (
+            min(max(round(max_fps * scale), 1), 255),
+            max(min(max_quality - drop, 100), min_quality, 1),
+            mode,
+        )
+        if not ladder or ladder[-1] != level:
+            ladder.append(level)
+    return ladder
+
+
+class SessionQuality:
+    """一个会话的指标窗口与当前推荐档位"""
+
+    def __init__(self, ladder):
+        self.ladder = ladder
+        self.level = 0
+        self.seq = 0
+        self.window = (
+            deque()
+        )  # (t, assembled, expired, backlog dropped, backlog offered)
+        self.assembly = deque()  # (t, 首包 -> 末包 ms)
+        self.last = None  # 上次的 (assembled, expired) 累计值
+        self.clear_since = None  # 指标持续低于升级阈值的起始时间
+        self.hold = UPGRADE_HOLD
+        self.last_upgrade = None
+
+    def add_assembly(self, now, ms):
+        self.assembly.append((now, ms))
+
+    def sample(self, now, assembled, expired, dropped, offered):
+        """记录一个反馈周期的增量，丢弃窗口外的样本"""
+        if self.last is not None:
+            self.window.append(
+                (
+                    now,
+                    max(assembled - self.last[0], 0),
+                    max(expired - self.last[1], 0),
+                    dropped,
+                    offered,
+                )
+            )
+        self.last = (assembled, expired)
+        start = now - FEEDBACK_WINDOW
+        while self.window and self.window[0][0] <= start:
+            self.window.popleft()
+        while self.assembly and self.assembly[0][0] <= start:
+            self.assembly.popleft()
+
+    def stats(self):
+        """窗口内 (帧数: 完成 + 过期, 丢帧率, 重组 p95 ms, 积压丢帧率)"""
+        assembled = sum(s[1] for s in self.window)
+        expired = sum(s[2] for s in self.window)
+        dropped = sum(s[3] for s in self.window)
+        offered = sum(s[4] for s in self.window)
+        loss = expired / (assembled + expired) if assembled + expired else 0.0
+        p95 = percentiles([ms for _, ms in self.assembly])[1] if self.assembly else 0.0
+        backlog = dropped / offered if offered else 0.0
+        return assembled + expired, loss, p95, backlog
+
+    def update(self, now):
+        """按窗口指标调整档位，返回 (reasons, loss, p95, backlog)"""
+        frames, loss, p95, backlog = self.stats()
+        period = 1000.0 / self.ladder[self.level][0]
+        reasons = 0
+        if loss > LOSS_HIGH:
+            reasons |= REASON_LOSS
+        if p95 > ASSEMBLY_HIGH * period:
+            reasons |= REASON_ASSEMBLY
+        if backlog > BACKLOG_HIGH:
+            reasons |= REASON_BACKLOG
+        if frames < MIN_FRAMES:
+            return reasons, loss, p95, backlog
+        if reasons:
+            self.clear_since = None
+            if self.level < len(self.ladder) - 1:
+                if (
+                    self.last_upgrade is not None
+                    and now - self.last_upgrade < FEEDBACK_WINDOW * 2
+                ):
+                    # 刚升级就拥塞: 上一档是可用的上限，之后更久才再试
+                    self.hold = min(self.hold * 2, UPGRADE_HOLD_MAX)
+                self.change(self.level + 1)
+        elif (
+            loss < LOSS_LOW
+            and p95 < ASSEMBLY_LOW * period
+            and backlog < BACKLOG_LOW
+            and self.level > 0
+        ):
+            if self.clear_since is None:
+                self.clear_since = now
+            elif now - self.clear_since >= self.hold:
+                self.change(self.level - 1)
+                self.last_upgrade = now
+        else:
+            self.clear_since = None
+        return reasons, loss, p95, backlog
+
+    def change(self, level):
+        # 新档位的效果要等发送端切换后才能看到: 清空窗口，重新积累
+        self.level = level
+        self.window.clear()
+        self.assembly.clear()
+        self.clear_since = None
+
+    def message(self, session, reasons, loss, p95, backlog):
+        fps, quality, mode = self.ladder[self.level]
+        self.seq = (self.seq + 1) & 0xFFFF
+        return FEEDBACK_MSG.pack(
+            FEEDBACK_MAGIC,
+            session,
+            self.seq,
+            fps,
+            quality,
+            mode,
+            reasons,
+            min(round(loss * 10000), 0xFFFF),
+            min(round(p95 * 10), 0xFFFF),
+            min(round(backlog * 10000), 0xFFFF),
+        )
+
+
+class QualityMonitor:
+    """中继侧: 按会话统计丢帧率 / 重组耗时 / 客户端积压，周期性生成发给发送端的 VFBK
+
+    add_frame 在广播每帧时调用 (事件循环)；tick 每 FEEDBACK_INTERVAL 秒调用一次，
+    counters 为 Relay.counters() (含按会话的 sessions / session_expired / senders)。
+    """
+
+    def __init__(self, max_fps=72, max_quality=85):
+        self.ladder = quality_ladder(max_fps, max_quality)
+        self.sessions = {}  # Key: session -> SessionQuality
+        self.client_totals = {}  # Key: ClientQueue -> 上次的 (delivered, dropped)
+
+    def session(self, session):
+        quality = self.sessions.get(session)
+        if quality is None:
+            quality = self.sessions[session] = SessionQuality(self.ladder)
+        return quality
+
+    def add_frame(self, session, timed, now):
+        _, _, _, _, _, first, last, _ = TIMING_HEADER.unpack_from(timed, 0)
+        self.session(session).add_assembly(now, last - first)
+
+    def backlog(self, broadcaster):
+        """本周期各会话最慢客户端的 (被覆盖帧数, 提交帧数)"""
+        result = {}
+        totals = {}
+        for client in list(broadcaster.clients):
+            delivered, dropped = self.client_totals.get(client, (0, 0))
+            totals[client] = (client.delivered, client.dropped)
+            dropped = client.dropped - dropped
+            offered = client.delivered - delivered + dropped
+            worst = result.get(client.session)
+            if offered and (worst is None or dropped * worst[1] > worst[0] * offered):
+                result[client.session] = (dropped, offered)
+        self.client_totals = totals
+        return result
+
+    def tick(self, counters, broadcaster, now=None):
+        """返回本周期要发送的 [(addr, datagram)]"""
+        now = time.time() if now is None else now
+        backlog = self.backlog(broadcaster)
+        expired = counters.get("session_expired", {})
+        messages = []
+        for session, addr in counters.get("senders", {}).items():
+            if addr is None:
+                continue
+            quality = self.session(session)
+            quality.sample(
+                now,
+                counters["sessions"].get(session, 0),
+                expired.get(session, 0),
+                *backlog.get(session, (0, 0)),
+            )
+            if not quality.window:
+                continue
+            reasons, loss, p95, drop_rate = quality.update(now)
+            messages.append(
+                (addr, quality.message(session, reasons, loss, p95, drop_rate))
+            )
+        return messages
+
+    def report(self):
+        lines = []
+        for session, quality in sorted(self.sessions.items()):
+            fps, q, mode = self.ladder[quality.level]
+            _, loss, p95, backlog = quality.stats()
+            mode = "stereo" if mode == MODE_STEREO else "mono"
+            lines.append(
+                f"Feedback session {session}: {fps} fps q{q} {mode} | loss {loss * 100:.1f}% "
+                f"assembly p95 {p95:.1f} ms backlog {backlog * 100:.1f}%"
+            )
+        return lines
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+FRAME_ID_MASK = 0xFFFFFFFF
+FRAME_ID_HALF = 0x80000000
+# 落后最新帧超过 window 的包: 连续 RESTART_PACKETS 个落在同一新范围内，
+# 或落后超过 RESTART_WINDOWS 个窗口时才视为发送端重启，否则作为迟到 / 重复的包丢弃
+RESTART_PACKETS = 3
+RESTART_WINDOWS = 16
+
+
+def frame_before(a, b):
+    """32 位 frame_id 序号比较 (RFC 1982 风格): a 是否早于 b，可跨越回绕"""
+    return a != b and (a - b) & FRAME_ID_MASK >= FRAME_ID_HALF
+
+
+class FrameTable:
+    """重组中帧的有界表，Key: (frame_id, eye)
+
+    按首包到达顺序保存，过期检查只看表头，均摊 O(1):
+    - 超过 max_age 秒仍未完成、或落后最新 frame_id 超过 window、或表满时淘汰
+    - 帧完成后立即移出，并记录为该 eye 的最新显示帧；更早的帧不再接收
+    - 远远落后于最新帧的包只有在确认发送端重启后才接收 (见 admit)
+    on_evict(fb) 在未完成的帧被淘汰时调用 (归还缓冲 / 统计)。
+    """
+
+    def __init__(self, max_frames=32, max_age=0.2, window=64, on_evict=None):
+        self.max_frames = max_frames
+        self.max_age = max_age
+        self.window = window
+        self.on_evict = on_evict
+        self.frames = OrderedDict()
+        self.newest = None  # 收到过的最新 frame_id
+        self.displayed = {}  # Key: eye -> 最新完成的 frame_id
+        self.expired = 0
+        self.stale = 0
+        self.restart_from = None  # 疑似重启后的第一个 frame_id
+        self.restart_packets = 0  # 连续落在该范围内的包数
+        self.restarts = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, key):
+        return key in self.frames
+
+    def values(self):
+        return self.frames.values()
+
+    def get(self, frame_id, eye):
+        return self.frames.get((frame_id, eye))
+
+    def is_stale(self, frame_id, eye):
+        """frame_id 不晚于该 eye 已显示的帧 (且在窗口内) -> 迟到的包，应丢弃"""
+        shown = self.displayed.get(eye)
+        if shown is None:
+            return False
+        behind = (shown - frame_id) & FRAME_ID_MASK
+        return behind <= self.window
+
+    def admit(self, frame_id, eye):
+        """表中没有的帧的包是否可以开始一个新帧；拒绝的包计入 stale
+
+        不晚于已显示的帧 (is_stale) 时拒绝。落后最新帧超过 window 时，单个迟到 / 重复的包也拒绝；
+        连续 RESTART_PACKETS 个包落在同一新范围内 (彼此相差不超过 window)，或落后超过
+        RESTART_WINDOWS 个窗口时视为发送端重启: 清空已显示记录并从该帧重新开始。
+        """
+        if self.is_stale(frame_id, eye):
+            self.stale += 1
+            return False
+        if self.newest is None:
+            return True
+        behind = (self.newest - frame_id) & FRAME_ID_MASK
+        if not self.window < behind < FRAME_ID_HALF:
+            self.restart_packets = 0
+            return True
+        start = self.restart_from
+        if start is not None and (
+            (frame_id - start) & FRAME_ID_MASK <= self.window
+            or (start - frame_id) & FRAME_ID_MASK <= self.window
+        ):
+            self.restart_packets += 1
+        else:
+            self.restart_from = frame_id
+            self.restart_packets = 1
+        if (
+            self.restart_packets >= RESTART_PACKETS
+            or behind > self.window * RESTART_WINDOWS
+        ):
+            self.restart(frame_id)
+            return True
+        self.stale += 1
+        return False
+
+    def restart(self, frame_id):
+        """发送端重启: 从 frame_id 重新开始 (旧范围中未完成的帧随之淘汰)"""
+        self.displayed.clear()
+        self.newest = frame_id
+        self.restart_from = None
+        self.restart_packets = 0
+        self.restarts += 1
+
+    def add(self, frame_id, eye, fb, now):
+        """登记新帧；admit() 拒绝时返回 False (调用方已 admit 过时结果相同)"""
+        if not self.admit(frame_id, eye):
+            return False
+        if self.newest is None or frame_before(self.newest, frame_id):
+            self.newest = frame_id
+        fb.first_time = now
+        self.frames[(frame_id, eye)] = fb
+        self.expire(now)
+        return True
+
+    def complete(self, frame_id, eye):
+        """帧已完成: 移出表 (所有权交给调用方)，并丢弃同一 eye 中更早的未完成帧"""
+        fb = self.frames.pop((frame_id, eye), None)
+        shown = self.displayed.get(eye)
+        if shown is None or frame_before(shown, frame_id):
+            self.displayed[eye] = frame_id
+        older = [
+            key
+            for key in self.frames
+            if key[1] == eye and frame_before(key[0], frame_id)
+        ]
+        for key in older:
+            self._evict(key)
+        return fb
+
+    def expire(self, now):
+        frames = self.frames
+        while frames:
+            key, fb = next(iter(frames.items()))
+            if (
+                len(frames) > self.max_frames
+                or now - fb.first_time > self.max_age
+                or (self.newest - key[0]) & FRAME_ID_MASK > self.window
+            ):
+                self._evict(key)
+            else:
+                break
+
+    def _evict(self, key):
+        fb = self.frames.pop(key)
+        self.expired += 1
+        if self.on_evict is not None:
+            self.on_evict(fb)
@@ -0,0 +1,90 @@
+import struct
+
+# VSSP v1.0 Constants
+VSSP_MAGIC = b"VSSP"
+HEADER_SIZE = 24
+# 发送端按固定步长分包: 除最后一包外每包 payload 都是 MAX_PAYLOAD 字节
+MAX_PAYLOAD = 1200
+
+# VSSP Header (24 bytes, little-endian):
+# 4(magic), 4(frame_id), 1(mode), 1(eye), 1(codec), 1(flags), 2(p_id), 2(p_count),
+# 2(p_size), 4(timestamp_ms), 2(session)
+# session: 发送端 (头显) 所属会话，中继按会话分别重组并只发给订阅该会话的客户端；
+# 旧版发送端在此写 0 (原 reserved 字段)，即默认会话
+VSSP_HEADER = struct.Struct("<4sIBBBBHHHIH")
+# 中继同时重组的会话数上限 (超出的会话的数据报被丢弃并计数)
+MAX_SESSIONS = 16
+
+# mode / eye / codec 字段
+MODE_MONO = 0
+MODE_STEREO = 1
+EYE_MONO = 0
+EYE_LEFT = 1
+EYE_RIGHT = 2
+CODEC_MJPEG = 0
+
+# Web Relay Packet (relay -> browser): [size:4][mode:1][eye:1][codec:1][payload]
+RELAY_HEADER = struct.Struct("<IBBB")
+RELAY_HEADER_SIZE = RELAY_HEADER.size
+
+# 延迟扩展头 (连接 ws://host:port/?timing=1 的客户端收到，位于 Web Relay 头之前):
+# 4(magic "VTIM"), 4(sender timestamp_ms), 4(int32 sender_clock - relay_clock ms), 1(flags), 1(pad),
+# 2(session), 8(double 首包到达), 8(double 末包到达 / 重组完成), 8(double 交给 WebSocket 发送) —— 均为中继时钟 epoch ms
+# 普通帧的前 4 字节是帧大小，"VTIM" 对应 ~1.3 GB，不会与之混淆。
+TIMING_MAGIC = b"VTIM"
+TIMING_HEADER = struct.Struct("<4sIiBxHddd")
+TIMING_HEADER_SIZE = TIMING_HEADER.size
+TIMING_ASSEMBLED = struct.Struct("<d")
+TIMING_ASSEMBLED_OFFSET = TIMING_HEADER_SIZE - TIMING_ASSEMBLED.size
+TIMING_CLOCK_SYNCED = 0x01  # 发送端时钟偏移来自 VCLK 握手 (否则为最小单向延迟估计)
+# 帧缓冲中 payload 之前的预留区: [延迟扩展头][Web Relay 头]
+FRAME_PREFIX_SIZE = TIMING_HEADER_SIZE + RELAY_HEADER_SIZE
+
+
+def parse_header(buf):
+    """解析数据报头，返回 (frame_id, mode, eye, codec, flags, p_id, p_count, p_size, ts, session) 或 None
+
+    不合法的包 (过短 / magic 错误 / p_count 为 0 / p_size 超出数据报) 返回 None。
+    """
+    nbytes = len(buf)
+    if nbytes < HEADER_SIZE:
+        return None
+    magic, frame_id, mode, eye, codec, flags, p_id, p_count, p_size, ts, session = (
+        VSSP_HEADER.unpack_from(buf, 0)
+    )
+    if magic != VSSP_MAGIC or p_count == 0 or p_size > nbytes - HEADER_SIZE:
+        return None
+    return frame_id, mode, eye, codec, flags, p_id, p_count, p_size, ts, session
+
+
+def pack_header(
+    frame_id, mode, eye, codec, flags, p_id, p_count, p_size, ts, session=0
+):
+    return VSSP_HEADER.pack(
+        VSSP_MAGIC,
+        frame_id,
+        mode,
+        eye,
+        codec,
+        flags,
+        p_id,
+        p_count,
+        p_size,
+        ts,
+        session,
+    )
+
+
+def packetize(frame_id, mode, eye, codec, data, ts, max_payload=MAX_PAYLOAD, session=0):
+    """发送端: 把一帧切成 VSSP 数据报列表"""
+    count = max(-(-len(data) // max_payload), 1)
+    packets = []
+    for i in range(count):
+        chunk = data[i * max_payload : (i + 1) * max_payload]
+        packets.append(
+            pack_header(
+                frame_id, mode, eye, codec, 0, i, count, len(chunk), ts, session
+            )
+            + chunk
+        )
+    return packets
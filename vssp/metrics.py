@@ -0,0 +1,118 @@
+"""Prometheus 文本格式 (0.0.4) 指标导出
+
+热路径只对普通属性 / 列表元素做 += (单写者，无锁)，采集时由回调读取，
+因此计数本身不引入额外的函数调用或锁。
+"""
+
+import asyncio
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    """单个计数器 (单写者)"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+class Histogram:
+    """固定桶直方图: observe 只做一次二分查找和两次加法"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class Registry:
+    """指标登记表: collect() 返回 [(labels dict 或 None, value)]"""
+
+    def __init__(self):
+        self.metrics = []  # (name, type, help, collect)
+
+    def register(self, name, kind, help_text, collect):
+        self.metrics.append((name, kind, help_text, collect))
+
+    def counter(self, name, help_text):
+        counter = Counter()
+        self.register(name, "counter", help_text, lambda: [(None, counter.value)])
+        return counter
+
+    def histogram(self, name, help_text, bounds):
+        hist = Histogram(bounds)
+        self.register(name, "histogram", help_text, lambda: hist)
+        return hist
+
+    def render(self):
+        lines = []
+        for name, kind, help_text, collect in self.metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                hist = collect()
+                total = 0
+                for bound, count in zip(hist.bounds, hist.counts):
+                    total += count
+                    lines.append(f'{name}_bucket{{le="{bound!r}"}} {total}')
+                total += hist.counts[-1]
+                lines.append(f'{name}_bucket{{le="+Inf"}} {total}')
+                lines.append(f"{name}_sum {hist.sum!r}")
+                lines.append(f"{name}_count {total}")
+                continue
+            for labels, value in collect():
+                if value is not None:
+                    lines.append(f"{name}{_labels(labels)} {_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(registry, port, host="127.0.0.1"):
+    """最小 HTTP 服务: GET /metrics 返回 registry.render()"""
+
+    async def handle(reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1] == b"/metrics":
+                status, ctype, body = "200 OK", CONTENT_TYPE, registry.render().encode()
+            else:
+                status, ctype, body = "404 Not Found", "text/plain", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,428 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+
+from .assembler import Reassembler
+from .capture import CaptureWriter, recording_handler
+from .fanout import Broadcaster
+from .feedback import FEEDBACK_INTERVAL, QualityMonitor
+from .header import MAX_SESSIONS, TIMING_ASSEMBLED, TIMING_ASSEMBLED_OFFSET
+from .metrics import Registry, serve_metrics
+from .static import AssetCache, make_ssl_context, serve_static
+from .timing import StageLatency, percentiles
+from .transport import (
+    RxReporter,
+    RxStats,
+    kernel_drops,
+    make_receiver,
+    open_udp_socket,
+)
+
+# (counters() 键, 指标名, 说明)
+RELAY_COUNTERS = (
+    ("packets", "vssp_packets_total", "VSSP datagrams received"),
+    ("bytes", "vssp_received_bytes_total", "VSSP datagram bytes received"),
+    ("bad_magic", "vssp_bad_magic_total", "Datagrams without the VSSP magic"),
+    ("malformed", "vssp_malformed_total", "VSSP datagrams with an invalid header"),
+    ("bad_p_id", "vssp_out_of_range_p_id_total", "Data packets with p_id >= p_count"),
+    ("expired", "vssp_frames_expired_total", "Incomplete frames expired"),
+    ("stale", "vssp_stale_packets_total", "Packets for frames already superseded"),
+    (
+        "sender_restarts",
+        "vssp_sender_restarts_total",
+        "Frame id restarts accepted from senders",
+    ),
+    ("fec_recovered", "vssp_fec_recovered_total", "Packets rebuilt from FEC parity"),
+    ("nack_requested", "vssp_nack_requested_total", "Packets requested by NACK"),
+    ("retransmits", "vssp_retransmits_total", "Retransmitted packets received"),
+    ("rx_errors", "vssp_rx_errors_total", "Exceptions while handling a datagram"),
+    (
+        "queue_drops",
+        "vssp_rx_queue_drops_total",
+        "Frames dropped before the event loop",
+    ),
+    ("pool_drops", "vssp_pool_drops_total", "Frames dropped for lack of a buffer"),
+    (
+        "oversize_drops",
+        "vssp_oversize_frame_drops_total",
+        "Frames larger than a worker's shared-memory slot (--shm-slot-size)",
+    ),
+    (
+        "session_drops",
+        "vssp_session_drops_total",
+        "Datagrams dropped because --max-sessions sessions are already active",
+    ),
+)
+
+
+# --workers 模式每个 worker 的共享内存帧槽位: 槽位数 / 单槽字节数 (大于槽位的帧被丢弃并计数)
+SHM_SLOTS = 16
+SHM_SLOT_SIZE = 2 * 1024 * 1024
+
+
+def query_session(path):
+    """WebSocket 请求路径中的 ?session=N (缺省为 0)，不是 u16 整数时返回 None"""
+    value = parse_qs(urlsplit(path).query).get("session", ["0"])[0]
+    try:
+        session = int(value)
+    except ValueError:
+        return None
+    return session if 0 <= session <= 0xFFFF else None
+
+
+class RelayConfig:
+    """一个 VSSP 中继实例的配置 (端口 / 重组表参数 / 接收路径)"""
+
+    def __init__(
+        self,
+        udp_port,
+        ws_port,
+        max_pending=30,
+        max_age=0.2,
+        window=64,
+        rx_mode="auto",
+        nack=False,
+        stats_interval=5.0,
+        rcvbuf=1024 * 1024,
+        workers=1,
+        shm_slots=SHM_SLOTS,
+        shm_slot_size=SHM_SLOT_SIZE,
+        metrics_port=None,
+        record=None,
+        max_sessions=MAX_SESSIONS,
+        feedback_interval=FEEDBACK_INTERVAL,
+        feedback_fps=72,
+        feedback_quality=85,
+        static_port=None,
+        static_root=".",
+        tls=None,
+        frame_queue=None,
+    ):
+        self.udp_port = udp_port
+        self.ws_port = ws_port
+        # 重组表: 最多同时重组的帧数 / 未完成帧的最长保留时间 / frame_id 窗口
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.window = window
+        self.rx_mode = rx_mode
+        self.nack = nack
+        self.stats_interval = stats_interval
+        self.rcvbuf = rcvbuf
+        # 多进程模式: 重组分片到 workers 个进程，完整帧经共享内存槽位交回前端
+        self.workers = workers
+        self.shm_slots = shm_slots
+        self.shm_slot_size = shm_slot_size
+        # Prometheus 文本格式指标: http://127.0.0.1:<metrics_port>/metrics
+        self.metrics_port = metrics_port
+        # 抓包文件: 追加写入收到的原始 VSSP 数据报 (回放见 replay.py)
+        self.record = record
+        # 同时重组的会话 (头显) 数上限，每个会话一组独立的重组表 / 发送端时钟 / 客户端
+        self.max_sessions = max_sessions
+        # 接收线程交给事件循环的完整帧队列上限 (各会话共用)，None 时按活跃会话数: 每会话 FRAME_QUEUE_PER_SESSION 帧
+        self.frame_queue = frame_queue
+        # 质量反馈 (VFBK): 每 feedback_interval 秒向各会话的发送端推荐 fps / JPEG 质量 / mode，0 关闭；
+        # 推荐档位的上限为 feedback_fps / feedback_quality (见 vssp/feedback.py)
+        self.feedback_interval = feedback_interval
+        self.feedback_fps = feedback_fps
+        self.feedback_quality = feedback_quality
+        # 网页静态资源 (index.html) 与中继共用事件循环: http(s)://<host>:<static_port>/，None / 0 关闭；
+        # tls 为 (certfile, keyfile) 时提供 HTTPS (见 vssp/static.py)
+        self.static_port = static_port
+        self.static_root = static_root
+        self.tls = tls
+
+
+class Relay:
+    """UDP (VSSP) -> WebSocket 中继: 接收 -> 重组 -> 按客户端最新帧广播"""
+
+    def __init__(self, config, log=print):
+        self.config = config
+        self.log = log
+        self.assembler = Reassembler(
+            config.max_pending,
+            config.max_age,
+            config.window,
+            max_sessions=config.max_sessions,
+        )
+        self.assembler.nack = config.nack
+        self.latency = StageLatency()
+        self.broadcaster = Broadcaster(self.latency)
+        self.rx = None
+        self.quality = None
+        if config.feedback_interval:
+            self.quality = QualityMonitor(config.feedback_fps, config.feedback_quality)
+        self.feedback_sent = 0
+        # 每个广播的帧调用 observer(session, timed, now)，timed 为延迟扩展头 (launcher.py 关联 pose 与视频帧)
+        self.frame_observers = []
+        self.assets = None
+        if config.static_port:
+            self.assets = AssetCache(config.static_root)
+        self.metrics = self.build_metrics()
+        if self.assets is not None:
+            self.assets.register_metrics(self.metrics, "vssp")
+
+    def release_frame(self, fb):
+        self.assembler.release_frame(fb)
+
+    def broadcast_frame(self, fb):
+        now = time.time()
+        TIMING_ASSEMBLED.pack_into(fb.timed, TIMING_ASSEMBLED_OFFSET, now * 1000)
+        self.latency.add_frame(fb.timed, now)
+        if self.quality is not None:
+            self.quality.add_frame(fb.session, fb.timed, now)
+        for observer in self.frame_observers:
+            observer(fb.session, fb.timed, now)
+        # 只投递到订阅该会话的各客户端的最新帧槽位，不等待发送；所有客户端处理完后归还缓冲
+        self.broadcaster.publish(
+            fb.eye, fb.packet, lambda: self.release_frame(fb), fb.timed, now, fb.session
+        )
+
+    async def udp_receiver(self):
+        config = self.config
+        sock = open_udp_socket(config.udp_port, config.rcvbuf)
+        self.assembler.sock = sock
+        self.log(f"VSSP UDP Listener active on {config.udp_port}")
+
+        handler = self.assembler.handle_packet
+        recorder = None
+        if config.record:
+            recorder = CaptureWriter(config.record)
+            handler = recording_handler(recorder, handler, config.udp_port)
+            self.log(f"Recording VSSP datagrams to {config.record}")
+        rx = make_receiver(
+            config.rx_mode,
+            sock,
+            handler,
+            self.release_frame,
+            config.frame_queue,
+            self.assembler.session_count,
+        )
+        rx.start(asyncio.get_event_loop())
+        self.rx = rx
+        self.log(f"VSSP RX started ({rx.mode})")
+        reporter = asyncio.create_task(self.report_stats(rx))
+        try:
+            while True:
+                self.broadcast_frame(await rx.get())
+        finally:
+            reporter.cancel()
+            rx.stop()
+            sock.close()
+            if recorder is not None:
+                recorder.close()
+
+    async def report_stats(self, rx):
+        reporter = RxReporter(rx.stats, self.config.udp_port, rx.mode)
+        while True:
+            await asyncio.sleep(self.config.stats_interval)
+            self.log(reporter.report())
+            self.log(self.assembler.report())
+            self.report_latency()
+            self.report_feedback()
+
+    def report_latency(self):
+        line = self.latency.report()
+        if line is not None:
+            self.log(line)
+        for line in self.broadcaster.report():
+            self.log(line)
+
+    def report_feedback(self):
+        if self.quality is not None:
+            for line in self.quality.report():
+                self.log(line)
+
+    def feedback_socket(self):
+        """发送 VFBK 的 socket: 与 VCLK / VNAK 相同，从 VSSP 端口发出"""
+        return self.assembler.sock
+
+    async def send_feedback(self):
+        interval = self.config.feedback_interval
+        while True:
+            await asyncio.sleep(interval)
+            sock = self.feedback_socket()
+            if sock is None:
+                continue
+            for addr, message in self.quality.tick(self.counters(), self.broadcaster):
+                try:
+                    sock.sendto(message, addr)
+                    self.feedback_sent += 1
+                except OSError:
+                    pass
+
+    def counters(self):
+        stats = self.rx.stats if self.rx is not None else RxStats()
+        counters = self.assembler.counters()
+        counters["packets"] = stats.packets
+        counters["bytes"] = stats.bytes
+        counters["rx_errors"] = stats.errors
+        counters["queue_drops"] = stats.queue_drops
+        return counters
+
+    def build_metrics(self):
+        registry = Registry()
+        for key, name, help_text in RELAY_COUNTERS:
+            registry.register(
+                name,
+                "counter",
+                help_text,
+                lambda key=key: [(None, self.counters()[key])],
+            )
+        registry.register(
+            "vssp_frames_assembled_total",
+            "counter",
+            "Complete frames reassembled, by eye",
+            lambda: [
+                ({"eye": eye}, n) for eye, n in self.counters()["assembled"].items()
+            ],
+        )
+        registry.register(
+            "vssp_session_frames_assembled_total",
+            "counter",
+            "Complete frames reassembled, by session",
+            lambda: [
+                ({"session": session}, n)
+                for session, n in self.counters()["sessions"].items()
+            ],
+        )
+        registry.register(
+            "vssp_kernel_drops_total",
+            "counter",
+            "Datagrams dropped by the kernel on the VSSP port (Linux)",
+            lambda: [(None, kernel_drops(self.config.udp_port))],
+        )
+        registry.register(
+            "vssp_ws_clients",
+            "gauge",
+            "Connected WebSocket clients",
+            lambda: [(None, len(self.broadcaster.clients))],
+        )
+        registry.register(
+            "vssp_ws_frames_delivered_total",
+            "counter",
+            "Frames sent to each WebSocket client",
+            lambda: [
+                ({"client": c.name, "session": c.session}, c.delivered)
+                for c in self.broadcaster.clients
+            ],
+        )
+        registry.register(
+            "vssp_ws_frames_dropped_total",
+            "counter",
+            "Frames superseded before they could be sent, per WebSocket client",
+            lambda: [
+                ({"client": c.name, "session": c.session}, c.dropped)
+                for c in self.broadcaster.clients
+            ],
+        )
+        registry.register(
+            "vssp_feedback_sent_total",
+            "counter",
+            "Quality feedback datagrams sent to VSSP senders",
+            lambda: [(None, self.feedback_sent)],
+        )
+        registry.register(
+            "vssp_feedback_quality_level",
+            "gauge",
+            "Recommended quality level per session (0 = best)",
+            lambda: [
+                ({"session": session}, quality.level)
+                for session, quality in (
+                    self.quality.sessions.items() if self.quality is not None else ()
+                )
+            ],
+        )
+        registry.register(
+            "vssp_stage_latency_ms",
+            "gauge",
+            "Recent per-stage latency quantiles in milliseconds",
+            self.latency_quantiles,
+        )
+        return registry
+
+    def latency_quantiles(self):
+        samples = []
+        for stage, values in self.latency.samples.items():
+            if values:
+                for q, value in zip(("0.5", "0.95", "0.99"), percentiles(values)):
+                    samples.append(({"stage": stage, "quantile": q}, float(value)))
+        return samples
+
+    async def ws_handler(self, websocket, path=None):
+        if path is None:
+            request = getattr(websocket, "request", None)
+            path = request.path if request is not None else ""
+        # ws://host:port/?timing=1 -> 每帧附带延迟扩展头；?session=N -> 只接收会话 N 的帧
+        timing = parse_qs(urlsplit(path).query).get("timing") == ["1"]
+        session = query_session(path)
+        if session is None:
+            await websocket.close(1008, "invalid session")
+            return
+        self.log(
+            f"Browser connected to VSSP Stream (session {session}). "
+            f"Active clients: {len(self.broadcaster.clients) + 1}"
+        )
+        await self.broadcaster.serve(websocket, timing, self.on_ws_message, session)
+
+    async def on_ws_message(self, client, message):
+        """浏览器文本消息: {"type": "clock", "t0": ms} 时钟握手 / {"type": "latency", ...} 延迟汇报"""
+        if not isinstance(message, str):
+            return
+        try:
+            msg = json.loads(message)
+        except ValueError:
+            return
+        if not isinstance(msg, dict):
+            return
+        kind = msg.get("type")
+        if kind == "clock":
+            reply = {"type": "clock", "t0": msg.get("t0"), "relay": time.time() * 1000}
+            await client.websocket.send(json.dumps(reply))
+        elif kind == "latency":
+            try:
+                parts = [
+                    f"{stage} {p50:.1f}/{p95:.1f}/{p99:.1f}"
+                    for stage, (p50, p95, p99) in msg["stages"].items()
+                ]
+            except (AttributeError, KeyError, TypeError, ValueError):
+                return
+            self.log(
+                f"Browser {client.name} latency ms p50/p95/p99 | " + " | ".join(parts)
+            )
+
+    async def run(self):
+        metrics_server = None
+        if self.config.metrics_port:
+            metrics_server = await serve_metrics(self.metrics, self.config.metrics_port)
+            self.log(f"Metrics on http://127.0.0.1:{self.config.metrics_port}/metrics")
+        static_server = None
+        if self.assets is not None:
+            tls = self.config.tls
+            static_server = await serve_static(
+                self.assets,
+                self.config.static_port,
+                ssl_context=make_ssl_context(*tls) if tls else None,
+            )
+            scheme = "https" if tls else "http"
+            self.log(
+                f"Serving {len(self.assets.assets)} static assets from "
+                f"{self.assets.root} on {scheme}://0.0.0.0:{self.config.static_port}/"
+            )
+        feedback = None
+        if self.quality is not None:
+            feedback = asyncio.create_task(self.send_feedback())
+        try:
+            async with websockets.serve(
+                self.ws_handler, "0.0.0.0", self.config.ws_port
+            ):
+                await self.udp_receiver()
+        finally:
+            if feedback is not None:
+                feedback.cancel()
+            if static_server is not None:
+                static_server.close()
+            if metrics_server is not None:
+                metrics_server.close()
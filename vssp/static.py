@@ -0,0 +1,352 @@
+"""静态资源 HTTP(S) 服务 (index.html 等)，可与中继共用一个事件循环
+
+替代 `python -m http.server` 与旧 https_server.py (单线程阻塞，慢连接会卡住其他请求):
+
+- 启动时把 root 下的网页资源 (ASSET_TYPES 中的扩展名，跳过隐藏文件与 __pycache__) 读入内存，
+  预先生成 gzip / brotli (需 pip install brotli) 压缩版本，只保留比原文小的版本
+- 强 ETag (按编码区分)，If-None-Match 命中时返回 304；HTML 为 Cache-Control: no-cache (每次重新验证)，
+  其他资源 max-age 秒内直接使用浏览器缓存
+- 文件修改后最多 RECHECK_SECS 秒重新读取；未知路径最多每 RECHECK_SECS 秒重新扫描一次目录
+- HTTP/1.1 keep-alive，只支持 GET / HEAD；响应头按 (资源, 编码) 预先生成
+- TLS: make_ssl_context(cert, key) 得到 ssl.SSLContext (TLS 1.2+)，传给 serve_static
+"""
+
+import asyncio
+import gzip
+import hashlib
+import os
+import ssl
+import time
+from email.utils import formatdate
+from urllib.parse import unquote
+
+try:
+    import brotli
+except ImportError:  # 没有 brotli 时只提供 gzip
+    brotli = None
+
+ASSET_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".htm": "text/html; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".mjs": "text/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".json": "application/json",
+    ".webmanifest": "application/manifest+json",
+    ".svg": "image/svg+xml",
+    ".wasm": "application/wasm",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".ico": "image/x-icon",
+    ".woff2": "font/woff2",
+}
+# 这些类型已压缩，不再生成 gzip / brotli 版本
+PRECOMPRESSED = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".woff2"}
+SKIP_DIRS = {"__pycache__", "node_modules"}
+MIN_COMPRESS = 256  # 小于此字节数的资源不压缩
+MAX_ASSET = 16 << 20  # 大于此字节数的文件不缓存
+ASSET_MAX_AGE = 3600  # 非 HTML 资源的 Cache-Control max-age (s)
+RECHECK_SECS = 1.0
+HEADER_TIMEOUT = 10.0  # 请求头需在此时间内收齐 (防止慢连接长期占用)
+IDLE_TIMEOUT = 60.0  # keep-alive 连接空闲超时
+MAX_HEADER_LINES = 100
+MAX_BODY = 1 << 20
+
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Request Entity Too Large",
+}
+
+
+class Asset:
+    """一个资源的各编码版本: encoding -> (encoding, body, etag, 200 响应头, 304 响应头)"""
+
+    def __init__(self, path, ctype, max_age):
+        self.path = path
+        self.ctype = ctype
+        self.max_age = max_age
+        self.stat = None
+        self.checked = 0.0
+        self.variants = {}
+
+    def load(self, now):
+        st = os.stat(self.path)
+        stat = (st.st_mtime_ns, st.st_size)
+        self.checked = now
+        if stat == self.stat:
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        bodies = {"identity": data}
+        ext = os.path.splitext(self.path)[1].lower()
+        if len(data) >= MIN_COMPRESS and ext not in PRECOMPRESSED:
+            bodies["gzip"] = gzip.compress(data, 9, mtime=0)
+            if brotli is not None:
+                bodies["br"] = brotli.compress(data, quality=11)
+        bodies = {
+            encoding: body
+            for encoding, body in bodies.items()
+            if encoding == "identity" or len(body) < len(data)
+        }
+        if ext in (".html", ".htm"):
+            cache_control = "no-cache"
+        else:
+            cache_control = f"public, max-age={self.max_age}"
+        common = f"Cache-Control: {cache_control}\r\n"
+        if len(bodies) > 1:
+            common += "Vary: Accept-Encoding\r\n"
+        modified = formatdate(st.st_mtime, usegmt=True)
+        variants = {}
+        for encoding, body in bodies.items():
+            etag = f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            head = (
+                f"HTTP/1.1 200 OK\r\nContent-Type: {self.ctype}\r\n"
+                f"Content-Length: {len(body)}\r\nETag: {etag}\r\n"
+                f"Last-Modified: {modified}\r\n{common}"
+            )
+            if encoding != "identity":
+                head += f"Content-Encoding: {encoding}\r\n"
+            not_modified = f"HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\n{common}"
+            variants[encoding] = (
+                encoding,
+                body,
+                etag,
+                head.encode(),
+                not_modified.encode(),
+            )
+        self.variants = variants
+        self.stat = stat
+
+    def select(self, accept_encoding):
+        """按 Accept-Encoding 选择版本: br > gzip > identity"""
+        if len(self.variants) > 1 and accept_encoding:
+            accepted = parse_accept_encoding(accept_encoding)
+            for encoding in ("br", "gzip"):
+                if encoding in self.variants and encoding in accepted:
+                    return self.variants[encoding]
+        return self.variants["identity"]
+
+
+def parse_accept_encoding(value):
+    """Accept-Encoding -> 可接受 (q > 0) 的编码集合"""
+    accepted = set()
+    for item in value.decode("latin-1").lower().split(","):
+        name, _, params = item.partition(";")
+        name = name.strip()
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    if "*" in accepted:
+        accepted.update(("br", "gzip"))
+    return accepted
+
+
+class AssetCache:
+    """root 目录下网页资源的内存缓存，Key: URL 路径 ("/index.html")"""
+
+    def __init__(self, root, max_age=ASSET_MAX_AGE):
+        self.root = os.path.abspath(root)
+        self.max_age = max_age
+        self.assets = {}
+        self.scanned = 0.0
+        self.requests = {}  # Key: 状态码 -> 请求数
+        self.bytes = {}  # Key: 编码 -> 发送的响应体字节数
+        self.scan(time.monotonic())
+
+    def scan(self, now):
+        self.scanned = now
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [
+                d for d in dirnames if not d.startswith(".") and d not in SKIP_DIRS
+            ]
+            for name in filenames:
+                ctype = ASSET_TYPES.get(os.path.splitext(name)[1].lower())
+                if ctype is None or name.startswith("."):
+                    continue
+                path = os.path.join(dirpath, name)
+                url = "/" + os.path.relpath(path, self.root).replace(os.sep, "/")
+                asset = self.assets.get(url) or Asset(path, ctype, self.max_age)
+                try:
+                    if os.path.getsize(path) > MAX_ASSET:
+                        continue
+                    asset.load(now)
+                except OSError:
+                    continue
+                found[url] = asset
+        self.assets = found
+
+    def get(self, url, now=None):
+        now = time.monotonic() if now is None else now
+        asset = self.assets.get(url)
+        if asset is None:
+            if now - self.scanned < RECHECK_SECS:
+                return None
+            self.scan(now)
+            return self.assets.get(url)
+        if now - asset.checked >= RECHECK_SECS:
+            try:
+                asset.load(now)
+            except OSError:
+                # 文件已删除
+                del self.assets[url]
+                return None
+        return asset
+
+    def count(self, status, encoding=None, size=0):
+        self.requests[status] = self.requests.get(status, 0) + 1
+        if size:
+            self.bytes[encoding] = self.bytes.get(encoding, 0) + size
+
+    def register_metrics(self, registry, prefix):
+        registry.register(
+            f"{prefix}_static_requests_total",
+            "counter",
+            "Static asset requests, by status",
+            lambda: [({"status": s}, n) for s, n in sorted(self.requests.items())],
+        )
+        registry.register(
+            f"{prefix}_static_sent_bytes_total",
+            "counter",
+            "Static asset body bytes sent, by content encoding",
+            lambda: [({"encoding": e}, n) for e, n in sorted(self.bytes.items())],
+        )
+
+
+def make_ssl_context(certfile, keyfile=None):
+    """服务端 TLS 上下文 (替代已移除的 ssl.wrap_socket)"""
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certfile, keyfile)
+    context.set_alpn_protocols(["http/1.1"])
+    return context
+
+
+def simple_response(status, close, extra=""):
+    body = f"{status} {REASONS[status]}\n".encode()
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: text/plain\r\n"
+        f"Content-Length: {len(body)}\r\n{extra}"
+    )
+    if close:
+        head += "Connection: close\r\n"
+    return head.encode() + b"\r\n" + body
+
+
+async def read_request(reader):
+    """请求行与请求头 -> (method, target, version, headers)，连接关闭或超时时返回 None
+
+    keep-alive 连接空闲最多 IDLE_TIMEOUT 秒；请求行到达后，请求头需在 HEADER_TIMEOUT 秒内收齐。
+    """
+    try:
+        line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+        if not line:
+            return None
+        return await asyncio.wait_for(read_headers(reader, line), HEADER_TIMEOUT)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def read_headers(reader, line):
+    parts = line.split()
+    if len(parts) != 3:
+        raise ValueError(line)
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n"):
+            return parts[0], parts[1], parts[2], headers
+        if not line:
+            raise asyncio.IncompleteReadError(line, None)
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    raise ValueError("too many header lines")
+
+
+def matches(if_none_match, etag):
+    for tag in if_none_match.decode("latin-1").split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def url_path(target):
+    """请求目标 -> 缓存 Key；目录映射到其中的 index.html"""
+    path = unquote(target.split(b"?", 1)[0].split(b"#", 1)[0].decode("latin-1"))
+    if not path.startswith("/"):
+        return None
+    if path.endswith("/"):
+        path += "index.html"
+    return path
+
+
+async def serve_static(cache, port, host="0.0.0.0", ssl_context=None):
+    """启动静态资源服务并返回 asyncio.Server (在当前事件循环中运行)"""
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers = request
+                connection = headers.get(b"connection", b"").lower()
+                if version == b"HTTP/1.1":
+                    close = connection == b"close"
+                else:
+                    close = connection != b"keep-alive"
+                length = int(headers.get(b"content-length", b"0"))
+                if length > MAX_BODY or b"transfer-encoding" in headers:
+                    writer.write(simple_response(413, True))
+                    break
+                if length:
+                    await reader.readexactly(length)
+                writer.writelines(respond(cache, method, target, headers, close))
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port, ssl=ssl_context)
+
+
+def respond(cache, method, target, headers, close):
+    """一个请求的响应: [响应头, 响应体]，响应体为缓存中的 bytes (不拷贝)"""
+    if method not in (b"GET", b"HEAD"):
+        cache.count(405)
+        return [simple_response(405, close, "Allow: GET, HEAD\r\n")]
+    path = url_path(target)
+    asset = cache.get(path) if path is not None else None
+    if asset is None:
+        cache.count(404)
+        return [simple_response(404, close)]
+    encoding, body, etag, head, not_modified = asset.select(
+        headers.get(b"accept-encoding")
+    )
+    tail = b"Connection: close\r\n\r\n" if close else b"\r\n"
+    if_none_match = headers.get(b"if-none-match")
+    if if_none_match is not None and matches(if_none_match, etag):
+        cache.count(304)
+        return [not_modified + tail]
+    if method == b"HEAD":
+        cache.count(200)
+        return [head + tail]
+    cache.count(200, encoding, len(body))
+    return [head + tail, body]
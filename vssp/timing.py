@@ -0,0 +1,139 @@
+import struct
+from collections import deque
+
+from .header import TIMING_CLOCK_SYNCED, TIMING_HEADER
+
+# 发送端时钟握手 (relay <-> sender，走 VSSP UDP 端口):
+#   4(magic "VCLK"), 1(route), 1(kind), 3(pad), 1(zero), 2(pad), 8(double t0 中继发出时间 s),
+#   4(sender_ms 发送端 timestamp_ms 所用时钟)
+# 中继发出 kind=PROBE (sender_ms=0)，发送端原样回送并填入 kind=REPLY 与当前 sender_ms。
+# route 为发出探测的 worker 下标: --workers 模式下 reuseport 过滤器按 (字节4 + 字节9) 分片，
+# 回包因此回到同一个进程。
+CLOCK_MAGIC = b"VCLK"
+CLOCK_MSG = struct.Struct("<4sBB3xB2xdI")
+CLOCK_PROBE = 0
+CLOCK_REPLY = 1
+CLOCK_INTERVAL = 1.0  # 探测间隔 (s)
+CLOCK_SAMPLES = 8  # 取最近 N 次中 RTT 最小的样本
+CLOCK_TIMEOUT = 10.0  # 超过该时间无回包则退回估计值
+CLOCK_WINDOW = 10.0  # 估计值的滑动窗口 (s)
+
+LATENCY_WINDOW = 1024  # 每个阶段保留的最近样本数
+
+
+def wrap_ms(value):
+    """32 位毫秒差值 -> 有符号整数"""
+    return ((value + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+
+def answer_clock_probe(sock, data, addr, sender_ms):
+    """发送端: data 为 VCLK 探测时回包并返回 True"""
+    if len(data) != CLOCK_MSG.size or data[:4] != CLOCK_MAGIC:
+        return False
+    magic, route, kind, zero, t0, _ = CLOCK_MSG.unpack(data)
+    if kind != CLOCK_PROBE:
+        return False
+    reply = CLOCK_MSG.pack(magic, route, CLOCK_REPLY, zero, t0, sender_ms & 0xFFFFFFFF)
+    sock.sendto(reply, addr)
+    return True
+
+
+class SenderClock:
+    """发送端 timestamp_ms 时钟相对中继时钟的偏移 (sender_ms - relay_ms)
+
+    发送端回应 VCLK 探测时按 NTP 方式计算；否则用窗口内 max(ts - 到达时间) 估计，
+    此时结果不含最小单向延迟。
+    """
+
+    def __init__(self, route=0):
+        self.route = route
+        self.samples = deque(maxlen=CLOCK_SAMPLES)  # (rtt, offset)
+        self.offset = 0
+        self.last_probe = 0.0
+        self.last_reply = -CLOCK_TIMEOUT
+        self.estimate = None
+        self.prev_estimate = None
+        self.window_start = 0.0
+
+    def synced(self, now):
+        return now - self.last_reply < CLOCK_TIMEOUT
+
+    def flags(self, now):
+        return TIMING_CLOCK_SYNCED if self.synced(now) else 0
+
+    def observe(self, ts, now):
+        """每个新帧调用一次，更新估计值"""
+        if self.synced(now):
+            return
+        delta = wrap_ms(ts - int(now * 1000))
+        if now - self.window_start > CLOCK_WINDOW:
+            self.prev_estimate, self.estimate = self.estimate, None
+            self.window_start = now
+        if self.estimate is None or delta > self.estimate:
+            self.estimate = delta
+        if self.prev_estimate is not None and self.prev_estimate > self.estimate:
+            self.offset = self.prev_estimate
+        else:
+            self.offset = self.estimate
+
+    def probe(self, sock, addr, now):
+        if sock is None or now - self.last_probe < CLOCK_INTERVAL:
+            return
+        self.last_probe = now
+        try:
+            sock.sendto(
+                CLOCK_MSG.pack(CLOCK_MAGIC, self.route, CLOCK_PROBE, 0, now, 0), addr
+            )
+        except OSError:
+            pass
+
+    def handle(self, data, now):
+        """处理 VCLK 回包，不是回包返回 False"""
+        if len(data) != CLOCK_MSG.size or data[:4] != CLOCK_MAGIC:
+            return False
+        _, _, kind, _, t0, sender_ms = CLOCK_MSG.unpack(data)
+        if kind != CLOCK_REPLY or not 0 <= now - t0 < CLOCK_TIMEOUT:
+            return False
+        self.samples.append((now - t0, wrap_ms(sender_ms - int((t0 + now) * 500))))
+        self.offset = min(self.samples)[1]
+        self.last_reply = now
+        return True
+
+
+def percentiles(samples):
+    """(p50, p95, p99)，最近秩法"""
+    ordered = sorted(samples)
+    n = len(ordered)
+    return tuple(ordered[min(n - 1, int(q * n))] for q in (0.5, 0.95, 0.99))
+
+
+class StageLatency:
+    """各阶段最近 LATENCY_WINDOW 个样本 (ms) 的 p50 / p95 / p99"""
+
+    STAGES = ("sender->relay", "receive", "handoff", "ws send")
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = {stage: deque(maxlen=window) for stage in self.STAGES}
+        self.synced = False
+
+    def add_frame(self, timed, now):
+        """由帧的延迟扩展头记录中继内各阶段"""
+        _, ts, offset, flags, _, first, last, _ = TIMING_HEADER.unpack_from(timed, 0)
+        self.synced = bool(flags & TIMING_CLOCK_SYNCED)
+        self.samples["sender->relay"].append(wrap_ms(int(first) - ts + offset))
+        self.samples["receive"].append(last - first)
+        self.samples["handoff"].append(now * 1000 - last)
+
+    def add_send(self, assembled, now):
+        self.samples["ws send"].append((now - assembled) * 1000)
+
+    def report(self):
+        parts = []
+        for stage, samples in self.samples.items():
+            if samples:
+                p50, p95, p99 = percentiles(samples)
+                parts.append(f"{stage} {p50:.1f}/{p95:.1f}/{p99:.1f}")
+        if not parts:
+            return None
+        clock = "synced" if self.synced else "estimated"
+        return f"Latency ms p50/p95/p99 ({clock} sender clock) | " + " | ".join(parts)
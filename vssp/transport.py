@@ -0,0 +1,415 @@
+import asyncio
+import ctypes
+import ctypes.util
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+# 接收线程参数
+RX_SLOT_SIZE = 2048  # 单个数据报缓冲 (VSSP 包最大 24 + 1200 字节)
+RX_BATCH = 64  # 每次批量读取的最大数据报数
+RX_TIMEOUT = 0.2  # 阻塞读取超时，用于检查退出标志
+# 交给 asyncio 的完整帧上限，超出即丢弃 (计入 queue_drops)；各会话共用一个队列，
+# 默认按当前活跃的会话数放大，--frame-queue 指定固定上限 (RelayConfig.frame_queue)
+FRAME_QUEUE_PER_SESSION = 8  # 一个会话左右眼各 4 帧
+
+MSG_WAITFORONE = 0x10000
+
+
+class _Iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _Msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_Iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _Mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _Msghdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_recvmmsg():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fn = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(_Mmsghdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+        ctypes.c_void_p,
+    ]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+_recvmmsg = _load_recvmmsg()
+
+
+def kernel_drops(port):
+    """读取 /proc/net/udp 中该端口 socket 的内核丢包计数 (仅 Linux)"""
+    try:
+        with open("/proc/net/udp") as f:
+            lines = f.readlines()[1:]
+    except OSError:
+        return None
+    suffix = f":{port:04X}"
+    drops = None
+    # SO_REUSEPORT 时同一端口有多个 socket，累加
+    for line in lines:
+        fields = line.split()
+        if fields[1].endswith(suffix):
+            drops = (drops or 0) + int(fields[-1])
+    return drops
+
+
+class RxStats:
+    """接收统计 (只由接收线程写入)"""
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.batches = 0
+        self.frames = 0
+        self.errors = 0
+        self.queue_drops = 0
+
+    def snapshot(self):
+        return (
+            self.packets,
+            self.bytes,
+            self.batches,
+            self.frames,
+            self.errors,
+            self.queue_drops,
+        )
+
+
+def open_udp_socket(port, rcvbuf=1024 * 1024, reuseport=False):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # Increase UDP buffer for macOS
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    if reuseport:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(("0.0.0.0", port))
+    return sock
+
+
+SO_ATTACH_REUSEPORT_CBPF = 51
+
+
+class _SockFilter(ctypes.Structure):
+    _fields_ = [
+        ("code", ctypes.c_uint16),
+        ("jt", ctypes.c_uint8),
+        ("jf", ctypes.c_uint8),
+        ("k", ctypes.c_uint32),
+    ]
+
+
+def attach_shard_filter(sock, shards):
+    """按包内容选择 SO_REUSEPORT 组内的 socket: (frame_id 低字节 + eye) % shards
+
+    内核以 UDP payload 起始处为偏移 0 运行该 cBPF 程序，返回值即组内 socket 下标
+    (按 bind 顺序)；同一帧的数据包、校验包和重传包总是落到同一个 socket。
+    仅 Linux 支持，失败返回 False (此时内核按四元组哈希分配，只能按发送端分流)。
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    prog = (_SockFilter * 6)(
+        (0x30, 0, 0, 4),  # ldb [4]      A = frame_id & 0xFF
+        (0x07, 0, 0, 0),  # tax          X = A
+        (0x30, 0, 0, 9),  # ldb [9]      A = eye
+        (0x0C, 0, 0, 0),  # add x        A += X
+        (0x94, 0, 0, shards),  # mod #n  A %= shards
+        (0x16, 0, 0, 0),  # ret a
+    )
+    fprog = struct.pack("HL", len(prog), ctypes.addressof(prog))
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_REUSEPORT_CBPF, fprog)
+    except OSError:
+        return False
+    return True
+
+
+class FrameQueue:
+    """接收端 -> asyncio 的完整帧队列 (单一 deque + 事件唤醒)
+
+    max_frames 为固定上限；为 None 时上限为每个活跃会话 FRAME_QUEUE_PER_SESSION 帧，
+    活跃会话数由 sessions() 给出 (未提供时按单个会话)。
+    """
+
+    def __init__(self, release=None, max_frames=None, sessions=None):
+        self.release = release
+        self.max_frames = max_frames
+        self.sessions = sessions
+        self.stats = RxStats()
+        self.frames = deque()
+        self.loop = None
+        self.wakeup = None
+
+    async def get(self):
+        """等待并取出下一帧 (asyncio 侧)"""
+        while not self.frames:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+        return self.frames.popleft()
+
+    def limit(self):
+        """当前的队列上限"""
+        if self.max_frames:
+            return self.max_frames
+        sessions = self.sessions() if self.sessions is not None else 1
+        return FRAME_QUEUE_PER_SESSION * max(sessions, 1)
+
+    def _push(self, frame):
+        if len(self.frames) >= self.limit():
+            self.stats.queue_drops += 1
+            if self.release is not None:
+                self.release(frame)
+            return False
+        self.frames.append(frame)
+        self.stats.frames += 1
+        return True
+
+
+class AsyncReceiver(FrameQueue):
+    """逐包 asyncio 接收 (旧路径，保留用于性能对比)，handler 在事件循环中调用"""
+
+    mode = "async"
+
+    def __init__(self, sock, handler, release=None, max_frames=None, sessions=None):
+        super().__init__(release, max_frames, sessions)
+        self.sock = sock
+        self.handler = handler
+        self.task = None
+
+    def start(self, loop):
+        self.loop = loop
+        self.wakeup = asyncio.Event()
+        self.sock.setblocking(False)
+        self.task = loop.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def _run(self):
+        rx_buf = bytearray(RX_SLOT_SIZE)
+        rx_view = memoryview(rx_buf)
+        stats = self.stats
+        while True:
+            nbytes, addr = await self.loop.sock_recvfrom_into(self.sock, rx_buf)
+            stats.packets += 1
+            stats.batches += 1
+            stats.bytes += nbytes
+            try:
+                frame = self.handler(rx_view[:nbytes], addr)
+            except Exception:
+                stats.errors += 1
+                continue
+            if frame is not None and self._push(frame):
+                self.wakeup.set()
+
+
+class BatchReceiver(FrameQueue):
+    """独立接收线程: 批量读取数据报 -> handler 重组 -> 完整帧经单一线程安全队列交给 asyncio
+
+    handler(view, addr) 在接收线程中调用，view 为数据报内容 (指向环形缓冲，调用后即失效)，
+    返回完整帧对象或 None。release(frame) 用于归还被丢弃的帧。
+    """
+
+    def __init__(
+        self,
+        sock,
+        handler,
+        release=None,
+        batch=RX_BATCH,
+        use_mmsg=True,
+        max_frames=None,
+        sessions=None,
+    ):
+        super().__init__(release, max_frames, sessions)
+        self.sock = sock
+        self.handler = handler
+        self.batch = batch
+        self.use_mmsg = use_mmsg and _recvmmsg is not None
+        self.running = False
+        self.thread = None
+
+    @property
+    def mode(self):
+        return "recvmmsg" if self.use_mmsg else "recv_into"
+
+    def start(self, loop):
+        self.loop = loop
+        self.wakeup = asyncio.Event()
+        self.running = True
+        # 阻塞模式 + SO_RCVTIMEO 定期唤醒检查 running
+        self.sock.setblocking(True)
+        if sys.platform == "win32":
+            timeo = struct.pack("I", int(RX_TIMEOUT * 1000))
+        else:
+            timeo = struct.pack("ll", 0, int(RX_TIMEOUT * 1_000_000))
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeo)
+        target = self._run_mmsg if self.use_mmsg else self._run_recv_into
+        self.thread = threading.Thread(target=target, name="vssp-rx", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(RX_TIMEOUT * 5)
+
+    def _handle(self, view, addr, ready):
+        try:
+            frame = self.handler(view, addr)
+        except Exception:
+            self.stats.errors += 1
+            return
+        if frame is not None:
+            ready.append(frame)
+
+    def _flush(self, ready):
+        # 一批数据报只唤醒 asyncio 一次
+        for frame in ready:
+            self._push(frame)
+        ready.clear()
+        try:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        except RuntimeError:
+            self.running = False
+
+    def _run_recv_into(self):
+        ring = [bytearray(RX_SLOT_SIZE) for _ in range(self.batch)]
+        views = [memoryview(b) for b in ring]
+        dontwait = getattr(socket, "MSG_DONTWAIT", 0)
+        stats = self.stats
+        ready = []
+        while self.running:
+            n = 0
+            while n < self.batch:
+                try:
+                    # 首包阻塞等待，之后非阻塞地把 socket 读空
+                    flags = dontwait if n else 0
+                    nbytes, addr = self.sock.recvfrom_into(ring[n], RX_SLOT_SIZE, flags)
+                except (BlockingIOError, InterruptedError, TimeoutError):
+                    break
+                except OSError:
+                    if not self.running:
+                        return
+                    break
+                stats.packets += 1
+                stats.bytes += nbytes
+                self._handle(views[n][:nbytes], addr, ready)
+                n += 1
+                if not dontwait:
+                    break
+            if n:
+                stats.batches += 1
+            if ready:
+                self._flush(ready)
+
+    def _run_mmsg(self):
+        batch = self.batch
+        ring = bytearray(RX_SLOT_SIZE * batch)
+        ring_view = memoryview(ring)
+        ring_base = ctypes.addressof(ctypes.c_char.from_buffer(ring))
+        names = (ctypes.c_char * (128 * batch))()
+        names_base = ctypes.addressof(names)
+        iovs = (_Iovec * batch)()
+        msgs = (_Mmsghdr * batch)()
+        for i in range(batch):
+            iovs[i].iov_base = ring_base + i * RX_SLOT_SIZE
+            iovs[i].iov_len = RX_SLOT_SIZE
+            msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovs[i])
+            msgs[i].msg_hdr.msg_iovlen = 1
+            msgs[i].msg_hdr.msg_name = names_base + i * 128
+        addr_cache = {}
+        fd = self.sock.fileno()
+        stats = self.stats
+        ready = []
+        for i in range(batch):
+            msgs[i].msg_hdr.msg_namelen = 128
+        while self.running:
+            n = _recvmmsg(fd, msgs, batch, MSG_WAITFORONE, None)
+            if n <= 0:
+                continue  # 超时 (EAGAIN) / EINTR
+            stats.batches += 1
+            for i in range(n):
+                nbytes = msgs[i].msg_len
+                stats.packets += 1
+                stats.bytes += nbytes
+                raw = bytes(names[i * 128 : i * 128 + 8])
+                addr = addr_cache.get(raw)
+                if addr is None:
+                    # sockaddr_in: family(2) port(2, big-endian) ip(4)
+                    addr = (socket.inet_ntoa(raw[4:8]), int.from_bytes(raw[2:4], "big"))
+                    addr_cache[raw] = addr
+                msgs[i].msg_hdr.msg_namelen = 128
+                offset = i * RX_SLOT_SIZE
+                self._handle(ring_view[offset : offset + nbytes], addr, ready)
+            if ready:
+                self._flush(ready)
+
+
+class RxReporter:
+    """周期性输出接收速率与丢包计数，便于对比不同接收路径"""
+
+    def __init__(self, stats, port, mode):
+        self.stats = stats
+        self.port = port
+        self.mode = mode
+        self.last = stats.snapshot()
+        self.last_time = time.time()
+        self.base_drops = kernel_drops(port)
+
+    def report(self):
+        now = time.time()
+        dt = max(now - self.last_time, 1e-6)
+        cur = self.stats.snapshot()
+        packets, nbytes, batches, frames = (
+            c - l for c, l in zip(cur[:4], self.last[:4])
+        )
+        self.last, self.last_time = cur, now
+        drops = kernel_drops(self.port)
+        kdrops = "n/a" if drops is None else drops - (self.base_drops or 0)
+        return (
+            f"RX[{self.mode}] {packets / dt:,.0f} pkt/s "
+            f"{nbytes * 8 / dt / 1e6:,.1f} Mbit/s "
+            f"{packets / max(batches, 1):.1f} pkt/batch "
+            f"{frames / dt:.1f} frame/s | errors {cur[4]} "
+            f"queue_drops {cur[5]} kernel_drops {kdrops}"
+        )
+
+
+def make_receiver(rx_mode, sock, handler, release=None, max_frames=None, sessions=None):
+    """rx_mode: auto / recvmmsg / recv_into (独立接收线程) 或 async (逐包 asyncio)
+
+    max_frames 为交给 asyncio 的完整帧队列的固定上限，None 时按 sessions() 个活跃会话放大。
+    """
+    if rx_mode == "async":
+        return AsyncReceiver(sock, handler, release, max_frames, sessions)
+    return BatchReceiver(
+        sock,
+        handler,
+        release,
+        use_mmsg=rx_mode != "recv_into",
+        max_frames=max_frames,
+        sessions=sessions,
+    )
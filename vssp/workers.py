@@ -0,0 +1,364 @@
+"""多进程中继: 每个 worker 进程持有一个 SO_REUSEPORT socket 并独立重组，
+完整帧直接写在共享内存槽位中，前端进程只收到 (slot, length, eye, frame_id, session) 通知。
+"""
+
+import asyncio
+import json
+import multiprocessing
+import socket
+import struct
+import threading
+from multiprocessing import shared_memory
+
+from .assembler import Reassembler
+from .capture import CaptureWriter, recording_handler
+from .frames import frame_before
+from .header import TIMING_HEADER_SIZE
+from .relay import RELAY_COUNTERS, Relay
+from .transport import (
+    RxReporter,
+    attach_shard_filter,
+    make_receiver,
+    open_udp_socket,
+)
+
+# worker -> 前端: 帧已就绪 (length 含延迟扩展头) 或指标快照 (MSG_METRICS + JSON)
+# 前端 -> worker: 槽位可复用
+MSG_FRAME = 0
+MSG_METRICS = 1
+# MSG_FRAME, slot, length, eye, frame_id, session
+FRAME_MSG = struct.Struct("<BHIBIH")
+RELEASE_MSG = struct.Struct("<H")  # slot
+METRICS_INTERVAL = 1.0
+
+
+class SlotPool:
+    """共享内存中的固定大小帧槽位，Reassembler 直接在槽位内重组 (接口同 FramePool)"""
+
+    def __init__(self, buf, slots, slot_size):
+        self.slot_size = slot_size
+        self.max_size = slot_size
+        self.views = [buf[i * slot_size : (i + 1) * slot_size] for i in range(slots)]
+        self.index = {id(view): i for i, view in enumerate(self.views)}
+        self.free = list(range(slots))
+        # 接收线程 acquire，事件循环收到前端归还后 release
+        self.lock = threading.Lock()
+
+    def acquire(self, size):
+        if size > self.slot_size:
+            return None
+        with self.lock:
+            if not self.free:
+                return None
+            return self.views[self.free.pop()]
+
+    def release(self, buf):
+        with self.lock:
+            self.free.append(self.index[id(buf)])
+
+    def slot_of(self, buf):
+        return self.index[id(buf)]
+
+    def close(self):
+        for view in self.views:
+            view.release()
+
+
+class ShardWorker:
+    """worker 进程: 接收 -> 重组 -> 通知前端，等待前端归还槽位"""
+
+    def __init__(self, index, config, shm_name, log, conn):
+        self.index = index
+        self.config = config
+        self.log = log
+        self.conn = conn
+        self.shm = shared_memory.SharedMemory(shm_name)
+        self.pool = SlotPool(self.shm.buf, config.shm_slots, config.shm_slot_size)
+        self.assembler = Reassembler(
+            config.max_pending,
+            config.max_age,
+            config.window,
+            self.pool,
+            index,
+            config.max_sessions,
+        )
+        self.assembler.nack = config.nack
+        self.sent = {}  # Key: slot -> 已交给前端的帧
+        self.task = None
+
+    async def run(self):
+        config = self.config
+        loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        sock = open_udp_socket(config.udp_port, config.rcvbuf, reuseport=True)
+        if not attach_shard_filter(sock, config.workers) and self.index == 0:
+            self.log("SO_ATTACH_REUSEPORT_CBPF unavailable, sharding by sender address")
+        self.assembler.sock = sock
+
+        handler = self.assembler.handle_packet
+        recorder = None
+        if config.record:
+            # 每个 worker 一个文件，replay.py 可同时回放多个文件 (按时间归并)
+            recorder = CaptureWriter(f"{config.record}.w{self.index}")
+            handler = recording_handler(recorder, handler, config.udp_port)
+        rx = make_receiver(
+            config.rx_mode,
+            sock,
+            handler,
+            self.assembler.release_frame,
+            config.frame_queue,
+            self.assembler.session_count,
+        )
+        rx.start(loop)
+        loop.add_reader(self.conn.fileno(), self.on_release)
+        reporter = asyncio.create_task(self.report_stats(rx))
+        metrics = asyncio.create_task(self.push_metrics(rx))
+        try:
+            while True:
+                fb = await rx.get()
+                slot = self.pool.slot_of(fb.buf)
+                self.sent[slot] = fb
+                self.conn.send_bytes(
+                    FRAME_MSG.pack(
+                        MSG_FRAME,
+                        slot,
+                        len(fb.timed),
+                        fb.eye,
+                        fb.frame_id,
+                        fb.session,
+                    )
+                )
+        except (asyncio.CancelledError, OSError):
+            pass
+        finally:
+            reporter.cancel()
+            metrics.cancel()
+            loop.remove_reader(self.conn.fileno())
+            rx.stop()
+            sock.close()
+            if recorder is not None:
+                recorder.close()
+
+    def on_release(self):
+        try:
+            while self.conn.poll():
+                (slot,) = RELEASE_MSG.unpack(self.conn.recv_bytes())
+                self.assembler.release_frame(self.sent.pop(slot))
+        except (EOFError, OSError):
+            # 前端已退出
+            self.task.cancel()
+
+    async def push_metrics(self, rx):
+        """定期把计数快照交给前端汇总 (/metrics 由前端提供)"""
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            counters = self.assembler.counters()
+            counters["packets"] = rx.stats.packets
+            counters["bytes"] = rx.stats.bytes
+            counters["rx_errors"] = rx.stats.errors
+            counters["queue_drops"] = rx.stats.queue_drops
+            self.conn.send_bytes(bytes([MSG_METRICS]) + json.dumps(counters).encode())
+
+    async def report_stats(self, rx):
+        reporter = RxReporter(rx.stats, self.config.udp_port, rx.mode)
+        while True:
+            await asyncio.sleep(self.config.stats_interval)
+            self.log(reporter.report())
+            self.log(
+                f"{self.assembler.report()} | slots in use {len(self.sent)} "
+                f"pool drops {self.assembler.pool_drops} "
+                f"oversize frames {self.assembler.oversize_drops}"
+            )
+
+
+def worker_main(index, config, shm_name, log, conn):
+    def worker_log(msg):
+        log(f"[worker {index}] {msg}")
+
+    worker = ShardWorker(index, config, shm_name, worker_log, conn)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.pool.close()
+        worker.shm.close()
+
+
+class Shard:
+    """前端持有的一个 worker: 进程 / 共享内存 / 通知管道"""
+
+    def __init__(self, ctx, index, config, log):
+        self.index = index
+        self.slot_size = config.shm_slot_size
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=config.shm_slots * config.shm_slot_size
+        )
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=worker_main,
+            args=(index, config, self.shm.name, log, child),
+            name=f"vssp-worker-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    def view(self, slot, length):
+        offset = slot * self.slot_size
+        return self.shm.buf[offset : offset + length]
+
+    def release(self, slot):
+        try:
+            self.conn.send_bytes(RELEASE_MSG.pack(slot))
+        except OSError:
+            pass
+
+    def close(self):
+        self.conn.close()
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # 仍有客户端持有帧视图，随进程退出释放
+        self.shm.unlink()
+
+
+class ShardFrame:
+    """共享内存中的完整帧 (含延迟扩展头与 Web Relay 头)，接口同 FrameBuffer 的广播部分"""
+
+    __slots__ = ("shard", "slot", "eye", "frame_id", "session", "timed", "packet")
+
+    def __init__(self, shard, slot, eye, frame_id, session, timed):
+        self.shard = shard
+        self.slot = slot
+        self.eye = eye
+        self.frame_id = frame_id
+        self.session = session
+        self.timed = timed
+        self.packet = timed[TIMING_HEADER_SIZE:]
+
+
+class ShardedRelay(Relay):
+    """--workers N: 按 (frame_id + eye) 把重组分到 N 个进程，前端只负责 WebSocket 扇出"""
+
+    def __init__(self, config, log=print):
+        super().__init__(config, log)
+        self.shards = []
+        self.latest = {}  # Key: (session, eye) -> 最近广播的 frame_id
+        self.reordered = 0
+        self.done = None
+        self.worker_counters = {}  # Key: worker index -> 最近的指标快照
+        self.sock = None  # 发送 VFBK (前端没有 VSSP 端口的 socket)
+        self.metrics.register(
+            "vssp_frames_reordered_total",
+            "counter",
+            "Frames dropped because a newer frame from another worker was sent first",
+            lambda: [(None, self.reordered)],
+        )
+
+    def release_frame(self, fb):
+        fb.packet.release()
+        fb.timed.release()
+        fb.shard.release(fb.slot)
+
+    def feedback_socket(self):
+        # 不能再绑定 VSSP 端口 (会加入 reuseport 组分走数据报)，用临时端口发出
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        return self.sock
+
+    async def udp_receiver(self):
+        config = self.config
+        loop = asyncio.get_running_loop()
+        self.done = loop.create_future()
+        ctx = multiprocessing.get_context("spawn")
+        for i in range(config.workers):
+            self.shards.append(Shard(ctx, i, config, self.log))
+        for shard in self.shards:
+            loop.add_reader(shard.conn.fileno(), self.on_frames, shard)
+        self.log(
+            f"VSSP UDP Listener active on {config.udp_port} "
+            f"({config.workers} workers, SO_REUSEPORT)"
+        )
+        reporter = asyncio.create_task(self.report_stats(None))
+        try:
+            await self.done
+        finally:
+            reporter.cancel()
+            for shard in self.shards:
+                loop.remove_reader(shard.conn.fileno())
+                shard.close()
+            if self.sock is not None:
+                self.sock.close()
+
+    def on_frames(self, shard):
+        window = self.config.window
+        try:
+            while shard.conn.poll():
+                msg = shard.conn.recv_bytes()
+                if msg[0] == MSG_METRICS:
+                    self.worker_counters[shard.index] = json.loads(msg[1:])
+                    continue
+                _, slot, length, eye, frame_id, session = FRAME_MSG.unpack(msg)
+                fb = ShardFrame(
+                    shard, slot, eye, frame_id, session, shard.view(slot, length)
+                )
+                last = self.latest.get((session, eye))
+                if (
+                    last is not None
+                    and frame_before(frame_id, last)
+                    and (last - frame_id) & 0xFFFFFFFF < window
+                ):
+                    # 不同 worker 完成的先后不定: 比已广播的帧还旧就丢弃
+                    self.reordered += 1
+                    self.release_frame(fb)
+                    continue
+                self.latest[(session, eye)] = frame_id
+                self.broadcast_frame(fb)
+        except (EOFError, OSError):
+            if not self.done.done():
+                self.done.set_exception(
+                    RuntimeError(f"VSSP worker {shard.index} exited")
+                )
+
+    def counters(self):
+        """各 worker 最近快照之和"""
+        total = {key: 0 for key, _, _ in RELAY_COUNTERS}
+        assembled = {}
+        sessions = {}
+        expired = {}
+        senders = {}
+        for counters in self.worker_counters.values():
+            for key in total:
+                total[key] += counters.get(key, 0)
+            for eye, n in counters.get("assembled", {}).items():
+                assembled[int(eye)] = assembled.get(int(eye), 0) + n
+            for session, n in counters.get("sessions", {}).items():
+                sessions[int(session)] = sessions.get(int(session), 0) + n
+            for session, n in counters.get("session_expired", {}).items():
+                expired[int(session)] = expired.get(int(session), 0) + n
+            for session, addr in counters.get("senders", {}).items():
+                if addr is not None:
+                    senders[int(session)] = tuple(addr)
+        total["assembled"] = assembled
+        total["sessions"] = sessions
+        total["session_expired"] = expired
+        total["senders"] = senders
+        return total
+
+    async def report_stats(self, rx):
+        while True:
+            await asyncio.sleep(self.config.stats_interval)
+            self.log(f"Frames dropped out of order {self.reordered}")
+            self.report_latency()
+            self.report_feedback()
+
+
+def create_relay(config, log=print):
+    if config.workers > 1:
+        return ShardedRelay(config, log)
+    return Relay(config, log)